@@ -0,0 +1,145 @@
+"""Measure alert rule evaluation throughput with many rules loaded.
+
+Loads ``--rules`` threshold and rate-of-change rules spread over
+``--topics`` telemetry topics (a few on ``telemetry.*``) and feeds
+``--samples`` synthetic samples through ``AlertEngine.evaluate``, whose
+rules are indexed by topic. ``--naive`` adds a run that checks every rule
+against every sample, for comparison. Reports samples per second, time per
+sample and rules evaluated per sample.
+
+    uv run python -m app.benchmarks.alert_rules --rules 100 500 --topics 20
+"""
+
+from ..services.alerts import AlertEngine, AlertRule
+from ..services.websocket_hub import WebSocketHub, topic_patterns
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+
+FIELDS = ("voltage", "current", "temp", "rpm")
+
+
+class NaiveAlertEngine(AlertEngine):
+    """Scans every rule for every sample instead of using the topic index."""
+
+    def evaluate(self, topic, data, timestamp, mission_id=None) -> None:
+        self.samples += 1
+        self.mission_id = mission_id
+        patterns = topic_patterns(topic)
+        rules = [
+            rule
+            for rule in self.rules.values()
+            if rule.kind != "stale" and rule.topic in patterns
+        ]
+        self._apply(rules, topic, data, timestamp)
+
+
+def make_rules(count: int, topics: List[str]) -> List[AlertRule]:
+    rng = random.Random(1)
+    rules = []
+    for i in range(count):
+        # One rule in twenty watches every telemetry topic
+        topic = "telemetry.*" if i % 20 == 1 else topics[i % len(topics)]
+        kind = "rate" if i % 4 == 0 else "threshold"
+        value = rng.uniform(60, 95) if kind == "threshold" else rng.uniform(20, 40)
+        rules.append(
+            AlertRule(
+                id=f"rule{i}",
+                kind=kind,
+                topic=topic,
+                field=f"motor.{FIELDS[i % len(FIELDS)]}",
+                value=value,
+                clear=value * 0.9,
+            )
+        )
+    return rules
+
+
+def make_samples(count: int, topics: List[str]) -> List[Dict[str, Any]]:
+    rng = random.Random(2)
+    start = datetime.now(timezone.utc)
+    samples = []
+    for i in range(count):
+        # Slow swings with noise so alerts raise and clear now and then
+        level = 50 + 40 * math.sin(i / 500)
+        samples.append(
+            {
+                "topic": topics[i % len(topics)],
+                "data": {"motor": {name: level + rng.gauss(0, 1) for name in FIELDS}},
+                "timestamp": start + timedelta(milliseconds=10 * i),
+            }
+        )
+    return samples
+
+
+async def run_case(
+    engine: AlertEngine, rules: List[AlertRule], samples: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    engine.set_rules(rules)
+    started = time.perf_counter()
+    for sample in samples:
+        engine.evaluate(sample["topic"], sample["data"], sample["timestamp"])
+    elapsed = time.perf_counter() - started
+    stats = engine.stats()
+    return {
+        "samples": len(samples),
+        "seconds": elapsed,
+        "samples_per_s": len(samples) / elapsed,
+        "us_per_sample": elapsed / len(samples) * 1e6,
+        "evaluations_per_sample": stats["evaluations"] / len(samples),
+        "alerts": stats["active"] + stats["unwritten"],
+    }
+
+
+async def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    topics = [f"telemetry.source{i}" for i in range(args.topics)]
+    samples = make_samples(args.samples, topics)
+    results = []
+    for count in args.rules:
+        engines: List[AlertEngine] = [AlertEngine(hub=WebSocketHub())]
+        if args.naive:
+            engines.append(NaiveAlertEngine(hub=WebSocketHub()))
+        for engine in engines:
+            result = await run_case(engine, make_rules(count, topics), samples)
+            result["rules"] = count
+            result["engine"] = (
+                "naive" if isinstance(engine, NaiveAlertEngine) else "indexed"
+            )
+            results.append(result)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Measure alert rule evaluation throughput"
+    )
+    parser.add_argument("--rules", type=int, nargs="+", default=[100, 500])
+    parser.add_argument("--topics", type=int, default=20)
+    parser.add_argument("--samples", type=int, default=100_000)
+    parser.add_argument("--naive", action="store_true")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print(
+        f"{'rules':>6} {'engine':>8} {'samples/s':>11} {'us/sample':>10} "
+        f"{'rules/sample':>13} {'alerts':>7}"
+    )
+    for r in results:
+        print(
+            f"{r['rules']:>6} {r['engine']:>8} {r['samples_per_s']:>11,.0f} "
+            f"{r['us_per_sample']:>10.2f} {r['evaluations_per_sample']:>13.1f} "
+            f"{r['alerts']:>7}"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
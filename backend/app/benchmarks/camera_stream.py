@@ -0,0 +1,231 @@
+"""Measure MJPEG fan-out from a synthetic camera to many HTTP viewers.
+
+Runs the API in-process under uvicorn with one fake camera and opens
+``--viewers`` concurrent /stream connections. Reports delivered frame rate
+per viewer, capture-to-receive latency and server CPU use, showing that
+encode cost stays flat as viewers are added.
+
+``--slow-viewers`` adds viewers whose reads are throttled to
+``--slow-kbps``, to show them dropping to lower tiers while fast viewers
+keep full quality, and the tier encodes being shared.
+
+    uv run python -m app.benchmarks.camera_stream --viewers 1 10 50
+    uv run python -m app.benchmarks.camera_stream --viewers 10 --slow-viewers 10
+"""
+
+from ..main import app
+from ..services.cameras import (
+    TIER_NAMES,
+    Camera,
+    CameraConfig,
+    FakeCameraSource,
+    camera_manager,
+)
+from collections import Counter
+from typing import Any, Dict, List, Optional
+import argparse
+import asyncio
+import json
+import socket
+import statistics
+import time
+import httpx
+import uvicorn
+
+CAMERA_ID = "bench"
+SLOW_RCVBUF = 16 * 1024
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def view(
+    client: httpx.AsyncClient,
+    camera: Camera,
+    duration: float,
+    latencies: List[float],
+    tiers: Counter,
+    kbps: Optional[float] = None,
+) -> int:
+    """Read the stream for ``duration`` seconds, returning frames received.
+
+    With ``kbps`` the reader sleeps after each chunk to emulate a slow link.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + duration
+    frames = 0
+    buffer = b""
+    async with client.stream("GET", f"/api/v1/cameras/{CAMERA_ID}/stream") as response:
+        async for chunk in response.aiter_raw():
+            if kbps:
+                await asyncio.sleep(len(chunk) * 8 / (kbps * 1000))
+            buffer += chunk
+            while True:
+                header_end = buffer.find(b"\r\n\r\n")
+                if header_end < 0:
+                    break
+                headers = dict(
+                    line.split(": ", 1)
+                    for line in buffer[:header_end].decode().split("\r\n")[1:]
+                )
+                end = header_end + 4 + int(headers["Content-Length"]) + 2
+                if len(buffer) < end:
+                    break
+                buffer = buffer[end:]
+                frames += 1
+                tiers[headers["X-Frame-Tier"]] += 1
+                frame = camera.buffer.get(int(headers["X-Frame-Seq"]))
+                if frame is not None:
+                    latencies.append(loop.time() - frame.captured_at)
+            if loop.time() >= deadline:
+                return frames
+    return frames
+
+
+async def run_viewers(
+    port: int,
+    camera: Camera,
+    viewers: int,
+    slow_viewers: int,
+    slow_kbps: float,
+    duration: float,
+) -> Dict[str, Any]:
+    latencies: List[float] = []
+    slow_latencies: List[float] = []
+    tiers: Counter = Counter()
+    slow_tiers: Counter = Counter()
+    frames_before = camera.frames_captured
+    encode_before = camera.encode_time_s
+    tier_encodes_before = sum(camera.tier_encodes.values())
+    cpu_before = time.process_time()
+    base_url = f"http://127.0.0.1:{port}"
+    # Small receive buffers on the slow links, like a radio with little in
+    # flight, so backpressure reaches the server instead of piling up in
+    # loopback socket buffers
+    slow_transport = httpx.AsyncHTTPTransport(
+        limits=httpx.Limits(max_connections=max(slow_viewers, 1)),
+        socket_options=[(socket.SOL_SOCKET, socket.SO_RCVBUF, SLOW_RCVBUF)],
+    )
+    async with (
+        httpx.AsyncClient(
+            base_url=base_url,
+            limits=httpx.Limits(max_connections=max(viewers, 1)),
+            timeout=None,
+        ) as client,
+        httpx.AsyncClient(
+            base_url=base_url, transport=slow_transport, timeout=None
+        ) as slow_client,
+    ):
+        received = await asyncio.gather(
+            *(view(client, camera, duration, latencies, tiers) for _ in range(viewers)),
+            *(
+                view(
+                    slow_client, camera, duration, slow_latencies, slow_tiers, slow_kbps
+                )
+                for _ in range(slow_viewers)
+            ),
+        )
+    captured = camera.frames_captured - frames_before
+    fast, slow = received[:viewers], received[viewers:]
+    return {
+        "viewers": viewers,
+        "slow_viewers": slow_viewers,
+        "camera_fps": captured / duration,
+        "viewer_fps": statistics.mean(fast) / duration if fast else 0.0,
+        "slow_viewer_fps": statistics.mean(slow) / duration if slow else 0.0,
+        "latency_p50_ms": _percentile(latencies, 50) * 1e3,
+        "latency_p95_ms": _percentile(latencies, 95) * 1e3,
+        "slow_latency_p50_ms": _percentile(slow_latencies, 50) * 1e3,
+        "tiers": {name: tiers[name] for name in TIER_NAMES},
+        "slow_tiers": {name: slow_tiers[name] for name in TIER_NAMES},
+        "encode_ms": (camera.encode_time_s - encode_before) / max(captured, 1) * 1e3,
+        "tier_encodes_per_frame": (
+            (sum(camera.tier_encodes.values()) - tier_encodes_before) / max(captured, 1)
+        ),
+        # Includes the client side, which runs in this process too
+        "cpu_percent": (time.process_time() - cpu_before) / duration * 100,
+    }
+
+
+async def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    width, height = (int(v) for v in args.resolution.split("x"))
+    camera = camera_manager.add(
+        Camera(
+            CAMERA_ID,
+            FakeCameraSource(CAMERA_ID, width, height),
+            CameraConfig(fps=args.fps),
+            buffer_size=int(args.fps * 10),
+        )
+    )
+    camera.start()
+    server = uvicorn.Server(
+        uvicorn.Config(
+            app, host="127.0.0.1", port=0, lifespan="off", log_level="warning"
+        )
+    )
+    listener = socket.socket()
+    # Accepted connections inherit the small send buffer
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SLOW_RCVBUF)
+    listener.bind(("127.0.0.1", 0))
+    serve = asyncio.create_task(server.serve(sockets=[listener]))
+    while not server.started:
+        await asyncio.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+
+    results = []
+    try:
+        for viewers in args.viewers:
+            results.append(
+                await run_viewers(
+                    port,
+                    camera,
+                    viewers,
+                    args.slow_viewers,
+                    args.slow_kbps,
+                    args.duration,
+                )
+            )
+    finally:
+        server.should_exit = True
+        await serve
+        await camera.stop()
+        camera_manager.cameras.pop(CAMERA_ID, None)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Measure MJPEG fan-out from a fake camera to many viewers"
+    )
+    parser.add_argument("--viewers", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--slow-viewers", type=int, default=0)
+    parser.add_argument("--slow-kbps", type=float, default=500.0)
+    parser.add_argument("--fps", type=float, default=15.0)
+    parser.add_argument("--resolution", default="640x480")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print(
+        f"{'viewers':>8} {'cam fps':>8} {'view fps':>9} {'p50':>9} {'p95':>9} "
+        f"{'encode':>9} {'cpu':>6}  tiers (fast / slow)"
+    )
+    for r in results:
+        print(
+            f"{r['viewers']:>8} {r['camera_fps']:>8.1f} {r['viewer_fps']:>9.1f} "
+            f"{r['latency_p50_ms']:>7.1f}ms {r['latency_p95_ms']:>7.1f}ms "
+            f"{r['encode_ms']:>7.2f}ms {r['cpu_percent']:>5.0f}%  "
+            f"{r['tiers']} / {r['slow_tiers']}"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""Compare the shared-memory frame ring with a ``multiprocessing.Queue`` for
+moving large frames between processes.
+
+A producer process sends ``--frames`` frames of ``--shape`` (default a
+640x480 16-bit depth image) to a consumer process at each ``--rate``
+frames per second, where 0 is as fast as it can. Reports delivered frames
+and MB per second, and latency from the producer's write to the
+consumer's receipt on the shared monotonic clock. Transports:
+
+- ``queue``: numpy arrays through a ``multiprocessing.Queue`` (pickled and
+  copied through a pipe)
+- ``ring-copy``: ``FrameRing``, the consumer copying each frame out
+- ``ring-view``: ``FrameRing``, the consumer using the shared memory in
+  place and checking the frame is still valid afterwards
+
+The ring never blocks the producer, so at full speed a slower consumer
+loses frames (``lost``) where the queue would apply back pressure. The
+ring consumers spin while waiting, the queue consumer blocks.
+
+    uv run python -m app.benchmarks.frame_ring --shape 480 640 --rate 0 30 200
+"""
+
+from ..services.frame_ring import FrameRing
+from ..services.metrics import Histogram
+from typing import Any, Dict, List, Optional
+import argparse
+import json
+import multiprocessing
+import numpy as np
+import time
+
+BUCKETS_MS = tuple(0.005 * 1.25**i for i in range(60))
+TRANSPORTS = ("queue", "ring-copy", "ring-view")
+
+
+def produce_queue(q, shape, dtype, frames: int, rate: float) -> None:
+    frame = np.zeros(shape, dtype)
+    started = time.monotonic()
+    for i in range(frames):
+        if rate:
+            delay = started + i / rate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        frame.flat[0] = i
+        q.put((i, time.monotonic(), frame))
+    q.put(None)
+
+
+def produce_ring(name: str, ready, frames: int, rate: float, shape, dtype) -> None:
+    ring = FrameRing.create(name, shape, dtype, slots=16)
+    ready.set()
+    frame = np.zeros(shape, dtype)
+    started = time.monotonic()
+    try:
+        for i in range(frames):
+            if rate:
+                delay = started + i / rate - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            frame.flat[0] = i
+            ring.write(frame, timestamp=time.monotonic())
+        # Leave the ring up until the consumer has read to the end
+        ready.clear()
+        ready.wait(30)
+    finally:
+        ring.close()
+        ring.unlink()
+
+
+def run_case(transport: str, args: argparse.Namespace, rate: float) -> Dict[str, Any]:
+    context = multiprocessing.get_context("spawn")
+    shape = tuple(args.shape)
+    latency = Histogram(BUCKETS_MS)
+    received = 0
+    lost = 0
+    if transport == "queue":
+        q = context.Queue(maxsize=16)
+        producer = context.Process(
+            target=produce_queue, args=(q, shape, args.dtype, args.frames, rate)
+        )
+        producer.start()
+        started: Optional[float] = None
+        while True:
+            item = q.get()
+            if item is None:
+                break
+            _, sent, frame = item
+            latency.observe((time.monotonic() - sent) * 1e3)
+            started = started or time.monotonic()
+            received += 1
+        elapsed = time.monotonic() - (started or 0.0)
+    else:
+        name = f"frame-ring-bench-{time.monotonic_ns()}"
+        ready = context.Event()
+        producer = context.Process(
+            target=produce_ring,
+            args=(name, ready, args.frames, rate, shape, args.dtype),
+        )
+        producer.start()
+        ready.wait(10)
+        ring = FrameRing.attach(name)
+        reader = ring.reader(from_start=True)
+        out = np.empty(ring.shape, ring.dtype)
+        copy = transport == "ring-copy"
+        started = None
+        frame = None
+        while reader.next_seq < args.frames:
+            frame = reader.wait(5.0, out, copy=copy, interval=0)
+            if frame is None:
+                break
+            now = time.monotonic()
+            # Touch the frame as the queue consumer's unpickling does
+            int(frame.array.flat[-1])
+            if not copy and not frame.valid():
+                reader.overruns += 1
+                continue
+            latency.observe((now - frame.timestamp) * 1e3)
+            started = started or now
+            received += 1
+        elapsed = time.monotonic() - (started or 0.0)
+        lost = reader.overruns
+        del frame
+        ring.close()
+        ready.set()
+    producer.join()
+    frame_bytes = int(np.prod(shape)) * np.dtype(args.dtype).itemsize
+    return {
+        "transport": transport,
+        "rate": rate,
+        "frame_kb": frame_bytes / 1024,
+        "received": received,
+        "lost": lost,
+        "frames_per_s": (received - 1) / elapsed if elapsed else 0.0,
+        "mb_per_s": (received - 1) * frame_bytes / elapsed / 1e6 if elapsed else 0.0,
+        "latency_p50_ms": latency.percentile(50),
+        "latency_p99_ms": latency.percentile(99),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare the shared-memory frame ring with a multiprocessing queue"
+    )
+    parser.add_argument("--shape", type=int, nargs="+", default=[480, 640])
+    parser.add_argument("--dtype", default="uint16")
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument(
+        "--rate",
+        type=float,
+        nargs="+",
+        default=[0, 200],
+        help="Frames per second to send; 0 for as fast as possible",
+    )
+    parser.add_argument("--transport", nargs="+", default=list(TRANSPORTS))
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    results: List[Dict[str, Any]] = []
+    for rate in args.rate:
+        for transport in args.transport:
+            results.append(run_case(transport, args, rate))
+    print(
+        f"{'transport':<10} {'rate':>6} {'frames/s':>9} {'MB/s':>8} "
+        f"{'lost':>6} {'p50':>9} {'p99':>9}"
+    )
+    for r in results:
+        print(
+            f"{r['transport']:<10} {r['rate'] or 'max':>6} "
+            f"{r['frames_per_s']:>9.0f} {r['mb_per_s']:>8.0f} {r['lost']:>6} "
+            f"{r['latency_p50_ms'] or 0:>7.3f}ms {r['latency_p99_ms'] or 0:>7.3f}ms"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
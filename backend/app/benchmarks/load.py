@@ -0,0 +1,330 @@
+"""End-to-end load benchmark for one backend process.
+
+Runs the API in-process under uvicorn, with its normal startup, and
+records a new mission so telemetry is written to the configured database
+as on the rover. For ``--duration`` seconds after a ``--warmup`` it drives
+the API with:
+
+- synthetic telemetry from the rover simulator at ``--ingest-rate``
+  messages per second, through the rover link and ingest
+- ``--clients`` WebSocket clients subscribed to ``--topics``
+- ``--pollers`` REST clients each polling ``--poll-rate`` times per second,
+  round robin over the polled endpoints, revalidating with ``ETag`` as a
+  browser would
+
+Reports ingest, database write and delivery throughput, WebSocket
+(generation to client) and REST latency percentiles, drops at the link and
+hub, how full the telemetry writer's buffer got (it blocks ingest when
+full), CPU and memory. The mission is stopped, and so archived, at the
+end.
+The clients run in the same process, so absolute numbers are a lower
+bound; compare runs on the same machine. Results are written as JSON to
+``--output``, and ``--compare`` prints the change against an earlier file.
+
+    uv run bench --ingest-rate 2000 --clients 20 --pollers 10
+    uv run bench --compare bench-results/baseline.json
+"""
+
+from ..main import app
+from ..services.ingest import ingest
+from ..services.metrics import Histogram
+from ..services.rover_link import SIMULATOR_RATES, RoverLink, SimulatorSource
+from ..services.telemetry_writer import telemetry_writer
+from ..services.websocket_hub import hub
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from websockets.asyncio.client import connect
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import httpx
+import uvicorn
+
+POLLED_ENDPOINTS = (
+    "/api/v1/telemetry/latest",
+    "/api/v1/telemetry/sensors/vescs",
+    "/api/v1/health/checks",
+)
+
+# 0.05 ms to ~12 s in 25% steps, fine enough for sub-millisecond latencies
+BUCKETS_MS = tuple(0.05 * 1.25**i for i in range(56))
+
+# Metric -> whether higher is better, for --compare
+METRICS = {
+    "ingest_per_s": True,
+    "db_rows_per_s": True,
+    "writer_full_percent": False,
+    "ws_messages_per_s": True,
+    "ws_p50_ms": False,
+    "ws_p99_ms": False,
+    "link_dropped": False,
+    "writer_dropped": False,
+    "hub_dropped": False,
+    "poll_per_s": True,
+    "poll_p50_ms": False,
+    "poll_p99_ms": False,
+    "poll_errors": False,
+    "cpu_percent": False,
+    "rss_mb": False,
+    "peak_rss_mb": False,
+}
+
+
+class Recorder:
+    """Counters for the measured window; replaced after the warmup."""
+
+    def __init__(self):
+        self.ws_latency = Histogram(BUCKETS_MS)
+        self.poll_latency = Histogram(BUCKETS_MS)
+        self.poll_status: Dict[str, int] = {}
+        self.writer_samples = 0
+        self.writer_full = 0
+        self.writer_peak = 0
+
+
+def _rss_mb() -> Optional[float]:
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, KiB elsewhere
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+async def ws_client(port: int, topics: List[str], state: Dict[str, Any]) -> None:
+    async with connect(f"ws://127.0.0.1:{port}/api/v1/ws", max_size=None) as ws:
+        await ws.send(json.dumps({"action": "subscribe", "topics": topics}))
+        async for raw in ws:
+            message = json.loads(raw)
+            if "topic" not in message or "timestamp" not in message:
+                continue
+            sent = datetime.fromisoformat(message["timestamp"]).timestamp()
+            recorder: Recorder = state["recorder"]
+            recorder.ws_latency.observe((time.time() - sent) * 1e3)
+
+
+async def poller(
+    client: httpx.AsyncClient, index: int, rate: float, state: Dict[str, Any]
+) -> None:
+    loop = asyncio.get_running_loop()
+    etags: Dict[str, str] = {}
+    started = loop.time()
+    sent = 0
+    while True:
+        url = POLLED_ENDPOINTS[(index + sent) % len(POLLED_ENDPOINTS)]
+        headers = {"If-None-Match": etags[url]} if url in etags else {}
+        request_started = time.perf_counter()
+        try:
+            response = await client.get(url, headers=headers)
+            status = str(response.status_code)
+            if "etag" in response.headers:
+                etags[url] = response.headers["etag"]
+        except httpx.HTTPError:
+            status = "error"
+        recorder: Recorder = state["recorder"]
+        recorder.poll_latency.observe((time.perf_counter() - request_started) * 1e3)
+        recorder.poll_status[status] = recorder.poll_status.get(status, 0) + 1
+        sent += 1
+        delay = started + sent / rate - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def watch_writer(state: Dict[str, Any]) -> None:
+    """Sample the telemetry writer's buffer every 10 ms."""
+    while True:
+        recorder: Recorder = state["recorder"]
+        pending = telemetry_writer.pending
+        recorder.writer_samples += 1
+        recorder.writer_full += pending >= telemetry_writer.max_pending
+        recorder.writer_peak = max(recorder.writer_peak, pending)
+        await asyncio.sleep(0.01)
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning")
+    )
+    serve = asyncio.create_task(server.serve())
+    while not server.started:
+        if serve.done():
+            # Startup failed; uvicorn has logged why
+            raise SystemExit(1)
+        await asyncio.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+
+    total = sum(SIMULATOR_RATES.values())
+    link = RoverLink(ingest, queue_size=args.queue_size)
+    if args.ingest_rate > 0:
+        rates = {t: args.ingest_rate * r / total for t, r in SIMULATOR_RATES.items()}
+        link.add_source(SimulatorSource(rates, seed=1))
+
+    state: Dict[str, Any] = {"recorder": Recorder()}
+    tasks: List[asyncio.Task] = []
+    http = httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{port}",
+        limits=httpx.Limits(max_connections=max(args.pollers, 1)),
+    )
+    mission_started = False
+    try:
+        response = await http.post(
+            "/api/v1/missions/start", params={"name": "Load benchmark"}
+        )
+        if response.status_code == 409:
+            raise SystemExit("Stop the active mission before running the benchmark")
+        response.raise_for_status()
+        mission_started = True
+        tasks.append(asyncio.create_task(watch_writer(state)))
+        clients_before = hub.client_count
+        for _ in range(args.clients):
+            tasks.append(asyncio.create_task(ws_client(port, args.topics, state)))
+        while hub.client_count < clients_before + args.clients:
+            await asyncio.sleep(0.01)
+        for i in range(args.pollers):
+            tasks.append(asyncio.create_task(poller(http, i, args.poll_rate, state)))
+        await link.start()
+        await asyncio.sleep(args.warmup)
+
+        state["recorder"] = recorder = Recorder()
+        link_before = dict(link.counts)
+        writer_before = telemetry_writer.stats()
+        hub_dropped = hub.stats()["dropped"]
+        cpu_before = time.process_time()
+        started = time.perf_counter()
+        await asyncio.sleep(args.duration)
+        elapsed = time.perf_counter() - started
+        cpu = time.process_time() - cpu_before
+        link_counts = {k: v - link_before[k] for k, v in link.counts.items()}
+        writer_counts = {
+            key: telemetry_writer.stats()[key] - writer_before[key]
+            for key in ("rows_written", "rows_dropped")
+        }
+        hub_dropped = hub.stats()["dropped"] - hub_dropped
+        rss = _rss_mb()
+        # Stop counting; the clients keep running until cancelled below
+        state["recorder"] = Recorder()
+    finally:
+        await link.stop()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if mission_started:
+            await http.post("/api/v1/missions/stop")
+        await http.aclose()
+        server.should_exit = True
+        await serve
+
+    polls = recorder.poll_latency.count
+    return {
+        "ingest_offered_per_s": link_counts["received"] / elapsed,
+        "ingest_per_s": link_counts["ingested"] / elapsed,
+        "link_dropped": link_counts["dropped"],
+        "db_rows_per_s": writer_counts["rows_written"] / elapsed,
+        "writer_dropped": writer_counts["rows_dropped"],
+        "writer_peak_pending": recorder.writer_peak,
+        "writer_full_percent": recorder.writer_full / recorder.writer_samples * 100
+        if recorder.writer_samples
+        else None,
+        "ws_messages_per_s": recorder.ws_latency.count / elapsed,
+        "ws_p50_ms": recorder.ws_latency.percentile(50),
+        "ws_p99_ms": recorder.ws_latency.percentile(99),
+        "ws_max_ms": recorder.ws_latency.max,
+        "hub_dropped": hub_dropped,
+        "poll_per_s": polls / elapsed,
+        "poll_p50_ms": recorder.poll_latency.percentile(50),
+        "poll_p99_ms": recorder.poll_latency.percentile(99),
+        "poll_not_modified": recorder.poll_status.get("304", 0) / polls
+        if polls
+        else None,
+        "poll_errors": polls
+        - recorder.poll_status.get("200", 0)
+        - recorder.poll_status.get("304", 0),
+        "cpu_percent": cpu / elapsed * 100,
+        "rss_mb": rss,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def compare(previous: Dict[str, Any], current: Dict[str, Any]) -> None:
+    print(f"\n{'metric':<20} {'before':>12} {'after':>12} {'change':>9}")
+    for metric, higher_is_better in METRICS.items():
+        before = previous["results"].get(metric)
+        after = current["results"].get(metric)
+        if before is None or after is None:
+            continue
+        if before:
+            change = (after - before) / abs(before) * 100
+            worse = change < 0 if higher_is_better else change > 0
+            note = f"{change:>+8.1f}%" + (
+                " worse" if worse and abs(change) >= 5 else ""
+            )
+        else:
+            note = "" if after == before else "     new"
+        print(f"{metric:<20} {before:>12.2f} {after:>12.2f} {note}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Load the backend with ingest, WebSocket clients and pollers"
+    )
+    parser.add_argument("--ingest-rate", type=float, default=2000.0)
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--topics", nargs="+", default=["telemetry.*"])
+    parser.add_argument("--pollers", type=int, default=10)
+    parser.add_argument("--poll-rate", type=float, default=5.0)
+    parser.add_argument("--queue-size", type=int, default=10000)
+    parser.add_argument("--warmup", type=float, default=1.0)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument(
+        "--output",
+        default=f"bench-results/load-{datetime.now():%Y%m%d-%H%M%S}.json",
+        help="Where to write the results",
+    )
+    parser.add_argument("--compare", help="Earlier results file to compare with")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    report = {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "config": {
+            k: v for k, v in vars(args).items() if k not in ("output", "compare")
+        },
+        "results": results,
+    }
+    for key, value in results.items():
+        if value is None:
+            shown = "-"
+        elif isinstance(value, float):
+            shown = f"{value:.2f}"
+        else:
+            shown = str(value)
+        print(f"{key:<22} {shown:>12}")
+    directory = os.path.dirname(args.output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Measure the per-request cost of the metrics middleware.
+
+Calls a minimal Starlette app directly through ASGI, with no server or
+client in between, ``--requests`` times with and without
+``MetricsMiddleware`` wrapped around it, and reports microseconds per
+request and the difference. Routing and the response are the same in both
+runs, so the difference is the middleware: two clock reads, the send
+wrapper and one histogram observation.
+
+    uv run python -m app.benchmarks.metrics_overhead --requests 200000
+"""
+
+from ..services.instrumentation import MetricsMiddleware
+from ..services.metrics import HistogramFamily
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Route
+from typing import Any, Dict, List
+import argparse
+import asyncio
+import json
+import time
+
+
+async def ok(request):
+    return Response(b"ok")
+
+
+def make_app() -> Starlette:
+    return Starlette(routes=[Route("/items/{item_id}", ok)])
+
+
+async def time_requests(app, requests: int) -> float:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/items/1",
+        "raw_path": b"/items/1",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [],
+        "server": ("test", 80),
+        "client": ("test", 1234),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+async def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    family = HistogramFamily("requests", "Requests", ("method", "route", "status"))
+    apps = {
+        "plain": make_app(),
+        "instrumented": MetricsMiddleware(make_app(), family),
+    }
+    best = {name: float("inf") for name in apps}
+    for _ in range(args.repeat):
+        for name, app in apps.items():
+            await time_requests(app, min(args.requests, 1000))
+            best[name] = min(best[name], await time_requests(app, args.requests))
+    return [
+        {
+            "app": name,
+            "us_per_request": us,
+            "overhead_us": us - best["plain"],
+        }
+        for name, us in best.items()
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Measure the per-request cost of the metrics middleware"
+    )
+    parser.add_argument("--requests", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print(f"{'app':<14} {'us/request':>11} {'overhead':>9}")
+    for r in results:
+        print(f"{r['app']:<14} {r['us_per_request']:>11.2f} {r['overhead_us']:>7.2f}us")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Compare JSON text and msgpack blob storage for telemetry payloads.
+
+Reports database size, batched insert rate and the time to query and
+decode a mission's telemetry for each encoding.
+
+    uv run python -m app.benchmarks.payload_encoding --rows 50000
+"""
+
+from .. import database
+from ..database import Base, PAYLOAD_ENCODINGS, make_engine
+from ..services.database_service import DatabaseService
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from typing import Any, Dict, List
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+
+
+def vesc_sample(i: int) -> Dict[str, Any]:
+    """A VESC status message shaped like the rover's."""
+    return {
+        "vesc_id": i % 6,
+        "rpm": random.randint(-12000, 12000),
+        "duty_cycle": round(random.uniform(-1, 1), 4),
+        "current_motor": random.uniform(-60, 60),
+        "current_input": random.uniform(0, 40),
+        "voltage_input": random.uniform(44, 50.4),
+        "temp_fet": random.uniform(20, 80),
+        "temp_motor": random.uniform(20, 90),
+        "amp_hours": random.uniform(0, 20),
+        "watt_hours": random.uniform(0, 900),
+        "tachometer": i * 37,
+        "fault_code": 0,
+    }
+
+
+async def run_encoding(
+    encoding: str, rows: int, batch_size: int, directory: str
+) -> Dict[str, Any]:
+    database.PAYLOAD_ENCODING = encoding
+    random.seed(0)
+    path = os.path.join(directory, f"{encoding}.db")
+    engine = make_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with session_factory() as session:
+        service = DatabaseService(session)
+        mission = await service.create_mission("benchmark")
+        samples = [vesc_sample(i) for i in range(rows)]
+
+        started = time.perf_counter()
+        for start in range(0, rows, batch_size):
+            await service.log_telemetry_batch(
+                [
+                    {"mission_id": mission.id, "topic": "telemetry.vescs", "data": s}
+                    for s in samples[start : start + batch_size]
+                ]
+            )
+        insert_s = time.perf_counter() - started
+
+    async with session_factory() as session:
+        started = time.perf_counter()
+        logs = await DatabaseService(session).get_telemetry_logs(mission.id, limit=rows)
+        query_s = time.perf_counter() - started
+        started = time.perf_counter()
+        decoded = [log.payload for log in logs]
+        decode_s = time.perf_counter() - started
+        assert len(decoded) == rows
+
+    async with engine.begin() as conn:
+        payload_bytes = (
+            await conn.exec_driver_sql(
+                "SELECT SUM(LENGTH(CAST(data AS BLOB))) FROM telemetry_logs"
+            )
+        ).scalar()
+        await conn.exec_driver_sql("VACUUM")
+    await engine.dispose()
+
+    return {
+        "encoding": encoding,
+        "rows": rows,
+        "db_bytes": os.path.getsize(path),
+        "payload_bytes_per_row": (payload_bytes or 0) / rows,
+        "insert_rows_per_s": rows / insert_s,
+        "query_s": query_s,
+        "decode_s": decode_s,
+    }
+
+
+async def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    original = database.PAYLOAD_ENCODING
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            for encoding in args.encodings:
+                results.append(
+                    await run_encoding(encoding, args.rows, args.batch_size, directory)
+                )
+    finally:
+        database.PAYLOAD_ENCODING = original
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare JSON and msgpack telemetry payload storage"
+    )
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument(
+        "--encodings",
+        nargs="+",
+        default=list(PAYLOAD_ENCODINGS),
+        choices=PAYLOAD_ENCODINGS,
+    )
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print(
+        f"{'encoding':<10} {'db size':>10} {'B/row':>8} {'rows/s':>10} "
+        f"{'query':>10} {'decode':>10}"
+    )
+    for r in results:
+        print(
+            f"{r['encoding']:<10} {r['db_bytes'] / 1e6:>8.2f}MB "
+            f"{r['payload_bytes_per_row']:>8.0f} {r['insert_rows_per_s']:>10.0f} "
+            f"{r['query_s'] * 1e3:>8.1f}ms {r['decode_s'] * 1e3:>8.1f}ms"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Measure telemetry throughput and latency from the rover link to WebSocket
+clients.
+
+Runs the API in-process under uvicorn and feeds it from the rover
+simulator at each ``--rate`` (total messages per second, split across the
+simulated streams in their usual proportions). Every message is JSON
+encoded, parsed by the link, ingested and fanned out to ``--clients``
+WebSocket clients subscribed to everything. Reports messages received and
+ingested per second, link and hub drops, and generation-to-client latency.
+The simulator runs in the same process, so its cost is included.
+
+    uv run python -m app.benchmarks.rover_link --rate 500 2000 8000 --clients 4
+"""
+
+from ..main import app
+from ..services.ingest import ingest
+from ..services.rover_link import SIMULATOR_RATES, RoverLink, SimulatorSource
+from ..services.websocket_hub import hub
+from datetime import datetime
+from typing import Any, Dict, List
+from websockets.asyncio.client import connect
+import argparse
+import asyncio
+import json
+import time
+import uvicorn
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def client(port: int, latencies: List[float], counts: List[int], index: int):
+    async with connect(f"ws://127.0.0.1:{port}/api/v1/ws", max_size=None) as ws:
+        await ws.send(json.dumps({"action": "subscribe", "topics": ["*"]}))
+        async for raw in ws:
+            message = json.loads(raw)
+            if "topic" not in message:
+                continue
+            sent = datetime.fromisoformat(message["timestamp"]).timestamp()
+            latencies.append((time.time() - sent) * 1e3)
+            counts[index] += 1
+
+
+async def run_case(port: int, rate: float, args: argparse.Namespace) -> Dict[str, Any]:
+    total = sum(SIMULATOR_RATES.values())
+    rates = {topic: rate * share / total for topic, share in SIMULATOR_RATES.items()}
+    link = RoverLink(ingest, queue_size=args.queue_size)
+    link.add_source(SimulatorSource(rates, seed=1))
+    latencies: List[float] = []
+    counts = [0] * args.clients
+    clients = [
+        asyncio.create_task(client(port, latencies, counts, i))
+        for i in range(args.clients)
+    ]
+    while hub.client_count < args.clients:
+        await asyncio.sleep(0.01)
+    hub_dropped = hub.stats()["dropped"]
+    cpu_before = time.process_time()
+    started = time.perf_counter()
+    await link.start()
+    await asyncio.sleep(args.duration)
+    await link.stop()
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_before
+    # Let the last messages reach the clients
+    await asyncio.sleep(0.2)
+    for task in clients:
+        task.cancel()
+    await asyncio.gather(*clients, return_exceptions=True)
+    while hub.client_count:
+        await asyncio.sleep(0.01)
+    return {
+        "rate": rate,
+        "clients": args.clients,
+        "received_per_s": link.counts["received"] / elapsed,
+        "ingested_per_s": link.counts["ingested"] / elapsed,
+        "link_dropped": link.counts["dropped"],
+        "parse_errors": link.counts["parse_errors"],
+        "client_per_s": sum(counts) / len(counts) / elapsed,
+        "hub_dropped": hub.stats()["dropped"] - hub_dropped,
+        "latency_p50_ms": _percentile(latencies, 50),
+        "latency_p99_ms": _percentile(latencies, 99),
+        "queue_p99_ms": link.queue_latency.percentile(99) or 0.0,
+        "cpu_percent": cpu / elapsed * 100,
+    }
+
+
+async def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    server = uvicorn.Server(
+        uvicorn.Config(
+            app, host="127.0.0.1", port=0, lifespan="off", log_level="warning"
+        )
+    )
+    serve = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    results = []
+    try:
+        for rate in args.rate:
+            results.append(await run_case(port, rate, args))
+    finally:
+        server.should_exit = True
+        await serve
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Measure rover link to WebSocket throughput and latency"
+    )
+    parser.add_argument("--rate", type=float, nargs="+", default=[500, 2000, 8000])
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--queue-size", type=int, default=10000)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print(
+        f"{'rate':>7} {'recv/s':>8} {'ingest/s':>9} {'client/s':>9} "
+        f"{'link drop':>10} {'hub drop':>9} {'p50':>8} {'p99':>8} {'cpu':>5}"
+    )
+    for r in results:
+        print(
+            f"{r['rate']:>7g} {r['received_per_s']:>8.0f} "
+            f"{r['ingested_per_s']:>9.0f} {r['client_per_s']:>9.0f} "
+            f"{r['link_dropped']:>10} {r['hub_dropped']:>9} "
+            f"{r['latency_p50_ms']:>6.2f}ms {r['latency_p99_ms']:>6.1f}ms "
+            f"{r['cpu_percent']:>4.0f}%"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
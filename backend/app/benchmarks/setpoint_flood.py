@@ -0,0 +1,158 @@
+"""Flood the setpoint endpoints the way sliders and joysticks do.
+
+``--clients`` concurrent clients each post a changing value to
+``/control/vesc/acceleration`` at ``--request-rate`` requests per second,
+against the in-process API with the fake rover and a throwaway database.
+Reports requests handled, commands actually sent and logged, request
+latency and how long requests waited in the coalescer, for each
+``--control-rate``. ``--direct`` adds a run that dispatches every request
+as its own command, for comparison.
+
+    uv run python -m app.benchmarks.setpoint_flood --clients 4 --request-rate 50
+"""
+
+from ..database import Base, make_engine
+from ..main import app
+from ..services.command_log_writer import CommandLogWriter
+from ..services.commands import CommandDispatcher, FakeRover
+from ..services.setpoints import SetpointCoalescer
+from ..services.websocket_hub import WebSocketHub
+from ..routers.v1 import control
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from typing import Any, Dict, List, Optional
+import argparse
+import asyncio
+import json
+import math
+import tempfile
+import time
+
+URL = "/api/v1/control/vesc/acceleration"
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def client_loop(
+    client: AsyncClient,
+    index: int,
+    request_rate: float,
+    duration: float,
+    latencies: List[float],
+) -> None:
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    sent = 0
+    while loop.time() - started < duration:
+        # A slider sweeping back and forth
+        value = round(5 + 5 * math.sin(sent / 10 + index), 2)
+        request_started = time.perf_counter()
+        response = await client.post(URL, json={"value": value})
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - request_started)
+        sent += 1
+        delay = started + sent / request_rate - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def run_case(
+    args: argparse.Namespace, control_rate: Optional[float], directory: str
+) -> Dict[str, Any]:
+    label = "direct" if control_rate is None else f"{control_rate:g}"
+    engine = make_engine(f"sqlite+aiosqlite:///{directory}/{label}.db")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    writer = CommandLogWriter(async_sessionmaker(engine, expire_on_commit=False))
+    dispatcher = CommandDispatcher(
+        FakeRover(latency=args.rover_latency / 1e3), writer=writer, hub=WebSocketHub()
+    )
+    # With --direct the coalescer runs at an effectively unlimited rate
+    coalescer = SetpointCoalescer(dispatcher, rate=control_rate or 1e9)
+    original = control.setpoints
+    control.setpoints = coalescer
+    await writer.start()
+    await dispatcher.start()
+    await coalescer.start()
+    latencies: List[float] = []
+    try:
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://bench"
+        ) as client:
+            await asyncio.gather(
+                *(
+                    client_loop(client, i, args.request_rate, args.duration, latencies)
+                    for i in range(args.clients)
+                )
+            )
+    finally:
+        await coalescer.stop()
+        await dispatcher.stop()
+        await writer.stop()
+        control.setpoints = original
+        await engine.dispose()
+    queue = coalescer.queue_latency
+    return {
+        "control_rate": control_rate,
+        "requests": coalescer.counts["requests"],
+        "commands_sent": dispatcher.counts["sent"],
+        "rows_logged": writer.rows_written,
+        "coalesced": coalescer.counts["coalesced"],
+        "unchanged": coalescer.counts["unchanged"],
+        "request_p50_ms": _percentile(latencies, 50) * 1e3,
+        "request_p99_ms": _percentile(latencies, 99) * 1e3,
+        "queue_p50_ms": queue.percentile(50) or 0.0,
+        "queue_p99_ms": queue.percentile(99) or 0.0,
+        "queue_max_ms": queue.max,
+    }
+
+
+async def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    rates: List[Optional[float]] = list(args.control_rate)
+    if args.direct:
+        rates.insert(0, None)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for rate in rates:
+            results.append(await run_case(args, rate, directory))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Measure setpoint coalescing under a flood of requests"
+    )
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--request-rate", type=float, default=50.0)
+    parser.add_argument("--control-rate", type=float, nargs="+", default=[5, 10, 20])
+    parser.add_argument("--direct", action="store_true")
+    parser.add_argument("--rover-latency", type=float, default=5.0, help="ms")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print(
+        f"{'rate':>8} {'requests':>9} {'sent':>6} {'logged':>7} "
+        f"{'req p50':>9} {'req p99':>9} {'queue p50':>10} {'queue p99':>10}"
+    )
+    for r in results:
+        rate = "direct" if r["control_rate"] is None else f"{r['control_rate']:g} Hz"
+        print(
+            f"{rate:>8} {r['requests']:>9} {r['commands_sent']:>6} "
+            f"{r['rows_logged']:>7} {r['request_p50_ms']:>7.2f}ms "
+            f"{r['request_p99_ms']:>7.2f}ms {r['queue_p50_ms']:>8.1f}ms "
+            f"{r['queue_p99_ms']:>8.1f}ms"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
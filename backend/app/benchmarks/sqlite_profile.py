@@ -0,0 +1,138 @@
+"""Compare SQLite engine profiles under concurrent write and read load.
+
+One writer commits telemetry in small batches while several readers poll
+the newest rows of a topic, the way the data routes do during a mission.
+
+    uv run python -m app.benchmarks.sqlite_profile --rows 20000 --readers 4
+"""
+
+from ..database import Base, SQLITE_PROFILES, make_engine
+from ..services.database_service import DatabaseService
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from typing import Any, Dict, List
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+
+TOPICS = [
+    "telemetry.vescs",
+    "telemetry.encoders",
+    "telemetry.rgbd",
+    "telemetry.payload",
+]
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run_profile(
+    profile: str, rows: int, batch_size: int, readers: int, directory: str
+) -> Dict[str, Any]:
+    path = os.path.join(directory, f"{profile}.db")
+    engine = make_engine(f"sqlite+aiosqlite:///{path}", profile)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with session_factory() as session:
+        mission = await DatabaseService(session).create_mission("benchmark")
+
+    done = asyncio.Event()
+    read_latencies: List[float] = []
+
+    async def writer() -> float:
+        started = time.perf_counter()
+        async with session_factory() as session:
+            service = DatabaseService(session)
+            for start in range(0, rows, batch_size):
+                await service.log_telemetry_batch(
+                    [
+                        {
+                            "mission_id": mission.id,
+                            "topic": TOPICS[i % len(TOPICS)],
+                            "data": {"rpm": i, "current": i * 0.01, "voltage": 48.2},
+                        }
+                        for i in range(start, min(rows, start + batch_size))
+                    ]
+                )
+        done.set()
+        return time.perf_counter() - started
+
+    async def reader() -> None:
+        while not done.is_set():
+            started = time.perf_counter()
+            # One session per query, like a request handler
+            async with session_factory() as session:
+                await DatabaseService(session).get_telemetry_logs(
+                    mission.id, "telemetry.vescs", limit=100
+                )
+            read_latencies.append(time.perf_counter() - started)
+
+    write_task = asyncio.create_task(writer())
+    await asyncio.gather(*(reader() for _ in range(readers)))
+    write_s = await write_task
+    await engine.dispose()
+
+    return {
+        "profile": profile,
+        "rows": rows,
+        "batch_size": batch_size,
+        "readers": readers,
+        "write_rows_per_s": rows / write_s,
+        "commits_per_s": (rows / batch_size) / write_s,
+        "reads_per_s": len(read_latencies) / write_s,
+        "read_p50_ms": statistics.median(read_latencies) * 1e3 if read_latencies else 0,
+        "read_p99_ms": _percentile(read_latencies, 99) * 1e3,
+    }
+
+
+async def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for profile in args.profiles:
+            results.append(
+                await run_profile(
+                    profile, args.rows, args.batch_size, args.readers, directory
+                )
+            )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare SQLite engine profiles under concurrent load"
+    )
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument(
+        "--profiles", nargs="+", default=list(SQLITE_PROFILES), choices=SQLITE_PROFILES
+    )
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print(
+        f"{'profile':<12} {'rows/s':>10} {'commits/s':>10} "
+        f"{'reads/s':>10} {'read p50':>10} {'read p99':>10}"
+    )
+    for r in results:
+        print(
+            f"{r['profile']:<12} {r['write_rows_per_s']:>10.0f} "
+            f"{r['commits_per_s']:>10.0f} {r['reads_per_s']:>10.0f} "
+            f"{r['read_p50_ms']:>8.2f}ms {r['read_p99_ms']:>8.2f}ms"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Compare WebSocket message encodings on simulated rover telemetry.
+
+Generates ``--seconds`` of every simulator stream at its
+``SIMULATOR_RATES`` rate and encodes each message the way the hub does for
+a client connected with each ``encoding`` and ``delta`` option, with and
+without permessage-deflate. Deflate is emulated as the server does it: one
+raw deflate context per connection, flushed after every message, with the
+trailing ``00 00 ff ff`` removed. Delta clients acknowledge the newest
+message of a topic every ``--ack-every`` messages on it.
+
+Reports wire bytes per message, including the WebSocket frame header, the
+bandwidth of all streams together, and encoding CPU time per message.
+
+    uv run python -m app.benchmarks.ws_encoding --seconds 20 --ack-every 1 10
+"""
+
+from ..database import encode_payload
+from ..services.rover_link import SIMULATOR_RATES, SimulatorSource
+from ..services.websocket_hub import DeltaEncoder
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Tuple
+import argparse
+import json
+import time
+import zlib
+
+ENCODINGS = ("json", "msgpack")
+
+
+def frame_header_bytes(length: int) -> int:
+    # Server frames are unmasked
+    if length < 126:
+        return 2
+    if length < 2**16:
+        return 4
+    return 10
+
+
+def messages(seconds: float, seed: int) -> List[Tuple[str, Any, str]]:
+    """Every simulator message in ``seconds``, in time order."""
+    source = SimulatorSource(seed=seed)
+    started = time.time()
+    timed = []
+    for topic, rate in SIMULATOR_RATES.items():
+        for i in range(int(seconds * rate)):
+            t = started + i / rate
+            timed.append((t, topic, source.sample(topic, t)))
+    timed.sort(key=lambda item: item[0])
+    return [
+        (topic, data, datetime.fromtimestamp(t, timezone.utc).isoformat())
+        for t, topic, data in timed
+    ]
+
+
+def run_case(
+    stream: List[Tuple[str, Any, str]],
+    encoding: str,
+    delta: bool,
+    deflate: bool,
+    ack_every: int,
+    seconds: float,
+) -> Dict[str, Any]:
+    encoder = DeltaEncoder() if delta else None
+    compressor = zlib.compressobj(wbits=-15) if deflate else None
+    received: Dict[str, int] = {}
+    wire = 0
+    keyframes = 0
+    started = time.perf_counter()
+    for topic, data, stamp in stream:
+        if encoder is not None:
+            message = encoder.encode(topic, data, stamp)
+            keyframes += "data" in message
+        else:
+            message = {"topic": topic, "data": data, "timestamp": stamp}
+        payload = encode_payload(message, encoding)
+        body = payload.encode() if isinstance(payload, str) else payload
+        if compressor is not None:
+            body = compressor.compress(body) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            body = body[:-4]
+        wire += frame_header_bytes(len(body)) + len(body)
+        if encoder is not None:
+            count = received[topic] = received.get(topic, 0) + 1
+            if count % ack_every == 0:
+                encoder.ack(topic, message["seq"])
+    elapsed = time.perf_counter() - started
+    return {
+        "encoding": encoding,
+        "delta": delta,
+        "deflate": deflate,
+        "ack_every": ack_every if delta else None,
+        "messages": len(stream),
+        "keyframes": keyframes if delta else len(stream),
+        "bytes_per_message": wire / len(stream),
+        "kb_per_s": wire / seconds / 1024,
+        "us_per_message": elapsed / len(stream) * 1e6,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare WebSocket message encodings on simulated telemetry"
+    )
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--ack-every", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    stream = messages(args.seconds, args.seed)
+    results: List[Dict[str, Any]] = []
+    for deflate in (False, True):
+        for encoding in ENCODINGS:
+            results.append(run_case(stream, encoding, False, deflate, 1, args.seconds))
+            for ack_every in args.ack_every:
+                results.append(
+                    run_case(stream, encoding, True, deflate, ack_every, args.seconds)
+                )
+    baseline = results[0]["kb_per_s"]
+    print(
+        f"{'encoding':<8} {'delta':>6} {'deflate':>8} {'bytes/msg':>10} "
+        f"{'KB/s':>8} {'vs json':>8} {'us/msg':>7}"
+    )
+    for r in results:
+        delta = f"ack/{r['ack_every']}" if r["delta"] else "-"
+        print(
+            f"{r['encoding']:<8} {delta:>6} {'yes' if r['deflate'] else 'no':>8} "
+            f"{r['bytes_per_message']:>10.1f} {r['kb_per_s']:>8.1f} "
+            f"{r['kb_per_s'] / baseline:>7.0%} {r['us_per_message']:>7.1f}"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import os
 import subprocess
 import sys
+import tempfile
 import uvicorn
 
 
@@ -12,17 +13,27 @@ def dev():
         port=int(os.getenv("PORT", "8000")),
         reload=True,
         log_level=os.getenv("LOG_LEVEL", "info"),
+        ws_per_message_deflate=os.getenv("WS_DEFLATE", "1") != "0",
     )
 
 
 def start():
     """Run production server"""
+    port = int(os.getenv("PORT", "8000"))
+    workers = int(os.getenv("WORKERS", "4"))
+    if workers > 1:
+        # Workers share telemetry from one leader over this socket
+        os.environ.setdefault(
+            "FANOUT_SOCKET",
+            os.path.join(tempfile.gettempdir(), f"mission-control-{port}.sock"),
+        )
     uvicorn.run(
         "app.main:app",
         host=os.getenv("HOST", "0.0.0.0"),
-        port=int(os.getenv("PORT", "8000")),
-        workers=int(os.getenv("WORKERS", "4")),
+        port=port,
+        workers=workers,
         log_level=os.getenv("LOG_LEVEL", "info"),
+        ws_per_message_deflate=os.getenv("WS_DEFLATE", "1") != "0",
     )
 
 
@@ -49,3 +60,25 @@ def test():
     except subprocess.CalledProcessError as e:
         print(f"Tests failed with exit code {e.returncode}")
         sys.exit(e.returncode)
+
+
+def bench():
+    """Run the end-to-end load benchmark"""
+    from .benchmarks.load import main
+
+    main()
+
+
+def migrate_payloads():
+    """Re-encode stored telemetry and command payloads as PAYLOAD_ENCODING"""
+    import asyncio
+    from .database import PAYLOAD_ENCODING, async_session, init_db
+    from .services.database_service import DatabaseService
+
+    async def run() -> int:
+        await init_db()
+        async with async_session() as session:
+            return await DatabaseService(session).reencode_payloads(PAYLOAD_ENCODING)
+
+    rewritten = asyncio.run(run())
+    print(f"Re-encoded {rewritten} rows as {PAYLOAD_ENCODING}")
@@ -1,16 +1,139 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    create_async_engine,
+    async_sessionmaker,
+)
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+from sqlalchemy import Integer, Float, String, DateTime, Text, Index, event
 from datetime import datetime, timezone
-from typing import AsyncGenerator
+from typing import (
+    Any,
+    AsyncGenerator,
+    Awaitable,
+    Callable,
+    Dict,
+    Optional,
+    TypeVar,
+    Union,
+    cast,
+)
+import asyncio
+import json
+import msgpack
 import os
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./mission_control.db")
+DATABASE_PROFILE = os.getenv("DATABASE_PROFILE", "default")
 
-engine = create_async_engine(DATABASE_URL, echo=False)
+# How new telemetry data / command parameters are stored. "json" writes
+# TEXT, "msgpack" writes a compact BLOB. Rows of either kind are decoded
+# transparently, so a database can hold both while migrating.
+PAYLOAD_ENCODINGS = ("json", "msgpack")
+PAYLOAD_ENCODING = os.getenv("PAYLOAD_ENCODING", "json")
+if PAYLOAD_ENCODING not in PAYLOAD_ENCODINGS:
+    raise ValueError(
+        f"Unknown PAYLOAD_ENCODING {PAYLOAD_ENCODING!r}, "
+        f"expected one of {PAYLOAD_ENCODINGS}"
+    )
+
+# Connect-time PRAGMAs applied to every SQLite connection, per profile.
+# "performance" switches to WAL so the playback/data readers and the
+# telemetry writer stop blocking each other, and relaxes fsync to NORMAL
+# (durable across application crashes, not across power loss mid-commit).
+SQLITE_PROFILES: Dict[str, Dict[str, str]] = {
+    "default": {},
+    "performance": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        # Negative cache_size is in KiB
+        "cache_size": os.getenv("SQLITE_CACHE_SIZE", "-65536"),
+        "mmap_size": os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)),
+        "busy_timeout": os.getenv("SQLITE_BUSY_TIMEOUT", "5000"),
+        "temp_store": "MEMORY",
+    },
+}
+
+
+def make_engine(
+    url: str = DATABASE_URL, profile: str = DATABASE_PROFILE
+) -> AsyncEngine:
+    """Create the async engine, applying the SQLite PRAGMAs for ``profile``."""
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(
+            f"Unknown DATABASE_PROFILE {profile!r}, "
+            f"expected one of {sorted(SQLITE_PROFILES)}"
+        )
+    new_engine = create_async_engine(url, echo=False)
+    pragmas = SQLITE_PROFILES[profile]
+    if pragmas and new_engine.dialect.name == "sqlite":
+
+        @event.listens_for(new_engine.sync_engine, "connect")
+        def _set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
+
+    return new_engine
+
+
+engine = make_engine()
 async_session = async_sessionmaker(engine, expire_on_commit=False)
 
 
+def encode_payload(data: Any, encoding: Optional[str] = None) -> Union[str, bytes]:
+    encoding = encoding or PAYLOAD_ENCODING
+    if encoding == "msgpack":
+        return cast(bytes, msgpack.packb(data, use_bin_type=True))
+    if encoding == "json":
+        return json.dumps(data)
+    raise ValueError(
+        f"Unknown PAYLOAD_ENCODING {encoding!r}, expected one of {PAYLOAD_ENCODINGS}"
+    )
+
+
+def decode_payload(raw: Union[str, bytes, None]) -> Any:
+    if raw is None:
+        return None
+    if isinstance(raw, bytes):
+        return msgpack.unpackb(raw, raw=False)
+    return json.loads(raw)
+
+
+def flatten_payload(data: Any, prefix: str = "") -> Dict[str, Any]:
+    """Flatten nested dicts into dotted keys, e.g. ``{"imu": {"ax": 1}}`` to
+    ``{"imu.ax": 1}``. Anything that is not a non-empty dict is a leaf."""
+    if not isinstance(data, dict) or not data:
+        return {prefix or "value": data}
+    flat: Dict[str, Any] = {}
+    for key, value in data.items():
+        name = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, dict) and value:
+            flat.update(flatten_payload(value, name))
+        else:
+            flat[name] = value
+    return flat
+
+
+def unflatten_payload(flat: Dict[str, Any]) -> Dict[str, Any]:
+    result: Dict[str, Any] = {}
+    for name, value in flat.items():
+        parts = name.split(".")
+        node = result
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        node[parts[-1]] = value
+    return result
+
+
+def as_utc_naive(value: datetime) -> datetime:
+    """``value`` as the naive UTC datetime that timestamps are stored as."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
 class Base(DeclarativeBase):
     pass
 
@@ -18,37 +141,156 @@ class Base(DeclarativeBase):
 class Mission(Base):
     __tablename__ = "missions"
 
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, index=True)
-    start_time = Column(DateTime, default=lambda: datetime.now(timezone.utc))
-    end_time = Column(DateTime, nullable=True)
-    status = Column(String, default="active")  # active, completed, failed
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    name: Mapped[str] = mapped_column(String, index=True, nullable=True)
+    start_time: Mapped[datetime] = mapped_column(
+        DateTime, default=lambda: datetime.now(timezone.utc), nullable=True
+    )
+    end_time: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    # active, completed, failed
+    status: Mapped[str] = mapped_column(String, default="active", nullable=True)
 
 
 class TelemetryLog(Base):
     __tablename__ = "telemetry_logs"
+    # Match the mission/topic filters and newest-first ordering of queries so
+    # SQLite walks the index instead of sorting the whole mission
+    __table_args__ = (
+        Index(
+            "ix_telemetry_logs_mission_topic_time", "mission_id", "topic", "timestamp"
+        ),
+        Index("ix_telemetry_logs_mission_time", "mission_id", "timestamp"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    mission_id: Mapped[int] = mapped_column(Integer, nullable=True)
+    timestamp: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, nullable=True
+    )
+    topic: Mapped[str] = mapped_column(String, index=True, nullable=True)
+    # JSON text or msgpack blob, see PAYLOAD_ENCODING
+    data: Mapped[Union[str, bytes]] = mapped_column(Text, nullable=True)
 
-    id = Column(Integer, primary_key=True, index=True)
-    mission_id = Column(Integer, index=True)
-    timestamp = Column(DateTime, default=datetime.utcnow)
-    topic = Column(String, index=True)
-    data = Column(Text)  # JSON string
+    @property
+    def payload(self) -> Any:
+        """``data`` decoded, whichever encoding the row was written with."""
+        return decode_payload(self.data)
 
 
 class CommandLog(Base):
     __tablename__ = "command_logs"
+    __table_args__ = (Index("ix_command_logs_mission_time", "mission_id", "timestamp"),)
 
-    id = Column(Integer, primary_key=True, index=True)
-    mission_id = Column(Integer, index=True)
-    timestamp = Column(DateTime, default=datetime.utcnow)
-    command = Column(String)
-    parameters = Column(Text)  # JSON string
-    status = Column(String, default="sent")  # sent, acknowledged, failed
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    mission_id: Mapped[int] = mapped_column(Integer, nullable=True)
+    timestamp: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, nullable=True
+    )
+    command: Mapped[str] = mapped_column(String, nullable=True)
+    # JSON text or msgpack blob, see PAYLOAD_ENCODING
+    parameters: Mapped[Union[str, bytes]] = mapped_column(Text, nullable=True)
+    # sent, acknowledged, failed
+    status: Mapped[str] = mapped_column(String, default="sent", nullable=True)
+
+    @property
+    def payload(self) -> Any:
+        """``parameters`` decoded, whichever encoding the row was written with."""
+        return decode_payload(self.parameters)
+
+
+class AlertLog(Base):
+    """An alert raised by the rule engine, written once it has cleared."""
+
+    __tablename__ = "alert_logs"
+    __table_args__ = (Index("ix_alert_logs_raised", "raised_at"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    alert_id: Mapped[str] = mapped_column(String, unique=True, nullable=False)
+    rule_id: Mapped[str] = mapped_column(String, index=True, nullable=False)
+    mission_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    topic: Mapped[str] = mapped_column(String, nullable=False)
+    # info, warning, critical
+    severity: Mapped[str] = mapped_column(String, nullable=False)
+    message: Mapped[str] = mapped_column(String, nullable=False)
+    # Sample value that raised the alert; None for stale-topic alerts
+    value: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    raised_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    cleared_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    acknowledged_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+
+class TelemetryRollup(Base):
+    """Per-bucket aggregates of one numeric payload field, kept up to date as
+    telemetry is written so history charts never scan raw rows."""
+
+    __tablename__ = "telemetry_rollups"
+    __table_args__ = (
+        Index(
+            "ix_telemetry_rollups_key",
+            "mission_id",
+            "topic",
+            "field",
+            "resolution",
+            "bucket",
+            unique=True,
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    mission_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    topic: Mapped[str] = mapped_column(String, nullable=False)
+    # Dotted path into the payload, e.g. "imu.ax"
+    field: Mapped[str] = mapped_column(String, nullable=False)
+    # Bucket width in seconds
+    resolution: Mapped[int] = mapped_column(Integer, nullable=False)
+    bucket: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    count: Mapped[int] = mapped_column(Integer, nullable=False)
+    min: Mapped[float] = mapped_column(Float, nullable=False)
+    max: Mapped[float] = mapped_column(Float, nullable=False)
+    sum: Mapped[float] = mapped_column(Float, nullable=False)
+    last: Mapped[float] = mapped_column(Float, nullable=False)
+    last_time: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+
+def _create_missing_indexes(conn) -> None:
+    # create_all skips indexes on tables that already exist, so databases
+    # from older versions would never get newly added indexes
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
 
 
 async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_create_missing_indexes)
+
+
+T = TypeVar("T")
+
+
+async def run_in_session(
+    fn: Callable[[AsyncSession], Awaitable[T]], session_factory=async_session
+) -> T:
+    """Run ``fn`` in a fresh session that completes even if the caller is
+    cancelled.
+
+    Cancelling a query midway can leave its connection checked out with
+    the read transaction still open, holding SQLite's shared lock so no
+    writer can commit until it is garbage collected. Background readers
+    that get cancelled (playback seeks and stops) use this instead.
+    """
+
+    async def run() -> T:
+        async with session_factory() as session:
+            return await fn(session)
+
+    task = asyncio.ensure_future(run())
+    try:
+        return await asyncio.shield(task)
+    except asyncio.CancelledError:
+        await asyncio.wait([task])
+        raise
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
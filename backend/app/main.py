@@ -1,20 +1,40 @@
-import sys
 import os
+from typing import Optional
 
-sys.path.insert(0, os.path.dirname(__file__))
-
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
-from routers.v1.telemetry import router as telemetry_router
-from routers.v1.control import router as control_router
-from routers.v1.cameras import router as cameras_router
-from routers.v1.visualization import router as visualization_router
-from routers.v1.alerts import router as alerts_router
-from routers.v1.data import router as data_router
-from routers.v1.config import router as config_router
-from routers.v1.tasks import router as tasks_router
-from routers.v1.system import router as system_router
-from database import init_db
+from fastapi.responses import PlainTextResponse
+from .routers.v1.telemetry import router as telemetry_router
+from .routers.v1.control import router as control_router
+from .routers.v1.cameras import router as cameras_router
+from .routers.v1.visualization import router as visualization_router
+from .routers.v1.alerts import router as alerts_router
+from .routers.v1.data import router as data_router
+from .routers.v1.config import router as config_router
+from .routers.v1.tasks import router as tasks_router
+from .routers.v1.system import router as system_router
+from .database import async_session, init_db
+from .services.alerts import alert_engine
+from .services.cameras import camera_manager
+from .services.command_log_writer import command_log_writer
+from .services.commands import command_dispatcher
+from .services.database_service import DatabaseService
+from .services.fanout import fanout
+from .services.health import health_scheduler
+from .services.ingest import ingest
+from .services.instrumentation import (
+    PROMETHEUS_CONTENT_TYPE,
+    MetricsMiddleware,
+    install as install_metrics,
+)
+from .services.metrics import registry
+from .services.mission_archive import mission_archive
+from .services.playback import playback
+from .services.profiler import loop_monitor
+from .services.rover_link import rover_link
+from .services.setpoints import setpoints
+from .services.telemetry_writer import telemetry_writer
+from .services.websocket_hub import ENCODINGS, POLICIES, hub
 
 cors_origins = os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",")
 
@@ -34,11 +54,47 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+install_metrics()
+
+
+async def start_leader_services():
+    """Services that only one worker runs; the others follow it."""
+    await alert_engine.start()
+    await rover_link.start()
 
 
 @app.on_event("startup")
 async def startup_event():
+    await loop_monitor.start()
     await init_db()
+    async with async_session() as session:
+        mission = await DatabaseService(session).get_active_mission()
+    ingest.mission_id = mission.id if mission else None
+    await telemetry_writer.start()
+    await command_log_writer.start()
+    await command_dispatcher.start()
+    await setpoints.start()
+    await fanout.start(on_leader=start_leader_services)
+    await health_scheduler.start()
+    camera_manager.add_fake_cameras()
+    camera_manager.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await health_scheduler.stop()
+    await camera_manager.stop()
+    await playback.stop()
+    await fanout.stop()
+    await rover_link.stop()
+    await alert_engine.stop()
+    await setpoints.stop()
+    await command_dispatcher.stop()
+    await command_log_writer.stop()
+    await telemetry_writer.stop()
+    await mission_archive.wait()
+    await loop_monitor.stop()
 
 
 # Include API v1 routers
@@ -54,12 +110,19 @@ app.include_router(system_router)
 
 
 @app.websocket("/api/v1/ws")
-async def websocket_endpoint(websocket: WebSocket):
+async def websocket_endpoint(
+    websocket: WebSocket,
+    policy: Optional[str] = None,
+    encoding: str = "json",
+    delta: bool = False,
+):
     """
     WebSocket endpoint for real-time data subscriptions.
 
     Clients can subscribe to topics by sending JSON messages with:
     {"action": "subscribe", "topics": ["topic1", "topic2", ...]}
+    and stop with {"action": "unsubscribe", "topics": [...]}.
+    {"action": "ping"} is answered with {"type": "pong"}.
 
     Available topics:
     - telemetry.vescs: VESC motor data
@@ -70,20 +133,43 @@ async def websocket_endpoint(websocket: WebSocket):
     - cameras.{camera_id}: Live video feed from specific camera
     - slam.map: SLAM map updates
     - pose.current: Current rover position/orientation
-    - alerts.live: Real-time alerts and faults
-    - health.checks: System health status updates
+    - alerts.live: Alerts raised, cleared or acknowledged
+    - health.checks: Health check results, on every probe run
     - playback.stream: Mission playback data
+    - commands.status: Command acknowledgements, failures and timeouts
+
+    Any "{prefix}.all" or "{prefix}.*" subscribes to every topic under
+    that prefix, and "*" to everything.
+
+    Each client has a bounded send queue. With ?policy=drop_oldest (the
+    default) the oldest message is dropped when it is full; with
+    ?policy=conflate only the latest message per topic is kept.
+
+    ?encoding=msgpack sends messages as MessagePack binary frames instead
+    of JSON text. With ?delta=true each message has a per-topic "seq";
+    after the client acknowledges one with
+    {"action": "ack", "seqs": {"telemetry.vescs": 12, ...}}, later messages
+    carry only the changed fields ("base", "set", "unset") relative to it
+    when fewer than half changed, with a full message every
+    WS_KEYFRAME_INTERVAL. permessage-deflate is
+    negotiated by the WebSocket handshake when the client offers it.
     """
+    if policy is not None and policy not in POLICIES:
+        await websocket.close(code=1008, reason=f"Unknown policy {policy!r}")
+        return
+    if encoding not in ENCODINGS:
+        await websocket.close(code=1008, reason=f"Unknown encoding {encoding!r}")
+        return
     await websocket.accept()
-    await websocket.send_text("Connected to WebSocket!")
-    try:
-        while True:
-            data = await websocket.receive_text()
-            await websocket.send_text(f"Echo: {data}")
-    except WebSocketDisconnect:
-        pass
+    await hub.serve(websocket, policy, encoding, delta)
 
 
 @app.get("/health", tags=["health"])
 def health_check():
     return {"status": "healthy"}
+
+
+@app.get("/metrics", tags=["health"], response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition of request, database and queue metrics."""
+    return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,5 +1,14 @@
-from fastapi import APIRouter
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from typing import List, Literal, Optional
+from ...database import get_db
+from ...services.alerts import AlertRule, alert_engine
+from ...services.database_service import DatabaseService
+from ...services.fanout import fanout
+from .data import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from .system import HealthResponse, health_response
 
 router = APIRouter(
     prefix="/api/v1",
@@ -7,50 +16,141 @@ router = APIRouter(
 )
 
 
-class MessageResponse(BaseModel):
+class AlertResponse(BaseModel):
+    id: str
+    rule_id: str
+    topic: str
+    severity: str
     message: str
+    value: Optional[float]
+    mission_id: Optional[int]
+    raised_at: datetime
+    cleared_at: Optional[datetime]
+    acknowledged_at: Optional[datetime]
+    active: bool
+
+
+class AlertRuleModel(BaseModel):
+    id: str = Field(min_length=1)
+    kind: Literal["threshold", "rate", "stale"]
+    topic: str = Field(min_length=1)
+    # Dotted path into the sample payload; not used by stale rules
+    field: Optional[str] = None
+    op: Literal["gt", "lt"] = "gt"
+    value: float = 0.0
+    # Value at which a raised alert clears; defaults to ``value``
+    clear: Optional[float] = None
+    # Seconds without a sample before a stale rule fires
+    timeout: Optional[float] = None
+    severity: Literal["info", "warning", "critical"] = "warning"
+    message: Optional[str] = None
+
+
+class ThresholdsRequest(BaseModel):
+    rules: List[AlertRuleModel]
+    # Drop every rule not in ``rules`` instead of adding/updating by id
+    replace: bool = False
 
 
 @router.get(
     "/alerts/active",
     summary="Get currently active alerts",
-    response_model=MessageResponse,
+    response_model=List[AlertResponse],
 )
 async def get_active_alerts():
-    return {"message": "hello mks"}
+    alerts = sorted(alert_engine.active.values(), key=lambda a: a.raised_at)
+    return [alert.to_dict() for alert in reversed(alerts)]
 
 
 @router.get(
     "/alerts/history",
     summary="Get alert history with filtering",
-    response_model=MessageResponse,
+    response_model=List[AlertResponse],
 )
-async def get_alert_history():
-    return {"message": "hello mks"}
+async def get_alert_history(
+    response: Response,
+    limit: int = Query(50, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    mission_id: Optional[int] = None,
+    rule_id: Optional[str] = None,
+    topic: Optional[str] = None,
+    severity: Optional[str] = None,
+    since: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """Ended alerts, newest first. Active ones are at ``/alerts/active``."""
+    # Alerts that ended since the last background flush
+    await alert_engine.flush()
+    logs = await DatabaseService(db).get_alert_logs(
+        limit,
+        before=decode_cursor(cursor),
+        mission_id=mission_id,
+        rule_id=rule_id,
+        topic=topic,
+        severity=severity,
+        since=since,
+    )
+    if len(logs) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            logs[-1].raised_at, logs[-1].id
+        )
+    return [
+        AlertResponse(
+            id=log.alert_id,
+            rule_id=log.rule_id,
+            topic=log.topic,
+            severity=log.severity,
+            message=log.message,
+            value=log.value,
+            mission_id=log.mission_id,
+            raised_at=log.raised_at,
+            cleared_at=log.cleared_at,
+            acknowledged_at=log.acknowledged_at,
+            active=False,
+        )
+        for log in logs
+    ]
 
 
 @router.post(
     "/alerts/acknowledge/{alert_id}",
     summary="Acknowledge an alert",
-    response_model=MessageResponse,
+    response_model=AlertResponse,
 )
 async def acknowledge_alert(alert_id: str):
-    return {"message": "hello mks"}
+    alert = fanout.acknowledge_alert(alert_id)
+    if alert is None:
+        raise HTTPException(status_code=404, detail="No active alert with that id")
+    return alert.to_dict()
 
 
 @router.get(
     "/health/checks",
     summary="Get all health check statuses",
-    response_model=MessageResponse,
+    response_model=HealthResponse,
+)
+async def get_health_checks(request: Request, response: Response):
+    return health_response(request, response)
+
+
+@router.get(
+    "/health/thresholds",
+    summary="Get configured alert rules",
+    response_model=List[AlertRuleModel],
 )
-async def get_health_checks():
-    return {"message": "hello mks"}
+async def get_health_thresholds():
+    return [rule.to_dict() for rule in alert_engine.rules.values()]
 
 
 @router.post(
     "/health/thresholds",
     summary="Configure alert thresholds",
-    response_model=MessageResponse,
+    response_model=List[AlertRuleModel],
 )
-async def configure_health_thresholds():
-    return {"message": "hello mks"}
+async def configure_health_thresholds(request: ThresholdsRequest):
+    try:
+        rules = [AlertRule(**rule.model_dump()) for rule in request.rules]
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    fanout.set_rules(rules, replace=request.replace)
+    return [rule.to_dict() for rule in alert_engine.rules.values()]
@@ -1,5 +1,11 @@
-from fastapi import APIRouter
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Dict, List, Literal, Optional
+from dataclasses import asdict
+from ...services.cameras import MJPEG_BOUNDARY, Camera, camera_manager
+
+TierName = Literal["full", "half", "quarter"]
 
 router = APIRouter(
     prefix="/api/v1/cameras",
@@ -7,39 +13,120 @@ router = APIRouter(
 )
 
 
-class MessageResponse(BaseModel):
-    message: str
+class CameraResponse(BaseModel):
+    id: str
+    running: bool
+    fps: float
+    width: int
+    height: int
+
+
+class CameraStatusResponse(CameraResponse):
+    frames_captured: int
+    encode_ms: float
+    viewers: int
+    viewer_tiers: Dict[str, int]
+    tier_encodes: Dict[str, int]
+    last_seq: Optional[int]
+    last_frame_bytes: int
+
+
+class CameraConfigRequest(BaseModel):
+    fps: Optional[float] = Field(None, gt=0, le=120)
+    adaptive: Optional[bool] = None
+    max_tier: Optional[TierName] = None
+    min_tier: Optional[TierName] = None
+    max_viewer_fps: Optional[float] = Field(None, gt=0, le=120)
+    downgrade_threshold: Optional[float] = Field(None, gt=0)
+    upgrade_threshold: Optional[float] = Field(None, gt=0)
+
+
+class CameraConfigResponse(BaseModel):
+    fps: float
+    adaptive: bool
+    max_tier: str
+    min_tier: str
+    max_viewer_fps: float
+    downgrade_threshold: float
+    upgrade_threshold: float
+
+
+def _get_camera(camera_id: str) -> Camera:
+    camera = camera_manager.get(camera_id)
+    if camera is None:
+        raise HTTPException(status_code=404, detail="Camera not found")
+    return camera
 
 
 @router.get(
-    "/list", summary="Get available camera feeds", response_model=MessageResponse
+    "/list", summary="Get available camera feeds", response_model=List[CameraResponse]
 )
 async def get_camera_list():
-    return {"message": "hello mks"}
+    return [camera.status() for camera in camera_manager.list()]
 
 
 @router.post(
     "/{camera_id}/config",
     summary="Configure camera settings",
-    response_model=MessageResponse,
+    response_model=CameraConfigResponse,
 )
-async def configure_camera(camera_id: str):
-    return {"message": "hello mks"}
+async def configure_camera(camera_id: str, request: CameraConfigRequest):
+    camera = _get_camera(camera_id)
+    try:
+        config = camera.configure(**request.model_dump(exclude_none=True))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return asdict(config)
 
 
 @router.get(
     "/{camera_id}/snapshot",
     summary="Get single frame capture",
-    response_model=MessageResponse,
+    response_class=Response,
+    responses={200: {"content": {"image/jpeg": {}}}},
+)
+async def get_camera_snapshot(camera_id: str, seq: Optional[int] = None):
+    camera = _get_camera(camera_id)
+    frame = camera.buffer.latest() if seq is None else camera.buffer.get(seq)
+    if frame is None:
+        raise HTTPException(
+            status_code=404 if seq is not None else 503,
+            detail="Frame not in buffer" if seq is not None else "No frame yet",
+        )
+    # Served straight from the frame buffer without copying
+    return Response(
+        content=memoryview(frame.data),
+        media_type="image/jpeg",
+        headers={
+            "Cache-Control": "no-store",
+            "X-Frame-Seq": str(frame.seq),
+            "X-Frame-Timestamp": frame.timestamp.isoformat(),
+        },
+    )
+
+
+@router.get(
+    "/{camera_id}/stream",
+    summary="Live MJPEG stream",
+    response_class=StreamingResponse,
 )
-async def get_camera_snapshot(camera_id: str):
-    return {"message": "hello mks"}
+async def get_camera_stream(
+    camera_id: str,
+    tier: Optional[TierName] = None,
+    fps: Optional[float] = Query(None, gt=0, le=120),
+):
+    camera = _get_camera(camera_id)
+    return StreamingResponse(
+        camera.mjpeg_stream(tier, fps),
+        media_type=f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}",
+        headers={"Cache-Control": "no-store"},
+    )
 
 
 @router.get(
     "/{camera_id}/status",
     summary="Get camera status and parameters",
-    response_model=MessageResponse,
+    response_model=CameraStatusResponse,
 )
 async def get_camera_status(camera_id: str):
-    return {"message": "hello mks"}
+    return _get_camera(camera_id).status()
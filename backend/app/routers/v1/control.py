@@ -1,5 +1,11 @@
-from fastapi import APIRouter
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from ...services.commands import command_dispatcher
+from ...services.ingest import ingest
+from ...services.setpoints import setpoints
 
 router = APIRouter(
     prefix="/api/v1/control",
@@ -11,22 +17,97 @@ class MessageResponse(BaseModel):
     message: str
 
 
+class PercentSetpointRequest(BaseModel):
+    value: float = Field(ge=0, le=100)
+
+
+class AccelerationSetpointRequest(BaseModel):
+    value: float = Field(ge=0)
+
+
+class SetpointResponse(BaseModel):
+    command: str
+    value: float
+    # sent, queued (sent on the next control tick) or unchanged
+    status: str
+
+
+class CommandRequest(BaseModel):
+    command: str = Field(min_length=1)
+    parameters: Dict[str, Any] = Field(default_factory=dict)
+    # Wait for the rover's answer (or the timeout) before responding
+    wait: bool = False
+
+
+class CommandResponse(BaseModel):
+    seq: int
+    command: str
+    parameters: Dict[str, Any]
+    mission_id: Optional[int]
+    timestamp: datetime
+    status: str
+    detail: Optional[str]
+    acked_at: Optional[datetime]
+    latency_ms: Optional[float]
+
+
+class LatencySummary(BaseModel):
+    count: int
+    mean: Optional[float]
+    p50: Optional[float]
+    p95: Optional[float]
+    p99: Optional[float]
+    max: Optional[float]
+    # Upper bound (ms) -> observations at or below it
+    buckets: Dict[float, int]
+
+
+class CommandStatsResponse(BaseModel):
+    sent: int
+    acknowledged: int
+    failed: int
+    pending: int
+    timeouts: int
+    latency_ms: Dict[str, LatencySummary]
+
+
+class SetpointStatsResponse(BaseModel):
+    requests: int
+    sent: int
+    coalesced: int
+    unchanged: int
+    rate: float
+    pending: int
+    queue_latency_ms: LatencySummary
+
+
+async def _set_point(command: str, value: float) -> dict:
+    try:
+        status = await setpoints.set(command, {"value": value}, ingest.mission_id)
+    except RuntimeError as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+    return {"command": command, "value": value, "status": status}
+
+
 @router.post(
     "/manipulator/power",
     summary="Set max power for manipulator",
-    response_model=MessageResponse,
+    response_model=SetpointResponse,
 )
-async def set_manipulator_power():
-    return {"message": "hello mks"}
+async def set_manipulator_power(request: PercentSetpointRequest):
+    """Max manipulator power in percent. Rate limited and deduplicated, see
+    ``/setpoints/stats``."""
+    return await _set_point("set_manipulator_power", request.value)
 
 
 @router.post(
     "/manipulator/speed",
     summary="Set max speed for manipulator",
-    response_model=MessageResponse,
+    response_model=SetpointResponse,
 )
-async def set_manipulator_speed():
-    return {"message": "hello mks"}
+async def set_manipulator_speed(request: PercentSetpointRequest):
+    """Max manipulator speed in percent. Rate limited and deduplicated."""
+    return await _set_point("set_manipulator_speed", request.value)
 
 
 @router.get(
@@ -71,10 +152,11 @@ async def get_radio_signal():
 @router.post(
     "/vesc/acceleration",
     summary="Set max acceleration for VESC",
-    response_model=MessageResponse,
+    response_model=SetpointResponse,
 )
-async def set_vesc_acceleration():
-    return {"message": "hello mks"}
+async def set_vesc_acceleration(request: AccelerationSetpointRequest):
+    """Max VESC acceleration. Rate limited and deduplicated."""
+    return await _set_point("set_vesc_acceleration", request.value)
 
 
 @router.get(
@@ -96,16 +178,52 @@ async def update_vesc_parameters():
 @router.post(
     "/commands/send",
     summary="Send arbitrary command to rover",
-    response_model=MessageResponse,
+    response_model=CommandResponse,
 )
-async def send_command():
-    return {"message": "hello mks"}
+async def send_command(request: CommandRequest):
+    """Dispatch a command. The response has its sequence number and status
+    ``sent``, or with ``wait`` the final ``acknowledged``/``failed`` status."""
+    try:
+        record = await command_dispatcher.send(
+            request.command, request.parameters, ingest.mission_id
+        )
+    except RuntimeError as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+    if request.wait:
+        await command_dispatcher.wait(record)
+    return record.to_dict()
 
 
 @router.get(
     "/commands/history",
     summary="Get recent command history",
-    response_model=MessageResponse,
+    response_model=List[CommandResponse],
 )
-async def get_command_history():
-    return {"message": "hello mks"}
+async def get_command_history(limit: int = Query(50, ge=1, le=200)):
+    """Recently dispatched commands, newest first, including ones not yet
+    written to the command log."""
+    return [record.to_dict() for record in command_dispatcher.recent(limit)]
+
+
+@router.get(
+    "/commands/stats",
+    summary="Get command counts and acknowledgement latency",
+    response_model=CommandStatsResponse,
+)
+async def get_command_stats():
+    """Send-to-answer latency histograms per command type, in milliseconds."""
+    return {
+        **command_dispatcher.stats(),
+        "latency_ms": command_dispatcher.latency_summary(),
+    }
+
+
+@router.get(
+    "/setpoints/stats",
+    summary="Get setpoint coalescing counts and queueing latency",
+    response_model=SetpointStatsResponse,
+)
+async def get_setpoint_stats():
+    """How many setpoint requests were sent, coalesced into a later command
+    or dropped as unchanged, and how long requests waited, in milliseconds."""
+    return setpoints.stats()
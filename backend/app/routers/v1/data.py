@@ -1,8 +1,24 @@
-from fastapi import APIRouter, Depends
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional
-from ...database import get_db
+from datetime import datetime, timedelta
+from typing import Any, List, Literal, Optional, Tuple
+from ...database import as_utc_naive, get_db
+from ...database import Mission
+from ...services.database_service import DatabaseService
+from ...services.fanout import fanout
+from ...services.mission_archive import mission_archive
+from ...services.playback import playback
+from ...services.telemetry_export import EXPORT_MEDIA_TYPES, export_telemetry
+from ...services.telemetry_rollup import (
+    RESOLUTIONS,
+    bucket_start,
+    choose_resolution,
+    downsample,
+)
+import asyncio
+import base64
 
 router = APIRouter(
     prefix="/api/v1",
@@ -16,30 +32,105 @@ class MissionResponse(BaseModel):
     start_time: str
     end_time: Optional[str]
     status: str
+    archived: bool = False
 
 
 class TelemetryLogResponse(BaseModel):
     id: int
     timestamp: str
     topic: str
-    data: str
+    data: Any
+
+
+class TelemetryBucketResponse(BaseModel):
+    timestamp: str
+    count: int
+    min: float
+    max: float
+    mean: float
+    last: float
+
+
+class TelemetryDownsampleResponse(BaseModel):
+    topic: str
+    field: str
+    # Width of each bucket in seconds
+    resolution: int
+    buckets: List[TelemetryBucketResponse]
 
 
 class CommandLogResponse(BaseModel):
     id: int
     timestamp: str
     command: str
-    parameters: str
+    parameters: Any
     status: str
 
 
+class PlaybackStartRequest(BaseModel):
+    mission_id: int
+    # Multiple of real time
+    rate: float = Field(1.0, gt=0, le=1000)
+    start: Optional[datetime] = None
+    paused: bool = False
+
+
+class PlaybackControlRequest(BaseModel):
+    action: Literal["pause", "resume", "seek", "rate", "step", "stop"]
+    position: Optional[datetime] = None
+    rate: Optional[float] = Field(None, gt=0, le=1000)
+    steps: int = Field(1, ge=1, le=10000)
+
+
+class PlaybackStatusResponse(BaseModel):
+    mission_id: Optional[int]
+    state: str
+    rate: float
+    position: Optional[str]
+    events_sent: int
+    buffered: int
+
+
+# Keyset pagination: the cursor is the (timestamp, id) of the last row of the
+# previous page, returned to clients in the X-Next-Cursor header as an opaque
+# token and passed back as ?cursor=...
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    raw = f"{timestamp.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    if not cursor:
+        return None
+    try:
+        timestamp, row_id = base64.urlsafe_b64decode(cursor).decode().split("|")
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _mission_response(mission: Mission) -> MissionResponse:
+    return MissionResponse(
+        id=mission.id,
+        name=mission.name,
+        start_time=mission.start_time.isoformat(),
+        end_time=mission.end_time.isoformat() if mission.end_time else None,
+        status=mission.status,
+        archived=mission_archive.is_archived(mission.id),
+    )
+
+
 @router.get(
     "/missions/list",
     summary="List all missions/sessions",
     response_model=List[MissionResponse],
 )
 async def get_missions_list(db: AsyncSession = Depends(get_db)):
-    raise NotImplementedError("Not implemented yet")
+    missions = await DatabaseService(db).list_missions()
+    return [_mission_response(mission) for mission in missions]
 
 
 @router.post(
@@ -48,15 +139,30 @@ async def get_missions_list(db: AsyncSession = Depends(get_db)):
     response_model=MissionResponse,
 )
 async def start_mission(name: str = "Mission", db: AsyncSession = Depends(get_db)):
-    raise NotImplementedError("Not implemented yet")
+    service = DatabaseService(db)
+    if await service.get_active_mission() is not None:
+        raise HTTPException(status_code=409, detail="A mission is already active")
+    mission = await service.create_mission(name)
+    fanout.set_mission(mission.id)
+    return _mission_response(mission)
 
 
 @router.post(
     "/missions/stop",
     summary="Stop current mission logging",
+    response_model=MissionResponse,
 )
 async def stop_mission(db: AsyncSession = Depends(get_db)):
-    raise NotImplementedError("Not implemented yet")
+    service = DatabaseService(db)
+    mission = await service.get_active_mission()
+    if mission is None:
+        raise HTTPException(status_code=404, detail="No active mission")
+    fanout.set_mission(None)
+    await service.end_mission(mission.id)
+    # Archived by the leader once everything it queued for the mission is on disk
+    await fanout.archive_mission(mission.id)
+    await db.refresh(mission)
+    return _mission_response(mission)
 
 
 @router.get(
@@ -65,7 +171,10 @@ async def stop_mission(db: AsyncSession = Depends(get_db)):
     response_model=MissionResponse,
 )
 async def get_mission_metadata(mission_id: int, db: AsyncSession = Depends(get_db)):
-    raise NotImplementedError("Not implemented yet")
+    mission = await DatabaseService(db).get_mission(mission_id)
+    if mission is None:
+        raise HTTPException(status_code=404, detail="Mission not found")
+    return _mission_response(mission)
 
 
 @router.get(
@@ -75,11 +184,121 @@ async def get_mission_metadata(mission_id: int, db: AsyncSession = Depends(get_d
 )
 async def get_mission_telemetry(
     mission_id: int,
+    response: Response,
     topic: Optional[str] = None,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
 ):
-    raise NotImplementedError("Not implemented yet")
+    before = decode_cursor(cursor)
+    if mission_archive.is_archived(mission_id):
+        logs = await asyncio.to_thread(
+            mission_archive.get_page, mission_id, topic, limit, before
+        )
+    else:
+        logs = await DatabaseService(db).get_telemetry_logs(
+            mission_id, topic, limit, before
+        )
+    if len(logs) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            logs[-1].timestamp, logs[-1].id
+        )
+    return [
+        TelemetryLogResponse(
+            id=log.id,
+            timestamp=log.timestamp.isoformat(),
+            topic=log.topic,
+            data=log.payload,
+        )
+        for log in logs
+    ]
+
+
+@router.get(
+    "/data/telemetry/{mission_id}/export",
+    summary="Stream a mission's full telemetry as NDJSON or CSV",
+    response_class=StreamingResponse,
+)
+async def export_mission_telemetry(
+    mission_id: int,
+    fmt: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    gzip: bool = False,
+    topic: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    if await DatabaseService(db).get_mission(mission_id) is None:
+        raise HTTPException(status_code=404, detail="Mission not found")
+    filename = f"mission_{mission_id}_telemetry.{fmt}"
+    media_type = EXPORT_MEDIA_TYPES[fmt]
+    if gzip:
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        export_telemetry(
+            mission_id,
+            fmt,
+            compress=gzip,
+            topic=topic,
+            start=as_utc_naive(start) if start else None,
+            end=as_utc_naive(end) if end else None,
+        ),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get(
+    "/data/telemetry/{mission_id}/downsample",
+    summary="Min/max/mean/last of a numeric field per time bucket",
+    response_model=TelemetryDownsampleResponse,
+)
+async def downsample_mission_telemetry(
+    mission_id: int,
+    topic: str,
+    field: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    max_points: int = Query(500, ge=1, le=10000),
+    db: AsyncSession = Depends(get_db),
+):
+    service = DatabaseService(db)
+    if await service.get_mission(mission_id) is None:
+        raise HTTPException(status_code=404, detail="Mission not found")
+    start = as_utc_naive(start) if start else None
+    end = as_utc_naive(end) if end else None
+    if start is None or end is None:
+        span = await service.get_rollup_span(mission_id, topic, field)
+        if span is None:
+            return TelemetryDownsampleResponse(
+                topic=topic, field=field, resolution=RESOLUTIONS[0], buckets=[]
+            )
+        start = start or span[0]
+        end = end or span[1] + timedelta(seconds=RESOLUTIONS[0])
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+
+    resolution, width = choose_resolution(start, end, max_points)
+    rows = await service.get_rollups(
+        mission_id, topic, field, resolution, bucket_start(start, resolution), end
+    )
+    return TelemetryDownsampleResponse(
+        topic=topic,
+        field=field,
+        resolution=width,
+        buckets=[
+            TelemetryBucketResponse(
+                timestamp=bucket.bucket.isoformat(),
+                count=bucket.count,
+                min=bucket.min,
+                max=bucket.max,
+                mean=bucket.mean,
+                last=bucket.last,
+            )
+            for bucket in downsample(rows, width)
+        ],
+    )
 
 
 @router.get(
@@ -88,9 +307,29 @@ async def get_mission_telemetry(
     response_model=List[CommandLogResponse],
 )
 async def get_mission_commands(
-    mission_id: int, limit: int = 50, db: AsyncSession = Depends(get_db)
+    mission_id: int,
+    response: Response,
+    limit: int = Query(50, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
 ):
-    raise NotImplementedError("Not implemented yet")
+    logs = await DatabaseService(db).get_command_logs(
+        mission_id, limit, before=decode_cursor(cursor)
+    )
+    if len(logs) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            logs[-1].timestamp, logs[-1].id
+        )
+    return [
+        CommandLogResponse(
+            id=log.id,
+            timestamp=log.timestamp.isoformat(),
+            command=log.command,
+            parameters=log.payload,
+            status=log.status,
+        )
+        for log in logs
+    ]
 
 
 # Placeholder endpoints (not implemented yet)
@@ -110,22 +349,56 @@ async def get_mission_events(mission_id: str):
     raise NotImplementedError("Not implemented yet")
 
 
-@router.post("/playback/start", summary="Start mission playback")
-async def start_playback():
-    raise NotImplementedError("Not implemented yet")
+@router.post(
+    "/playback/start",
+    summary="Start mission playback",
+    response_model=PlaybackStatusResponse,
+)
+async def start_playback(
+    request: PlaybackStartRequest, db: AsyncSession = Depends(get_db)
+):
+    if await DatabaseService(db).get_mission(request.mission_id) is None:
+        raise HTTPException(status_code=404, detail="Mission not found")
+    await playback.start(
+        request.mission_id, request.rate, request.start, paused=request.paused
+    )
+    return playback.status()
 
 
 @router.post(
     "/playback/control",
     summary="Pause/resume/seek playback",
+    response_model=PlaybackStatusResponse,
 )
-async def control_playback():
-    raise NotImplementedError("Not implemented yet")
+async def control_playback(request: PlaybackControlRequest):
+    if playback.mission_id is None:
+        raise HTTPException(status_code=409, detail="No playback in progress")
+    try:
+        if request.action == "pause":
+            await playback.pause()
+        elif request.action == "resume":
+            await playback.resume()
+        elif request.action == "seek":
+            if request.position is None:
+                raise HTTPException(status_code=400, detail="seek needs a position")
+            await playback.seek(request.position)
+        elif request.action == "rate":
+            if request.rate is None:
+                raise HTTPException(status_code=400, detail="rate needs a rate")
+            await playback.set_rate(request.rate)
+        elif request.action == "step":
+            await playback.step(request.steps)
+        else:
+            await playback.stop()
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return playback.status()
 
 
 @router.get(
     "/playback/status",
     summary="Get current playback status",
+    response_model=PlaybackStatusResponse,
 )
 async def get_playback_status():
-    raise NotImplementedError("Not implemented yet")
+    return playback.status()
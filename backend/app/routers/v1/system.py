@@ -1,5 +1,11 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
+from datetime import datetime
+from typing import Any, Dict, List, Literal, Optional, Union
+from ...services.health import health_scheduler, worst_status
+from ...services.profiler import loop_monitor, profiler
+from .telemetry import not_modified
 
 router = APIRouter(
     prefix="/api/v1",
@@ -11,22 +17,129 @@ class MessageResponse(BaseModel):
     message: str
 
 
+class StallResponse(BaseModel):
+    at: datetime
+    lag_ms: float
+    # Event loop thread stack while blocked, outermost call first
+    stack: List[str]
+
+
+class LoopLagResponse(BaseModel):
+    running: bool
+    interval_ms: float
+    threshold_ms: float
+    current_lag_ms: float
+    lag_ms: Dict[str, Any]
+    stalls: int
+    recent_stalls: List[StallResponse]
+
+
+class ProfileResponse(BaseModel):
+    started_at: datetime
+    duration_s: float
+    interval_ms: float
+    samples: int
+    idle_samples: int
+    # Functions by self samples: function, samples, percent
+    top: List[Dict[str, Any]]
+
+
+class HealthCheckResponse(BaseModel):
+    name: str
+    category: str
+    # ok, unknown, warning or critical
+    status: str
+    value: Optional[float]
+    unit: Optional[str]
+    detail: Optional[str]
+    checked_at: Optional[datetime]
+    duration_ms: Optional[float]
+    interval: float
+
+
+class HealthResponse(BaseModel):
+    version: int
+    # Worst status of the checks listed
+    status: str
+    checks: List[HealthCheckResponse]
+
+
+def health_response(
+    request: Request, response: Response, category: Optional[str] = None
+) -> Union[HealthResponse, Response]:
+    """The scheduler's cached results; never runs a probe."""
+    etag = health_scheduler.etag()
+    if not_modified(request, response, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    snapshot = health_scheduler.snapshot()
+    checks = [
+        check
+        for check in snapshot["checks"]
+        if category is None or check["category"] == category
+    ]
+    return HealthResponse(
+        version=snapshot["version"],
+        status=worst_status([check["status"] for check in checks]),
+        checks=[HealthCheckResponse(**check) for check in checks],
+    )
+
+
 @router.get(
     "/system/status",
     summary="Get overall system status",
-    response_model=MessageResponse,
+    response_model=HealthResponse,
 )
-async def get_system_status():
-    return {"message": "hello mks"}
+async def get_system_status(request: Request, response: Response):
+    return health_response(request, response, "system")
 
 
 @router.get(
     "/system/network",
     summary="Get network connectivity status",
-    response_model=MessageResponse,
+    response_model=HealthResponse,
 )
-async def get_network_status():
-    return {"message": "hello mks"}
+async def get_network_status(request: Request, response: Response):
+    return health_response(request, response, "network")
+
+
+@router.get(
+    "/system/loop",
+    summary="Event loop lag and recent stalls with the blocking stack",
+    response_model=LoopLagResponse,
+)
+async def get_loop_lag():
+    return loop_monitor.stats()
+
+
+@router.post(
+    "/system/profile",
+    summary="Sample the event loop thread for a while and return the stacks",
+    response_model=ProfileResponse,
+    responses={200: {"content": {"text/plain": {}}}},
+)
+async def profile_event_loop(
+    duration: float = Query(5.0, gt=0),
+    interval_ms: float = Query(5.0, ge=1, le=1000),
+    fmt: Literal["collapsed", "json"] = Query("collapsed", alias="format"),
+    include_idle: bool = False,
+):
+    if not profiler.enabled:
+        raise HTTPException(
+            status_code=403, detail="Profiling is disabled; set PROFILER_ENABLED=1"
+        )
+    try:
+        profile = await profiler.profile(duration, interval_ms / 1e3, include_idle)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    except RuntimeError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    if fmt == "json":
+        return profile.to_dict()
+    filename = f"profile-{profile.started_at:%Y%m%d-%H%M%S}.folded"
+    return PlainTextResponse(
+        profile.collapsed(),
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 
 @router.post(
@@ -1,5 +1,8 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Request, Response
 from pydantic import BaseModel
+from typing import Any, Dict, List, Optional, Union
+from ...services.rover_link import rover_link
+from ...services.telemetry_cache import CachedValue, telemetry_cache
 
 router = APIRouter(
     prefix="/api/v1/telemetry",
@@ -11,13 +14,101 @@ class MessageResponse(BaseModel):
     message: str
 
 
+class TelemetryValueResponse(BaseModel):
+    topic: str
+    seq: int
+    timestamp: str
+    data: Any
+
+
+class TelemetrySnapshotResponse(BaseModel):
+    version: int
+    topics: Dict[str, TelemetryValueResponse]
+
+
+class LinkSourceResponse(BaseModel):
+    name: str
+    kind: str
+    connected: bool
+    received: int
+    reconnects: int
+    last_error: Optional[str]
+
+
+class LinkStatsResponse(BaseModel):
+    received: int
+    ingested: int
+    dropped: int
+    parse_errors: int
+    queue_depth: int
+    queue_size: Optional[int]
+    # Time messages waited between arriving and being ingested
+    queue_latency_ms: Dict[str, Any]
+    sources: List[LinkSourceResponse]
+
+
+def _value_response(value: CachedValue) -> TelemetryValueResponse:
+    return TelemetryValueResponse(
+        topic=value.topic,
+        seq=value.seq,
+        timestamp=value.timestamp.isoformat(),
+        data=value.data,
+    )
+
+
+def not_modified(
+    request: Request, response: Response, etag: str, exists: bool = True
+) -> bool:
+    """Set the ETag header and report whether the client already has it.
+
+    ``*`` matches only when a representation ``exists``.
+    """
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return etag in tags or ("*" in tags and exists)
+
+
+def _latest_for_topic(
+    topic: str, request: Request, response: Response
+) -> Union[TelemetryValueResponse, Response]:
+    etag = telemetry_cache.etag(topic)
+    value = telemetry_cache.get(topic)
+    if not_modified(request, response, etag, exists=value is not None):
+        return Response(status_code=304, headers={"ETag": etag})
+    if value is None:
+        raise HTTPException(status_code=404, detail=f"No data received on {topic}")
+    return _value_response(value)
+
+
 @router.get(
     "/latest",
     summary="Get most recent telemetry snapshot",
-    response_model=MessageResponse,
+    response_model=TelemetrySnapshotResponse,
 )
-async def get_latest_telemetry():
-    raise NotImplementedError("Not implemented yet")
+async def get_latest_telemetry(request: Request, response: Response):
+    etag = telemetry_cache.etag()
+    if not_modified(request, response, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return TelemetrySnapshotResponse(
+        version=telemetry_cache.version,
+        topics={
+            topic: _value_response(value)
+            for topic, value in telemetry_cache.snapshot().items()
+        },
+    )
+
+
+@router.get(
+    "/link",
+    summary="Get rover link sources and message counts",
+    response_model=LinkStatsResponse,
+)
+async def get_link_stats():
+    return rover_link.stats()
 
 
 @router.get(
@@ -30,34 +121,36 @@ async def get_telemetry_health():
 
 
 @router.get(
-    "/sensors/vescs", summary="Get latest VESC data", response_model=MessageResponse
+    "/sensors/vescs",
+    summary="Get latest VESC data",
+    response_model=TelemetryValueResponse,
 )
-async def get_sensors_vescs():
-    raise NotImplementedError("Not implemented yet")
+async def get_sensors_vescs(request: Request, response: Response):
+    return _latest_for_topic("telemetry.vescs", request, response)
 
 
 @router.get(
     "/sensors/encoders",
     summary="Get latest encoder readings",
-    response_model=MessageResponse,
+    response_model=TelemetryValueResponse,
 )
-async def get_sensors_encoders():
-    raise NotImplementedError("Not implemented yet")
+async def get_sensors_encoders(request: Request, response: Response):
+    return _latest_for_topic("telemetry.encoders", request, response)
 
 
 @router.get(
     "/sensors/rgbd",
     summary="Get latest RGBD camera data and IMU",
-    response_model=MessageResponse,
+    response_model=TelemetryValueResponse,
 )
-async def get_sensors_rgbd():
-    raise NotImplementedError("Not implemented yet")
+async def get_sensors_rgbd(request: Request, response: Response):
+    return _latest_for_topic("telemetry.rgbd", request, response)
 
 
 @router.get(
     "/sensors/payload",
     summary="Get latest payload sensor data",
-    response_model=MessageResponse,
+    response_model=TelemetryValueResponse,
 )
-async def get_sensors_payload():
-    raise NotImplementedError("Not implemented yet")
+async def get_sensors_payload(request: Request, response: Response):
+    return _latest_for_topic("telemetry.payload", request, response)
@@ -1,5 +1,10 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query, Response
 from pydantic import BaseModel
+from datetime import datetime
+from typing import List, Optional
+
+from ...services.pose import POSE_FIELDS, pose_service
+from ...services.slam_map import map_store
 
 router = APIRouter(
     prefix="/api/v1",
@@ -7,23 +12,97 @@ router = APIRouter(
 )
 
 
-class MessageResponse(BaseModel):
-    message: str
+class MapTileResponse(BaseModel):
+    x: int
+    y: int
+    version: int
+    data: str
+
+
+class MapResponse(BaseModel):
+    version: int
+    base_version: int
+    reset: bool
+    resolution: Optional[float]
+    tile_size: int
+    encoding: str
+    tiles: List[MapTileResponse]
 
 
 @router.get(
     "/slam/map/current",
     summary="Get current SLAM map data",
-    response_model=MessageResponse,
+    response_model=MapResponse,
 )
-async def get_current_slam_map():
-    return {"message": "hello mks"}
+async def get_current_slam_map(since_version: int = Query(0, ge=0)):
+    """Map tiles changed after ``since_version``; the full map by default
+    or when ``since_version`` predates a map reset (``reset`` is true)."""
+    return map_store.snapshot(since_version)
+
+
+class PositionResponse(BaseModel):
+    x: float
+    y: float
+    z: float
+
+
+class OrientationResponse(BaseModel):
+    x: float
+    y: float
+    z: float
+    w: float
+
+
+class PoseResponse(BaseModel):
+    timestamp: datetime
+    position: PositionResponse
+    orientation: OrientationResponse
 
 
 @router.get(
     "/pose/current",
     summary="Get current rover pose/position",
-    response_model=MessageResponse,
+    response_model=PoseResponse,
 )
-async def get_current_pose():
-    return {"message": "hello mks"}
+async def get_current_pose(at: Optional[datetime] = None):
+    """The latest pose, or with ``?at=`` the pose interpolated at that time
+    from the recent pose buffer."""
+    if at is None:
+        pose = pose_service.latest()
+        if pose is None:
+            raise HTTPException(status_code=503, detail="No pose received yet")
+        return pose
+    pose = pose_service.pose_at(at)
+    if pose is None:
+        raise HTTPException(status_code=404, detail="Time is outside the pose buffer")
+    return pose
+
+
+@router.get(
+    "/pose/trajectory",
+    summary="Get recent rover trajectory as a packed array",
+    response_class=Response,
+)
+async def get_pose_trajectory(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    max_points: int = Query(2000, ge=2, le=100000),
+):
+    """Buffered poses as little-endian float32 rows of ``X-Pose-Fields``.
+
+    ``t`` is seconds after ``X-Pose-Epoch`` (UTC epoch seconds), which
+    keeps float32 precision for the time column.
+    """
+    rows = pose_service.trajectory(start, end, max_points)
+    epoch = float(rows[0, 0]) if len(rows) else 0.0
+    packed = rows.astype("<f4")
+    packed[:, 0] = rows[:, 0] - epoch
+    return Response(
+        content=packed.tobytes(),
+        media_type="application/octet-stream",
+        headers={
+            "X-Pose-Fields": ",".join(POSE_FIELDS),
+            "X-Pose-Count": str(len(rows)),
+            "X-Pose-Epoch": repr(epoch),
+        },
+    )
@@ -0,0 +1,458 @@
+from ..database import as_utc_naive, async_session
+from .database_service import DatabaseService
+from .pose import epoch_seconds
+from .websocket_hub import WebSocketHub, hub, topic_patterns
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import dataclasses
+import itertools
+import json
+import logging
+import math
+import os
+import uuid
+
+logger = logging.getLogger(__name__)
+
+ALERT_TOPIC = "alerts.live"
+ALERT_RULES_FILE = os.getenv("ALERT_RULES_FILE")
+RULE_KINDS = ("threshold", "rate", "stale")
+SEVERITIES = ("info", "warning", "critical")
+
+# (rule id, topic): a rule on a wildcard topic tracks each matching topic
+AlertKey = Tuple[str, str]
+
+
+@dataclass
+class AlertRule:
+    """A condition on one telemetry topic.
+
+    ``threshold`` compares a payload field (dotted path) with ``value``;
+    ``rate`` compares the field's absolute rate of change per second;
+    ``stale`` fires when no sample arrives for ``timeout`` seconds. With
+    ``op`` ``gt`` the alert raises above ``value`` and clears at or below
+    ``clear`` (``lt`` the other way round); ``clear`` defaults to ``value``,
+    and setting it apart gives hysteresis so a noisy signal does not flap.
+    """
+
+    id: str
+    kind: str
+    topic: str
+    field: Optional[str] = None
+    op: str = "gt"
+    value: float = 0.0
+    clear: Optional[float] = None
+    timeout: Optional[float] = None
+    severity: str = "warning"
+    message: Optional[str] = None
+    path: Tuple[str, ...] = dataclasses.field(default=(), init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.kind not in RULE_KINDS:
+            raise ValueError(f"Unknown rule kind {self.kind!r}")
+        if self.severity not in SEVERITIES:
+            raise ValueError(f"Unknown severity {self.severity!r}")
+        if self.op not in ("gt", "lt"):
+            raise ValueError(f"op must be 'gt' or 'lt', got {self.op!r}")
+        if self.kind == "stale":
+            if not self.timeout or self.timeout <= 0:
+                raise ValueError("stale rules need a positive timeout")
+            if self.topic == "*" or self.topic.endswith((".all", ".*")):
+                raise ValueError("stale rules need an exact topic")
+        elif not self.field:
+            raise ValueError(f"{self.kind} rules need a field")
+        if self.clear is None:
+            self.clear = self.value
+        elif (
+            (self.clear > self.value) if self.op == "gt" else (self.clear < self.value)
+        ):
+            raise ValueError("clear must be on the non-alerting side of value")
+        self.path = tuple(self.field.split(".")) if self.field else ()
+
+    def describe(self) -> str:
+        if self.message:
+            return self.message
+        if self.kind == "stale":
+            return f"No {self.topic} data for {self.timeout:g}s"
+        what = f"{self.field} rate" if self.kind == "rate" else self.field
+        return f"{self.topic} {what} {'>' if self.op == 'gt' else '<'} {self.value:g}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "topic": self.topic,
+            "field": self.field,
+            "op": self.op,
+            "value": self.value,
+            "clear": self.clear,
+            "timeout": self.timeout,
+            "severity": self.severity,
+            "message": self.message,
+        }
+
+
+@dataclass
+class Alert:
+    id: str
+    rule_id: str
+    topic: str
+    severity: str
+    message: str
+    value: Optional[float]
+    raised_at: datetime
+    mission_id: Optional[int] = None
+    cleared_at: Optional[datetime] = None
+    acknowledged_at: Optional[datetime] = None
+
+    @property
+    def active(self) -> bool:
+        return self.cleared_at is None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "rule_id": self.rule_id,
+            "topic": self.topic,
+            "severity": self.severity,
+            "message": self.message,
+            "value": self.value,
+            "mission_id": self.mission_id,
+            "raised_at": self.raised_at,
+            "cleared_at": self.cleared_at,
+            "acknowledged_at": self.acknowledged_at,
+            "active": self.active,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Alert":
+        """Inverse of the ``alert`` in an ``alerts.live`` message."""
+        fields = {key: value for key, value in data.items() if key != "active"}
+        for key in ("raised_at", "cleared_at", "acknowledged_at"):
+            if fields[key] is not None:
+                fields[key] = datetime.fromisoformat(fields[key])
+        return cls(**fields)
+
+    def to_row(self) -> Dict[str, Any]:
+        row = self.to_dict()
+        row["alert_id"] = row.pop("id")
+        del row["active"]
+        for key in ("raised_at", "cleared_at", "acknowledged_at"):
+            if row[key] is not None:
+                row[key] = as_utc_naive(row[key])
+        return row
+
+
+def _jsonable(alert: Alert) -> Dict[str, Any]:
+    return {
+        key: value.isoformat() if isinstance(value, datetime) else value
+        for key, value in alert.to_dict().items()
+    }
+
+
+class _RuleState:
+    __slots__ = ("active", "last_value", "last_time")
+
+    def __init__(self) -> None:
+        self.active = False
+        self.last_value: Optional[float] = None
+        self.last_time: Optional[float] = None
+
+
+def _field_value(data: Any, path: Tuple[str, ...]) -> Optional[float]:
+    for key in path:
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    if isinstance(data, bool) or not isinstance(data, (int, float)):
+        return None
+    return float(data) if math.isfinite(data) else None
+
+
+class AlertEngine:
+    """Evaluates alert rules incrementally as telemetry samples arrive.
+
+    Rules are indexed by topic (exact or ``prefix.*``), so each sample only
+    touches the rules for its topic and the cost does not grow with the
+    total number of rules. A rule on a wildcard topic keeps separate state,
+    and raises separate alerts, for each topic it matches. Raised, cleared
+    and acknowledged alerts are
+    published on ``alerts.live``; active alerts live in memory and ended
+    ones are written to ``AlertLog`` in batches by a background task, which
+    also checks the stale-topic rules.
+    """
+
+    def __init__(
+        self,
+        hub: WebSocketHub = hub,
+        session_factory=async_session,
+        flush_interval: float = 1.0,
+        check_interval: float = 0.25,
+    ):
+        self.hub = hub
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.check_interval = check_interval
+        self.mission_id: Optional[int] = None
+        self.rules: Dict[str, AlertRule] = {}
+        self.active: Dict[AlertKey, Alert] = {}
+        self.samples = 0
+        self.evaluations = 0
+        self.rows_written = 0
+        self.write_errors = 0
+        self._by_topic: Dict[str, List[AlertRule]] = {}
+        self._stale_by_topic: Dict[str, List[AlertRule]] = {}
+        self._state: Dict[AlertKey, _RuleState] = {}
+        self._last_seen: Dict[str, float] = {}
+        self._unwritten: List[Alert] = []
+        self._task: Optional[asyncio.Task] = None
+
+    # Rules
+    def set_rules(self, rules: List[AlertRule], replace: bool = False) -> None:
+        """Add or update rules by id, or replace all of them."""
+        if replace:
+            for rule_id in list(self.rules):
+                self.remove_rule(rule_id)
+        for rule in rules:
+            if rule.id in self.rules:
+                self.remove_rule(rule.id)
+            self.rules[rule.id] = rule
+        self._reindex()
+
+    def remove_rule(self, rule_id: str) -> bool:
+        rule = self.rules.pop(rule_id, None)
+        if rule is None:
+            return False
+        self._forget(rule_id)
+        now = datetime.now(timezone.utc)
+        for key in [key for key in self.active if key[0] == rule_id]:
+            self._clear(key, now)
+        self._reindex()
+        return True
+
+    def _forget(self, rule_id: str) -> None:
+        for key in [key for key in self._state if key[0] == rule_id]:
+            del self._state[key]
+
+    def _rule_state(self, rule_id: str, topic: str) -> _RuleState:
+        state = self._state.get((rule_id, topic))
+        if state is None:
+            state = self._state[(rule_id, topic)] = _RuleState()
+        return state
+
+    def load_rules_file(self, path: str) -> None:
+        with open(path) as f:
+            self.set_rules([AlertRule(**rule) for rule in json.load(f)])
+
+    def _reindex(self) -> None:
+        self._by_topic = {}
+        self._stale_by_topic = {}
+        for rule in self.rules.values():
+            index = self._stale_by_topic if rule.kind == "stale" else self._by_topic
+            index.setdefault(rule.topic, []).append(rule)
+
+    # Mirroring the engine of another worker
+    def mirror_rules(self, rules: List[AlertRule], replace: bool = False) -> None:
+        """Like ``set_rules`` without raising or clearing anything, for a
+        worker that shows another worker's rules and alerts."""
+        if replace:
+            self.rules = {}
+            self._state = {}
+        for rule in rules:
+            self.rules[rule.id] = rule
+            self._forget(rule.id)
+        self._reindex()
+
+    def mirror(self, message: Dict[str, Any]) -> None:
+        """Apply an ``alerts.live`` message published by another engine."""
+        alert = Alert.from_dict(message["alert"])
+        key = (alert.rule_id, alert.topic)
+        if message["event"] == "cleared":
+            self.active.pop(key, None)
+        else:
+            self.active[key] = alert
+        # Ready to clear the alert if this worker takes over evaluation
+        if alert.rule_id in self.rules:
+            self._rule_state(*key).active = alert.active
+
+    def mirror_state(
+        self, rules: List[AlertRule], active: List[Dict[str, Any]]
+    ) -> None:
+        self.mirror_rules(rules, replace=True)
+        self.active = {}
+        for alert in active:
+            self.mirror({"event": "raised", "alert": alert})
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Rules and active alerts, for ``mirror_state``."""
+        return {
+            "rules": [rule.to_dict() for rule in self.rules.values()],
+            "active": [_jsonable(alert) for alert in self.active.values()],
+        }
+
+    # Evaluation
+    def evaluate(
+        self,
+        topic: str,
+        data: Any,
+        timestamp: datetime,
+        mission_id: Optional[int] = None,
+    ) -> None:
+        """Apply one telemetry sample to the rules for its topic."""
+        self.samples += 1
+        self.mission_id = mission_id
+        stale = self._stale_by_topic.get(topic)
+        if stale:
+            self._last_seen[topic] = asyncio.get_running_loop().time()
+            for rule in stale:
+                state = self._rule_state(rule.id, topic)
+                if state.active:
+                    state.active = False
+                    self._clear((rule.id, topic), timestamp)
+        by_topic = self._by_topic
+        if not by_topic:
+            return
+        for pattern in topic_patterns(topic):
+            rules = by_topic.get(pattern)
+            if rules:
+                self._apply(rules, topic, data, timestamp)
+
+    def _apply(
+        self, rules: List[AlertRule], topic: str, data: Any, timestamp: datetime
+    ) -> None:
+        t = epoch_seconds(timestamp)
+        for rule in rules:
+            self.evaluations += 1
+            x = _field_value(data, rule.path)
+            if x is None:
+                continue
+            state = self._rule_state(rule.id, topic)
+            if rule.kind == "rate":
+                last_value, last_time = state.last_value, state.last_time
+                state.last_value, state.last_time = x, t
+                if last_value is None or last_time is None or t <= last_time:
+                    continue
+                x = abs(x - last_value) / (t - last_time)
+            if state.active:
+                assert rule.clear is not None
+                if (x <= rule.clear) if rule.op == "gt" else (x >= rule.clear):
+                    state.active = False
+                    self._clear((rule.id, topic), timestamp)
+            elif (x > rule.value) if rule.op == "gt" else (x < rule.value):
+                state.active = True
+                self._raise(rule, topic, x, timestamp)
+
+    def check_stale(self) -> None:
+        """Raise stale-topic alerts for topics silent longer than their
+        timeout. Called periodically by the background task."""
+        now = asyncio.get_running_loop().time()
+        for rule in itertools.chain(*self._stale_by_topic.values()):
+            state = self._rule_state(rule.id, rule.topic)
+            if state.active:
+                continue
+            last_seen = self._last_seen.setdefault(rule.topic, now)
+            assert rule.timeout is not None
+            if now - last_seen > rule.timeout:
+                state.active = True
+                self._raise(rule, rule.topic, None, datetime.now(timezone.utc))
+
+    def _raise(
+        self, rule: AlertRule, topic: str, value: Optional[float], at: datetime
+    ) -> None:
+        alert = Alert(
+            id=uuid.uuid4().hex,
+            rule_id=rule.id,
+            topic=topic,
+            severity=rule.severity,
+            message=rule.describe(),
+            value=value,
+            raised_at=at,
+            mission_id=self.mission_id,
+        )
+        self.active[(rule.id, topic)] = alert
+        self._publish("raised", alert)
+
+    def _clear(self, key: AlertKey, at: datetime) -> None:
+        alert = self.active.pop(key, None)
+        if alert is None:
+            return
+        alert.cleared_at = at
+        self._unwritten.append(alert)
+        self._publish("cleared", alert)
+
+    def acknowledge(self, alert_id: str) -> Optional[Alert]:
+        for alert in self.active.values():
+            if alert.id == alert_id:
+                if alert.acknowledged_at is None:
+                    alert.acknowledged_at = datetime.now(timezone.utc)
+                    self._publish("acknowledged", alert)
+                return alert
+        return None
+
+    def _publish(self, event: str, alert: Alert) -> None:
+        self.hub.publish(ALERT_TOPIC, {"event": event, "alert": _jsonable(alert)})
+
+    # Background task
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        if ALERT_RULES_FILE and not self.rules:
+            self.load_rules_file(ALERT_RULES_FILE)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop checking and write ended alerts. Still-active alerts are
+        written too, with no ``cleared_at``."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._unwritten.extend(self.active.values())
+        await self.flush()
+
+    async def flush(self) -> None:
+        batch, self._unwritten = self._unwritten, []
+        if not batch:
+            return
+        try:
+            async with self.session_factory() as session:
+                await DatabaseService(session).log_alert_batch(
+                    [alert.to_row() for alert in batch]
+                )
+        except Exception:
+            # Keep them for the next flush
+            logger.exception("Failed to write %d alerts", len(batch))
+            self._unwritten[:0] = batch
+            self.write_errors += 1
+            return
+        self.rows_written += len(batch)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_flush = loop.time() + self.flush_interval
+        while True:
+            await asyncio.sleep(self.check_interval)
+            self.check_stale()
+            if loop.time() >= next_flush:
+                next_flush = loop.time() + self.flush_interval
+                await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rules": len(self.rules),
+            "active": len(self.active),
+            "samples": self.samples,
+            "evaluations": self.evaluations,
+            "unwritten": len(self._unwritten),
+            "rows_written": self.rows_written,
+            "write_errors": self.write_errors,
+        }
+
+
+alert_engine = AlertEngine()
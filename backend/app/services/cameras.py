@@ -0,0 +1,432 @@
+from collections import Counter, deque
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import AsyncIterator, Deque, Dict, List, Optional, Tuple
+import asyncio
+import io
+import logging
+import os
+import time
+from PIL import Image, ImageDraw
+
+logger = logging.getLogger(__name__)
+
+# Comma-separated ids of synthetic cameras to run, e.g. "front,rear"
+FAKE_CAMERAS = os.getenv("FAKE_CAMERAS", "")
+MJPEG_BOUNDARY = "frame"
+
+# Frames keep their decoded image this long so tiers can be encoded from it
+TIER_SOURCE_FRAMES = 2
+
+
+@dataclass(frozen=True)
+class Tier:
+    name: str
+    scale: float
+    # None reuses the source encoding as-is
+    quality: Optional[int]
+
+
+# Best first
+TIERS = (
+    Tier("full", 1.0, None),
+    Tier("half", 0.5, 70),
+    Tier("quarter", 0.25, 50),
+)
+TIER_NAMES = tuple(tier.name for tier in TIERS)
+
+
+@dataclass
+class CameraConfig:
+    # Capture rate
+    fps: float = 15.0
+    # Adapt each viewer's tier to its link; otherwise everyone gets max_tier
+    adaptive: bool = True
+    max_tier: str = "full"
+    min_tier: str = "quarter"
+    # Per-viewer frame rate cap, on top of any ?fps= a viewer asks for
+    max_viewer_fps: float = 30.0
+    # Step down when a frame's send time or lag exceeds this fraction of the
+    # frame interval, step up after a couple of seconds below upgrade_threshold
+    downgrade_threshold: float = 0.8
+    upgrade_threshold: float = 0.3
+
+
+@dataclass
+class Frame:
+    seq: int
+    timestamp: datetime
+    # Event-loop time the frame was captured, for latency measurements
+    captured_at: float
+    data: bytes
+    width: int
+    height: int
+    image: Optional[Image.Image] = None
+    # Encodings of this frame at lower tiers, shared by every viewer
+    tiers: Dict[str, bytes] = field(default_factory=dict)
+    encoding: Dict[str, "asyncio.Task[bytes]"] = field(default_factory=dict)
+
+
+def encode_jpeg(image: Image.Image, quality: int, scale: float = 1.0) -> bytes:
+    if scale != 1.0:
+        size = (max(1, int(image.width * scale)), max(1, int(image.height * scale)))
+        image = image.resize(size, Image.Resampling.BILINEAR)
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+class FrameBuffer:
+    """Ring buffer of a camera's most recent encoded frames."""
+
+    def __init__(self, capacity: int = 30):
+        self.frames: Deque[Frame] = deque(maxlen=capacity)
+        # Created on first use so it binds to the running loop
+        self._new_frame: Optional[asyncio.Event] = None
+
+    def push(self, frame: Frame) -> None:
+        self.frames.append(frame)
+        if self._new_frame is not None:
+            # Wake every waiter at once; later waiters get a fresh event
+            self._new_frame.set()
+            self._new_frame = None
+
+    def latest(self) -> Optional[Frame]:
+        return self.frames[-1] if self.frames else None
+
+    def get(self, seq: int) -> Optional[Frame]:
+        for frame in reversed(self.frames):
+            if frame.seq == seq:
+                return frame
+        return None
+
+    async def next_frame(self, after_seq: int) -> Frame:
+        """The newest frame if it is newer than ``after_seq``, else wait.
+
+        Slow readers skip straight to the newest frame instead of working
+        through a backlog, so they fall behind in frame rate, not latency.
+        """
+        while True:
+            frame = self.latest()
+            if frame is not None and frame.seq > after_seq:
+                return frame
+            if self._new_frame is None:
+                self._new_frame = asyncio.Event()
+            await self._new_frame.wait()
+
+
+class FakeCameraSource:
+    """Synthetic JPEG frames: a gradient with a moving bar and a counter."""
+
+    def __init__(
+        self, name: str, width: int = 640, height: int = 480, quality: int = 80
+    ):
+        self.name = name
+        self.width = width
+        self.height = height
+        self.quality = quality
+        self._background = Image.linear_gradient("L").resize((width, height))
+        self._background = Image.merge(
+            "RGB",
+            (
+                self._background,
+                self._background.transpose(Image.Transpose.FLIP_LEFT_RIGHT),
+                Image.new("L", (width, height), 96),
+            ),
+        )
+
+    def render(self, seq: int) -> Image.Image:
+        image = self._background.copy()
+        draw = ImageDraw.Draw(image)
+        x = (seq * 8) % self.width
+        draw.rectangle((x, 0, x + 16, self.height), fill=(255, 255, 255))
+        draw.text((10, 10), f"{self.name} #{seq}", fill=(255, 255, 0))
+        return image
+
+    def capture(self, seq: int) -> Tuple[Image.Image, bytes]:
+        image = self.render(seq)
+        return image, encode_jpeg(image, self.quality)
+
+
+class ViewerState:
+    """Adaptive delivery state of one stream viewer.
+
+    Two signals drive the tier: how long the last frames took to send
+    (transport backpressure, so link bandwidth and RTT) and how old a frame
+    already was when the viewer picked it up (its queueing lag).
+    """
+
+    # Weight of the newest sample in the moving averages
+    ALPHA = 0.3
+
+    def __init__(
+        self,
+        config: CameraConfig,
+        tier: Optional[str] = None,
+        max_fps: Optional[float] = None,
+    ):
+        self.config = config
+        self.fixed = tier is not None
+        self.tier_index = TIER_NAMES.index(tier or config.max_tier)
+        self.requested_fps = max_fps
+        self.send_time = 0.0
+        self.lag = 0.0
+        self.frames_sent = 0
+        self.tier_changes = 0
+        self._good_frames = 0
+
+    @property
+    def tier(self) -> Tier:
+        return TIERS[self.tier_index]
+
+    @property
+    def max_fps(self) -> float:
+        fps = min(self.config.fps, self.config.max_viewer_fps)
+        return min(fps, self.requested_fps) if self.requested_fps else fps
+
+    def record(self, send_time: float, lag: float) -> None:
+        self.frames_sent += 1
+        self.send_time += self.ALPHA * (send_time - self.send_time)
+        self.lag += self.ALPHA * (lag - self.lag)
+        if self.fixed:
+            return
+        if not self.config.adaptive:
+            self.tier_index = TIER_NAMES.index(self.config.max_tier)
+            return
+        interval = 1.0 / self.max_fps
+        worst = max(self.send_time, self.lag)
+        lowest = TIER_NAMES.index(self.config.min_tier)
+        highest = TIER_NAMES.index(self.config.max_tier)
+        if worst > self.config.downgrade_threshold * interval:
+            self._good_frames = 0
+            if self.tier_index < lowest:
+                self._set_tier(self.tier_index + 1)
+        elif worst < self.config.upgrade_threshold * interval:
+            self._good_frames += 1
+            if self._good_frames >= 2 * self.max_fps and self.tier_index > highest:
+                self._good_frames = 0
+                self._set_tier(self.tier_index - 1)
+        else:
+            self._good_frames = 0
+        # Config changes can move the allowed range under a viewer
+        self.tier_index = min(max(self.tier_index, highest), lowest)
+
+    def _set_tier(self, index: int) -> None:
+        self.tier_index = index
+        self.tier_changes += 1
+        # Measurements from the old tier do not apply to the new one
+        self.send_time = self.lag = 0.0
+
+
+def _store_encoding(frame: Frame, name: str, task: "asyncio.Task[bytes]") -> None:
+    frame.encoding.pop(name, None)
+    # A failed encode is retried by the next viewer that asks
+    if not task.cancelled() and task.exception() is None:
+        frame.tiers[name] = task.result()
+
+
+class Camera:
+    """A camera feed: one capture/encode loop feeding a shared frame buffer.
+
+    Every snapshot and stream viewer reads the same encoded frames, so the
+    cost of a feed does not grow with the number of viewers.
+    """
+
+    def __init__(
+        self,
+        camera_id: str,
+        source: FakeCameraSource,
+        config: Optional[CameraConfig] = None,
+        buffer_size: int = 30,
+    ):
+        self.id = camera_id
+        self.source = source
+        self.config = config or CameraConfig()
+        self.buffer = FrameBuffer(buffer_size)
+        self.frames_captured = 0
+        self.encode_time_s = 0.0
+        self.tier_encodes: Counter = Counter()
+        self.viewers: List[ViewerState] = []
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_capture = loop.time()
+        seq = 0
+        while True:
+            seq += 1
+            interval = 1.0 / self.config.fps
+            started = time.perf_counter()
+            try:
+                # Encoding releases the GIL, so it runs off the event loop
+                image, data = await asyncio.to_thread(self.source.capture, seq)
+            except Exception:
+                logger.exception("Camera %s capture failed", self.id)
+                await asyncio.sleep(interval)
+                continue
+            self.encode_time_s += time.perf_counter() - started
+            self.frames_captured += 1
+            self.buffer.push(
+                Frame(
+                    seq=seq,
+                    timestamp=datetime.now(timezone.utc),
+                    captured_at=loop.time(),
+                    data=data,
+                    width=self.source.width,
+                    height=self.source.height,
+                    image=image,
+                )
+            )
+            if len(self.buffer.frames) > TIER_SOURCE_FRAMES:
+                self.buffer.frames[-TIER_SOURCE_FRAMES - 1].image = None
+            next_capture = max(next_capture + interval, loop.time())
+            await asyncio.sleep(next_capture - loop.time())
+
+    def status(self) -> Dict:
+        latest = self.buffer.latest()
+        tiers = Counter(viewer.tier.name for viewer in self.viewers)
+        return {
+            "id": self.id,
+            "running": self.running,
+            "fps": self.config.fps,
+            "width": self.source.width,
+            "height": self.source.height,
+            "frames_captured": self.frames_captured,
+            "encode_ms": (
+                self.encode_time_s / self.frames_captured * 1e3
+                if self.frames_captured
+                else 0.0
+            ),
+            "viewers": len(self.viewers),
+            "viewer_tiers": {name: tiers[name] for name in TIER_NAMES},
+            "tier_encodes": {name: self.tier_encodes[name] for name in TIER_NAMES[1:]},
+            "last_seq": latest.seq if latest else None,
+            "last_frame_bytes": len(latest.data) if latest else 0,
+        }
+
+    async def encoded(self, frame: Frame, tier: Tier) -> Optional[bytes]:
+        """``frame`` at ``tier``, encoded at most once however many viewers
+        ask for it concurrently. None if the frame is too old to encode."""
+        if tier.quality is None:
+            return frame.data
+        if tier.name in frame.tiers:
+            return frame.tiers[tier.name]
+        if frame.image is None:
+            # Viewers only ask for recent frames. Serving the full frame
+            # instead would swamp a viewer that was moved to a lower tier
+            return None
+        task = frame.encoding.get(tier.name)
+        if task is None:
+            self.tier_encodes[tier.name] += 1
+            task = asyncio.create_task(
+                asyncio.to_thread(encode_jpeg, frame.image, tier.quality, tier.scale)
+            )
+            frame.encoding[tier.name] = task
+            task.add_done_callback(
+                lambda task, name=tier.name: _store_encoding(frame, name, task)
+            )
+        # A viewer that disconnects must not cancel the encode for the others
+        return await asyncio.shield(task)
+
+    def configure(self, **changes) -> CameraConfig:
+        """Update config fields; unknown tiers or an inverted range raise."""
+        config = CameraConfig(**{**asdict(self.config), **changes})
+        for name in (config.max_tier, config.min_tier):
+            if name not in TIER_NAMES:
+                raise ValueError(f"Unknown tier {name!r}, expected one of {TIER_NAMES}")
+        if TIER_NAMES.index(config.max_tier) > TIER_NAMES.index(config.min_tier):
+            raise ValueError("max_tier must not be below min_tier")
+        # Updated in place so running viewers see the change
+        for key, value in asdict(config).items():
+            setattr(self.config, key, value)
+        return self.config
+
+    async def mjpeg_stream(
+        self, tier: Optional[str] = None, max_fps: Optional[float] = None
+    ) -> AsyncIterator[memoryview]:
+        """multipart/x-mixed-replace parts for one viewer.
+
+        The viewer's tier adapts to its link unless ``tier`` pins it. Frame
+        bytes are yielded as memoryviews of the shared per-tier encodings,
+        so nothing is encoded or copied per viewer.
+        """
+        loop = asyncio.get_running_loop()
+        viewer = ViewerState(self.config, tier, max_fps)
+        self.viewers.append(viewer)
+        try:
+            seq = 0
+            next_send = loop.time()
+            while True:
+                if next_send > loop.time():
+                    await asyncio.sleep(next_send - loop.time())
+                frame = await self.buffer.next_frame(seq)
+                seq = frame.seq
+                lag = loop.time() - frame.captured_at
+                data = await self.encoded(frame, viewer.tier)
+                if data is None:
+                    continue
+                started = loop.time()
+                yield memoryview(
+                    (
+                        f"--{MJPEG_BOUNDARY}\r\n"
+                        "Content-Type: image/jpeg\r\n"
+                        f"Content-Length: {len(data)}\r\n"
+                        f"X-Frame-Seq: {frame.seq}\r\n"
+                        f"X-Frame-Tier: {viewer.tier.name}\r\n\r\n"
+                    ).encode()
+                )
+                yield memoryview(data)
+                yield memoryview(b"\r\n")
+                # Resumed once the server has handed the frame to the socket
+                viewer.record(loop.time() - started, lag)
+                next_send = max(next_send + 1.0 / viewer.max_fps, started)
+        finally:
+            self.viewers.remove(viewer)
+
+
+class CameraManager:
+    def __init__(self):
+        self.cameras: Dict[str, Camera] = {}
+
+    def add(self, camera: Camera) -> Camera:
+        self.cameras[camera.id] = camera
+        return camera
+
+    def get(self, camera_id: str) -> Optional[Camera]:
+        return self.cameras.get(camera_id)
+
+    def list(self) -> List[Camera]:
+        return list(self.cameras.values())
+
+    def add_fake_cameras(self, ids: str = FAKE_CAMERAS) -> None:
+        for camera_id in filter(None, (i.strip() for i in ids.split(","))):
+            self.add(Camera(camera_id, FakeCameraSource(camera_id)))
+
+    def start(self) -> None:
+        for camera in self.cameras.values():
+            camera.start()
+
+    async def stop(self) -> None:
+        for camera in self.cameras.values():
+            await camera.stop()
+
+
+camera_manager = CameraManager()
@@ -0,0 +1,146 @@
+from ..database import async_session
+from .database_service import DatabaseService
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+FINAL_STATUSES = ("acknowledged", "failed")
+
+
+class CommandLogWriter:
+    """Writes ``CommandLog`` rows in the background, off the command path.
+
+    Dispatched commands and their status changes are queued in memory and
+    written every ``flush_interval`` seconds, inserts and updates together
+    in one transaction. A status that changes before its row is written is
+    folded into the insert, so a fast ack costs no extra UPDATE.
+    """
+
+    def __init__(self, session_factory=async_session, flush_interval: float = 0.2):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.rows_written = 0
+        self.updates_written = 0
+        self.rows_dropped = 0
+        # Keyed by dispatcher sequence number
+        self._inserts: Dict[int, Dict[str, Any]] = {}
+        self._updates: Dict[int, str] = {}
+        # Rows written while still "sent", waiting for their final status
+        self._row_ids: Dict[int, int] = {}
+        self._lock: Optional[asyncio.Lock] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+
+    @property
+    def pending(self) -> int:
+        return len(self._inserts) + len(self._updates)
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    async def start(self) -> None:
+        if self._running:
+            return
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._running = True
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background task after writing everything queued."""
+        if not self._running:
+            return
+        self._running = False
+        assert self._wakeup is not None and self._task is not None
+        self._wakeup.set()
+        await self._task
+        self._task = None
+
+    def log(
+        self,
+        seq: int,
+        mission_id: Optional[int],
+        command: str,
+        parameters: Dict[str, Any],
+        status: str,
+        timestamp: datetime,
+    ) -> None:
+        """Queue the row for a newly dispatched command."""
+        self._inserts[seq] = {
+            "mission_id": mission_id,
+            "command": command,
+            "parameters": parameters,
+            "status": status,
+            "timestamp": timestamp,
+        }
+
+    def update_status(self, seq: int, status: str) -> None:
+        row = self._inserts.get(seq)
+        if row is not None:
+            row["status"] = status
+        else:
+            self._updates[seq] = status
+
+    async def flush(self) -> None:
+        """Write everything queued so far."""
+        if not self._running:
+            return
+        await self._write_pending()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": self.pending,
+            "rows_written": self.rows_written,
+            "updates_written": self.updates_written,
+            "rows_dropped": self.rows_dropped,
+        }
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        while self._running:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self._write_pending()
+        await self._write_pending()
+
+    async def _write_pending(self) -> None:
+        assert self._lock is not None
+        async with self._lock:
+            inserts, self._inserts = self._inserts, {}
+            # Updates for rows still being inserted wait for their id
+            statuses: List[Tuple[int, str]] = []
+            for seq in [seq for seq in self._updates if seq in self._row_ids]:
+                statuses.append((self._row_ids.pop(seq), self._updates.pop(seq)))
+            if not inserts and not statuses:
+                return
+            try:
+                async with self.session_factory() as session:
+                    ids = await DatabaseService(session).log_command_batch(
+                        list(inserts.values()), statuses
+                    )
+            except Exception:
+                self.rows_dropped += len(inserts)
+                for seq in inserts:
+                    self._updates.pop(seq, None)
+                logger.exception(
+                    "Failed to write %d command rows and %d status updates",
+                    len(inserts),
+                    len(statuses),
+                )
+                return
+            for seq, row_id, row in zip(inserts, ids, inserts.values()):
+                if row["status"] not in FINAL_STATUSES:
+                    self._row_ids[seq] = row_id
+            self.rows_written += len(inserts)
+            self.updates_written += len(statuses)
+
+
+command_log_writer = CommandLogWriter()
@@ -0,0 +1,309 @@
+from .command_log_writer import CommandLogWriter, command_log_writer
+from .metrics import Histogram
+from .websocket_hub import WebSocketHub, hub
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Deque, Dict, List, Optional
+import asyncio
+import itertools
+import logging
+import os
+import random
+
+logger = logging.getLogger(__name__)
+
+COMMAND_STATUS_TOPIC = "commands.status"
+COMMAND_TIMEOUT = float(os.getenv("COMMAND_TIMEOUT", "2.0"))
+
+# Called by a transport with (seq, status, detail) when the rover answers
+AckHandler = Callable[[int, str, Optional[str]], None]
+
+
+class CommandTransport:
+    """Carries command messages to the rover and acknowledgements back.
+
+    ``send`` receives ``{"seq", "command", "parameters"}``; the transport
+    reports the rover's answer by calling the handler given to ``start``
+    with the same ``seq`` and ``acknowledged`` or ``failed``.
+    """
+
+    async def start(self, on_ack: AckHandler) -> None:
+        raise NotImplementedError
+
+    async def stop(self) -> None:
+        raise NotImplementedError
+
+    async def send(self, message: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    async def ping(self) -> None:
+        """Return once the rover has answered a ping. Transports that cannot
+        ping leave this unimplemented."""
+        raise NotImplementedError
+
+
+class FakeRover(CommandTransport):
+    """In-process rover that acknowledges commands after ``latency`` seconds.
+
+    Commands named in ``reject`` are answered ``failed`` and a ``drop_rate``
+    fraction get no answer at all, to exercise timeouts.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.005,
+        jitter: float = 0.0,
+        drop_rate: float = 0.0,
+        reject: Optional[List[str]] = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+        self.reject = set(reject or [])
+        self.received: Deque[Dict[str, Any]] = deque(maxlen=1000)
+        self._on_ack: Optional[AckHandler] = None
+        self._handles: Dict[int, asyncio.TimerHandle] = {}
+
+    async def start(self, on_ack: AckHandler) -> None:
+        self._on_ack = on_ack
+
+    async def stop(self) -> None:
+        for handle in self._handles.values():
+            handle.cancel()
+        self._handles.clear()
+        self._on_ack = None
+
+    async def send(self, message: Dict[str, Any]) -> None:
+        if self._on_ack is None:
+            raise ConnectionError("Fake rover is not running")
+        self.received.append(message)
+        if random.random() < self.drop_rate:
+            return
+        seq = message["seq"]
+        if message["command"] in self.reject:
+            status, detail = "failed", "rejected by rover"
+        else:
+            status, detail = "acknowledged", None
+        delay = self.latency + random.uniform(0, self.jitter)
+        self._handles[seq] = asyncio.get_running_loop().call_later(
+            delay, self._answer, seq, status, detail
+        )
+
+    async def ping(self) -> None:
+        if self._on_ack is None:
+            raise ConnectionError("Fake rover is not running")
+        await asyncio.sleep(self.latency + random.uniform(0, self.jitter))
+
+    def _answer(self, seq: int, status: str, detail: Optional[str]) -> None:
+        self._handles.pop(seq, None)
+        if self._on_ack is not None:
+            self._on_ack(seq, status, detail)
+
+
+@dataclass
+class CommandRecord:
+    seq: int
+    command: str
+    parameters: Dict[str, Any]
+    mission_id: Optional[int]
+    timestamp: datetime
+    # sent, acknowledged, failed
+    status: str = "sent"
+    detail: Optional[str] = None
+    acked_at: Optional[datetime] = None
+    latency_ms: Optional[float] = None
+    sent_at: float = 0.0
+    done: Optional[asyncio.Future] = field(default=None, repr=False)
+    timer: Optional[asyncio.TimerHandle] = field(default=None, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "seq": self.seq,
+            "command": self.command,
+            "parameters": self.parameters,
+            "mission_id": self.mission_id,
+            "timestamp": self.timestamp,
+            "status": self.status,
+            "detail": self.detail,
+            "acked_at": self.acked_at,
+            "latency_ms": self.latency_ms,
+        }
+
+
+class CommandDispatcher:
+    """Sends commands to the rover and tracks them until answered.
+
+    Every command gets a sequence number, is handed to the transport and
+    stays pending until the rover acknowledges or rejects it, or
+    ``timeout`` seconds pass (``failed``, detail ``timeout``). Logging goes
+    through ``CommandLogWriter`` so no database round trip sits on the
+    send path. Send-to-answer latency is kept per command as a histogram.
+    """
+
+    def __init__(
+        self,
+        transport: Optional[CommandTransport] = None,
+        writer: CommandLogWriter = command_log_writer,
+        hub: WebSocketHub = hub,
+        timeout: float = COMMAND_TIMEOUT,
+        history_size: int = 200,
+    ):
+        self.transport = transport or FakeRover()
+        self.writer = writer
+        self.hub = hub
+        self.timeout = timeout
+        self.history: Deque[CommandRecord] = deque(maxlen=history_size)
+        self.latency: Dict[str, Histogram] = {}
+        self.counts: Dict[str, int] = {"sent": 0, "acknowledged": 0, "failed": 0}
+        self.timeouts = 0
+        self._seq = itertools.count(1)
+        self._pending: Dict[int, CommandRecord] = {}
+        self._running = False
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def start(self) -> None:
+        if self._running:
+            return
+        await self.transport.start(self._on_ack)
+        self._running = True
+
+    async def stop(self) -> None:
+        """Stop the transport, failing commands still waiting for an answer."""
+        if not self._running:
+            return
+        self._running = False
+        await self.transport.stop()
+        for seq in list(self._pending):
+            self._finish(seq, "failed", "dispatcher stopped")
+
+    async def use_transport(self, transport: CommandTransport) -> None:
+        """Swap the transport, e.g. once a rover link is configured."""
+        running = self._running
+        await self.stop()
+        self.transport = transport
+        if running:
+            await self.start()
+
+    async def send(
+        self,
+        command: str,
+        parameters: Optional[Dict[str, Any]] = None,
+        mission_id: Optional[int] = None,
+    ) -> CommandRecord:
+        """Send a command, returning as soon as the transport has it.
+
+        Await ``wait(record)`` for the rover's answer.
+        """
+        if not self._running:
+            raise RuntimeError("Command dispatcher is not running")
+        loop = asyncio.get_running_loop()
+        record = CommandRecord(
+            seq=next(self._seq),
+            command=command,
+            parameters=parameters or {},
+            mission_id=mission_id,
+            timestamp=datetime.now(timezone.utc),
+            sent_at=loop.time(),
+            done=loop.create_future(),
+        )
+        self._pending[record.seq] = record
+        self.history.append(record)
+        self.counts["sent"] += 1
+        self.writer.log(
+            record.seq,
+            mission_id,
+            command,
+            record.parameters,
+            record.status,
+            record.timestamp,
+        )
+        record.timer = loop.call_later(
+            self.timeout, self._finish, record.seq, "failed", "timeout"
+        )
+        try:
+            await self.transport.send(
+                {"seq": record.seq, "command": command, "parameters": record.parameters}
+            )
+        except Exception as exc:
+            logger.warning("Sending command %s failed: %s", command, exc)
+            self._finish(record.seq, "failed", f"send failed: {exc}")
+        return record
+
+    async def ping(self) -> float:
+        """Round trip to the rover through the transport, in milliseconds."""
+        if not self._running:
+            raise RuntimeError("Command dispatcher is not running")
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await self.transport.ping()
+        return (loop.time() - started) * 1e3
+
+    async def wait(self, record: CommandRecord) -> CommandRecord:
+        """Wait until ``record`` is acknowledged, rejected or timed out."""
+        if record.done is not None:
+            await asyncio.shield(record.done)
+        return record
+
+    def recent(self, limit: int = 50) -> List[CommandRecord]:
+        """Most recent commands, newest first."""
+        return list(itertools.islice(reversed(self.history), limit))
+
+    def latency_summary(self) -> Dict[str, Any]:
+        return {name: h.summary() for name, h in sorted(self.latency.items())}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counts,
+            "pending": self.pending,
+            "timeouts": self.timeouts,
+        }
+
+    def _on_ack(self, seq: int, status: str, detail: Optional[str] = None) -> None:
+        if status not in ("acknowledged", "failed"):
+            logger.warning("Ignoring unknown status %r for command %d", status, seq)
+            return
+        if seq not in self._pending:
+            # Late answer after a timeout, or a duplicate
+            logger.debug("Answer for unknown command %d: %s", seq, status)
+            return
+        self._finish(seq, status, detail, answered=True)
+
+    def _finish(
+        self, seq: int, status: str, detail: Optional[str], answered: bool = False
+    ) -> None:
+        record = self._pending.pop(seq, None)
+        if record is None:
+            return
+        if record.timer is not None:
+            record.timer.cancel()
+        record.status = status
+        record.detail = detail
+        if detail == "timeout":
+            self.timeouts += 1
+        if answered:
+            loop = asyncio.get_running_loop()
+            record.acked_at = datetime.now(timezone.utc)
+            record.latency_ms = (loop.time() - record.sent_at) * 1e3
+            histogram = self.latency.get(record.command)
+            if histogram is None:
+                histogram = self.latency[record.command] = Histogram()
+            histogram.observe(record.latency_ms)
+        self.counts[status] += 1
+        self.writer.update_status(seq, status)
+        if record.done is not None and not record.done.done():
+            record.done.set_result(record)
+        self.hub.publish(COMMAND_STATUS_TOPIC, _jsonable(record.to_dict()))
+
+
+def _jsonable(data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        key: value.isoformat() if isinstance(value, datetime) else value
+        for key, value in data.items()
+    }
+
+
+command_dispatcher = CommandDispatcher()
@@ -1,9 +1,18 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
-from ..database import Mission, TelemetryLog, CommandLog
+from sqlalchemy import case, delete, func, insert, select, tuple_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from ..database import (
+    AlertLog,
+    Mission,
+    TelemetryLog,
+    TelemetryRollup,
+    CommandLog,
+    decode_payload,
+    encode_payload,
+)
+from .telemetry_rollup import RESOLUTIONS, compute_rollups
 from datetime import datetime, timezone
-from typing import List, Optional
-import json
+from typing import Any, Dict, List, Optional, Tuple
 
 
 class DatabaseService:
@@ -25,8 +34,12 @@ class DatabaseService:
         return result.scalar_one_or_none()
 
     async def get_active_mission(self) -> Optional[Mission]:
+        # Newest wins if an unclean shutdown left several missions active
         result = await self.session.execute(
-            select(Mission).where(Mission.status == "active")
+            select(Mission)
+            .where(Mission.status == "active")
+            .order_by(Mission.start_time.desc(), Mission.id.desc())
+            .limit(1)
         )
         return result.scalar_one_or_none()
 
@@ -49,28 +62,183 @@ class DatabaseService:
     async def log_telemetry(
         self, mission_id: int, topic: str, data: dict
     ) -> TelemetryLog:
-        log = TelemetryLog(mission_id=mission_id, topic=topic, data=json.dumps(data))
+        """Insert one telemetry row, updating its rollups like a batch."""
+        row = {
+            "mission_id": mission_id,
+            "topic": topic,
+            "data": data,
+            "timestamp": datetime.now(timezone.utc),
+        }
+        log = TelemetryLog(**{**row, "data": encode_payload(data)})
         self.session.add(log)
+        # Flushes the row first, in the same transaction
+        await self.upsert_rollups(compute_rollups([row]))
         await self.session.commit()
         await self.session.refresh(log)
         return log
 
+    async def log_telemetry_batch(
+        self, rows: List[Dict[str, Any]], rollups: bool = True
+    ) -> int:
+        """Insert many telemetry rows in a single transaction.
+
+        Each row is a dict with ``mission_id``, ``topic``, ``data`` (a dict)
+        and optionally ``timestamp``. Unless ``rollups`` is False the
+        rollup buckets of the batch's numeric fields are updated in the same
+        transaction. Returns the number of rows written.
+        """
+        if not rows:
+            return 0
+        now = datetime.now(timezone.utc)
+        rows = [{**row, "timestamp": row.get("timestamp") or now} for row in rows]
+        values = [{**row, "data": encode_payload(row["data"])} for row in rows]
+        await self.session.execute(insert(TelemetryLog), values)
+        if rollups:
+            await self.upsert_rollups(compute_rollups(rows))
+        await self.session.commit()
+        return len(values)
+
+    # Telemetry rollups
+    async def upsert_rollups(self, rollups: List[Dict[str, Any]]) -> None:
+        """Merge rollup rows into the stored buckets (no commit)."""
+        if not rollups:
+            return
+        stmt = sqlite_insert(TelemetryRollup)
+        excluded = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[
+                TelemetryRollup.mission_id,
+                TelemetryRollup.topic,
+                TelemetryRollup.field,
+                TelemetryRollup.resolution,
+                TelemetryRollup.bucket,
+            ],
+            set_={
+                "count": TelemetryRollup.count + excluded.count,
+                # Two-argument min()/max() are SQLite's scalar functions
+                "min": func.min(TelemetryRollup.min, excluded.min),
+                "max": func.max(TelemetryRollup.max, excluded.max),
+                "sum": TelemetryRollup.sum + excluded.sum,
+                "last": case(
+                    (excluded.last_time >= TelemetryRollup.last_time, excluded.last),
+                    else_=TelemetryRollup.last,
+                ),
+                "last_time": func.max(TelemetryRollup.last_time, excluded.last_time),
+            },
+        )
+        await self.session.execute(stmt, rollups)
+
+    async def get_rollups(
+        self,
+        mission_id: int,
+        topic: str,
+        field: str,
+        resolution: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> List[TelemetryRollup]:
+        """Oldest-first rollup buckets of one field in ``[start, end)``."""
+        query = select(TelemetryRollup).where(
+            TelemetryRollup.mission_id == mission_id,
+            TelemetryRollup.topic == topic,
+            TelemetryRollup.field == field,
+            TelemetryRollup.resolution == resolution,
+        )
+        if start is not None:
+            query = query.where(TelemetryRollup.bucket >= start)
+        if end is not None:
+            query = query.where(TelemetryRollup.bucket < end)
+        result = await self.session.execute(query.order_by(TelemetryRollup.bucket))
+        return list(result.scalars().all())
+
+    async def get_rollup_span(
+        self, mission_id: int, topic: str, field: str
+    ) -> Optional[Tuple[datetime, datetime]]:
+        """First and last finest-resolution bucket recorded for a field."""
+        result = await self.session.execute(
+            select(
+                func.min(TelemetryRollup.bucket), func.max(TelemetryRollup.bucket)
+            ).where(
+                TelemetryRollup.mission_id == mission_id,
+                TelemetryRollup.topic == topic,
+                TelemetryRollup.field == field,
+                TelemetryRollup.resolution == RESOLUTIONS[0],
+            )
+        )
+        first, last = result.one()
+        if first is None:
+            return None
+        return first, last
+
     async def get_telemetry_logs(
-        self, mission_id: int, topic: Optional[str] = None, limit: int = 100
+        self,
+        mission_id: int,
+        topic: Optional[str] = None,
+        limit: int = 100,
+        before: Optional[Tuple[datetime, int]] = None,
     ) -> List[TelemetryLog]:
+        """Newest-first telemetry, optionally starting after a keyset cursor.
+
+        ``before`` is the ``(timestamp, id)`` of the last row of the previous
+        page, so deep pages cost the same as the first one.
+        """
+        query = select(TelemetryLog).where(TelemetryLog.mission_id == mission_id)
+        if topic:
+            query = query.where(TelemetryLog.topic == topic)
+        if before is not None:
+            query = query.where(
+                tuple_(TelemetryLog.timestamp, TelemetryLog.id) < tuple_(*before)
+            )
+        query = query.order_by(
+            TelemetryLog.timestamp.desc(), TelemetryLog.id.desc()
+        ).limit(limit)
+        result = await self.session.execute(query)
+        return list(result.scalars().all())
+
+    async def get_telemetry_range(
+        self,
+        mission_id: int,
+        topic: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        after: Optional[Tuple[datetime, int]] = None,
+        limit: int = 1000,
+    ) -> List[TelemetryLog]:
+        """Oldest-first telemetry in ``[start, end)``, continuing after ``after``.
+
+        ``after`` is the ``(timestamp, id)`` of the last row already read, so
+        a whole mission can be read in fixed-size chunks.
+        """
         query = select(TelemetryLog).where(TelemetryLog.mission_id == mission_id)
         if topic:
             query = query.where(TelemetryLog.topic == topic)
-        query = query.order_by(TelemetryLog.timestamp.desc()).limit(limit)
+        if start is not None:
+            query = query.where(TelemetryLog.timestamp >= start)
+        if end is not None:
+            query = query.where(TelemetryLog.timestamp < end)
+        if after is not None:
+            query = query.where(
+                tuple_(TelemetryLog.timestamp, TelemetryLog.id) > tuple_(*after)
+            )
+        query = query.order_by(TelemetryLog.timestamp, TelemetryLog.id).limit(limit)
         result = await self.session.execute(query)
         return list(result.scalars().all())
 
+    async def delete_telemetry(self, mission_id: int) -> int:
+        result = await self.session.execute(
+            delete(TelemetryLog).where(TelemetryLog.mission_id == mission_id)
+        )
+        await self.session.commit()
+        return result.rowcount  # type: ignore[attr-defined]
+
     # Command logging
     async def log_command(
         self, mission_id: int, command: str, parameters: dict
     ) -> CommandLog:
         log = CommandLog(
-            mission_id=mission_id, command=command, parameters=json.dumps(parameters)
+            mission_id=mission_id,
+            command=command,
+            parameters=encode_payload(parameters),
         )
         self.session.add(log)
         await self.session.commit()
@@ -84,13 +252,168 @@ class DatabaseService:
         await self.session.commit()
         return result.rowcount > 0  # type: ignore[attr-defined]
 
+    async def log_command_batch(
+        self,
+        rows: List[Dict[str, Any]],
+        statuses: Optional[List[Tuple[int, str]]] = None,
+    ) -> List[int]:
+        """Insert command rows and apply ``(id, status)`` updates in one
+        transaction.
+
+        Each row is a dict with ``mission_id``, ``command``, ``parameters``
+        (a dict), ``status`` and ``timestamp``. Returns the new row ids in
+        the order of ``rows``.
+        """
+        ids: List[int] = []
+        if rows:
+            values = [
+                {**row, "parameters": encode_payload(row["parameters"])} for row in rows
+            ]
+            result = await self.session.execute(
+                insert(CommandLog).returning(
+                    CommandLog.id, sort_by_parameter_order=True
+                ),
+                values,
+            )
+            ids = list(result.scalars().all())
+        if statuses:
+            # ORM bulk update by primary key: one executemany
+            await self.session.execute(
+                update(CommandLog),
+                [{"id": row_id, "status": status} for row_id, status in statuses],
+            )
+        await self.session.commit()
+        return ids
+
     async def get_command_logs(
-        self, mission_id: int, limit: int = 50
+        self,
+        mission_id: int,
+        limit: int = 50,
+        before: Optional[Tuple[datetime, int]] = None,
+    ) -> List[CommandLog]:
+        query = select(CommandLog).where(CommandLog.mission_id == mission_id)
+        if before is not None:
+            query = query.where(
+                tuple_(CommandLog.timestamp, CommandLog.id) < tuple_(*before)
+            )
+        result = await self.session.execute(
+            query.order_by(CommandLog.timestamp.desc(), CommandLog.id.desc()).limit(
+                limit
+            )
+        )
+        return list(result.scalars().all())
+
+    async def get_command_range(
+        self,
+        mission_id: int,
+        start: Optional[datetime] = None,
+        after: Optional[Tuple[datetime, int]] = None,
+        limit: int = 1000,
     ) -> List[CommandLog]:
+        """Oldest-first commands from ``start``, continuing after ``after``."""
+        query = select(CommandLog).where(CommandLog.mission_id == mission_id)
+        if start is not None:
+            query = query.where(CommandLog.timestamp >= start)
+        if after is not None:
+            query = query.where(
+                tuple_(CommandLog.timestamp, CommandLog.id) > tuple_(*after)
+            )
         result = await self.session.execute(
-            select(CommandLog)
-            .where(CommandLog.mission_id == mission_id)
-            .order_by(CommandLog.timestamp.desc())
-            .limit(limit)
+            query.order_by(CommandLog.timestamp, CommandLog.id).limit(limit)
         )
         return list(result.scalars().all())
+
+    # Alert logging
+    async def log_alert_batch(self, rows: List[Dict[str, Any]]) -> int:
+        """Write alerts (``AlertLog`` column dicts) in one transaction.
+
+        An alert written while still active, as at shutdown, is updated in
+        place when it is written again once cleared or acknowledged.
+        """
+        if not rows:
+            return 0
+        stmt = sqlite_insert(AlertLog)
+        excluded = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[AlertLog.alert_id],
+            set_={
+                "cleared_at": func.coalesce(excluded.cleared_at, AlertLog.cleared_at),
+                "acknowledged_at": func.coalesce(
+                    excluded.acknowledged_at, AlertLog.acknowledged_at
+                ),
+            },
+        )
+        await self.session.execute(stmt, rows)
+        await self.session.commit()
+        return len(rows)
+
+    async def get_alert_logs(
+        self,
+        limit: int = 50,
+        before: Optional[Tuple[datetime, int]] = None,
+        mission_id: Optional[int] = None,
+        rule_id: Optional[str] = None,
+        topic: Optional[str] = None,
+        severity: Optional[str] = None,
+        since: Optional[datetime] = None,
+    ) -> List[AlertLog]:
+        """Logged alerts newest first, continuing before ``(raised_at, id)``."""
+        query = select(AlertLog)
+        if mission_id is not None:
+            query = query.where(AlertLog.mission_id == mission_id)
+        if rule_id is not None:
+            query = query.where(AlertLog.rule_id == rule_id)
+        if topic is not None:
+            query = query.where(AlertLog.topic == topic)
+        if severity is not None:
+            query = query.where(AlertLog.severity == severity)
+        if since is not None:
+            query = query.where(AlertLog.raised_at >= since)
+        if before is not None:
+            query = query.where(
+                tuple_(AlertLog.raised_at, AlertLog.id) < tuple_(*before)
+            )
+        result = await self.session.execute(
+            query.order_by(AlertLog.raised_at.desc(), AlertLog.id.desc()).limit(limit)
+        )
+        return list(result.scalars().all())
+
+    # Payload encoding migration
+    async def reencode_payloads(self, encoding: str, batch_size: int = 1000) -> int:
+        """Rewrite telemetry and command payloads stored in another encoding.
+
+        Works in id order, one transaction per batch, so it can run against a
+        live database and be resumed. Returns the number of rows rewritten.
+        """
+        # SQLite's typeof() tells the two encodings apart without decoding
+        stale_type = "text" if encoding == "msgpack" else "blob"
+        rewritten = 0
+        for model, column in (
+            (TelemetryLog, TelemetryLog.data),
+            (CommandLog, CommandLog.parameters),
+        ):
+            last_id = 0
+            while True:
+                result = await self.session.execute(
+                    select(model.id, column)
+                    .where(model.id > last_id, func.typeof(column) == stale_type)
+                    .order_by(model.id)
+                    .limit(batch_size)
+                )
+                rows = result.all()
+                if not rows:
+                    break
+                await self.session.execute(
+                    update(model),
+                    [
+                        {
+                            "id": row_id,
+                            column.key: encode_payload(decode_payload(raw), encoding),
+                        }
+                        for row_id, raw in rows
+                    ],
+                )
+                await self.session.commit()
+                rewritten += len(rows)
+                last_id = rows[-1][0]
+        return rewritten
@@ -0,0 +1,358 @@
+"""Share ingested telemetry between uvicorn workers.
+
+With ``WORKERS`` > 1 every worker is a separate process with its own cache
+and WebSocket hub, so a client only sees what its own worker ingested.
+``FanoutBus`` elects one worker as leader with an ``fcntl`` lock next to
+the ``FANOUT_SOCKET`` Unix socket. Only the leader runs the rover link
+and writes to the database. It forwards every ingested sample, and every
+message on ``FORWARDED_TOPICS``, over the socket to the other workers,
+which apply them to their own cache and subscribers. Messages on
+``FORWARDED_TOPICS`` published by a follower go to the leader, which
+relays them to the other followers.
+
+Alert rules are evaluated by the leader only. Followers mirror its rules
+and active alerts, and send acknowledgements and rule changes to the
+leader. Starting and stopping a mission goes the same way, so whichever
+worker handles the request, the leader records and archives it. If the
+leader exits, the kernel releases its lock and a follower takes over.
+
+Command dispatch and setpoint rate limits, command history, camera capture
+and playback sessions remain per worker.
+
+Without ``FANOUT_SOCKET`` the bus is disabled and the process leads.
+"""
+
+from .alerts import ALERT_TOPIC, Alert, AlertRule
+from .ingest import TelemetryIngest, ingest
+from .mission_archive import MissionArchive, mission_archive
+from .telemetry_writer import TelemetryWriter, telemetry_writer
+from .websocket_hub import WebSocketHub, hub, topic_patterns
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import struct
+
+logger = logging.getLogger(__name__)
+
+FANOUT_SOCKET = os.getenv("FANOUT_SOCKET", "")
+# Hub topics published outside ingest that clients of every worker need
+FORWARDED_TOPICS = ("alerts.*", "commands.*", "playback.*")
+# Bytes buffered for a follower before frames to it are dropped
+FANOUT_BUFFER = 4 * 2**20
+
+_HEADER = struct.Struct(">I")
+
+
+def encode_frame(kind: str, topic: str, data: Any, timestamp: Optional[datetime]):
+    body = json.dumps(
+        {
+            "kind": kind,
+            "topic": topic,
+            "data": data,
+            "timestamp": timestamp.timestamp() if timestamp else None,
+        }
+    ).encode()
+    return _HEADER.pack(len(body)) + body
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Dict[str, Any]:
+    (length,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    return json.loads(await reader.readexactly(length))
+
+
+class FanoutBus:
+    def __init__(
+        self,
+        path: str = FANOUT_SOCKET,
+        ingest: TelemetryIngest = ingest,
+        hub: WebSocketHub = hub,
+        writer: TelemetryWriter = telemetry_writer,
+        archive: MissionArchive = mission_archive,
+        forwarded_topics=FORWARDED_TOPICS,
+        retry: float = 1.0,
+    ):
+        self.path = path
+        self.ingest = ingest
+        self.hub = hub
+        self.writer = writer
+        self.archive = archive
+        self.forwarded_topics = set(forwarded_topics)
+        self.retry = retry
+        self.role = "stopped"
+        self.counts: Dict[str, int] = {
+            "sent": 0,
+            "received": 0,
+            "dropped": 0,
+            "errors": 0,
+        }
+        self._lock_fd: Optional[int] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._followers: Set[asyncio.StreamWriter] = set()
+        self._leader: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+        self._on_leader: Optional[Callable[[], Awaitable[None]]] = None
+        # Set while publishing a forwarded message, which is not sent back
+        self._relaying = False
+        self._origin: Optional[asyncio.StreamWriter] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    @property
+    def is_leader(self) -> bool:
+        return self.role == "leader"
+
+    @property
+    def connected(self) -> bool:
+        """Whether a follower is connected to its leader."""
+        return self._leader is not None
+
+    async def start(
+        self, on_leader: Optional[Callable[[], Awaitable[None]]] = None
+    ) -> None:
+        """Lead or follow; ``on_leader`` runs once this process leads,
+        now or after taking over from a leader that exited."""
+        self._on_leader = on_leader
+        if not self.enabled or self._try_lock():
+            await self._lead()
+        else:
+            self.role = "follower"
+            self.hub.taps.append(self._forward_hub)
+            self._task = asyncio.create_task(self._follow())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._followers):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+        if self.ingest.forward == self._forward_sample:
+            self.ingest.forward = None
+        if self._forward_hub in self.hub.taps:
+            self.hub.taps.remove(self._forward_hub)
+        if self._lock_fd is not None:
+            # Closing the descriptor releases the lock
+            os.close(self._lock_fd)
+            self._lock_fd = None
+        self.role = "stopped"
+
+    def set_mission(self, mission_id: Optional[int]) -> None:
+        """Make ``mission_id`` the active mission in every worker."""
+        self.ingest.mission_id = mission_id
+        frame = encode_frame("mission", "", {"mission_id": mission_id}, None)
+        if self.is_leader:
+            self._broadcast(frame)
+        elif self.role == "follower":
+            self._send_to_leader(frame)
+
+    def set_rules(self, rules: List[AlertRule], replace: bool = False) -> None:
+        """Add or update alert rules, or replace all of them, in the leader's
+        engine and every worker's mirror of it."""
+        alerts = self.ingest.alerts
+        if self.role == "follower":
+            alerts.mirror_rules(rules, replace)
+            data = {"rules": [rule.to_dict() for rule in rules], "replace": replace}
+            self._send_to_leader(encode_frame("rules", "", data, None))
+            return
+        alerts.set_rules(rules, replace)
+        if self.is_leader:
+            self._broadcast(encode_frame("alerts", "", alerts.snapshot(), None))
+
+    def acknowledge_alert(self, alert_id: str) -> Optional[Alert]:
+        alerts = self.ingest.alerts
+        if self.role != "follower":
+            return alerts.acknowledge(alert_id)
+        for alert in alerts.active.values():
+            if alert.id == alert_id:
+                data = {"alert_id": alert_id}
+                self._send_to_leader(encode_frame("ack", "", data, None))
+                # The leader's "acknowledged" message replaces this
+                alert.acknowledged_at = alert.acknowledged_at or datetime.now(
+                    timezone.utc
+                )
+                return alert
+        return None
+
+    async def archive_mission(self, mission_id: int) -> None:
+        """Archive an ended mission once the leader has written all of its
+        telemetry."""
+        if self.role == "follower":
+            frame = encode_frame("archive", "", {"mission_id": mission_id}, None)
+            self._send_to_leader(frame)
+            return
+        await self.writer.flush()
+        self.archive.schedule(mission_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "role": self.role,
+            "followers": len(self._followers),
+            "connected": self.connected,
+            **self.counts,
+        }
+
+    def _try_lock(self) -> bool:
+        fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        return True
+
+    async def _lead(self) -> None:
+        self.role = "leader"
+        if self.enabled:
+            # A leader that was killed leaves its socket behind
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            self._server = await asyncio.start_unix_server(self._serve, self.path)
+            self.ingest.forward = self._forward_sample
+            if self._forward_hub not in self.hub.taps:
+                self.hub.taps.append(self._forward_hub)
+            logger.info("Leading telemetry fan-out on %s", self.path)
+        if self._on_leader is not None:
+            await self._on_leader()
+
+    async def _serve(self, reader, writer: asyncio.StreamWriter) -> None:
+        self._followers.add(writer)
+        mission = {"mission_id": self.ingest.mission_id}
+        writer.write(encode_frame("mission", "", mission, None))
+        writer.write(encode_frame("alerts", "", self.ingest.alerts.snapshot(), None))
+        try:
+            while True:
+                await self._apply(await read_frame(reader), writer)
+        except (asyncio.IncompleteReadError, OSError):
+            pass
+        finally:
+            self._followers.discard(writer)
+            writer.close()
+
+    def _send_to_leader(self, frame: bytes) -> None:
+        if self._leader is None:
+            logger.warning("No fan-out leader to send to; change lost")
+            return
+        self._leader.write(frame)
+
+    def _broadcast(self, frame: bytes) -> None:
+        for writer in self._followers:
+            if writer is self._origin:
+                continue
+            if writer.transport.get_write_buffer_size() > FANOUT_BUFFER:
+                self.counts["dropped"] += 1
+                continue
+            writer.write(frame)
+            self.counts["sent"] += 1
+
+    def _forward_sample(self, topic: str, data: dict, timestamp: datetime) -> None:
+        if self._followers:
+            self._broadcast(encode_frame("sample", topic, data, timestamp))
+
+    def _forward_hub(
+        self, topic: str, data: Any, timestamp: Optional[datetime]
+    ) -> None:
+        if self._relaying or not self.forwarded_topics.intersection(
+            topic_patterns(topic)
+        ):
+            return
+        if self.is_leader:
+            if self._followers:
+                self._broadcast(encode_frame("hub", topic, data, timestamp))
+        elif self._leader is not None:
+            self._leader.write(encode_frame("hub", topic, data, timestamp))
+
+    async def _follow(self) -> None:
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.path)
+            except OSError:
+                pass
+            else:
+                logger.info("Following telemetry fan-out on %s", self.path)
+                self._leader = writer
+                try:
+                    while True:
+                        await self._apply(await read_frame(reader))
+                except (asyncio.IncompleteReadError, OSError):
+                    logger.warning("Lost the fan-out leader on %s", self.path)
+                finally:
+                    self._leader = None
+                    writer.close()
+            if self._try_lock():
+                self._task = None
+                await self._lead()
+                return
+            await asyncio.sleep(self.retry)
+
+    async def _apply(
+        self, frame: Dict[str, Any], origin: Optional[asyncio.StreamWriter] = None
+    ) -> None:
+        self.counts["received"] += 1
+        try:
+            await self._apply_frame(frame, origin)
+        except Exception:
+            # One bad frame must not end the connection to the leader
+            self.counts["errors"] += 1
+            logger.exception(
+                "Applying a fan-out %s frame on %s failed",
+                frame.get("kind"),
+                frame.get("topic"),
+            )
+
+    async def _apply_frame(
+        self, frame: Dict[str, Any], origin: Optional[asyncio.StreamWriter]
+    ) -> None:
+        kind, data = frame["kind"], frame["data"]
+        timestamp = frame["timestamp"]
+        timestamp = (
+            datetime.fromtimestamp(timestamp, timezone.utc) if timestamp else None
+        )
+        if kind == "sample":
+            await self.ingest.apply(
+                frame["topic"], data, timestamp or datetime.now(timezone.utc)
+            )
+        elif kind == "hub":
+            # The leader relays to every follower but the sender; a follower
+            # publishes only to its own clients
+            self._origin, self._relaying = origin, not self.is_leader
+            try:
+                self.hub.publish(frame["topic"], data, timestamp)
+            finally:
+                self._origin, self._relaying = None, False
+            if frame["topic"] == ALERT_TOPIC and not self.is_leader:
+                self.ingest.alerts.mirror(data)
+        elif kind == "mission":
+            if self.is_leader:
+                self.set_mission(data["mission_id"])
+            else:
+                self.ingest.mission_id = data["mission_id"]
+        elif kind == "archive" and self.is_leader:
+            await self.archive_mission(data["mission_id"])
+        elif kind == "alerts" and not self.is_leader:
+            rules = [AlertRule(**rule) for rule in data["rules"]]
+            self.ingest.alerts.mirror_state(rules, data["active"])
+        elif kind == "rules" and self.is_leader:
+            rules = [AlertRule(**rule) for rule in data["rules"]]
+            self.set_rules(rules, data["replace"])
+        elif kind == "ack" and self.is_leader:
+            self.ingest.alerts.acknowledge(data["alert_id"])
+
+
+fanout = FanoutBus()
@@ -0,0 +1,290 @@
+"""Shared-memory ring of fixed-size frames, one writer and many readers.
+
+For frames too large to pickle or JSON-encode on every hop, such as depth
+images and IMU bursts, between an ingest process and the API workers. The
+producer ``create``s a named ring and ``write``s numpy arrays of one
+shape and dtype into it; any process ``attach``es by name and reads frames
+as numpy views of the shared memory, without copying.
+
+Nothing is locked. Each slot has a sequence word used as a seqlock: the
+writer makes it odd before copying a frame in and even (``2 * seq + 2``)
+afterwards. A reader checks the word before and after it uses a slot; if
+it changed, the writer lapped the reader and the frame is reported as an
+overrun instead of being returned torn. The writer never waits for
+readers, so a slow reader loses old frames rather than slowing ingest.
+
+The sequence words are aligned 8-byte stores. This relies on the writer's
+stores becoming visible in order, which x86-64 guarantees.
+"""
+
+from dataclasses import dataclass
+from multiprocessing import resource_tracker, shared_memory
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+import sys
+import time
+
+MAGIC = 0x46524E47  # "FRNG"
+MAX_DIMS = 4
+HEADER_BYTES = 128
+SLOT_HEADER_BYTES = 32
+ALIGN = 64
+
+# Ring header, as uint64 words
+_MAGIC, _SLOTS, _SLOT_BYTES, _DTYPE, _NDIM = 0, 1, 2, 3, 4
+_SHAPE = 5  # MAX_DIMS words
+# On its own cache line; the only header word that changes
+_WRITE_SEQ = 8
+# Slot header, as uint64 words (timestamp and rows share the float64 view)
+_SEQ, _ROWS, _STAMP = 0, 1, 2
+
+
+class Overrun(Exception):
+    """The frame was overwritten by the writer before it could be read."""
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    # A reader's resource tracker would otherwise unlink the ring when the
+    # reader exits, under the writer and every other reader
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name)
+    finally:
+        resource_tracker.register = register
+
+
+def _aligned(size: int) -> int:
+    return (size + ALIGN - 1) // ALIGN * ALIGN
+
+
+@dataclass
+class Frame:
+    seq: int
+    # Producer's time.time() when the frame was written
+    timestamp: float
+    array: np.ndarray
+    ring: "FrameRing"
+
+    def valid(self) -> bool:
+        """Whether a zero-copy ``array`` still holds this frame; check after
+        using it, and discard the result if not."""
+        return self.ring._slot_seq(self.seq) == 2 * self.seq + 2
+
+
+class FrameRing:
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self.shm = shm
+        self.owner = owner
+        header = np.ndarray((HEADER_BYTES // 8,), np.uint64, shm.buf)
+        if int(header[_MAGIC]) != MAGIC:
+            raise ValueError(f"{shm.name} is not a frame ring")
+        self._header = header
+        self.slots = int(header[_SLOTS])
+        self.slot_bytes = int(header[_SLOT_BYTES])
+        code = int(header[_DTYPE]).to_bytes(8, "little").rstrip(b"\0")
+        self.dtype = np.dtype(code.decode())
+        ndim = int(header[_NDIM])
+        self.shape: Tuple[int, ...] = tuple(
+            int(d) for d in header[_SHAPE : _SHAPE + ndim]
+        )
+        self._meta: List[np.ndarray] = []
+        self._stamps: List[np.ndarray] = []
+        self._frames: List[np.ndarray] = []
+        for i in range(self.slots):
+            offset = HEADER_BYTES + i * self.slot_bytes
+            self._meta.append(
+                np.ndarray((SLOT_HEADER_BYTES // 8,), np.uint64, shm.buf, offset)
+            )
+            self._stamps.append(
+                np.ndarray((SLOT_HEADER_BYTES // 8,), np.float64, shm.buf, offset)
+            )
+            self._frames.append(
+                np.ndarray(self.shape, self.dtype, shm.buf, offset + SLOT_HEADER_BYTES)
+            )
+
+    @classmethod
+    def create(
+        cls,
+        name: Optional[str],
+        shape: Sequence[int],
+        dtype="uint8",
+        slots: int = 8,
+    ) -> "FrameRing":
+        """Create a ring for frames of ``shape`` and ``dtype``; the caller
+        is its writer and should ``unlink`` it when done."""
+        dtype = np.dtype(dtype)
+        if not 0 < len(shape) <= MAX_DIMS:
+            raise ValueError(f"frames must have 1 to {MAX_DIMS} dimensions")
+        if slots < 2:
+            raise ValueError("a ring needs at least 2 slots")
+        dtype_code = dtype.str.encode()
+        if len(dtype_code) > 8 or dtype.hasobject:
+            raise ValueError(f"unsupported dtype {dtype}")
+        frame_bytes = int(np.prod(shape)) * dtype.itemsize
+        slot_bytes = _aligned(SLOT_HEADER_BYTES + frame_bytes)
+        shm = shared_memory.SharedMemory(
+            name, create=True, size=HEADER_BYTES + slots * slot_bytes
+        )
+        header = np.ndarray((HEADER_BYTES // 8,), np.uint64, shm.buf)
+        header[:] = 0
+        header[_SLOTS] = slots
+        header[_SLOT_BYTES] = slot_bytes
+        header[_DTYPE] = int.from_bytes(dtype_code.ljust(8, b"\0"), "little")
+        header[_NDIM] = len(shape)
+        header[_SHAPE : _SHAPE + len(shape)] = shape
+        for i in range(slots):
+            offset = HEADER_BYTES + i * slot_bytes
+            np.ndarray((1,), np.uint64, shm.buf, offset)[0] = 0
+        header[_MAGIC] = MAGIC
+        del header
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "FrameRing":
+        return cls(_attach(name), owner=False)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def write_seq(self) -> int:
+        """Sequence number the next frame will get; frames written so far."""
+        return int(self._header[_WRITE_SEQ])
+
+    def write(
+        self,
+        frame: np.ndarray,
+        timestamp: Optional[float] = None,
+        rows: Optional[int] = None,
+    ) -> int:
+        """Copy ``frame`` into the next slot and return its sequence number.
+
+        ``rows`` marks only the first rows valid, for bursts shorter than
+        the slot; ``frame`` then needs only those rows.
+        """
+        if not self.owner:
+            raise RuntimeError("only the ring's creator writes to it")
+        seq = self.write_seq
+        slot = seq % self.slots
+        meta = self._meta[slot]
+        rows = self.shape[0] if rows is None else rows
+        meta[_SEQ] = 2 * seq + 1
+        self._frames[slot][:rows] = frame[:rows]
+        meta[_ROWS] = rows
+        self._stamps[slot][_STAMP] = time.time() if timestamp is None else timestamp
+        meta[_SEQ] = 2 * seq + 2
+        self._header[_WRITE_SEQ] = seq + 1
+        return seq
+
+    def _slot_seq(self, seq: int) -> int:
+        return int(self._meta[seq % self.slots][_SEQ])
+
+    def read(
+        self, seq: int, out: Optional[np.ndarray] = None, copy: bool = True
+    ) -> Frame:
+        """Frame ``seq``, copied into ``out`` (or a new array) unless
+        ``copy`` is false.
+
+        Raises ``Overrun`` if the writer has already replaced it, and
+        ``LookupError`` if it has not been written yet.
+        """
+        slot = seq % self.slots
+        meta = self._meta[slot]
+        expected = 2 * seq + 2
+        before = int(meta[_SEQ])
+        if before < expected:
+            raise LookupError(f"frame {seq} has not been written")
+        if before > expected:
+            raise Overrun(f"frame {seq} was overwritten")
+        rows = int(meta[_ROWS])
+        timestamp = float(self._stamps[slot][_STAMP])
+        view = self._frames[slot][:rows]
+        if copy:
+            if out is None:
+                array = view.copy()
+            else:
+                array = out[:rows]
+                array[...] = view
+        else:
+            array = view
+        if int(meta[_SEQ]) != expected:
+            raise Overrun(f"frame {seq} was overwritten while read")
+        return Frame(seq, timestamp, array, self)
+
+    def latest(self, copy: bool = False) -> Optional[Frame]:
+        """The newest complete frame, as a zero-copy view by default."""
+        while True:
+            seq = self.write_seq - 1
+            if seq < 0:
+                return None
+            try:
+                return self.read(seq, copy=copy)
+            except Overrun:
+                # Lapped between reading write_seq and the slot; retry
+                continue
+
+    def reader(self, from_start: bool = False) -> "FrameReader":
+        return FrameReader(self, 0 if from_start else self.write_seq)
+
+    def close(self) -> None:
+        """Unmap the ring; zero-copy frames must no longer be referenced."""
+        self._meta.clear()
+        self._stamps.clear()
+        self._frames.clear()
+        self._header = np.empty(0, np.uint64)
+        self.shm.close()
+
+    def unlink(self) -> None:
+        self.shm.unlink()
+
+
+class FrameReader:
+    """Reads every frame in order from ``next_seq``, counting the frames
+    it lost to overruns instead of stopping."""
+
+    def __init__(self, ring: FrameRing, next_seq: int = 0):
+        self.ring = ring
+        self.next_seq = next_seq
+        self.overruns = 0
+
+    def poll(
+        self, out: Optional[np.ndarray] = None, copy: bool = True
+    ) -> Optional[Frame]:
+        """The next frame, or ``None`` if the writer has not produced it."""
+        while True:
+            write_seq = self.ring.write_seq
+            if self.next_seq >= write_seq:
+                return None
+            oldest = write_seq - self.ring.slots
+            if self.next_seq < oldest:
+                self.overruns += oldest - self.next_seq
+                self.next_seq = oldest
+            try:
+                frame = self.ring.read(self.next_seq, out, copy)
+            except Overrun:
+                self.overruns += 1
+                self.next_seq += 1
+                continue
+            self.next_seq += 1
+            return frame
+
+    def wait(
+        self,
+        timeout: float,
+        out: Optional[np.ndarray] = None,
+        copy: bool = True,
+        interval: float = 0.0005,
+    ) -> Optional[Frame]:
+        """Poll until a frame arrives or ``timeout`` seconds pass; an
+        ``interval`` of 0 spins, for the lowest latency."""
+        deadline = time.monotonic() + timeout
+        while True:
+            frame = self.poll(out, copy)
+            if frame is not None or time.monotonic() >= deadline:
+                return frame
+            if interval:
+                time.sleep(interval)
@@ -0,0 +1,287 @@
+from ..database import async_session, engine
+from .commands import CommandDispatcher, command_dispatcher
+from .fanout import FanoutBus, fanout
+from .rover_link import RoverLink, rover_link
+from .websocket_hub import WebSocketHub, hub
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from sqlalchemy import text
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import logging
+import os
+import shutil
+import uuid
+
+logger = logging.getLogger(__name__)
+
+HEALTH_TOPIC = "health.checks"
+# Higher is worse; a group of checks takes the worst status
+STATUS_RANK = {"ok": 0, "unknown": 1, "warning": 2, "critical": 3}
+
+
+@dataclass
+class ProbeResult:
+    status: str
+    value: Optional[float] = None
+    unit: Optional[str] = None
+    detail: Optional[str] = None
+
+
+Probe = Callable[[], Awaitable[ProbeResult]]
+
+
+@dataclass
+class HealthCheck:
+    name: str
+    probe: Probe
+    interval: float
+    timeout: float
+    # system or network, for /system/status and /system/network
+    category: str = "system"
+    result: Optional[ProbeResult] = None
+    checked_at: Optional[datetime] = None
+    duration_ms: Optional[float] = None
+    runs: int = 0
+    failures: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = self.result or ProbeResult("unknown", detail="not checked yet")
+        return {
+            "name": self.name,
+            "category": self.category,
+            "status": result.status,
+            "value": result.value,
+            "unit": result.unit,
+            "detail": result.detail,
+            "checked_at": self.checked_at.isoformat() if self.checked_at else None,
+            "duration_ms": self.duration_ms,
+            "interval": self.interval,
+        }
+
+
+def worst_status(statuses: List[str]) -> str:
+    return max(statuses, key=STATUS_RANK.__getitem__, default="unknown")
+
+
+class HealthScheduler:
+    """Runs health probes in the background and serves cached results.
+
+    Each registered probe runs in its own task every ``interval`` seconds,
+    bounded by ``timeout``, so slow probes neither block nor delay each
+    other. Every result bumps ``version`` and rebuilds the snapshot, which
+    is published on ``health.checks``. Endpoints only read the snapshot, so
+    polling clients never trigger a probe.
+    """
+
+    def __init__(self, hub: WebSocketHub = hub):
+        self.hub = hub
+        self.checks: Dict[str, HealthCheck] = {}
+        self.version = 0
+        self._boot_id = uuid.uuid4().hex[:8]
+        self._snapshot: Dict[str, Any] = self._build_snapshot()
+        self._tasks: List[asyncio.Task] = []
+        hub.register_snapshot(HEALTH_TOPIC, self.snapshot)
+
+    def register(
+        self,
+        name: str,
+        probe: Probe,
+        interval: float = 5.0,
+        timeout: float = 2.0,
+        category: str = "system",
+    ) -> None:
+        if self._tasks:
+            raise RuntimeError("Register probes before starting the scheduler")
+        self.checks[name] = HealthCheck(name, probe, interval, timeout, category)
+        self._snapshot = self._build_snapshot()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._run(check)) for check in self.checks.values()
+        ]
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def run_check(self, check: HealthCheck) -> None:
+        """Run one probe and record its result."""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            result = await asyncio.wait_for(check.probe(), check.timeout)
+        except asyncio.TimeoutError:
+            result = ProbeResult(
+                "critical", detail=f"timed out after {check.timeout:g}s"
+            )
+        except Exception as exc:
+            logger.warning("Health probe %s failed: %s", check.name, exc)
+            result = ProbeResult("critical", detail=f"probe failed: {exc}")
+        check.duration_ms = (loop.time() - started) * 1e3
+        check.checked_at = datetime.now(timezone.utc)
+        check.runs += 1
+        if result.status == "critical":
+            check.failures += 1
+        check.result = result
+        self.version += 1
+        self._snapshot = self._build_snapshot()
+        self.hub.publish(HEALTH_TOPIC, self._snapshot)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return self._snapshot
+
+    def etag(self) -> str:
+        return f'W/"{self._boot_id}-{self.version}"'
+
+    def _build_snapshot(self) -> Dict[str, Any]:
+        checks = [check.to_dict() for check in self.checks.values()]
+        return {
+            "version": self.version,
+            "status": worst_status([check["status"] for check in checks]),
+            "checks": checks,
+        }
+
+    async def _run(self, check: HealthCheck) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await self.run_check(check)
+            await asyncio.sleep(max(0.0, started + check.interval - loop.time()))
+
+
+# Default probes
+
+
+def database_probe(session_factory=async_session, warning_ms: float = 100.0) -> Probe:
+    async def probe() -> ProbeResult:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        async with session_factory() as session:
+            await session.execute(text("SELECT 1"))
+        latency = (loop.time() - started) * 1e3
+        return ProbeResult(
+            "warning" if latency > warning_ms else "ok", round(latency, 3), "ms"
+        )
+
+    return probe
+
+
+def websocket_probe(hub: WebSocketHub = hub) -> Probe:
+    last_dropped = 0
+
+    async def probe() -> ProbeResult:
+        nonlocal last_dropped
+        stats = hub.stats()
+        dropped = stats["dropped"] - last_dropped
+        last_dropped = stats["dropped"]
+        return ProbeResult(
+            # Some client could not keep up since the last check
+            "warning" if dropped > 0 else "ok",
+            stats["clients"],
+            "clients",
+            f"{dropped} messages dropped, queue depth {stats['queue_depth']}",
+        )
+
+    return probe
+
+
+def rover_link_probe(
+    dispatcher: CommandDispatcher = command_dispatcher, warning_ms: float = 200.0
+) -> Probe:
+    async def probe() -> ProbeResult:
+        try:
+            rtt = await dispatcher.ping()
+        except NotImplementedError:
+            return ProbeResult("unknown", detail="transport cannot ping")
+        except RuntimeError as exc:
+            return ProbeResult("critical", detail=str(exc))
+        return ProbeResult("warning" if rtt > warning_ms else "ok", round(rtt, 3), "ms")
+
+    return probe
+
+
+def telemetry_link_probe(
+    link: RoverLink = rover_link, bus: FanoutBus = fanout
+) -> Probe:
+    last: Dict[str, float] = {}
+
+    async def probe() -> ProbeResult:
+        now = asyncio.get_running_loop().time()
+        if bus.role == "follower":
+            # Telemetry arrives from the worker that runs the rover link
+            received = bus.counts["received"]
+            elapsed = now - last.get("time", now)
+            rate = (received - last.get("received", 0)) / elapsed if elapsed else None
+            last.update(time=now, received=received)
+            if not bus.connected:
+                return ProbeResult("critical", detail="not connected to the leader")
+            value = round(rate, 1) if rate is not None else None
+            return ProbeResult("ok", value, "messages/s", "following the leader")
+        received, dropped = link.counts["received"], link.counts["dropped"]
+        elapsed = now - last.get("time", now)
+        rate = (received - last.get("received", 0)) / elapsed if elapsed else None
+        new_drops = dropped - last.get("dropped", 0)
+        last.update(time=now, received=received, dropped=dropped)
+        if not link.sources:
+            return ProbeResult("unknown", detail="no rover link configured")
+        connected = sum(1 for source in link.sources if source.connected)
+        detail = f"{connected}/{len(link.sources)} sources connected"
+        if connected == 0:
+            return ProbeResult("critical", detail=detail)
+        if new_drops:
+            detail += f", {new_drops} messages dropped"
+        value = round(rate, 1) if rate is not None else None
+        status = "warning" if new_drops or connected < len(link.sources) else "ok"
+        return ProbeResult(status, value, "messages/s", detail)
+
+    return probe
+
+
+def disk_probe(
+    path: str, warning_percent: float = 10.0, critical_percent: float = 5.0
+) -> Probe:
+    async def probe() -> ProbeResult:
+        usage = await asyncio.to_thread(shutil.disk_usage, path)
+        free = usage.free / usage.total * 100
+        status = "ok"
+        if free < critical_percent:
+            status = "critical"
+        elif free < warning_percent:
+            status = "warning"
+        return ProbeResult(
+            status, round(free, 2), "% free", f"{usage.free / 2**30:.1f} GiB free"
+        )
+
+    return probe
+
+
+def register_default_probes(scheduler: "HealthScheduler") -> None:
+    data_dir = os.path.dirname(os.path.abspath(engine.url.database or "."))
+    scheduler.register("database", database_probe(), interval=5.0, timeout=2.0)
+    scheduler.register("disk", disk_probe(data_dir), interval=30.0, timeout=2.0)
+    scheduler.register(
+        "websocket", websocket_probe(), interval=2.0, timeout=1.0, category="network"
+    )
+    scheduler.register(
+        "rover_link", rover_link_probe(), interval=2.0, timeout=1.0, category="network"
+    )
+    scheduler.register(
+        "telemetry_link",
+        telemetry_link_probe(),
+        interval=2.0,
+        timeout=1.0,
+        category="network",
+    )
+
+
+health_scheduler = HealthScheduler()
+register_default_probes(health_scheduler)
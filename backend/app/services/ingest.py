@@ -0,0 +1,70 @@
+from .alerts import AlertEngine, alert_engine
+from .pose import PoseService, pose_service
+from .slam_map import TiledMapStore, map_store
+from .telemetry_cache import TelemetryCache, telemetry_cache
+from .telemetry_writer import TelemetryWriter, telemetry_writer
+from .websocket_hub import WebSocketHub, hub
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+
+class TelemetryIngest:
+    """Single entry point for telemetry samples arriving from the rover.
+
+    Each sample updates the latest-value cache, is pushed to WebSocket
+    subscribers and, while a mission is active, is queued for the database.
+    Occupancy grids on the map topic go to the tiled map store instead,
+    which publishes only the tiles that changed. Poses are also recorded in
+    the pose service's ring buffer, and every sample is run through the
+    alert rules for its topic.
+
+    When several workers serve the API, only the fan-out leader ingests;
+    ``forward`` sends each sample to the other workers, which ``apply`` it
+    to their own cache and subscribers.
+    """
+
+    def __init__(
+        self,
+        cache: TelemetryCache = telemetry_cache,
+        hub: WebSocketHub = hub,
+        writer: TelemetryWriter = telemetry_writer,
+        map_store: TiledMapStore = map_store,
+        pose: PoseService = pose_service,
+        alerts: AlertEngine = alert_engine,
+    ):
+        self.cache = cache
+        self.hub = hub
+        self.writer = writer
+        self.map_store = map_store
+        self.pose = pose
+        self.alerts = alerts
+        self.mission_id: Optional[int] = None
+        self.samples = 0
+        self.forward: Optional[Callable[[str, dict, datetime], None]] = None
+
+    async def apply(self, topic: str, data: dict, timestamp: datetime) -> None:
+        """Update the in-memory state and WebSocket subscribers only."""
+        if topic == self.map_store.topic:
+            await self.map_store.apply_message(data)
+            return
+        if topic == self.pose.topic:
+            self.pose.apply_message(data, timestamp)
+        self.cache.update(topic, data, timestamp)
+        self.hub.publish(topic, data, timestamp)
+
+    async def publish(
+        self, topic: str, data: dict, timestamp: Optional[datetime] = None
+    ) -> None:
+        timestamp = timestamp or datetime.now(timezone.utc)
+        self.samples += 1
+        if self.forward is not None:
+            self.forward(topic, data, timestamp)
+        await self.apply(topic, data, timestamp)
+        if topic == self.map_store.topic:
+            return
+        self.alerts.evaluate(topic, data, timestamp, self.mission_id)
+        if self.mission_id is not None and self.writer.running:
+            await self.writer.submit(self.mission_id, topic, data, timestamp)
+
+
+ingest = TelemetryIngest()
@@ -0,0 +1,273 @@
+"""Request, database and queue metrics for the ``/metrics`` endpoint.
+
+Latencies are observed into the histograms of ``metrics.registry`` as they
+happen: HTTP requests by route template, SQL statements and commits from
+SQLAlchemy events, and each ``DatabaseService`` method. Queue depths and
+counters that the services already keep are read only when scraped.
+"""
+
+from .alerts import alert_engine
+from .commands import command_dispatcher
+from .database_service import DatabaseService
+from .fanout import fanout
+from .metrics import HistogramFamily, MetricsRegistry, registry
+from .rover_link import rover_link
+from .telemetry_writer import telemetry_writer
+from .websocket_hub import hub
+from ..database import engine
+from functools import wraps
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+from typing import Any, Awaitable, Callable, List, Tuple
+from time import perf_counter
+import inspect
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+SQL_STATEMENTS = ("SELECT", "INSERT", "UPDATE", "DELETE", "BEGIN", "COMMIT")
+
+http_requests = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("method", "route", "status"),
+)
+db_queries = registry.histogram(
+    "db_query_duration_seconds", "SQL statement execution time", ("statement",)
+)
+db_commits = registry.histogram(
+    "db_commit_duration_seconds", "Session commit time including the flush"
+)
+db_operations = registry.histogram(
+    "db_operation_duration_seconds",
+    "DatabaseService method time",
+    ("operation",),
+)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware timing each HTTP request.
+
+    The route label is the matched path template (``/api/v1/data/{id}``),
+    never the raw path, so the number of series stays bounded; requests
+    that match no route share ``unmatched``. WebSockets pass straight
+    through and are covered by the hub gauges instead.
+    """
+
+    def __init__(self, app, histograms: HistogramFamily = http_requests):
+        self.app = app
+        self.histograms = histograms
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+        started = perf_counter()
+
+        async def send_wrapper(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            self.histograms.labels(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status),
+            ).observe((perf_counter() - started) * 1e3)
+
+
+def _statement(sql: str) -> str:
+    words = sql.lstrip().split(None, 1)
+    keyword = words[0].upper() if words else ""
+    return keyword if keyword in SQL_STATEMENTS else "OTHER"
+
+
+def instrument_engine(
+    async_engine: AsyncEngine, histograms: HistogramFamily = db_queries
+) -> None:
+    """Time every statement the engine executes, by statement keyword."""
+
+    # The start time lives on the statement's execution context, which is
+    # discarded with it if the statement fails
+    def before(conn, cursor, statement, parameters, context, executemany):
+        context._query_started = perf_counter()
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_query_started", None)
+        if started is not None:
+            histograms.labels(_statement(statement)).observe(
+                (perf_counter() - started) * 1e3
+            )
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before)
+    event.listen(async_engine.sync_engine, "after_cursor_execute", after)
+
+
+def instrument_commits(histograms: HistogramFamily = db_commits) -> None:
+    """Time every ORM session commit, flush included."""
+
+    def before(session: Session) -> None:
+        session.info["commit_started"] = perf_counter()
+
+    def after(session: Session) -> None:
+        started = session.info.pop("commit_started", None)
+        if started is not None:
+            histograms.labels().observe((perf_counter() - started) * 1e3)
+
+    event.listen(Session, "before_commit", before)
+    event.listen(Session, "after_commit", after)
+
+
+def _timed(
+    method: Callable[..., Awaitable[Any]], histograms: HistogramFamily
+) -> Callable[..., Awaitable[Any]]:
+    histogram = histograms.labels(method.__name__)
+
+    @wraps(method)
+    async def wrapper(*args, **kwargs):
+        started = perf_counter()
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            histogram.observe((perf_counter() - started) * 1e3)
+
+    return wrapper
+
+
+def instrument_methods(cls: type, histograms: HistogramFamily = db_operations) -> None:
+    """Wrap the public coroutine methods of ``cls`` to time each call."""
+    for name, method in list(vars(cls).items()):
+        if name.startswith("_") or not inspect.iscoroutinefunction(method):
+            continue
+        if getattr(method, "__wrapped__", None) is not None:
+            continue
+        setattr(cls, name, _timed(method, histograms))
+
+
+def _service_metrics() -> List[Tuple[str, str, str, float]]:
+    ws = hub.stats()
+    writer = telemetry_writer.stats()
+    link = rover_link.stats()
+    commands = command_dispatcher.stats()
+    bus = fanout.stats()
+    return [
+        ("websocket_clients", "gauge", "Connected WebSocket clients", ws["clients"]),
+        (
+            "websocket_queue_depth",
+            "gauge",
+            "Messages waiting in all client send queues",
+            ws["queue_depth"],
+        ),
+        (
+            "websocket_queue_depth_max",
+            "gauge",
+            "Deepest single client send queue",
+            ws["max_queue_depth"],
+        ),
+        (
+            "websocket_messages_published_total",
+            "counter",
+            "Messages published to the hub",
+            ws["published"],
+        ),
+        (
+            "websocket_messages_dropped_total",
+            "counter",
+            "Messages dropped from full client queues",
+            ws["dropped"],
+        ),
+        (
+            "websocket_messages_decimated_total",
+            "counter",
+            "Messages skipped by client rate limits",
+            ws["decimated"],
+        ),
+        (
+            "websocket_bytes_sent_total",
+            "counter",
+            "Message bytes sent to connected clients, before compression",
+            ws["bytes_sent"],
+        ),
+        (
+            "telemetry_writer_pending",
+            "gauge",
+            "Telemetry rows waiting to be written",
+            writer["pending"],
+        ),
+        (
+            "telemetry_writer_rows_written_total",
+            "counter",
+            "Telemetry rows written",
+            writer["rows_written"],
+        ),
+        (
+            "telemetry_writer_rows_dropped_total",
+            "counter",
+            "Telemetry rows dropped because their batch failed to write",
+            writer["rows_dropped"],
+        ),
+        (
+            "rover_link_queue_depth",
+            "gauge",
+            "Messages waiting between the rover link and ingest",
+            link["queue_depth"],
+        ),
+        (
+            "rover_link_messages_received_total",
+            "counter",
+            "Messages received from the rover",
+            link["received"],
+        ),
+        (
+            "rover_link_messages_dropped_total",
+            "counter",
+            "Rover messages dropped by a full queue",
+            link["dropped"],
+        ),
+        (
+            "rover_link_parse_errors_total",
+            "counter",
+            "Rover messages that failed to parse",
+            link["parse_errors"],
+        ),
+        (
+            "commands_pending",
+            "gauge",
+            "Commands waiting for an acknowledgement",
+            commands["pending"],
+        ),
+        (
+            "fanout_followers",
+            "gauge",
+            "Workers following this one's telemetry",
+            bus["followers"],
+        ),
+        (
+            "fanout_frames_dropped_total",
+            "counter",
+            "Fan-out frames dropped for slow followers",
+            bus["dropped"],
+        ),
+        (
+            "alerts_active",
+            "gauge",
+            "Alerts currently active",
+            len(alert_engine.active),
+        ),
+    ]
+
+
+def install(target: MetricsRegistry = registry) -> None:
+    """Hook the database and service metrics into ``target``; idempotent."""
+    if _service_metrics in target.collectors:
+        return
+    instrument_engine(engine)
+    instrument_commits()
+    instrument_methods(DatabaseService)
+    target.collector(_service_metrics)
@@ -0,0 +1,183 @@
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Upper bounds in milliseconds, roughly doubling from 1 ms to 10 s
+LATENCY_BUCKETS_MS = (
+    1,
+    2.5,
+    5,
+    10,
+    25,
+    50,
+    100,
+    250,
+    500,
+    1000,
+    2500,
+    5000,
+    10000,
+)
+
+
+class Histogram:
+    """Fixed-bucket histogram, cheap enough to observe on every command.
+
+    ``counts[i]`` holds observations ``<= buckets[i]`` and above the previous
+    bound; the last slot counts everything above the largest bound.
+    Percentiles are estimated by interpolating within the bucket.
+    """
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = self.count * pct / 100
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.max
+
+    def cumulative(self) -> List[int]:
+        """Observations ``<=`` each bound, Prometheus style."""
+        totals = []
+        running = 0
+        for count in self.counts[:-1]:
+            running += count
+            totals.append(running)
+        return totals
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean": self.sum / self.count if self.count else None,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max if self.count else None,
+            "buckets": dict(zip(self.buckets, self.cumulative())),
+        }
+
+
+# Request latencies are mostly well under a millisecond
+REQUEST_BUCKETS_MS = (0.1, 0.25, 0.5) + LATENCY_BUCKETS_MS
+
+# Collectors return (name, type, help, value) for gauges and counters read
+# from service stats at scrape time
+CollectedMetric = Tuple[str, str, str, float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class HistogramFamily:
+    """A labelled set of ``Histogram``s observed in milliseconds and
+    exported in seconds, as Prometheus expects."""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = REQUEST_BUCKETS_MS,
+    ):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self.children: Dict[Tuple[str, ...], Histogram] = {}
+
+    def labels(self, *values: str) -> Histogram:
+        histogram = self.children.get(values)
+        if histogram is None:
+            histogram = self.children[values] = Histogram(self.buckets)
+        return histogram
+
+    def render(self, lines: List[str]) -> None:
+        lines.append(f"# HELP {self.name} {self.help}")
+        lines.append(f"# TYPE {self.name} histogram")
+        for values, histogram in sorted(self.children.items()):
+            bounds = [bound / 1e3 for bound in self.buckets] + [float("inf")]
+            counts = histogram.cumulative() + [histogram.count]
+            for bound, count in zip(bounds, counts):
+                labels = _labels(self.label_names, values, f'le="{_number(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _labels(self.label_names, values)
+            lines.append(f"{self.name}_sum{labels} {_number(histogram.sum / 1e3)}")
+            lines.append(f"{self.name}_count{labels} {histogram.count}")
+
+
+class MetricsRegistry:
+    """Metrics exported at ``/metrics`` in the Prometheus text format.
+
+    Latencies are recorded into histograms on the hot path; counts and
+    gauges the services already keep are read by collectors only when
+    the endpoint is scraped.
+    """
+
+    def __init__(self):
+        self.histograms: Dict[str, HistogramFamily] = {}
+        self.collectors: List[Callable[[], List[CollectedMetric]]] = []
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = REQUEST_BUCKETS_MS,
+    ) -> HistogramFamily:
+        family = self.histograms.get(name)
+        if family is None:
+            family = self.histograms[name] = HistogramFamily(
+                name, help, label_names, buckets
+            )
+        return family
+
+    def collector(
+        self, collect: Callable[[], List[CollectedMetric]]
+    ) -> Callable[[], List[CollectedMetric]]:
+        self.collectors.append(collect)
+        return collect
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for family in self.histograms.values():
+            family.render(lines)
+        for collect in self.collectors:
+            for name, kind, help, value in collect():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"{name} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,429 @@
+from ..database import (
+    TelemetryLog,
+    as_utc_naive,
+    async_session,
+    flatten_payload,
+    unflatten_payload,
+)
+from .database_service import DatabaseService
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Set, Tuple, Union
+import asyncio
+import heapq
+import json
+import logging
+import os
+import re
+import shutil
+import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "./archive")
+MANIFEST_FILE = "manifest.json"
+DATA_PREFIX = "data."
+
+ARROW_TYPES = {
+    "bool": pa.bool_(),
+    "int": pa.int64(),
+    "float": pa.float64(),
+    "str": pa.string(),
+    # Lists and values whose type changes between samples, JSON-encoded
+    "json": pa.string(),
+}
+
+
+class ArchivedTelemetry:
+    """A telemetry row read back from an archive, shaped like TelemetryLog."""
+
+    __slots__ = ("id", "timestamp", "topic", "payload")
+
+    def __init__(self, id: int, timestamp: datetime, topic: str, payload: Any):
+        self.id = id
+        self.timestamp = timestamp
+        self.topic = topic
+        self.payload = payload
+
+
+TelemetryRow = Union[TelemetryLog, ArchivedTelemetry]
+
+
+def _kind(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    if isinstance(value, str):
+        return "str"
+    return "json"
+
+
+def _resolve_kind(kinds: Set[str]) -> str:
+    if len(kinds) == 1:
+        return next(iter(kinds))
+    if kinds == {"int", "float"}:
+        return "float"
+    return "json" if kinds else "str"
+
+
+def _timestamp_scalar(value: datetime) -> pa.Scalar:
+    return pa.scalar(as_utc_naive(value), pa.timestamp("us"))
+
+
+def _bisect(
+    column: pa.ChunkedArray, target: Any, low: int = 0, high: Optional[int] = None
+) -> int:
+    """Index of the first value >= ``target`` in a sorted column."""
+    high = len(column) if high is None else high
+    while low < high:
+        middle = (low + high) // 2
+        if column[middle].as_py() < target:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def _bisect_time(column: pa.ChunkedArray, value: datetime) -> int:
+    """Index of the first timestamp >= ``value`` in a sorted column."""
+    return _bisect(column, _timestamp_scalar(value).as_py())
+
+
+def _bisect_key(table: pa.Table, key: Tuple[datetime, int]) -> int:
+    """Index of the first row at or after ``(timestamp, id)`` in a table
+    sorted by both."""
+    timestamps = table.column("timestamp")
+    target = _timestamp_scalar(key[0]).as_py()
+    low = _bisect(timestamps, target)
+    # Rows sharing the timestamp are ordered by id
+    high = low
+    while high < len(timestamps) and timestamps[high].as_py() == target:
+        high += 1
+    return _bisect(table.column("id"), key[1], low, high)
+
+
+def _infer_kinds(kinds: Dict[str, Dict[str, Set[str]]], rows: List[TelemetryLog]):
+    for row in rows:
+        fields = kinds.setdefault(row.topic, {})
+        for name, value in flatten_payload(row.payload).items():
+            field_kinds = fields.setdefault(name, set())
+            kind = _kind(value)
+            if kind is not None:
+                field_kinds.add(kind)
+
+
+class MissionArchive:
+    """Columnar archive of completed missions' telemetry.
+
+    Each archived mission is a directory with one Arrow IPC file per topic,
+    with typed columns extracted from the JSON payloads, and a manifest.
+    Files are memory-mapped on read, so queries touch only the pages they
+    need. Once a mission is archived its rows are removed from SQLite.
+    Arrow work runs in worker threads, off the event loop; the methods
+    that read archives are synchronous and are called through
+    ``asyncio.to_thread``.
+    """
+
+    def __init__(self, directory: str = ARCHIVE_DIR, session_factory=async_session):
+        self.directory = directory
+        self.session_factory = session_factory
+        self._manifests: Dict[int, Dict[str, Any]] = {}
+        self._tables: Dict[Tuple[int, str], pa.Table] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def mission_path(self, mission_id: int) -> str:
+        return os.path.join(self.directory, f"mission_{mission_id}")
+
+    def manifest(self, mission_id: int) -> Optional[Dict[str, Any]]:
+        if mission_id in self._manifests:
+            return self._manifests[mission_id]
+        path = os.path.join(self.mission_path(mission_id), MANIFEST_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            manifest = json.load(f)
+        self._manifests[mission_id] = manifest
+        return manifest
+
+    def is_archived(self, mission_id: int) -> bool:
+        return self.manifest(mission_id) is not None
+
+    def topics(self, mission_id: int, topic: Optional[str] = None) -> List[str]:
+        manifest = self.manifest(mission_id)
+        if manifest is None:
+            return []
+        if topic is not None:
+            return [topic] if topic in manifest["topics"] else []
+        return sorted(manifest["topics"])
+
+    # Writing
+    def schedule(self, mission_id: int) -> asyncio.Task:
+        """Archive a mission in the background."""
+        task = asyncio.create_task(self._archive_logged(mission_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def wait(self) -> None:
+        """Wait for scheduled archive jobs to finish."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _archive_logged(self, mission_id: int) -> None:
+        try:
+            manifest = await self.archive(mission_id)
+            logger.info("Archived mission %d (%d rows)", mission_id, manifest["rows"])
+        except Exception:
+            logger.exception("Failed to archive mission %d", mission_id)
+
+    async def _iter_db(
+        self, mission_id: int, chunk_size: int = 5000
+    ) -> AsyncIterator[List[TelemetryLog]]:
+        after = None
+        while True:
+            async with self.session_factory() as session:
+                rows = await DatabaseService(session).get_telemetry_range(
+                    mission_id, after=after, limit=chunk_size
+                )
+            if rows:
+                yield rows
+            if len(rows) < chunk_size:
+                return
+            after = (rows[-1].timestamp, rows[-1].id)
+
+    async def archive(
+        self, mission_id: int, delete_rows: bool = True
+    ) -> Dict[str, Any]:
+        """Write a mission's telemetry to Arrow files and drop it from SQLite.
+
+        Reads the mission twice in chunks: once to infer each topic's column
+        types, once to write record batches, so memory stays bounded.
+        """
+        kinds: Dict[str, Dict[str, Set[str]]] = {}
+        async for rows in self._iter_db(mission_id):
+            await asyncio.to_thread(_infer_kinds, kinds, rows)
+
+        schemas = {
+            topic: pa.schema(
+                [
+                    pa.field("id", pa.int64()),
+                    pa.field("timestamp", pa.timestamp("us")),
+                ]
+                + [
+                    pa.field(
+                        DATA_PREFIX + name,
+                        ARROW_TYPES[_resolve_kind(field_kinds)],
+                        metadata={"kind": _resolve_kind(field_kinds)},
+                    )
+                    for name, field_kinds in sorted(fields.items())
+                ]
+            )
+            for topic, fields in kinds.items()
+        }
+
+        final_path = self.mission_path(mission_id)
+        tmp_path = final_path + ".tmp"
+        files = {topic: self._file_name(topic, i) for i, topic in enumerate(schemas)}
+        writers = await asyncio.to_thread(self._open_writers, tmp_path, files, schemas)
+        counts = {topic: 0 for topic in schemas}
+        try:
+            async for rows in self._iter_db(mission_id):
+                await asyncio.to_thread(
+                    self._write_rows, writers, schemas, counts, rows
+                )
+        finally:
+            await asyncio.to_thread(self._close_writers, writers)
+
+        manifest = {
+            "mission_id": mission_id,
+            "archived_at": datetime.now(timezone.utc).isoformat(),
+            "rows": sum(counts.values()),
+            "topics": {
+                topic: {
+                    "file": files[topic],
+                    "rows": counts[topic],
+                    "columns": {
+                        field.name: field.metadata[b"kind"].decode()
+                        for field in schemas[topic]
+                        if field.metadata
+                    },
+                }
+                for topic in schemas
+            },
+        }
+        await asyncio.to_thread(self._finish, tmp_path, final_path, manifest)
+        self._manifests[mission_id] = manifest
+
+        if delete_rows:
+            async with self.session_factory() as session:
+                await DatabaseService(session).delete_telemetry(mission_id)
+        return manifest
+
+    @staticmethod
+    def _open_writers(
+        tmp_path: str, files: Dict[str, str], schemas: Dict[str, pa.Schema]
+    ) -> Dict[str, pa.RecordBatchFileWriter]:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        return {
+            topic: pa.ipc.new_file(os.path.join(tmp_path, files[topic]), schema)
+            for topic, schema in schemas.items()
+        }
+
+    @staticmethod
+    def _close_writers(writers: Dict[str, pa.RecordBatchFileWriter]) -> None:
+        for writer in writers.values():
+            writer.close()
+
+    def _write_rows(
+        self,
+        writers: Dict[str, pa.RecordBatchFileWriter],
+        schemas: Dict[str, pa.Schema],
+        counts: Dict[str, int],
+        rows: List[TelemetryLog],
+    ) -> None:
+        by_topic: Dict[str, List[TelemetryLog]] = {}
+        for row in rows:
+            by_topic.setdefault(row.topic, []).append(row)
+        for topic, topic_rows in by_topic.items():
+            writers[topic].write_batch(self._record_batch(schemas[topic], topic_rows))
+            counts[topic] += len(topic_rows)
+
+    @staticmethod
+    def _finish(tmp_path: str, final_path: str, manifest: Dict[str, Any]) -> None:
+        with open(os.path.join(tmp_path, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f, indent=2)
+        shutil.rmtree(final_path, ignore_errors=True)
+        os.replace(tmp_path, final_path)
+
+    @staticmethod
+    def _file_name(topic: str, index: int) -> str:
+        safe = re.sub(r"[^A-Za-z0-9_.-]", "_", topic)
+        return f"{index:03d}_{safe}.arrow"
+
+    @staticmethod
+    def _record_batch(schema: pa.Schema, rows: List[TelemetryLog]) -> pa.RecordBatch:
+        flat_rows = [flatten_payload(row.payload) for row in rows]
+        arrays = [
+            pa.array([row.id for row in rows], pa.int64()),
+            pa.array([row.timestamp for row in rows], pa.timestamp("us")),
+        ]
+        for field in list(schema)[2:]:
+            name = field.name[len(DATA_PREFIX) :]
+            kind = field.metadata[b"kind"].decode()
+            values = [flat.get(name) for flat in flat_rows]
+            if kind == "json":
+                values = [None if v is None else json.dumps(v) for v in values]
+            elif kind == "float":
+                values = [None if v is None else float(v) for v in values]
+            arrays.append(pa.array(values, field.type))
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    # Reading
+    def read_table(self, mission_id: int, topic: str) -> pa.Table:
+        """A topic's archived telemetry, memory-mapped (zero-copy)."""
+        key = (mission_id, topic)
+        if key not in self._tables:
+            manifest = self.manifest(mission_id)
+            if manifest is None or topic not in manifest["topics"]:
+                raise KeyError(f"Mission {mission_id} has no archived topic {topic}")
+            path = os.path.join(
+                self.mission_path(mission_id), manifest["topics"][topic]["file"]
+            )
+            self._tables[key] = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        return self._tables[key]
+
+    @staticmethod
+    def _rows(
+        batch: Union[pa.Table, pa.RecordBatch], topic: str
+    ) -> List[ArchivedTelemetry]:
+        data_columns = [
+            (
+                field.name,
+                field.name[len(DATA_PREFIX) :],
+                field.metadata[b"kind"] == b"json",
+            )
+            for field in batch.schema
+            if field.name.startswith(DATA_PREFIX)
+        ]
+        rows = []
+        for record in batch.to_pylist():
+            flat = {}
+            for column, name, is_json in data_columns:
+                value = record[column]
+                if value is not None:
+                    flat[name] = json.loads(value) if is_json else value
+            rows.append(
+                ArchivedTelemetry(
+                    record["id"], record["timestamp"], topic, unflatten_payload(flat)
+                )
+            )
+        return rows
+
+    def get_page(
+        self,
+        mission_id: int,
+        topic: Optional[str] = None,
+        limit: int = 100,
+        before: Optional[Tuple[datetime, int]] = None,
+    ) -> List[ArchivedTelemetry]:
+        """Newest-first page, matching DatabaseService.get_telemetry_logs."""
+        candidates: List[ArchivedTelemetry] = []
+        for name in self.topics(mission_id, topic):
+            table = self.read_table(mission_id, name)
+            # Files are sorted by (timestamp, id), so the rows before the
+            # cursor are a prefix found by binary search, and the page is
+            # its tail
+            end = table.num_rows if before is None else _bisect_key(table, before)
+            candidates.extend(
+                self._rows(table.slice(max(0, end - limit), min(end, limit)), name)
+            )
+        candidates.sort(key=lambda row: (row.timestamp, row.id), reverse=True)
+        return candidates[:limit]
+
+    def iter_range(
+        self,
+        mission_id: int,
+        topic: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        chunk_size: int = 1000,
+    ) -> Iterator[List[ArchivedTelemetry]]:
+        """Oldest-first chunks in ``[start, end)``, merged across topics."""
+        streams = [
+            self._iter_topic(mission_id, name, start, end, chunk_size)
+            for name in self.topics(mission_id, topic)
+        ]
+        chunk: List[ArchivedTelemetry] = []
+        for row in heapq.merge(*streams, key=lambda row: (row.timestamp, row.id)):
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _iter_topic(
+        self,
+        mission_id: int,
+        topic: str,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        chunk_size: int,
+    ) -> Iterator[ArchivedTelemetry]:
+        table = self.read_table(mission_id, topic)
+        # Files are sorted by timestamp, so the range is a slice found by
+        # binary search rather than a scan
+        if start is not None:
+            table = table.slice(_bisect_time(table.column("timestamp"), start))
+        if end is not None:
+            table = table.slice(0, _bisect_time(table.column("timestamp"), end))
+        for batch in table.to_batches(chunk_size):
+            yield from self._rows(batch, topic)
+
+
+mission_archive = MissionArchive()
@@ -0,0 +1,324 @@
+from ..database import as_utc_naive, async_session, run_in_session
+from .database_service import DatabaseService
+from .mission_archive import MissionArchive, mission_archive
+from .telemetry_export import iter_telemetry
+from .websocket_hub import WebSocketHub, hub
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+PLAYBACK_TOPIC = "playback.stream"
+
+
+@dataclass
+class PlaybackEvent:
+    timestamp: datetime
+    id: int
+    message: Dict[str, Any]
+
+    @property
+    def key(self) -> Tuple[datetime, int]:
+        return self.timestamp, self.id
+
+
+async def merge_chunks(
+    *streams: AsyncIterator[List[PlaybackEvent]],
+) -> AsyncIterator[List[PlaybackEvent]]:
+    """Merge oldest-first chunk streams into one oldest-first chunk stream.
+
+    Only events up to the earliest buffered tail are released each round;
+    no stream with data left can still produce anything older than that.
+    """
+    buffers: List[Deque[PlaybackEvent]] = [deque() for _ in streams]
+    done = [False] * len(streams)
+    while True:
+        for i, stream in enumerate(streams):
+            if not buffers[i] and not done[i]:
+                try:
+                    buffers[i].extend(await stream.__anext__())
+                except StopAsyncIteration:
+                    done[i] = True
+        if not any(buffers):
+            return
+        tails = [buffer[-1].key for i, buffer in enumerate(buffers) if not done[i]]
+        horizon = min(tails) if tails else None
+        chunk: List[PlaybackEvent] = []
+        for buffer in buffers:
+            while buffer and (horizon is None or buffer[0].key <= horizon):
+                chunk.append(buffer.popleft())
+        chunk.sort(key=lambda event: event.key)
+        yield chunk
+
+
+class PlaybackEngine:
+    """Replays a recorded mission's telemetry and commands on the hub.
+
+    A reader task prefetches merged telemetry/command chunks into a bounded
+    queue while a pacer task publishes them on ``playback.stream`` at
+    ``rate`` times real time. Seeking restarts the reader with an indexed
+    ``timestamp >=`` query, or a binary search for archived missions, so
+    it costs O(log n) wherever the target is.
+    """
+
+    def __init__(
+        self,
+        hub: WebSocketHub = hub,
+        session_factory=async_session,
+        archive: MissionArchive = mission_archive,
+        chunk_size: int = 500,
+        prefetch_chunks: int = 4,
+    ):
+        self.hub = hub
+        self.session_factory = session_factory
+        self.archive = archive
+        self.chunk_size = chunk_size
+        self.prefetch_chunks = prefetch_chunks
+        self.mission_id: Optional[int] = None
+        # idle, playing, paused, finished
+        self.state = "idle"
+        self.rate = 1.0
+        self.position: Optional[datetime] = None
+        self.events_sent = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._chunk: Deque[PlaybackEvent] = deque()
+        self._pending: Optional[PlaybackEvent] = None
+        self._reader: Optional[asyncio.Task] = None
+        self._pacer: Optional[asyncio.Task] = None
+        self._anchor_wall = 0.0
+        self._anchor_position: Optional[datetime] = None
+
+    # Control
+    async def start(
+        self,
+        mission_id: int,
+        rate: float = 1.0,
+        start: Optional[datetime] = None,
+        paused: bool = False,
+    ) -> None:
+        await self.stop()
+        self.mission_id = mission_id
+        self.rate = rate
+        self.state = "paused" if paused else "playing"
+        await self._load(start)
+
+    async def stop(self) -> None:
+        await self._cancel_tasks()
+        self.mission_id = None
+        self.state = "idle"
+        self.position = None
+        self.events_sent = 0
+        self._queue = None
+        self._chunk.clear()
+        self._pending = None
+
+    async def pause(self) -> None:
+        if self.state == "playing":
+            self.position = self.clock()
+            await self._cancel(self._pacer)
+            self.state = "paused"
+
+    async def resume(self) -> None:
+        if self.state == "paused":
+            self.state = "playing"
+            self._start_pacer()
+
+    async def seek(self, position: datetime) -> None:
+        self._require_loaded()
+        if self.state == "finished":
+            self.state = "paused"
+        await self._load(position)
+
+    async def set_rate(self, rate: float) -> None:
+        self._require_loaded()
+        if self.state == "playing":
+            self.position = self.clock()
+            await self._cancel(self._pacer)
+            self.rate = rate
+            self._start_pacer()
+        else:
+            self.rate = rate
+
+    async def step(self, count: int = 1) -> int:
+        """Publish the next ``count`` events immediately while paused."""
+        self._require_loaded()
+        if self.state != "paused":
+            raise RuntimeError("Playback must be paused to step")
+        sent = 0
+        while sent < count:
+            event = await self._next_event()
+            if event is None:
+                self.state = "finished"
+                break
+            self._emit(event)
+            sent += 1
+        return sent
+
+    def clock(self) -> Optional[datetime]:
+        """Current mission time of the playback cursor."""
+        if self.state != "playing" or self._anchor_position is None:
+            return self.position
+        elapsed = asyncio.get_running_loop().time() - self._anchor_wall
+        return self._anchor_position + timedelta(seconds=elapsed * self.rate)
+
+    def status(self) -> Dict[str, Any]:
+        position = self.clock()
+        return {
+            "mission_id": self.mission_id,
+            "state": self.state,
+            "rate": self.rate,
+            "position": position.isoformat() if position else None,
+            "events_sent": self.events_sent,
+            "buffered": len(self._chunk) + (self._queue.qsize() if self._queue else 0),
+        }
+
+    def _require_loaded(self) -> None:
+        if self.mission_id is None:
+            raise RuntimeError("No mission loaded for playback")
+
+    # Tasks
+    async def _cancel(self, task: Optional[asyncio.Task]) -> None:
+        if task is None or task.done():
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def _cancel_tasks(self) -> None:
+        await self._cancel(self._pacer)
+        await self._cancel(self._reader)
+        self._pacer = self._reader = None
+
+    async def _load(self, position: Optional[datetime]) -> None:
+        await self._cancel_tasks()
+        if position is not None:
+            position = as_utc_naive(position)
+        assert self.mission_id is not None
+        self.position = position
+        self._queue = asyncio.Queue(maxsize=self.prefetch_chunks)
+        self._chunk.clear()
+        self._pending = None
+        self._reader = asyncio.create_task(
+            self._read(self.mission_id, position, self._queue)
+        )
+        if self.state == "playing":
+            self._start_pacer()
+
+    def _start_pacer(self) -> None:
+        self._anchor_wall = asyncio.get_running_loop().time()
+        self._anchor_position = self.position
+        self._pacer = asyncio.create_task(self._pace())
+
+    async def _read(
+        self, mission_id: int, start: Optional[datetime], queue: asyncio.Queue
+    ) -> None:
+        try:
+            async for chunk in merge_chunks(
+                self._telemetry_chunks(mission_id, start),
+                self._command_chunks(mission_id, start),
+            ):
+                await queue.put(chunk)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Playback of mission %d failed", mission_id)
+        await queue.put(None)
+
+    async def _telemetry_chunks(
+        self, mission_id: int, start: Optional[datetime]
+    ) -> AsyncIterator[List[PlaybackEvent]]:
+        async for rows in iter_telemetry(
+            mission_id,
+            start=start,
+            chunk_size=self.chunk_size,
+            session_factory=self.session_factory,
+            archive=self.archive,
+        ):
+            yield [
+                PlaybackEvent(
+                    row.timestamp,
+                    row.id,
+                    {
+                        "mission_id": mission_id,
+                        "kind": "telemetry",
+                        "topic": row.topic,
+                        "data": row.payload,
+                    },
+                )
+                for row in rows
+            ]
+
+    async def _command_chunks(
+        self, mission_id: int, start: Optional[datetime]
+    ) -> AsyncIterator[List[PlaybackEvent]]:
+        after = None
+        while True:
+            rows = await run_in_session(
+                lambda session: DatabaseService(session).get_command_range(
+                    mission_id, start, after=after, limit=self.chunk_size
+                ),
+                self.session_factory,
+            )
+            if rows:
+                yield [
+                    PlaybackEvent(
+                        row.timestamp,
+                        row.id,
+                        {
+                            "mission_id": mission_id,
+                            "kind": "command",
+                            "command": row.command,
+                            "parameters": row.payload,
+                            "status": row.status,
+                        },
+                    )
+                    for row in rows
+                ]
+            if len(rows) < self.chunk_size:
+                return
+            after = (rows[-1].timestamp, rows[-1].id)
+
+    async def _next_event(self) -> Optional[PlaybackEvent]:
+        if self._pending is None:
+            if not self._chunk:
+                assert self._queue is not None
+                chunk = await self._queue.get()
+                if chunk is None:
+                    # Leave the end marker for later callers
+                    self._queue.put_nowait(None)
+                    return None
+                self._chunk.extend(chunk)
+            self._pending = self._chunk.popleft()
+        return self._pending
+
+    def _emit(self, event: PlaybackEvent) -> None:
+        self._pending = None
+        self.position = event.timestamp
+        self.events_sent += 1
+        self.hub.publish(PLAYBACK_TOPIC, event.message, event.timestamp)
+
+    async def _pace(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            event = await self._next_event()
+            if event is None:
+                self.state = "finished"
+                return
+            if self._anchor_position is None:
+                self._anchor_position = event.timestamp
+                self._anchor_wall = loop.time()
+            offset = (event.timestamp - self._anchor_position).total_seconds()
+            delay = self._anchor_wall + offset / self.rate - loop.time()
+            if delay > 0:
+                # Cancelled on pause/seek/rate changes; the event stays pending
+                await asyncio.sleep(delay)
+            self._emit(event)
+
+
+playback = PlaybackEngine()
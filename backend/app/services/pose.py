@@ -0,0 +1,199 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Literal, Optional
+import math
+import numpy as np
+
+POSE_TOPIC = "pose.current"
+# Columns of a pose row: time (UTC epoch seconds), position, orientation
+# quaternion
+POSE_FIELDS = ("t", "x", "y", "z", "qx", "qy", "qz", "qw")
+
+
+def epoch_seconds(value: datetime) -> float:
+    # Naive timestamps are UTC, as everywhere else in the backend
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def slerp(q0: np.ndarray, q1: np.ndarray, fraction: float) -> np.ndarray:
+    """Spherical linear interpolation between unit quaternions (x, y, z, w)."""
+    dot = float(np.dot(q0, q1))
+    if dot < 0.0:
+        # q and -q are the same rotation; take the shorter arc
+        q1, dot = -q1, -dot
+    if dot > 0.9995:
+        # Nearly parallel: lerp avoids dividing by sin(~0)
+        q = q0 + fraction * (q1 - q0)
+    else:
+        theta = math.acos(dot)
+        sin_theta = math.sin(theta)
+        q = (
+            math.sin((1.0 - fraction) * theta) * q0 + math.sin(fraction * theta) * q1
+        ) / sin_theta
+    return q / np.linalg.norm(q)
+
+
+def pose_dict(row: np.ndarray) -> Dict[str, Any]:
+    t, x, y, z, qx, qy, qz, qw = (float(v) for v in row)
+    return {
+        "timestamp": datetime.fromtimestamp(t, timezone.utc),
+        "position": {"x": x, "y": y, "z": z},
+        "orientation": {"x": qx, "y": qy, "z": qz, "w": qw},
+    }
+
+
+class PoseBuffer:
+    """Fixed-size ring of pose rows in one preallocated numpy array.
+
+    Rows are appended in time order, so each of the (at most two)
+    contiguous segments of the ring is sorted and can be binary searched
+    in place.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.count = 0
+        self._start = 0
+        self._data = np.zeros((capacity, len(POSE_FIELDS)))
+
+    def append(self, row: np.ndarray) -> None:
+        end = (self._start + self.count) % self.capacity
+        self._data[end] = row
+        if self.count < self.capacity:
+            self.count += 1
+        else:
+            self._start = (self._start + 1) % self.capacity
+
+    def _segments(self) -> List[np.ndarray]:
+        end = self._start + self.count
+        if end <= self.capacity:
+            return [self._data[self._start : end]]
+        return [self._data[self._start :], self._data[: end - self.capacity]]
+
+    def row(self, index: int) -> np.ndarray:
+        """Row ``index`` counting from the oldest."""
+        return self._data[(self._start + index) % self.capacity]
+
+    def newest(self) -> Optional[np.ndarray]:
+        return self.row(self.count - 1) if self.count else None
+
+    def count_until(self, t: float, side: Literal["left", "right"] = "right") -> int:
+        """Number of rows with time <= ``t`` (< ``t`` with side="left")."""
+        total = 0
+        for segment in self._segments():
+            index = int(np.searchsorted(segment[:, 0], t, side=side))
+            total += index
+            if index < len(segment):
+                break
+        return total
+
+    def slice(self, start: float, end: float) -> np.ndarray:
+        """Copy of the rows with ``start <= t <= end``, oldest first."""
+        first = self.count_until(start, side="left")
+        last = self.count_until(end)
+        if last <= first:
+            return np.empty((0, len(POSE_FIELDS)))
+        indices = (np.arange(first, last) + self._start) % self.capacity
+        return self._data[indices]
+
+
+class PoseService:
+    """Recent rover poses at full odometry rate, for interpolation and
+    trajectory queries.
+
+    Samples arrive through ``TelemetryIngest`` on ``pose.current``; the hub
+    still publishes every one, and browsers cap their own rate with the
+    ``max_rate`` subscription option rather than receiving 100 Hz JSON.
+    """
+
+    def __init__(self, capacity: int = 6000, topic: str = POSE_TOPIC):
+        self.topic = topic
+        self.buffer = PoseBuffer(capacity)
+        self.out_of_order = 0
+
+    def update(
+        self,
+        position: Dict[str, float],
+        orientation: Dict[str, float],
+        timestamp: datetime,
+    ) -> bool:
+        """Record a pose. Returns False for samples older than the newest
+        one, which are dropped so the ring stays sorted."""
+        t = epoch_seconds(timestamp)
+        newest = self.buffer.newest()
+        if newest is not None and t < newest[0]:
+            self.out_of_order += 1
+            return False
+        self.buffer.append(
+            np.array(
+                [
+                    t,
+                    position.get("x", 0.0),
+                    position.get("y", 0.0),
+                    position.get("z", 0.0),
+                    orientation.get("x", 0.0),
+                    orientation.get("y", 0.0),
+                    orientation.get("z", 0.0),
+                    orientation.get("w", 1.0),
+                ]
+            )
+        )
+        return True
+
+    def apply_message(self, message: Dict[str, Any], timestamp: datetime) -> bool:
+        """Record a ``geometry_msgs/Pose``-shaped message; ``PoseStamped``
+        and ``Odometry`` (``pose.pose``) wrappers are unwrapped."""
+        while "position" not in message and isinstance(message.get("pose"), dict):
+            message = message["pose"]
+        return self.update(
+            message.get("position", {}), message.get("orientation", {}), timestamp
+        )
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        newest = self.buffer.newest()
+        return pose_dict(newest) if newest is not None else None
+
+    def pose_at(self, timestamp: datetime) -> Optional[Dict[str, Any]]:
+        """Pose at ``timestamp``, interpolated between the samples around it
+        (SLERP for orientation). None outside the buffered time range."""
+        t = epoch_seconds(timestamp)
+        index = self.buffer.count_until(t)
+        if index == 0:
+            return None
+        before = self.buffer.row(index - 1)
+        if before[0] == t:
+            return pose_dict(before)
+        if index == self.buffer.count:
+            return None
+        after = self.buffer.row(index)
+        fraction = (t - before[0]) / (after[0] - before[0])
+        row = np.empty(len(POSE_FIELDS))
+        row[0] = t
+        row[1:4] = before[1:4] + fraction * (after[1:4] - before[1:4])
+        row[4:] = slerp(before[4:], after[4:], fraction)
+        return pose_dict(row)
+
+    def trajectory(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        max_points: Optional[int] = None,
+    ) -> np.ndarray:
+        """Buffered rows between ``start`` and ``end``, thinned to at most
+        ``max_points`` by taking every n-th row (the newest is always kept)."""
+        rows = self.buffer.slice(
+            epoch_seconds(start) if start else -math.inf,
+            epoch_seconds(end) if end else math.inf,
+        )
+        if max_points is not None and len(rows) > max_points:
+            # Leaves room for the newest row when the stride skips it
+            stride = math.ceil((len(rows) - 1) / max(max_points - 1, 1))
+            keep = rows[::stride]
+            if (len(rows) - 1) % stride:
+                keep = np.vstack([keep, rows[-1:]])
+            rows = keep
+        return rows
+
+
+pose_service = PoseService()
@@ -0,0 +1,308 @@
+"""Event loop profiling for the running server.
+
+``LoopLagMonitor`` runs all the time. It schedules a callback every
+``interval`` and records how late it runs, and a watchdog thread captures
+the event loop thread's stack whenever a callback is overdue by more than
+``threshold``, so a stall is reported with the code that caused it.
+
+``SamplingProfiler`` is opt-in (``PROFILER_ENABLED=1``). It samples the
+event loop thread's stack from another thread for a fixed time and
+aggregates the samples into collapsed stacks, the input format of
+flamegraph.pl and speedscope.
+"""
+
+from .metrics import CollectedMetric, registry
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from types import FrameType
+from typing import Any, Deque, Dict, List, Optional
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "0").lower() in ("1", "true", "yes")
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "60"))
+LOOP_LAG_THRESHOLD_MS = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "100"))
+
+MAX_STACK_DEPTH = 128
+
+loop_lag = registry.histogram(
+    "event_loop_lag_seconds", "Delay of a periodic event loop callback"
+)
+
+
+def _location(frame: FrameType) -> str:
+    """``function (file:first line)``; one entry per function, not per line."""
+    code = frame.f_code
+    path = code.co_filename
+    marker = "site-packages" + os.sep
+    if marker in path:
+        path = path[path.rindex(marker) + len(marker) :]
+    elif path.startswith(os.getcwd() + os.sep):
+        path = os.path.relpath(path)
+    return f"{code.co_name} ({path}:{code.co_firstlineno})".replace(";", ":")
+
+
+def frame_stack(frame: Optional[FrameType]) -> List[str]:
+    """Locations from the outermost call to ``frame``."""
+    stack = []
+    while frame is not None and len(stack) < MAX_STACK_DEPTH:
+        stack.append(_location(frame))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _idle(frame: FrameType) -> bool:
+    # The loop waiting for I/O in selector.select()
+    return frame.f_code.co_filename.endswith("selectors.py")
+
+
+@dataclass
+class Stall:
+    """An event loop callback that ran ``lag_ms`` late."""
+
+    at: datetime
+    lag_ms: float
+    # The loop thread's stack while it was blocked, outermost call first
+    stack: List[str]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"at": self.at, "lag_ms": self.lag_ms, "stack": self.stack}
+
+
+class LoopLagMonitor:
+    """Continuous event loop lag measurement with stall attribution."""
+
+    def __init__(
+        self,
+        interval: float = 0.05,
+        threshold: float = LOOP_LAG_THRESHOLD_MS / 1e3,
+        history: int = 50,
+    ):
+        self.interval = interval
+        self.threshold = threshold
+        self.lag = loop_lag.labels()
+        self.stall_count = 0
+        self.stalls: Deque[Stall] = deque(maxlen=history)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread_id: Optional[int] = None
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._expected = 0.0
+        self._last_beat = 0.0
+        self._beats = 0
+        self._captured: Optional[List[str]] = None
+        self._captured_beat = -1
+
+    @property
+    def running(self) -> bool:
+        return self._handle is not None
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        self._stopping.clear()
+        self._expected = self._loop.time()
+        self._beat()
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop-lag-watchdog", daemon=True
+        )
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        self._stopping.set()
+        if self._watchdog is not None:
+            self._watchdog.join()
+            self._watchdog = None
+
+    def _beat(self) -> None:
+        assert self._loop is not None
+        now = self._loop.time()
+        lag = max(0.0, now - self._expected)
+        self.lag.observe(lag * 1e3)
+        if lag >= self.threshold:
+            stack = self._captured if self._captured_beat == self._beats else None
+            self.stall_count += 1
+            self.stalls.append(
+                Stall(datetime.now(timezone.utc), lag * 1e3, stack or [])
+            )
+            logger.warning(
+                "Event loop blocked for %.0f ms in %s",
+                lag * 1e3,
+                stack[-1] if stack else "unknown code",
+            )
+        self._beats += 1
+        self._last_beat = time.monotonic()
+        self._expected = now + self.interval
+        self._handle = self._loop.call_at(self._expected, self._beat)
+
+    def _watch(self) -> None:
+        while not self._stopping.wait(self.interval / 2):
+            beat = self._beats
+            overdue = time.monotonic() - self._last_beat - self.interval
+            if overdue < self.threshold or self._captured_beat == beat:
+                continue
+            frame = sys._current_frames().get(self._thread_id or 0)
+            self._captured = frame_stack(frame)
+            self._captured_beat = beat
+
+    def stats(self) -> Dict[str, Any]:
+        current = 0.0
+        if self.running:
+            current = max(0.0, time.monotonic() - self._last_beat - self.interval)
+        return {
+            "running": self.running,
+            "interval_ms": self.interval * 1e3,
+            "threshold_ms": self.threshold * 1e3,
+            "current_lag_ms": current * 1e3,
+            "lag_ms": self.lag.summary(),
+            "stalls": self.stall_count,
+            "recent_stalls": [stall.to_dict() for stall in reversed(self.stalls)],
+        }
+
+
+@dataclass
+class Profile:
+    started_at: datetime
+    duration_s: float
+    interval_ms: float
+    samples: int = 0
+    idle_samples: int = 0
+    stacks: Counter = field(default_factory=Counter)
+
+    def collapsed(self) -> str:
+        """One ``frame;frame;frame count`` line per distinct stack."""
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.stacks.most_common()
+        )
+
+    def top(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Functions by the samples they were running in (self time)."""
+        own: Counter = Counter()
+        for stack, count in self.stacks.items():
+            own[stack.rsplit(";", 1)[-1]] += count
+        total = sum(own.values()) or 1
+        return [
+            {"function": name, "samples": count, "percent": count / total * 100}
+            for name, count in own.most_common(limit)
+        ]
+
+    def to_dict(self, limit: int = 20) -> Dict[str, Any]:
+        return {
+            "started_at": self.started_at,
+            "duration_s": self.duration_s,
+            "interval_ms": self.interval_ms,
+            "samples": self.samples,
+            "idle_samples": self.idle_samples,
+            "top": self.top(limit),
+        }
+
+
+class SamplingProfiler:
+    """Samples the event loop thread's stack for a fixed time.
+
+    One profile runs at a time. Sampling happens on its own thread, so it
+    keeps going while the loop is blocked, which is when it matters.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = PROFILER_ENABLED,
+        max_duration: float = PROFILER_MAX_SECONDS,
+    ):
+        self.enabled = enabled
+        self.max_duration = max_duration
+        self.running = False
+        self.last: Optional[Profile] = None
+
+    async def profile(
+        self, duration: float, interval: float = 0.005, include_idle: bool = False
+    ) -> Profile:
+        """Sample the calling loop's thread for ``duration`` seconds.
+
+        Raises ``ValueError`` for a duration over ``max_duration`` and
+        ``RuntimeError`` if a profile is already running.
+        """
+        if not 0 < duration <= self.max_duration:
+            raise ValueError(f"duration must be in (0, {self.max_duration:g}] seconds")
+        if self.running:
+            raise RuntimeError("A profile is already running")
+        loop = asyncio.get_running_loop()
+        done: asyncio.Future = loop.create_future()
+        stop = threading.Event()
+        profile = Profile(datetime.now(timezone.utc), duration, interval * 1e3)
+        thread_id = threading.get_ident()
+
+        def finished() -> None:
+            if not done.done():
+                done.set_result(None)
+
+        def run() -> None:
+            try:
+                self._sample(profile, thread_id, interval, include_idle, stop)
+            finally:
+                loop.call_soon_threadsafe(finished)
+
+        thread = threading.Thread(target=run, name="profiler", daemon=True)
+        self.running = True
+        try:
+            thread.start()
+            await done
+        finally:
+            # Cancelled: the sampler must end before another can start
+            stop.set()
+            await asyncio.to_thread(thread.join)
+            self.running = False
+        self.last = profile
+        return profile
+
+    @staticmethod
+    def _sample(
+        profile: Profile,
+        thread_id: int,
+        interval: float,
+        include_idle: bool,
+        stop: threading.Event,
+    ) -> None:
+        deadline = time.perf_counter() + profile.duration_s
+        next_sample = time.perf_counter()
+        while next_sample < deadline and not stop.is_set():
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                profile.samples += 1
+                if _idle(frame):
+                    profile.idle_samples += 1
+                if include_idle or not _idle(frame):
+                    profile.stacks[";".join(frame_stack(frame))] += 1
+            # Keep the schedule; a slow sample shortens the next sleep
+            next_sample += interval
+            stop.wait(max(0.0, next_sample - time.perf_counter()))
+
+
+loop_monitor = LoopLagMonitor()
+profiler = SamplingProfiler()
+
+
+@registry.collector
+def _loop_metrics() -> List[CollectedMetric]:
+    return [
+        (
+            "event_loop_stalls_total",
+            "counter",
+            "Event loop callbacks delayed past the lag threshold",
+            loop_monitor.stall_count,
+        )
+    ]
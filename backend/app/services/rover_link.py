@@ -0,0 +1,544 @@
+from .ingest import TelemetryIngest, ingest
+from .metrics import Histogram
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
+from urllib.parse import urlsplit
+from websockets.asyncio.client import connect as websocket_connect
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+# Comma-separated link sources started with the app, e.g. "simulator",
+# "udp://0.0.0.0:9870", "tcp://rover.local:9870" or "ws://rover.local:9090"
+# (rosbridge)
+ROVER_LINK = os.getenv("ROVER_LINK", "")
+ROVER_LINK_QUEUE = int(os.getenv("ROVER_LINK_QUEUE", "10000"))
+
+# rosbridge topic -> backend topic
+ROS_TOPICS: Dict[str, str] = {
+    "/vesc/state": "telemetry.vescs",
+    "/encoders": "telemetry.encoders",
+    "/camera/imu": "telemetry.rgbd",
+    "/payload": "telemetry.payload",
+    "/odom": "pose.current",
+    "/map": "slam.map",
+}
+
+# Messages per second per simulated stream
+SIMULATOR_RATES: Dict[str, float] = {
+    "telemetry.vescs": 50.0,
+    "telemetry.encoders": 100.0,
+    "telemetry.rgbd": 30.0,
+    "telemetry.payload": 1.0,
+    "pose.current": 20.0,
+}
+
+WHEELS = ("front_left", "front_right", "rear_left", "rear_right")
+
+# (topic, data, sample timestamp, loop time received)
+LinkMessage = Tuple[str, Any, datetime, float]
+
+
+def _from_epoch(seconds: float) -> datetime:
+    try:
+        return datetime.fromtimestamp(seconds, timezone.utc)
+    except (OverflowError, OSError) as exc:
+        raise ValueError(f"Timestamp {seconds!r} out of range") from exc
+
+
+def _parse_timestamp(value: Any) -> Optional[datetime]:
+    if value is None:
+        return None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return _from_epoch(value)
+    if isinstance(value, str):
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+    if isinstance(value, dict):
+        # ROS 2 (sec, nanosec) or ROS 1 (secs, nsecs) stamp
+        seconds = value.get("sec", value.get("secs"))
+        nanos = value.get("nanosec", value.get("nsecs", 0))
+        if isinstance(seconds, int) and isinstance(nanos, int):
+            return _from_epoch(seconds + nanos / 1e9)
+    raise ValueError(f"Invalid timestamp {value!r}")
+
+
+def parse_message(
+    raw: Union[str, bytes], topics: Dict[str, str] = ROS_TOPICS
+) -> Tuple[str, Any, Optional[datetime]]:
+    """Parse one message from the rover.
+
+    Accepts ``{"topic", "data", "timestamp"}`` (timestamp as epoch seconds
+    or ISO 8601, optional) and rosbridge ``{"op": "publish", "topic",
+    "msg"}``, whose ROS topic is mapped through ``topics`` and whose stamp
+    is taken from ``msg.header.stamp``. Raises ``ValueError`` otherwise.
+    """
+    message = json.loads(raw)
+    if not isinstance(message, dict):
+        raise ValueError("Message is not an object")
+    if message.get("op") == "publish":
+        ros_topic = message.get("topic")
+        topic = topics.get(ros_topic) if isinstance(ros_topic, str) else None
+        if topic is None:
+            raise ValueError(f"Unmapped ROS topic {ros_topic!r}")
+        data = message.get("msg")
+        header = data.get("header") if isinstance(data, dict) else None
+        stamp = header.get("stamp") if isinstance(header, dict) else None
+    else:
+        topic = message.get("topic")
+        data = message.get("data")
+        stamp = message.get("timestamp")
+    if not isinstance(topic, str) or not topic:
+        raise ValueError("Message has no topic")
+    if not isinstance(data, dict):
+        raise ValueError(f"Message on {topic} has no data object")
+    return topic, data, _parse_timestamp(stamp)
+
+
+class LinkSource:
+    """Receives telemetry from the rover and hands raw messages to the link.
+
+    ``run`` is started as a task by ``RoverLink`` and cancelled on stop; it
+    calls ``link.receive(self, raw)`` for every message.
+    """
+
+    kind = "source"
+
+    def __init__(self, name: Optional[str] = None):
+        self.name = name or self.kind
+        self.connected = False
+        self.received = 0
+        self.reconnects = 0
+        self.last_error: Optional[str] = None
+
+    async def run(self, link: "RoverLink") -> None:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "connected": self.connected,
+            "received": self.received,
+            "reconnects": self.reconnects,
+            "last_error": self.last_error,
+        }
+
+
+class ReconnectingSource(LinkSource):
+    """A source that connects out to the rover and reconnects when the
+    connection fails or closes, waiting ``min_backoff`` seconds at first and
+    doubling up to ``max_backoff`` while it keeps failing."""
+
+    def __init__(
+        self,
+        name: Optional[str] = None,
+        min_backoff: float = 0.5,
+        max_backoff: float = 10.0,
+    ):
+        super().__init__(name)
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+
+    async def connect_and_read(self, link: "RoverLink") -> None:
+        """Connect, set ``connected`` and read until the connection ends."""
+        raise NotImplementedError
+
+    async def run(self, link: "RoverLink") -> None:
+        delay = self.min_backoff
+        while True:
+            try:
+                await self.connect_and_read(link)
+                self.last_error = "connection closed"
+            except Exception as exc:
+                self.last_error = str(exc) or type(exc).__name__
+            if self.connected:
+                # Was up for a while: start over from the shortest wait
+                delay = self.min_backoff
+            self.connected = False
+            self.reconnects += 1
+            logger.warning(
+                "Rover link %s down (%s), retrying in %.1fs",
+                self.name,
+                self.last_error,
+                delay,
+            )
+            # Jitter so several sources do not retry in lockstep
+            await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+            delay = min(delay * 2, self.max_backoff)
+
+
+class TcpSource(ReconnectingSource):
+    """Newline-delimited JSON messages over a TCP connection to the rover."""
+
+    kind = "tcp"
+
+    def __init__(self, host: str, port: int, **kwargs: Any):
+        super().__init__(kwargs.pop("name", f"tcp://{host}:{port}"), **kwargs)
+        self.host = host
+        self.port = port
+
+    async def connect_and_read(self, link: "RoverLink") -> None:
+        # Occupancy grids can be large, so allow long lines
+        reader, writer = await asyncio.open_connection(
+            self.host, self.port, limit=2**24
+        )
+        self.connected = True
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                if line.strip():
+                    link.receive(self, line)
+        finally:
+            writer.close()
+
+
+class RosbridgeSource(ReconnectingSource):
+    """rosbridge WebSocket client subscribing to the mapped ROS topics."""
+
+    kind = "rosbridge"
+
+    def __init__(self, url: str, topics: Optional[Dict[str, str]] = None, **kwargs):
+        super().__init__(kwargs.pop("name", url), **kwargs)
+        self.url = url
+        self.topics = topics if topics is not None else ROS_TOPICS
+
+    async def connect_and_read(self, link: "RoverLink") -> None:
+        async with websocket_connect(self.url, max_size=None) as websocket:
+            for ros_topic in self.topics:
+                await websocket.send(
+                    json.dumps({"op": "subscribe", "topic": ros_topic})
+                )
+            self.connected = True
+            async for raw in websocket:
+                link.receive(self, raw)
+
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self, source: "UdpSource", link: "RoverLink"):
+        self.source = source
+        self.link = link
+
+    def datagram_received(self, data: bytes, addr: Any) -> None:
+        self.link.receive(self.source, data)
+
+
+class UdpSource(LinkSource):
+    """One JSON message per UDP datagram, received on ``host:port``.
+
+    Nothing to reconnect: lost datagrams are simply never seen.
+    """
+
+    kind = "udp"
+
+    def __init__(self, host: str = "0.0.0.0", port: int = 9870, **kwargs: Any):
+        super().__init__(kwargs.pop("name", f"udp://{host}:{port}"))
+        self.host = host
+        self.port = port
+        self.address: Optional[Tuple[str, int]] = None
+
+    async def run(self, link: "RoverLink") -> None:
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: _DatagramProtocol(self, link), local_addr=(self.host, self.port)
+        )
+        self.address = transport.get_extra_info("sockname")[:2]
+        self.connected = True
+        try:
+            await loop.create_future()
+        finally:
+            self.connected = False
+            transport.close()
+
+
+class SimulatorSource(LinkSource):
+    """Stands in for the rover: emits VESC, encoder, RGBD IMU, payload and
+    odometry streams at ``rates`` messages per second.
+
+    Messages are JSON encoded and go through the same parsing as real ones
+    unless ``encode`` is off. Streams faster than the loop can sleep are
+    emitted in small bursts to keep the average rate.
+    """
+
+    kind = "simulator"
+
+    def __init__(
+        self,
+        rates: Optional[Dict[str, float]] = None,
+        encode: bool = True,
+        seed: Optional[int] = None,
+        name: Optional[str] = None,
+    ):
+        super().__init__(name)
+        self.rates = dict(SIMULATOR_RATES if rates is None else rates)
+        self.encode = encode
+        self._random = random.Random(seed)
+
+    async def run(self, link: "RoverLink") -> None:
+        self.connected = True
+        try:
+            await asyncio.gather(
+                *(
+                    self._stream(link, topic, rate)
+                    for topic, rate in self.rates.items()
+                    if rate > 0
+                )
+            )
+        finally:
+            self.connected = False
+
+    async def _stream(self, link: "RoverLink", topic: str, rate: float) -> None:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        sent = 0
+        while True:
+            due = int((loop.time() - started) * rate) + 1
+            # After a stall, catch up by at most a second's worth
+            if due - sent > rate:
+                sent = due - max(1, int(rate))
+            while sent < due:
+                t = time.time()
+                data = self.sample(topic, t)
+                if self.encode:
+                    raw = json.dumps({"topic": topic, "data": data, "timestamp": t})
+                    link.receive(self, raw)
+                else:
+                    self.received += 1
+                    link.submit(topic, data, datetime.fromtimestamp(t, timezone.utc))
+                sent += 1
+            await asyncio.sleep(max(0.0, started + sent / rate - loop.time()))
+
+    def sample(self, topic: str, t: float) -> Dict[str, Any]:
+        """One plausible message for ``topic`` at time ``t`` (epoch seconds)."""
+        noise = self._random.gauss
+        # Drive forward and back with a slow turn
+        speed = 1.2 * math.sin(t / 20)
+        turn = 0.3 * math.sin(t / 7)
+        if topic == "telemetry.vescs":
+            return {
+                wheel: {
+                    "rpm": round(
+                        (speed + (turn if i % 2 else -turn)) * 2000 + noise(0, 15)
+                    ),
+                    "duty": round(abs(speed) / 2 + noise(0, 0.01), 3),
+                    "current": round(abs(speed) * 8 + noise(0, 0.3), 2),
+                    "voltage": round(48 - (t % 3600) / 900 + noise(0, 0.05), 2),
+                    "temp_fet": round(35 + abs(speed) * 10 + noise(0, 0.2), 1),
+                    "temp_motor": round(40 + abs(speed) * 15 + noise(0, 0.2), 1),
+                }
+                for i, wheel in enumerate(WHEELS)
+            }
+        if topic == "telemetry.encoders":
+            return {
+                wheel: {
+                    # Integral of the wheel velocity below
+                    "position": round(
+                        (-24 * math.cos(t / 20) / 0.15) % (2 * math.pi), 4
+                    ),
+                    "velocity": round(speed / 0.15 + noise(0, 0.02), 4),
+                }
+                for wheel in WHEELS
+            }
+        if topic == "telemetry.rgbd":
+            return {
+                "imu": {
+                    "ax": round(0.06 * math.cos(t / 20) + noise(0, 0.02), 4),
+                    "ay": round(speed * turn + noise(0, 0.02), 4),
+                    "az": round(9.81 + noise(0, 0.03), 4),
+                    "gx": round(noise(0, 0.005), 4),
+                    "gy": round(noise(0, 0.005), 4),
+                    "gz": round(turn + noise(0, 0.005), 4),
+                },
+                "depth": {
+                    "min": round(0.3 + abs(noise(0, 0.05)), 3),
+                    "max": round(8 + noise(0, 0.2), 3),
+                    "valid_ratio": round(0.92 + noise(0, 0.01), 3),
+                },
+            }
+        if topic == "telemetry.payload":
+            return {
+                "temperature": round(22 + 3 * math.sin(t / 600) + noise(0, 0.1), 2),
+                "humidity": round(40 + noise(0, 0.5), 1),
+                "pressure": round(1013 + noise(0, 0.3), 1),
+                "methane_ppm": round(max(0.0, 2 + noise(0, 0.4)), 2),
+            }
+        if topic == "pose.current":
+            # Integral of the turn rate above
+            heading = -2.1 * math.cos(t / 7)
+            return {
+                "position": {
+                    "x": round(24 * -math.cos(t / 20) * math.cos(heading), 4),
+                    "y": round(24 * -math.cos(t / 20) * math.sin(heading), 4),
+                    "z": 0.0,
+                },
+                "orientation": {
+                    "x": 0.0,
+                    "y": 0.0,
+                    "z": round(math.sin(heading / 2), 6),
+                    "w": round(math.cos(heading / 2), 6),
+                },
+            }
+        return {"value": noise(0, 1)}
+
+
+def source_from_url(url: str) -> LinkSource:
+    """Build a source from ``simulator``, ``udp://``, ``tcp://`` or a
+    rosbridge ``ws://``/``wss://`` URL."""
+    url = url.strip()
+    if url == "simulator":
+        return SimulatorSource()
+    parts = urlsplit(url)
+    if parts.scheme in ("ws", "wss"):
+        return RosbridgeSource(url)
+    if parts.scheme in ("udp", "tcp") and parts.hostname and parts.port:
+        if parts.scheme == "udp":
+            return UdpSource(parts.hostname, parts.port)
+        return TcpSource(parts.hostname, parts.port)
+    raise ValueError(f"Unsupported rover link {url!r}")
+
+
+class RoverLink:
+    """Bounded queue between the link sources and telemetry ingest.
+
+    Sources parse and queue messages without waiting; one consumer task
+    feeds them to ``ingest.publish``. When ingest falls behind (e.g. the
+    database writer applying backpressure) the queue fills up and the
+    oldest messages are dropped and counted, so the newest telemetry keeps
+    flowing. ``queue_latency`` records how long messages waited.
+    """
+
+    def __init__(
+        self,
+        ingest: TelemetryIngest = ingest,
+        queue_size: int = ROVER_LINK_QUEUE,
+        topics: Dict[str, str] = ROS_TOPICS,
+    ):
+        self.ingest = ingest
+        self.topics = topics
+        self.sources: List[LinkSource] = []
+        self.counts: Dict[str, int] = {
+            "received": 0,
+            "ingested": 0,
+            "dropped": 0,
+            "parse_errors": 0,
+        }
+        self.queue_latency = Histogram()
+        self._queue: Deque[LinkMessage] = deque(maxlen=queue_size)
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self._consumer: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._consumer is not None
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def add_source(self, source: LinkSource) -> None:
+        self.sources.append(source)
+        if self.running:
+            self._tasks.append(asyncio.create_task(self._run_source(source)))
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        if not self.sources:
+            for url in filter(None, ROVER_LINK.split(",")):
+                self.sources.append(source_from_url(url))
+        self._wakeup = asyncio.Event()
+        self._consumer = asyncio.create_task(self._consume())
+        self._tasks = [
+            asyncio.create_task(self._run_source(source)) for source in self.sources
+        ]
+
+    async def stop(self) -> None:
+        """Stop the sources, then ingest what is still queued."""
+        if self._consumer is None:
+            return
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._consumer.cancel()
+        try:
+            await self._consumer
+        except asyncio.CancelledError:
+            pass
+        self._consumer = None
+        await self._drain()
+
+    def receive(self, source: LinkSource, raw: Union[str, bytes]) -> None:
+        """Parse a raw message from ``source`` and queue it."""
+        source.received += 1
+        try:
+            topic, data, timestamp = parse_message(raw, self.topics)
+        except ValueError as exc:
+            self.counts["parse_errors"] += 1
+            logger.debug("Unparseable message from %s: %s", source.name, exc)
+            return
+        self.submit(topic, data, timestamp)
+
+    def submit(
+        self, topic: str, data: Any, timestamp: Optional[datetime] = None
+    ) -> None:
+        """Queue a parsed message, dropping the oldest if the queue is full."""
+        self.counts["received"] += 1
+        if len(self._queue) == self._queue.maxlen:
+            self.counts["dropped"] += 1
+        loop = asyncio.get_running_loop()
+        self._queue.append(
+            (topic, data, timestamp or datetime.now(timezone.utc), loop.time())
+        )
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counts,
+            "queue_depth": self.queue_depth,
+            "queue_size": self._queue.maxlen,
+            "queue_latency_ms": self.queue_latency.summary(),
+            "sources": [source.stats() for source in self.sources],
+        }
+
+    async def _run_source(self, source: LinkSource) -> None:
+        try:
+            await source.run(self)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Rover link source %s stopped", source.name)
+            source.connected = False
+
+    async def _drain(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self._queue:
+            topic, data, timestamp, received_at = self._queue.popleft()
+            self.queue_latency.observe((loop.time() - received_at) * 1e3)
+            try:
+                await self.ingest.publish(topic, data, timestamp)
+            except Exception:
+                logger.exception("Ingesting %s from the rover link failed", topic)
+                continue
+            self.counts["ingested"] += 1
+
+    async def _consume(self) -> None:
+        assert self._wakeup is not None
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            await self._drain()
+
+
+rover_link = RoverLink()
@@ -0,0 +1,177 @@
+from .commands import CommandDispatcher, CommandRecord, command_dispatcher
+from .metrics import Histogram
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Maximum commands per second for each setpoint
+CONTROL_RATE = float(os.getenv("CONTROL_RATE", "10"))
+
+
+@dataclass
+class SetpointSlot:
+    command: str
+    # Latest requested parameters not yet sent
+    pending: Optional[Dict[str, Any]] = None
+    # Loop times of the requests folded into ``pending``
+    requested_at: List[float] = field(default_factory=list)
+    mission_id: Optional[int] = None
+    last_sent: Optional[CommandRecord] = None
+    next_allowed: float = 0.0
+
+
+class SetpointCoalescer:
+    """Turns bursts of setpoint requests into at most ``rate`` commands per
+    second for each setpoint.
+
+    Each setpoint (one command name, e.g. ``set_vesc_acceleration``) has a
+    latest-wins slot. A request to an idle slot is sent at once; requests
+    arriving within ``1 / rate`` of the last send overwrite the slot and the
+    latest is sent on the next tick. Values equal to the last successfully
+    sent command are dropped, so only effective commands reach the rover and
+    the command log. ``queue_latency`` records how long each request waited.
+    """
+
+    def __init__(
+        self,
+        dispatcher: CommandDispatcher = command_dispatcher,
+        rate: float = CONTROL_RATE,
+    ):
+        self.dispatcher = dispatcher
+        self.rate = rate
+        self.slots: Dict[str, SetpointSlot] = {}
+        self.queue_latency = Histogram()
+        self.counts: Dict[str, int] = {
+            "requests": 0,
+            "sent": 0,
+            "coalesced": 0,
+            "unchanged": 0,
+        }
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    @property
+    def interval(self) -> float:
+        return 1.0 / self.rate
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop ticking, sending whatever is still pending first."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self.flush()
+
+    async def set(
+        self,
+        command: str,
+        parameters: Dict[str, Any],
+        mission_id: Optional[int] = None,
+    ) -> str:
+        """Request a setpoint. Returns ``sent``, ``queued`` or ``unchanged``."""
+        if self._task is None:
+            raise RuntimeError("Setpoint coalescer is not running")
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        self.counts["requests"] += 1
+        slot = self.slots.get(command)
+        if slot is None:
+            slot = self.slots[command] = SetpointSlot(command)
+        if slot.pending is not None:
+            self.counts["coalesced"] += 1
+        elif self._unchanged(slot, parameters):
+            self.counts["unchanged"] += 1
+            self.queue_latency.observe(0.0)
+            return "unchanged"
+        slot.pending = parameters
+        slot.mission_id = mission_id
+        slot.requested_at.append(now)
+        if now >= slot.next_allowed:
+            await self._send(slot)
+            return "sent"
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return "queued"
+
+    async def flush(self) -> None:
+        """Send every pending setpoint now, ignoring the rate limit."""
+        for slot in list(self.slots.values()):
+            if slot.pending is not None:
+                await self._send(slot)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counts,
+            "rate": self.rate,
+            "pending": sum(1 for s in self.slots.values() if s.pending is not None),
+            "queue_latency_ms": self.queue_latency.summary(),
+        }
+
+    def _unchanged(self, slot: SetpointSlot, parameters: Dict[str, Any]) -> bool:
+        record = slot.last_sent
+        # A failed command did not take effect, so the same value is resent
+        return (
+            record is not None
+            and record.status != "failed"
+            and record.parameters == parameters
+        )
+
+    async def _send(self, slot: SetpointSlot) -> None:
+        parameters, requested_at = slot.pending, slot.requested_at
+        slot.pending, slot.requested_at = None, []
+        assert parameters is not None
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot.next_allowed = now + self.interval
+        if self._unchanged(slot, parameters):
+            # Burst ended back on the value already sent
+            self.counts["unchanged"] += 1
+        else:
+            slot.last_sent = await self.dispatcher.send(
+                slot.command, parameters, slot.mission_id
+            )
+            self.counts["sent"] += 1
+        for requested in requested_at:
+            self.queue_latency.observe((now - requested) * 1e3)
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [s for s in self.slots.values() if s.pending is not None]
+            delay = (
+                min(slot.next_allowed for slot in pending) - loop.time()
+                if pending
+                else None
+            )
+            if delay is None or delay > 0:
+                # A new setpoint may be due before the earliest one here
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+            for slot in pending:
+                if slot.pending is not None and loop.time() >= slot.next_allowed:
+                    try:
+                        await self._send(slot)
+                    except Exception:
+                        logger.exception("Sending setpoint %s failed", slot.command)
+
+
+setpoints = SetpointCoalescer()
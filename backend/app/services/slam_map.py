@@ -0,0 +1,197 @@
+from .websocket_hub import WebSocketHub, hub
+from array import array
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+import asyncio
+import base64
+import zlib
+
+MAP_TOPIC = "slam.map"
+# Cells per tile side
+TILE_SIZE = 64
+# Occupancy values are int8: -1 unknown, 0..100 occupied probability
+UNKNOWN_CELL = 0xFF
+
+
+@dataclass
+class MapTile:
+    x: int
+    y: int
+    version: int
+    cells: bytes
+    # zlib-compressed cells, computed once and sent to every client
+    compressed: bytes
+
+    def encode(self) -> Dict[str, Any]:
+        return {
+            "x": self.x,
+            "y": self.y,
+            "version": self.version,
+            "data": base64.b64encode(self.compressed).decode(),
+        }
+
+
+class TiledMapStore:
+    """The SLAM occupancy grid, stored as fixed-size versioned tiles.
+
+    Tiles are aligned to the world grid (cell = coordinate / resolution), so
+    they stay put when the map grows or its origin moves. Each update is
+    diffed tile by tile and only changed tiles are published, compressed,
+    on ``slam.map``. Every tile records the map version it last changed
+    in, so a client at version N needs only tiles newer than N.
+    """
+
+    def __init__(
+        self,
+        hub: WebSocketHub = hub,
+        topic: str = MAP_TOPIC,
+        tile_size: int = TILE_SIZE,
+    ):
+        self.hub = hub
+        self.topic = topic
+        self.tile_size = tile_size
+        self.version = 0
+        # Versions before this were for a different resolution
+        self.reset_version = 0
+        self.resolution: Optional[float] = None
+        self.tiles: Dict[Tuple[int, int], MapTile] = {}
+        # Created on first use so it binds to the running loop
+        self._lock: Optional[asyncio.Lock] = None
+        hub.register_snapshot(topic, self.snapshot)
+
+    async def update(
+        self,
+        width: int,
+        height: int,
+        resolution: float,
+        origin_x: float,
+        origin_y: float,
+        data: Union[bytes, Sequence[int]],
+    ) -> Optional[Dict[str, Any]]:
+        """Apply a full occupancy grid (row-major, ``height`` rows).
+
+        Returns the published delta, or None when no tile changed. Tiling
+        and compression run in a worker thread; updates are applied one at
+        a time, in order.
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            reset = resolution != self.resolution
+            base_version = self.version
+            changed = await asyncio.to_thread(
+                self._changed_tiles,
+                width,
+                height,
+                resolution,
+                (origin_x, origin_y),
+                data,
+                {} if reset else self.tiles,
+                base_version + 1,
+            )
+            if reset:
+                self.tiles = {}
+                self.resolution = resolution
+                self.reset_version = base_version + 1
+            elif not changed:
+                return None
+            for tile in changed:
+                self.tiles[(tile.x, tile.y)] = tile
+            self.version = base_version + 1
+            delta = self._message(changed, base_version, reset)
+            self.hub.publish(self.topic, delta)
+            return delta
+
+    async def apply_message(self, message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Apply a ``nav_msgs/OccupancyGrid``-shaped map message."""
+        info = message["info"]
+        position = info["origin"]["position"]
+        return await self.update(
+            info["width"],
+            info["height"],
+            info["resolution"],
+            position["x"],
+            position["y"],
+            message["data"],
+        )
+
+    def snapshot(self, since_version: int = 0) -> Dict[str, Any]:
+        """Tiles changed after ``since_version``, or the whole map if the
+        client's version predates the last reset."""
+        reset = since_version < self.reset_version
+        tiles = [
+            tile
+            for tile in self.tiles.values()
+            if reset or tile.version > since_version
+        ]
+        return self._message(tiles, 0 if reset else since_version, reset)
+
+    def _changed_tiles(
+        self,
+        width: int,
+        height: int,
+        resolution: float,
+        position: Tuple[float, float],
+        data: Union[bytes, Sequence[int]],
+        tiles: Dict[Tuple[int, int], MapTile],
+        version: int,
+    ) -> List[MapTile]:
+        """The tiles of the grid that differ from ``tiles``, compressed."""
+        cells = data if isinstance(data, bytes) else array("b", data).tobytes()
+        if len(cells) != width * height:
+            raise ValueError(f"Expected {width * height} cells, got {len(cells)}")
+        size = self.tile_size
+        origin = (round(position[0] / resolution), round(position[1] / resolution))
+        changed: List[MapTile] = []
+        for ty in range(origin[1] // size, (origin[1] + height - 1) // size + 1):
+            for tx in range(origin[0] // size, (origin[0] + width - 1) // size + 1):
+                tile_cells = self._extract(cells, width, height, origin, tx, ty)
+                existing = tiles.get((tx, ty))
+                if existing is not None and existing.cells == tile_cells:
+                    continue
+                changed.append(
+                    MapTile(tx, ty, version, tile_cells, zlib.compress(tile_cells))
+                )
+        return changed
+
+    def _extract(
+        self,
+        cells: bytes,
+        width: int,
+        height: int,
+        origin: Tuple[int, int],
+        tx: int,
+        ty: int,
+    ) -> bytes:
+        size = self.tile_size
+        view = memoryview(cells)
+        tile = bytearray([UNKNOWN_CELL]) * (size * size)
+        # Grid columns covered by this tile
+        first_col = max(tx * size - origin[0], 0)
+        last_col = min((tx + 1) * size - origin[0], width)
+        offset = first_col + origin[0] - tx * size
+        for row in range(size):
+            grid_row = ty * size + row - origin[1]
+            if 0 <= grid_row < height:
+                start = grid_row * width
+                tile[
+                    row * size + offset : row * size + offset + last_col - first_col
+                ] = view[start + first_col : start + last_col]
+        return bytes(tile)
+
+    def _message(
+        self, tiles: List[MapTile], base_version: int, reset: bool
+    ) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            # Apply only on top of this version; otherwise refetch
+            "base_version": base_version,
+            "reset": reset,
+            "resolution": self.resolution,
+            "tile_size": self.tile_size,
+            "encoding": "zlib+base64",
+            "tiles": [tile.encode() for tile in tiles],
+        }
+
+
+map_store = TiledMapStore()
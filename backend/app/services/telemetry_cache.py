@@ -0,0 +1,60 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+import uuid
+
+
+@dataclass
+class CachedValue:
+    topic: str
+    seq: int
+    data: Any
+    timestamp: datetime
+
+
+class TelemetryCache:
+    """Latest value of every telemetry topic, kept in memory.
+
+    Each topic has its own sequence number, bumped on every update, and the
+    cache has a ``version`` bumped on any update. ETags combine these with
+    a per-process id so they never match across restarts.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._boot_id = uuid.uuid4().hex[:8]
+        self._values: Dict[str, CachedValue] = {}
+
+    def update(
+        self, topic: str, data: Any, timestamp: Optional[datetime] = None
+    ) -> CachedValue:
+        previous = self._values.get(topic)
+        self.version += 1
+        value = CachedValue(
+            topic=topic,
+            seq=previous.seq + 1 if previous else 1,
+            data=data,
+            timestamp=timestamp or datetime.now(timezone.utc),
+        )
+        self._values[topic] = value
+        return value
+
+    def get(self, topic: str) -> Optional[CachedValue]:
+        return self._values.get(topic)
+
+    def snapshot(self) -> Dict[str, CachedValue]:
+        return dict(self._values)
+
+    def etag(self, topic: Optional[str] = None) -> str:
+        """ETag for one topic, or for the whole cache when ``topic`` is None."""
+        if topic is None:
+            return f'W/"{self._boot_id}-{self.version}"'
+        value = self._values.get(topic)
+        return f'W/"{self._boot_id}-{topic}-{value.seq if value else 0}"'
+
+    def clear(self) -> None:
+        self._values.clear()
+        self.version += 1
+
+
+telemetry_cache = TelemetryCache()
@@ -0,0 +1,110 @@
+from ..database import async_session, run_in_session
+from .database_service import DatabaseService
+from .mission_archive import MissionArchive, TelemetryRow, mission_archive
+from datetime import datetime
+from typing import AsyncIterator, Optional, Sequence
+import asyncio
+import csv
+import io
+import json
+import zlib
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+CSV_COLUMNS = ["id", "timestamp", "topic", "data"]
+
+
+async def iter_telemetry(
+    mission_id: int,
+    topic: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    chunk_size: int = 1000,
+    session_factory=async_session,
+    archive: MissionArchive = mission_archive,
+) -> AsyncIterator[Sequence[TelemetryRow]]:
+    """Yield a mission's telemetry oldest-first in chunks of ``chunk_size``.
+
+    Every chunk is a separate short keyset query, so memory stays constant
+    and no read transaction is held open against the telemetry writer.
+    Archived missions are read from their Arrow files instead.
+    """
+    if archive.is_archived(mission_id):
+        chunks = archive.iter_range(mission_id, topic, start, end, chunk_size)
+        # Arrow reads block, so each chunk is read in a worker thread
+        while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+            yield chunk
+        return
+    after = None
+    while True:
+        rows = await run_in_session(
+            lambda session: DatabaseService(session).get_telemetry_range(
+                mission_id, topic, start, end, after=after, limit=chunk_size
+            ),
+            session_factory,
+        )
+        if rows:
+            yield rows
+        if len(rows) < chunk_size:
+            return
+        after = (rows[-1].timestamp, rows[-1].id)
+
+
+def _ndjson(rows: Sequence[TelemetryRow]) -> str:
+    return "".join(
+        json.dumps(
+            {
+                "id": row.id,
+                "timestamp": row.timestamp.isoformat(),
+                "topic": row.topic,
+                "data": row.payload,
+            }
+        )
+        + "\n"
+        for row in rows
+    )
+
+
+def _csv(rows: Sequence[TelemetryRow], header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(CSV_COLUMNS)
+    for row in rows:
+        writer.writerow(
+            [row.id, row.timestamp.isoformat(), row.topic, json.dumps(row.payload)]
+        )
+    return buffer.getvalue()
+
+
+async def export_telemetry(
+    mission_id: int,
+    fmt: str = "ndjson",
+    compress: bool = False,
+    topic: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    chunk_size: int = 1000,
+    session_factory=async_session,
+) -> AsyncIterator[bytes]:
+    """Encode a mission's telemetry as NDJSON or CSV, optionally gzipped."""
+    if fmt not in EXPORT_MEDIA_TYPES:
+        raise ValueError(f"Unknown export format {fmt!r}")
+    # wbits=31 writes a gzip header and trailer around the deflate stream
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def encode(text: str) -> bytes:
+        data = text.encode()
+        return compressor.compress(data) if compressor else data
+
+    if fmt == "csv":
+        header = encode(_csv([], header=True))
+        if header:
+            yield header
+    async for rows in iter_telemetry(
+        mission_id, topic, start, end, chunk_size, session_factory
+    ):
+        chunk = encode(_ndjson(rows) if fmt == "ndjson" else _csv(rows, header=False))
+        if chunk:
+            yield chunk
+    if compressor:
+        yield compressor.flush()
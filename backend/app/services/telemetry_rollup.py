@@ -0,0 +1,148 @@
+from ..database import as_utc_naive, flatten_payload
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+import math
+
+# Bucket widths, in seconds, maintained for every numeric payload field.
+# Each must be a multiple of the one before it.
+RESOLUTIONS = (1, 10, 60)
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def bucket_start(timestamp: datetime, width: int) -> datetime:
+    """Start of the ``width``-second bucket containing ``timestamp``."""
+    offset = (as_utc_naive(timestamp) - _EPOCH) // timedelta(seconds=width)
+    return _EPOCH + timedelta(seconds=offset * width)
+
+
+def numeric_fields(data: Any) -> Dict[str, float]:
+    """Finite numeric leaves of a payload, keyed by dotted path."""
+    return {
+        name: float(value)
+        for name, value in flatten_payload(data).items()
+        if isinstance(value, (int, float))
+        and not isinstance(value, bool)
+        and math.isfinite(value)
+    }
+
+
+@dataclass
+class Bucket:
+    bucket: datetime
+    count: int
+    min: float
+    max: float
+    sum: float
+    last: float
+    last_time: datetime
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count
+
+    def add(self, value: float, timestamp: datetime) -> None:
+        self.count += 1
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.sum += value
+        if timestamp >= self.last_time:
+            self.last, self.last_time = value, timestamp
+
+    def merge(self, other: Any) -> None:
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.sum += other.sum
+        if other.last_time >= self.last_time:
+            self.last, self.last_time = other.last, other.last_time
+
+
+def compute_rollups(
+    rows: Iterable[Dict[str, Any]], resolutions: Sequence[int] = RESOLUTIONS
+) -> List[Dict[str, Any]]:
+    """Aggregate a batch of telemetry rows into rollup rows for upserting.
+
+    ``rows`` are the dicts passed to ``log_telemetry_batch``. Samples are
+    bucketed once at the finest resolution; coarser buckets are merged from
+    those, which is much cheaper than bucketing every sample again.
+    """
+    finest = resolutions[0]
+    buckets: Dict[Tuple[int, str, str, datetime], Bucket] = {}
+    for row in rows:
+        timestamp = as_utc_naive(row["timestamp"])
+        seconds = int((timestamp - _EPOCH).total_seconds())
+        start = _EPOCH + timedelta(seconds=seconds - seconds % finest)
+        for field, value in numeric_fields(row["data"]).items():
+            key = (row["mission_id"], row["topic"], field, start)
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = Bucket(start, 1, value, value, value, value, timestamp)
+            else:
+                bucket.add(value, timestamp)
+
+    rollups = []
+    for resolution in resolutions:
+        if resolution != finest:
+            coarser: Dict[Tuple[int, str, str, datetime], Bucket] = {}
+            for (mission_id, topic, field, _), fine in buckets.items():
+                start = bucket_start(fine.bucket, resolution)
+                key = (mission_id, topic, field, start)
+                if key in coarser:
+                    coarser[key].merge(fine)
+                else:
+                    coarser[key] = replace(fine, bucket=start)
+            buckets = coarser
+        rollups.extend(
+            {
+                "mission_id": mission_id,
+                "topic": topic,
+                "field": field,
+                "resolution": resolution,
+                "bucket": start,
+                "count": b.count,
+                "min": b.min,
+                "max": b.max,
+                "sum": b.sum,
+                "last": b.last,
+                "last_time": b.last_time,
+            }
+            for (mission_id, topic, field, start), b in buckets.items()
+        )
+    return rollups
+
+
+def choose_resolution(
+    start: datetime, end: datetime, max_points: int
+) -> Tuple[int, int]:
+    """Pick the stored resolution to read and the bucket width to return.
+
+    The width is the smallest multiple of a stored resolution that covers
+    ``[start, end)`` in at most ``max_points`` buckets; the resolution is
+    the coarsest stored one that divides it, so the fewest rows are read.
+    """
+    span = max((end - start).total_seconds(), 1.0)
+    width = max(1, math.ceil(span / max_points))
+    resolution = max(r for r in RESOLUTIONS if r <= width)
+    width = math.ceil(width / resolution) * resolution
+    # Aligning start down to a bucket edge can add one bucket
+    while (end - bucket_start(start, width)) / timedelta(seconds=width) > max_points:
+        width += resolution
+    return resolution, width
+
+
+def downsample(rows: Iterable[Any], width: int) -> List[Bucket]:
+    """Merge oldest-first rollup rows into ``width``-second buckets."""
+    merged: List[Bucket] = []
+    for row in rows:
+        start = bucket_start(row.bucket, width)
+        if merged and merged[-1].bucket == start:
+            merged[-1].merge(row)
+        else:
+            merged.append(
+                Bucket(
+                    start, row.count, row.min, row.max, row.sum, row.last, row.last_time
+                )
+            )
+    return merged
@@ -0,0 +1,184 @@
+from ..database import async_session
+from .database_service import DatabaseService
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FlushMetrics:
+    rows: int
+    latency_s: float
+    pending: int
+    timestamp: datetime
+
+
+class TelemetryWriter:
+    """Buffers telemetry samples in memory and writes them in batches.
+
+    Rows are flushed with one multi-row insert per transaction as soon as
+    ``batch_size`` rows are waiting or ``flush_interval`` seconds have
+    passed, whichever comes first. ``submit`` blocks once ``max_pending``
+    rows are buffered so producers slow down instead of growing memory.
+    """
+
+    def __init__(
+        self,
+        session_factory=async_session,
+        batch_size: int = 500,
+        flush_interval: float = 0.5,
+        max_pending: int = 10_000,
+        metrics_history: int = 100,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.metrics: Deque[FlushMetrics] = deque(maxlen=metrics_history)
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.flush_count = 0
+        self._buffer: List[Dict[str, Any]] = []
+        self._batch_ready: Optional[asyncio.Event] = None
+        self._not_full: Optional[asyncio.Event] = None
+        self._progress: Optional[asyncio.Event] = None
+        self._submitted = 0
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    async def start(self) -> None:
+        if self._running:
+            return
+        # Events are created here so they bind to the running loop
+        self._batch_ready = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        self._progress = asyncio.Event()
+        self._running = True
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background task after flushing everything buffered."""
+        if not self._running:
+            return
+        self._running = False
+        assert self._batch_ready is not None and self._task is not None
+        self._batch_ready.set()
+        await self._task
+        self._task = None
+
+    async def submit(
+        self,
+        mission_id: int,
+        topic: str,
+        data: dict,
+        timestamp: Optional[datetime] = None,
+    ) -> None:
+        """Queue a telemetry sample, waiting while the buffer is full."""
+        if not self._running:
+            raise RuntimeError("TelemetryWriter is not running")
+        assert self._not_full is not None and self._batch_ready is not None
+        while len(self._buffer) >= self.max_pending:
+            self._not_full.clear()
+            await self._not_full.wait()
+            if not self._running:
+                raise RuntimeError("TelemetryWriter stopped while waiting")
+        self._buffer.append(
+            {
+                "mission_id": mission_id,
+                "topic": topic,
+                "data": data,
+                "timestamp": timestamp or datetime.now(timezone.utc),
+            }
+        )
+        self._submitted += 1
+        if len(self._buffer) >= self.batch_size:
+            self._batch_ready.set()
+
+    async def flush(self) -> None:
+        """Wait until every sample submitted so far has been written."""
+        if not self._running:
+            return
+        assert self._batch_ready is not None and self._progress is not None
+        target = self._submitted
+        while self.rows_written + self.rows_dropped < target:
+            self._progress.clear()
+            self._batch_ready.set()
+            await self._progress.wait()
+
+    def stats(self) -> Dict[str, Any]:
+        last = self.metrics[-1] if self.metrics else None
+        return {
+            "pending": self.pending,
+            "rows_written": self.rows_written,
+            "rows_dropped": self.rows_dropped,
+            "flush_count": self.flush_count,
+            "last_flush_rows": last.rows if last else 0,
+            "last_flush_latency_s": last.latency_s if last else 0.0,
+        }
+
+    async def _run(self) -> None:
+        assert self._batch_ready is not None and self._not_full is not None
+        while True:
+            if self._running:
+                try:
+                    await asyncio.wait_for(
+                        self._batch_ready.wait(), timeout=self.flush_interval
+                    )
+                except asyncio.TimeoutError:
+                    pass
+            batch = self._buffer[: self.batch_size]
+            del self._buffer[: self.batch_size]
+            if len(self._buffer) < self.batch_size:
+                self._batch_ready.clear()
+            self._not_full.set()
+            if batch:
+                await self._write(batch)
+            elif not self._running:
+                return
+
+    async def _write(self, batch: List[Dict[str, Any]]) -> None:
+        assert self._progress is not None
+        try:
+            await self._write_batch(batch)
+        finally:
+            self._progress.set()
+
+    async def _write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        started = time.perf_counter()
+        try:
+            async with self.session_factory() as session:
+                await DatabaseService(session).log_telemetry_batch(batch)
+        except Exception:
+            self.rows_dropped += len(batch)
+            logger.exception("Failed to write %d telemetry rows", len(batch))
+            return
+        latency = time.perf_counter() - started
+        self.rows_written += len(batch)
+        self.flush_count += 1
+        self.metrics.append(
+            FlushMetrics(
+                rows=len(batch),
+                latency_s=latency,
+                pending=len(self._buffer),
+                timestamp=datetime.now(timezone.utc),
+            )
+        )
+        logger.debug("Flushed %d telemetry rows in %.1f ms", len(batch), latency * 1e3)
+
+
+telemetry_writer = TelemetryWriter()
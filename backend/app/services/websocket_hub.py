@@ -0,0 +1,567 @@
+from fastapi import WebSocket
+from ..database import encode_payload
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+import asyncio
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ("drop_oldest", "conflate")
+# json is sent as text frames, msgpack as binary frames
+ENCODINGS = ("json", "msgpack")
+# Delta clients get a full message at least this often per topic
+KEYFRAME_INTERVAL = int(os.getenv("WS_KEYFRAME_INTERVAL", "50"))
+# Sent states per topic kept until the client acknowledges one
+DELTA_HISTORY = 32
+# Above this fraction of changed fields a full message is smaller
+DELTA_MAX_CHANGED = 0.5
+
+# Subscriber counters that the hub reports as totals over all clients
+CLIENT_COUNTERS = ("dropped", "decimated", "bytes_sent")
+
+Payload = Union[str, bytes]
+
+
+def topic_patterns(topic: str) -> List[str]:
+    """Subscription keys that match ``topic``, most specific first.
+
+    ``telemetry.vescs`` is matched by itself, ``telemetry.all``,
+    ``telemetry.*`` and ``*``.
+    """
+    patterns = [topic]
+    parts = topic.split(".")
+    for i in range(len(parts) - 1, 0, -1):
+        prefix = ".".join(parts[:i])
+        patterns.append(f"{prefix}.all")
+        patterns.append(f"{prefix}.*")
+    patterns.append("*")
+    return patterns
+
+
+def _valid_rate(value: Any) -> bool:
+    if value is None:
+        return True
+    return (
+        isinstance(value, (int, float))
+        and not isinstance(value, bool)
+        and 0 < value < float("inf")
+    )
+
+
+# Leaf values by dotted path, and the length of every list by its path
+_Flat = Tuple[Dict[str, Any], Dict[str, int]]
+
+
+def _flatten(data: Any, prefix: str, leaves: Dict[str, Any], lists: Dict[str, int]):
+    """Flatten dicts and lists into dotted paths; list items are addressed
+    by index, e.g. ``checks.2.status``. Empty containers are leaves."""
+    if isinstance(data, dict) and data:
+        items = [(str(key), value) for key, value in data.items()]
+    elif isinstance(data, list) and data:
+        lists[prefix] = len(data)
+        items = [(str(index), value) for index, value in enumerate(data)]
+    else:
+        leaves[prefix] = data
+        return
+    for key, value in items:
+        _flatten(value, f"{prefix}.{key}" if prefix else key, leaves, lists)
+
+
+def _nested(paths: Iterable[str]) -> bool:
+    """Whether one of ``paths`` lies inside another, as when a value turns
+    into a dict or back."""
+    paths = set(paths)
+    for path in paths:
+        parts = path.split(".")
+        if any(".".join(parts[:i]) in paths for i in range(1, len(parts))):
+            return True
+    return False
+
+
+class _TopicDelta:
+    __slots__ = ("seq", "acked_seq", "acked", "sent", "since_keyframe")
+
+    def __init__(self):
+        self.seq = 0
+        self.acked_seq = 0
+        self.acked: Optional[_Flat] = None
+        self.sent: "OrderedDict[int, _Flat]" = OrderedDict()
+        self.since_keyframe = 0
+
+
+class DeltaEncoder:
+    """Field-level deltas for one client.
+
+    Every message on a topic gets the next ``seq``. Once the client has
+    acknowledged a message, later ones carry only the fields that differ
+    from it: ``base`` is the acknowledged seq, ``set`` maps changed dotted
+    field paths to their values and ``unset`` lists removed paths. Paths
+    go into lists by index. A delta is always relative to what the client
+    confirmed it has, so messages dropped from the send queue never break
+    decoding. A full message (``data``) is sent until the first ack, for
+    data that is not a non-empty dict, every ``keyframe_interval``
+    messages, and when more than ``DELTA_MAX_CHANGED`` of the fields
+    changed, as they do for noisy sensor streams. It is also sent when the
+    shape changed: a list changed length, or a value turned into a
+    container or back. So a delta only ever unsets dict keys and sets
+    values at paths whose lists already exist.
+    """
+
+    def __init__(
+        self, keyframe_interval: int = KEYFRAME_INTERVAL, history: int = DELTA_HISTORY
+    ):
+        self.keyframe_interval = keyframe_interval
+        self.history = history
+        self.topics: Dict[str, _TopicDelta] = {}
+
+    def encode(self, topic: str, data: Any, timestamp: str) -> Dict[str, Any]:
+        state = self.topics.get(topic)
+        if state is None:
+            state = self.topics[topic] = _TopicDelta()
+        state.seq += 1
+        message: Dict[str, Any] = {
+            "topic": topic,
+            "seq": state.seq,
+            "timestamp": timestamp,
+        }
+        if not isinstance(data, dict) or not data:
+            message["data"] = data
+            return message
+        flat, lists = {}, {}
+        _flatten(data, "", flat, lists)
+        state.sent[state.seq] = (flat, lists)
+        if len(state.sent) > self.history:
+            state.sent.popitem(last=False)
+        if state.acked is None or state.since_keyframe + 1 >= self.keyframe_interval:
+            state.since_keyframe = 0
+            message["data"] = data
+            return message
+        acked, acked_lists = state.acked
+        changed = {
+            path: value
+            for path, value in flat.items()
+            if path not in acked or acked[path] != value
+        }
+        unset = [path for path in acked if path not in flat]
+        if (
+            lists != acked_lists
+            or len(changed) + len(unset) > DELTA_MAX_CHANGED * len(flat)
+            or _nested([*changed, *unset])
+        ):
+            state.since_keyframe = 0
+            message["data"] = data
+            return message
+        state.since_keyframe += 1
+        message["base"] = state.acked_seq
+        message["set"] = changed
+        if unset:
+            message["unset"] = unset
+        return message
+
+    def ack(self, topic: str, seq: int) -> bool:
+        """Record that the client has message ``seq`` of ``topic``; False if
+        it is unknown or older than the last ack."""
+        state = self.topics.get(topic)
+        if state is None or seq <= state.acked_seq:
+            return False
+        flat = state.sent.get(seq)
+        if flat is None:
+            return False
+        state.acked, state.acked_seq = flat, seq
+        while state.sent and next(iter(state.sent)) <= seq:
+            state.sent.popitem(last=False)
+        return True
+
+
+class Subscriber:
+    """A connected client with its own bounded send queue.
+
+    ``drop_oldest`` discards the oldest queued message when the queue is
+    full. ``conflate`` keeps at most one pending message per topic, so a
+    slow client always receives the latest value of each topic.
+
+    Topics can also be capped at a maximum rate: messages arriving faster
+    are held back and only the latest is sent once the interval has
+    passed, so the client still ends on the final value.
+
+    Messages are sent as ``encoding`` (JSON text or MessagePack binary
+    frames), as deltas if ``delta`` is set. Protocol replies are always
+    JSON text.
+    """
+
+    def __init__(
+        self,
+        websocket: Any,
+        max_queue: int = 256,
+        policy: str = "drop_oldest",
+        encoding: str = "json",
+        delta: bool = False,
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy {policy!r}, expected one of {POLICIES}")
+        if encoding not in ENCODINGS:
+            raise ValueError(
+                f"Unknown encoding {encoding!r}, expected one of {ENCODINGS}"
+            )
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.policy = policy
+        self.encoding = encoding
+        self.delta: Optional[DeltaEncoder] = DeltaEncoder() if delta else None
+        self.topics: Set[str] = set()
+        self.sent = 0
+        self.bytes_sent = 0
+        self.dropped = 0
+        self._queue: Deque[Payload] = deque()
+        self._latest: "OrderedDict[str, Payload]" = OrderedDict()
+        self._control: Deque[str] = deque()
+        self._wakeup = asyncio.Event()
+        # Subscription pattern -> minimum seconds between messages
+        self.intervals: Dict[str, float] = {}
+        self.decimated = 0
+        self._next_due: Dict[str, float] = {}
+        self._held: Dict[str, Payload] = {}
+        self._release_timers: Dict[str, asyncio.TimerHandle] = {}
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue) + len(self._latest)
+
+    def enqueue(self, topic: str, payload: Payload) -> None:
+        if self.policy == "conflate":
+            if topic in self._latest:
+                self.dropped += 1
+            elif len(self._latest) >= self.max_queue:
+                self._latest.popitem(last=False)
+                self.dropped += 1
+            self._latest[topic] = payload
+        else:
+            if len(self._queue) >= self.max_queue:
+                self._queue.popleft()
+                self.dropped += 1
+            self._queue.append(payload)
+        self._wakeup.set()
+
+    def set_max_rate(self, topics: Iterable[str], max_rate: Optional[float]) -> None:
+        """Cap ``topics`` (subscription patterns) at ``max_rate`` messages
+        per second, or remove the cap with None."""
+        for topic in topics:
+            if max_rate is None:
+                self.intervals.pop(topic, None)
+            else:
+                self.intervals[topic] = 1.0 / max_rate
+
+    def _interval(self, topic: str) -> Optional[float]:
+        for pattern in topic_patterns(topic):
+            if pattern in self.intervals:
+                return self.intervals[pattern]
+        return None
+
+    def deliver(self, topic: str, payload: Payload) -> None:
+        """Queue a published message, applying the topic's rate cap."""
+        interval = self._interval(topic) if self.intervals else None
+        if interval is not None:
+            loop = asyncio.get_running_loop()
+            due = self._next_due.get(topic, 0.0)
+            if loop.time() < due:
+                if topic in self._held:
+                    self.decimated += 1
+                else:
+                    self._release_timers[topic] = loop.call_at(
+                        due, self._release, topic
+                    )
+                self._held[topic] = payload
+                return
+            self._next_due[topic] = loop.time() + interval
+        self.enqueue(topic, payload)
+
+    def _release(self, topic: str) -> None:
+        self._release_timers.pop(topic, None)
+        payload = self._held.pop(topic, None)
+        if payload is None:
+            return
+        interval = self._interval(topic)
+        if interval is not None:
+            self._next_due[topic] = asyncio.get_running_loop().time() + interval
+        self.enqueue(topic, payload)
+
+    def forget_unsubscribed(self) -> None:
+        """Drop held messages and rate state of topics that no longer match
+        a subscription, so nothing is sent for them after unsubscribing."""
+        for topic in list(self._next_due):
+            if self.topics.intersection(topic_patterns(topic)):
+                continue
+            timer = self._release_timers.pop(topic, None)
+            if timer is not None:
+                timer.cancel()
+            self._held.pop(topic, None)
+            del self._next_due[topic]
+
+    def send_control(self, message: Dict[str, Any]) -> None:
+        """Queue a protocol reply; these are never dropped or conflated."""
+        self._control.append(json.dumps(message))
+        self._wakeup.set()
+
+    def _next(self) -> Optional[Payload]:
+        if self._control:
+            return self._control.popleft()
+        if self._queue:
+            return self._queue.popleft()
+        if self._latest:
+            return self._latest.popitem(last=False)[1]
+        return None
+
+    async def run_sender(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            payload = self._next()
+            while payload is not None:
+                if isinstance(payload, bytes):
+                    await self.websocket.send_bytes(payload)
+                else:
+                    await self.websocket.send_text(payload)
+                self.sent += 1
+                self.bytes_sent += len(payload)
+                payload = self._next()
+
+
+class WebSocketHub:
+    """In-process topic broker for the ``/api/v1/ws`` endpoint.
+
+    ``publish`` never awaits a client: it serializes the message once and
+    appends the same string to each matching subscriber's queue, and each
+    subscriber has its own sender task draining that queue.
+    """
+
+    def __init__(self, max_queue: int = 256, policy: str = "drop_oldest"):
+        self.max_queue = max_queue
+        self.policy = policy
+        self.published = 0
+        self._subscribers: Set[Subscriber] = set()
+        self._by_pattern: Dict[str, Set[Subscriber]] = {}
+        self._snapshots: Dict[str, Callable[[], Any]] = {}
+        # Counters of disconnected clients, so the totals never go down
+        self._removed = {counter: 0 for counter in CLIENT_COUNTERS}
+        # Called with every published message, subscribed or not
+        self.taps: List[Callable[[str, Any, Optional[datetime]], None]] = []
+
+    @property
+    def client_count(self) -> int:
+        return len(self._subscribers)
+
+    def add(self, subscriber: Subscriber) -> None:
+        self._subscribers.add(subscriber)
+
+    def remove(self, subscriber: Subscriber) -> None:
+        self.unsubscribe(subscriber, list(subscriber.topics))
+        if subscriber in self._subscribers:
+            self._subscribers.discard(subscriber)
+            for counter in CLIENT_COUNTERS:
+                self._removed[counter] += getattr(subscriber, counter)
+
+    def subscribe(self, subscriber: Subscriber, topics: Iterable[str]) -> None:
+        for topic in topics:
+            subscriber.topics.add(topic)
+            self._by_pattern.setdefault(topic, set()).add(subscriber)
+
+    def unsubscribe(self, subscriber: Subscriber, topics: Iterable[str]) -> None:
+        for topic in topics:
+            subscriber.topics.discard(topic)
+            subscribers = self._by_pattern.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._by_pattern[topic]
+        subscriber.forget_unsubscribed()
+
+    def register_snapshot(self, topic: str, provider: Callable[[], Any]) -> None:
+        """Send ``provider()`` to every new subscriber of ``topic`` first.
+
+        For topics published as deltas, so a client joining late starts
+        from the full state instead of waiting for it to be rebuilt.
+        """
+        self._snapshots[topic] = provider
+
+    def send_snapshots(self, subscriber: Subscriber, topics: Iterable[str]) -> None:
+        requested = set(topics)
+        for topic, provider in self._snapshots.items():
+            if requested.intersection(topic_patterns(topic)):
+                # Control messages are never dropped or conflated
+                subscriber.send_control(
+                    {
+                        "topic": topic,
+                        "data": provider(),
+                        "timestamp": datetime.now(timezone.utc).isoformat(),
+                    }
+                )
+
+    def subscribers_for(self, topic: str) -> Set[Subscriber]:
+        matched: Set[Subscriber] = set()
+        for pattern in topic_patterns(topic):
+            subscribers = self._by_pattern.get(pattern)
+            if subscribers:
+                matched |= subscribers
+        return matched
+
+    def publish(
+        self, topic: str, data: Any, timestamp: Optional[datetime] = None
+    ) -> int:
+        """Fan a message out to every subscriber of ``topic``.
+
+        Returns the number of subscribers the message was queued for.
+        """
+        for tap in self.taps:
+            tap(topic, data, timestamp)
+        subscribers = self.subscribers_for(topic)
+        if not subscribers:
+            return 0
+        stamp = (timestamp or datetime.now(timezone.utc)).isoformat()
+        message = {"topic": topic, "data": data, "timestamp": stamp}
+        # Encoded once per encoding; deltas once per delta subscriber
+        payloads: Dict[str, Payload] = {}
+        for subscriber in subscribers:
+            if subscriber.delta is not None:
+                delta = subscriber.delta.encode(topic, data, stamp)
+                subscriber.deliver(topic, encode_payload(delta, subscriber.encoding))
+                continue
+            payload = payloads.get(subscriber.encoding)
+            if payload is None:
+                payload = payloads[subscriber.encoding] = encode_payload(
+                    message, subscriber.encoding
+                )
+            subscriber.deliver(topic, payload)
+        self.published += 1
+        return len(subscribers)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "clients": self.client_count,
+            "published": self.published,
+            "queue_depth": sum(s.queue_depth for s in self._subscribers),
+            "max_queue_depth": max(
+                (s.queue_depth for s in self._subscribers), default=0
+            ),
+            # Totals since startup, including disconnected clients
+            **{
+                counter: total + sum(getattr(s, counter) for s in self._subscribers)
+                for counter, total in self._removed.items()
+            },
+        }
+
+    def handle_message(self, subscriber: Subscriber, text: str) -> None:
+        """Apply one client protocol message."""
+        try:
+            message = json.loads(text)
+            action = message["action"]
+        except (ValueError, TypeError, KeyError):
+            subscriber.send_control({"type": "error", "message": "Invalid message"})
+            return
+        topics = message.get("topics", [])
+        if action in ("subscribe", "unsubscribe") and (
+            not isinstance(topics, list)
+            or not all(isinstance(topic, str) for topic in topics)
+        ):
+            subscriber.send_control(
+                {"type": "error", "message": "topics must be a list of strings"}
+            )
+        elif action == "subscribe" and not _valid_rate(message.get("max_rate")):
+            subscriber.send_control(
+                {"type": "error", "message": "max_rate must be a positive number"}
+            )
+        elif action == "subscribe":
+            self.subscribe(subscriber, topics)
+            subscriber.set_max_rate(topics, message.get("max_rate"))
+            reply: Dict[str, Any] = {
+                "type": "subscribed",
+                "topics": sorted(subscriber.topics),
+            }
+            if subscriber.intervals:
+                reply["max_rates"] = {
+                    topic: 1.0 / interval
+                    for topic, interval in sorted(subscriber.intervals.items())
+                }
+            subscriber.send_control(reply)
+            self.send_snapshots(subscriber, topics)
+        elif action == "unsubscribe":
+            self.unsubscribe(subscriber, topics)
+            subscriber.set_max_rate(topics, None)
+            subscriber.send_control(
+                {"type": "unsubscribed", "topics": sorted(subscriber.topics)}
+            )
+        elif action == "ack":
+            self._ack(subscriber, message.get("seqs"))
+        elif action == "ping":
+            subscriber.send_control({"type": "pong"})
+        else:
+            subscriber.send_control(
+                {"type": "error", "message": f"Unknown action {action!r}"}
+            )
+
+    def _ack(self, subscriber: Subscriber, seqs: Any) -> None:
+        # Acks are frequent, so only errors are answered
+        if subscriber.delta is None:
+            subscriber.send_control(
+                {"type": "error", "message": "ack needs a delta connection"}
+            )
+        elif not isinstance(seqs, dict) or not all(
+            isinstance(seq, int) and not isinstance(seq, bool) for seq in seqs.values()
+        ):
+            subscriber.send_control(
+                {"type": "error", "message": "seqs must map topics to integers"}
+            )
+        else:
+            for topic, seq in seqs.items():
+                subscriber.delta.ack(topic, seq)
+
+    async def serve(
+        self,
+        websocket: WebSocket,
+        policy: Optional[str] = None,
+        encoding: str = "json",
+        delta: bool = False,
+    ) -> None:
+        """Run the protocol for an accepted WebSocket until it disconnects."""
+        subscriber = Subscriber(
+            websocket, self.max_queue, policy or self.policy, encoding, delta
+        )
+        self.add(subscriber)
+        sender = asyncio.create_task(subscriber.run_sender())
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                text = message.get("text")
+                if text is None:
+                    # Client messages are JSON text whatever the encoding
+                    await websocket.close(code=1003, reason="Send JSON text frames")
+                    break
+                self.handle_message(subscriber, text)
+        finally:
+            self.remove(subscriber)
+            sender.cancel()
+            try:
+                await sender
+            except asyncio.CancelledError:
+                pass
+            except Exception:
+                logger.debug("WebSocket sender ended with an error", exc_info=True)
+
+
+hub = WebSocketHub()
@@ -0,0 +1,220 @@
+import pytest
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Any, List, Tuple
+from ...database import async_session, init_db, get_db
+from ...services.alerts import ALERT_TOPIC, AlertEngine, AlertRule
+from ...services.database_service import DatabaseService
+from ...services.websocket_hub import WebSocketHub
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class RecordingHub(WebSocketHub):
+    def __init__(self):
+        super().__init__()
+        self.messages: List[Tuple[str, Any]] = []
+
+    def publish(self, topic, data, timestamp=None):
+        self.messages.append((topic, data))
+        return super().publish(topic, data, timestamp)
+
+    def events(self) -> List[str]:
+        return [data["event"] for topic, data in self.messages if topic == ALERT_TOPIC]
+
+
+def test_rule_validation():
+    with pytest.raises(ValueError):
+        AlertRule(id="r", kind="threshold", topic="telemetry.vescs")
+    with pytest.raises(ValueError):
+        AlertRule(id="r", kind="stale", topic="telemetry.vescs")
+    with pytest.raises(ValueError):
+        AlertRule(id="r", kind="stale", topic="telemetry.*", timeout=1)
+    with pytest.raises(ValueError):
+        AlertRule(id="r", kind="threshold", topic="t", field="x", value=5, clear=6)
+    rule = AlertRule(id="r", kind="threshold", topic="t", field="a.b", op="lt")
+    assert rule.path == ("a", "b") and rule.clear == rule.value
+
+
+@pytest.mark.asyncio
+async def test_threshold_hysteresis():
+    hub = RecordingHub()
+    engine = AlertEngine(hub=hub)
+    engine.set_rules(
+        [
+            AlertRule(
+                id="hot",
+                kind="threshold",
+                topic="telemetry.vescs",
+                field="motor.temp",
+                value=80,
+                clear=70,
+                severity="critical",
+            )
+        ]
+    )
+
+    for i, temp in enumerate([60, 85, 79, 90, 71, 69, 75]):
+        engine.evaluate(
+            "telemetry.vescs",
+            {"motor": {"temp": temp}},
+            T0 + timedelta(seconds=i),
+            mission_id=3,
+        )
+        if i == 3:
+            assert list(engine.active) == [("hot", "telemetry.vescs")]
+
+    # Raised at 85, held through 79/90/71, cleared at 69, not re-raised at 75
+    assert hub.events() == ["raised", "cleared"]
+    raised = hub.messages[0][1]["alert"]
+    assert raised["value"] == 85 and raised["severity"] == "critical"
+    assert raised["mission_id"] == 3
+    assert engine.active == {}
+    assert engine.stats()["unwritten"] == 1
+
+
+@pytest.mark.asyncio
+async def test_rate_of_change_uses_sample_timestamps():
+    hub = RecordingHub()
+    engine = AlertEngine(hub=hub)
+    engine.set_rules(
+        [AlertRule(id="jump", kind="rate", topic="telemetry.*", field="v", value=10)]
+    )
+
+    engine.evaluate("telemetry.encoders", {"v": 0}, T0)
+    # 5 per second
+    engine.evaluate("telemetry.encoders", {"v": 10}, T0 + timedelta(seconds=2))
+    assert engine.active == {}
+    # 20 per second
+    engine.evaluate("telemetry.encoders", {"v": 30}, T0 + timedelta(seconds=3))
+    alert = engine.active[("jump", "telemetry.encoders")]
+    assert alert.topic == "telemetry.encoders" and alert.value == 20
+
+
+@pytest.mark.asyncio
+async def test_wildcard_rules_track_each_topic():
+    hub = RecordingHub()
+    engine = AlertEngine(hub=hub)
+    engine.set_rules(
+        [
+            AlertRule(id="jump", kind="rate", topic="telemetry.*", field="v", value=10),
+            AlertRule(id="hot", kind="threshold", topic="telemetry.*", field="t"),
+        ]
+    )
+
+    # Interleaved topics: no rate is computed across them
+    engine.evaluate("telemetry.a", {"v": 0, "t": 1}, T0)
+    engine.evaluate("telemetry.b", {"v": 100, "t": 0}, T0 + timedelta(seconds=1))
+    engine.evaluate("telemetry.a", {"v": 5, "t": 1}, T0 + timedelta(seconds=2))
+    engine.evaluate("telemetry.b", {"v": 105, "t": 0}, T0 + timedelta(seconds=3))
+    assert list(engine.active) == [("hot", "telemetry.a")]
+
+    # A healthy sample on one topic does not clear another's alert
+    engine.evaluate("telemetry.b", {"t": 2}, T0 + timedelta(seconds=4))
+    engine.evaluate("telemetry.a", {"t": 0}, T0 + timedelta(seconds=5))
+    assert list(engine.active) == [("hot", "telemetry.b")]
+    assert hub.events() == ["raised", "raised", "cleared"]
+
+
+@pytest.mark.asyncio
+async def test_rules_are_indexed_by_topic():
+    engine = AlertEngine(hub=RecordingHub())
+    engine.set_rules(
+        [
+            AlertRule(id=f"r{i}", kind="threshold", topic=f"topic.{i}", field="x")
+            for i in range(100)
+        ]
+    )
+
+    engine.evaluate("topic.7", {"x": 1}, T0)
+    engine.evaluate("other", {"x": 1}, T0)
+
+    assert engine.evaluations == 1
+    assert list(engine.active) == [("r7", "topic.7")]
+
+
+@pytest.mark.asyncio
+async def test_stale_topic_raises_and_clears():
+    hub = RecordingHub()
+    engine = AlertEngine(hub=hub)
+    engine.set_rules(
+        [AlertRule(id="quiet", kind="stale", topic="telemetry.rgbd", timeout=0.05)]
+    )
+
+    engine.check_stale()
+    await asyncio.sleep(0.08)
+    engine.check_stale()
+    assert engine.active[("quiet", "telemetry.rgbd")].value is None
+
+    engine.evaluate("telemetry.rgbd", {}, T0)
+    engine.check_stale()
+    assert hub.events() == ["raised", "cleared"]
+
+
+@pytest.mark.asyncio
+async def test_acknowledge_and_persist():
+    await init_db()
+    engine = AlertEngine(hub=RecordingHub())
+    engine.set_rules(
+        [
+            AlertRule(id="a", kind="threshold", topic="persist.t", field="x"),
+            AlertRule(id="b", kind="threshold", topic="persist.t", field="y"),
+        ]
+    )
+    await engine.start()
+    engine.evaluate("persist.t", {"x": 1, "y": 1}, T0)
+    alert = engine.active[("a", "persist.t")]
+    assert engine.acknowledge(alert.id) is alert
+    assert alert.acknowledged_at is not None
+    assert engine.acknowledge("missing") is None
+    engine.evaluate("persist.t", {"x": 0}, T0 + timedelta(seconds=1))
+    await engine.stop()
+
+    async for session in get_db():
+        logs = await DatabaseService(session).get_alert_logs(topic="persist.t")
+        break
+    else:
+        raise AssertionError("no session")
+    by_rule = {
+        log.rule_id: log for log in logs if log.raised_at == T0.replace(tzinfo=None)
+    }
+    # Cleared alert and the one still active at shutdown
+    assert by_rule["a"].cleared_at == (T0 + timedelta(seconds=1)).replace(tzinfo=None)
+    assert by_rule["a"].acknowledged_at is not None
+    assert by_rule["b"].cleared_at is None
+    assert engine.rows_written == 2
+
+
+@pytest.mark.asyncio
+async def test_alert_written_at_shutdown_is_updated_when_it_clears():
+    await init_db()
+    engine = AlertEngine(hub=RecordingHub())
+    engine.set_rules(
+        [AlertRule(id="r", kind="threshold", topic="restart.t", field="x")]
+    )
+    await engine.start()
+    engine.evaluate("restart.t", {"x": 1}, T0)
+    alert_id = engine.active[("r", "restart.t")].id
+    await engine.stop()
+
+    # Writing the same alert again once it has cleared updates its row
+    await engine.start()
+    engine.evaluate("restart.t", {"x": 0}, T0 + timedelta(seconds=1))
+
+    def failing_session():
+        raise OSError("database is gone")
+
+    engine.session_factory = failing_session
+    await engine.flush()
+    assert engine.stats()["unwritten"] == 1 and engine.write_errors == 1
+    engine.session_factory = async_session
+    await engine.stop()
+    assert engine.stats()["unwritten"] == 0
+
+    async for session in get_db():
+        logs = await DatabaseService(session).get_alert_logs(rule_id="r")
+        break
+    else:
+        raise AssertionError("no session")
+    [log] = [log for log in logs if log.alert_id == alert_id]
+    assert log.cleared_at == (T0 + timedelta(seconds=1)).replace(tzinfo=None)
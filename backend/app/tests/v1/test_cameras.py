@@ -1,3 +1,41 @@
+import pytest
+import pytest_asyncio
+import asyncio
+from datetime import datetime, timezone
+from httpx import ASGITransport, AsyncClient
+from ...main import app
+from ...services.cameras import (
+    Camera,
+    CameraConfig,
+    FakeCameraSource,
+    Frame,
+    FrameBuffer,
+    TIERS,
+    ViewerState,
+    camera_manager,
+)
+
+
+def _frame(seq: int) -> Frame:
+    return Frame(seq, datetime.now(timezone.utc), 0.0, b"jpeg%d" % seq, 4, 4)
+
+
+@pytest_asyncio.fixture
+async def camera():
+    camera = camera_manager.add(
+        Camera(
+            "test",
+            FakeCameraSource("test", 160, 120),
+            CameraConfig(fps=50),
+            buffer_size=5,
+        )
+    )
+    camera.start()
+    yield camera
+    await camera.stop()
+    camera_manager.cameras.pop("test", None)
+
+
 def test_basic():
     assert True
 
@@ -11,17 +49,173 @@ def test_example_green():
     assert mock_func.called
 
 
+@pytest.mark.asyncio
+async def test_frame_buffer():
+    buffer = FrameBuffer(capacity=3)
+    for seq in range(1, 6):
+        buffer.push(_frame(seq))
+    assert [f.seq for f in buffer.frames] == [3, 4, 5]
+    assert buffer.get(4) is not None and buffer.get(1) is None
+    # A reader that is behind skips straight to the newest frame
+    assert (await buffer.next_frame(1)).seq == 5
+
+    waiters = [asyncio.create_task(buffer.next_frame(5)) for _ in range(3)]
+    await asyncio.sleep(0)
+    assert not any(w.done() for w in waiters)
+    buffer.push(_frame(6))
+    assert [(await w).seq for w in waiters] == [6, 6, 6]
+
+
+def test_fake_camera_source():
+    image, data = FakeCameraSource("front", 160, 120).capture(1)
+    assert image.size == (160, 120)
+    assert data[:2] == b"\xff\xd8" and data[-2:] == b"\xff\xd9"
+
+
+@pytest.mark.asyncio
+async def test_tier_encoded_once():
+    camera = Camera("idle", FakeCameraSource("idle", 160, 120))
+    image, data = camera.source.capture(1)
+    frame = Frame(1, datetime.now(timezone.utc), 0.0, data, 160, 120, image=image)
+    full, half, quarter = TIERS
+    assert await camera.encoded(frame, full) is data
+
+    results = await asyncio.gather(*(camera.encoded(frame, quarter) for _ in range(5)))
+    assert camera.tier_encodes["quarter"] == 1
+    assert all(r is results[0] for r in results)
+    assert len(results[0]) < len(data)
+
+    # Too old to encode: skipped rather than served at the wrong tier
+    frame.image = None
+    assert await camera.encoded(frame, half) is None
+
+
+@pytest.mark.asyncio
+async def test_cancelled_viewer_does_not_cancel_shared_encode():
+    camera = Camera("idle", FakeCameraSource("idle", 160, 120))
+    image, data = camera.source.capture(1)
+    frame = Frame(1, datetime.now(timezone.utc), 0.0, data, 160, 120, image=image)
+    _, half, _ = TIERS
+    leaving = asyncio.create_task(camera.encoded(frame, half))
+    staying = asyncio.create_task(camera.encoded(frame, half))
+    await asyncio.sleep(0)
+    leaving.cancel()
+    encoded = await staying
+    assert leaving.cancelled()
+    assert frame.tiers["half"] is encoded and not frame.encoding
+    assert await camera.encoded(frame, half) is encoded
+    assert camera.tier_encodes["half"] == 1
+
+
+def test_viewer_state_adapts():
+    config = CameraConfig(fps=10)
+    viewer = ViewerState(config)
+    assert viewer.tier.name == "full"
+    # Sends take longer than the 100 ms frame interval: step down, stop at min
+    for _ in range(20):
+        viewer.record(send_time=0.5, lag=0.0)
+    assert viewer.tier.name == "quarter"
+    # Queueing lag alone also counts
+    lagging = ViewerState(config)
+    for _ in range(5):
+        lagging.record(send_time=0.0, lag=0.5)
+    assert lagging.tier.name != "full"
+    # A couple of seconds of fast sends steps back up one tier at a time
+    for _ in range(40):
+        viewer.record(send_time=0.001, lag=0.001)
+    assert viewer.tier.name == "half"
+
+    config.max_tier = "half"
+    viewer.record(send_time=0.001, lag=0.001)
+    assert viewer.tier.name == "half"
+    pinned = ViewerState(config, tier="quarter", max_fps=2)
+    pinned.record(send_time=0.0, lag=0.0)
+    assert pinned.tier.name == "quarter" and pinned.max_fps == 2
+
+
+@pytest.mark.asyncio
+async def test_mjpeg_stream_shares_frames():
+    camera = Camera("idle", FakeCameraSource("idle", 160, 120))
+    frame = _frame(1)
+    camera.buffer.push(frame)
+    streams = [camera.mjpeg_stream() for _ in range(3)]
+    parts = [[await s.__anext__() for _ in range(3)] for s in streams]
+    assert len(camera.viewers) == 3
+    header, body, tail = parts[0]
+    assert bytes(header) == (
+        b"--frame\r\nContent-Type: image/jpeg\r\n"
+        b"Content-Length: 5\r\nX-Frame-Seq: 1\r\nX-Frame-Tier: full\r\n\r\n"
+    )
+    assert bytes(tail) == b"\r\n"
+    # Every viewer gets a view of the same encoded bytes, not a copy
+    assert all(p[1].obj is frame.data for p in parts)
+    for s in streams:
+        await s.aclose()
+    assert camera.viewers == []
+
+
 def test_get_camera_list():
     pass
 
 
-def test_configure_camera():
-    pass
+@pytest.mark.asyncio
+async def test_configure_camera(camera):
+    url = "/api/v1/cameras/test/config"
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        response = await client.post(url, json={"fps": 5, "max_tier": "half"})
+        assert response.status_code == 200
+        assert response.json()["fps"] == 5
+        assert response.json()["min_tier"] == "quarter"
+        assert camera.config.max_tier == "half"
 
+        response = await client.post(
+            url, json={"max_tier": "quarter", "min_tier": "half"}
+        )
+        assert response.status_code == 400
+        response = await client.post(url, json={"max_tier": "huge"})
+        assert response.status_code == 422
+        response = await client.post("/api/v1/cameras/missing/config", json={})
+        assert response.status_code == 404
 
-def test_get_camera_snapshot():
-    pass
 
+@pytest.mark.asyncio
+async def test_get_camera_snapshot(camera):
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        response = await client.get("/api/v1/cameras/missing/snapshot")
+        assert response.status_code == 404
 
-def test_get_camera_status():
-    pass
+        await camera.buffer.next_frame(0)
+        response = await client.get("/api/v1/cameras/test/snapshot")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/jpeg"
+        assert response.content[:2] == b"\xff\xd8"
+        seq = int(response.headers["x-frame-seq"])
+
+        response = await client.get(
+            "/api/v1/cameras/test/snapshot", params={"seq": seq}
+        )
+        assert int(response.headers["x-frame-seq"]) == seq
+        response = await client.get(
+            "/api/v1/cameras/test/snapshot", params={"seq": 10**6}
+        )
+        assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_get_camera_status(camera):
+    await camera.buffer.next_frame(1)
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        response = await client.get("/api/v1/cameras/test/status")
+        status = response.json()
+        assert status["running"] is True
+        assert status["frames_captured"] >= 2
+        assert (status["width"], status["height"]) == (160, 120)
+
+        response = await client.get("/api/v1/cameras/list")
+        assert "test" in [c["id"] for c in response.json()]
@@ -0,0 +1,131 @@
+import pytest
+from ...database import init_db, get_db
+from ...services.command_log_writer import CommandLogWriter
+from ...services.commands import CommandDispatcher, CommandTransport, FakeRover
+from ...services.database_service import DatabaseService
+from ...services.metrics import Histogram
+from ...services.websocket_hub import WebSocketHub
+
+
+async def _create_mission() -> int:
+    await init_db()
+    async for session in get_db():
+        mission = await DatabaseService(session).create_mission("Command Mission")
+        return mission.id
+    raise AssertionError("no session")
+
+
+async def _command_rows(mission_id: int) -> list:
+    async for session in get_db():
+        return await DatabaseService(session).get_command_logs(mission_id, limit=1000)
+    raise AssertionError("no session")
+
+
+class BrokenTransport(CommandTransport):
+    async def start(self, on_ack) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    async def send(self, message) -> None:
+        raise ConnectionError("link down")
+
+
+def test_histogram_percentiles():
+    histogram = Histogram([1, 2, 4, 8])
+    for value in [0.5, 1.5, 1.5, 3, 3, 3, 3, 6, 7, 20]:
+        histogram.observe(value)
+
+    assert histogram.count == 10
+    assert histogram.cumulative() == [1, 3, 7, 9]
+    assert histogram.percentile(50) == 3.0
+    assert histogram.percentile(100) == 20
+    assert Histogram().percentile(50) is None
+
+
+@pytest.mark.asyncio
+async def test_commands_are_acknowledged_with_latency():
+    dispatcher = CommandDispatcher(
+        FakeRover(latency=0.01), writer=CommandLogWriter(), hub=WebSocketHub()
+    )
+    await dispatcher.start()
+    records = [await dispatcher.send("move", {"i": i}) for i in range(3)]
+
+    assert [r.seq for r in records] == [1, 2, 3]
+    assert all(r.status == "sent" for r in records)
+    for record in records:
+        await dispatcher.wait(record)
+    assert all(r.status == "acknowledged" for r in records)
+    assert records[0].latency_ms is not None and records[0].latency_ms >= 10
+    assert dispatcher.latency["move"].count == 3
+    assert dispatcher.stats()["acknowledged"] == 3
+    assert [r.seq for r in dispatcher.recent(2)] == [3, 2]
+    await dispatcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_rejections_timeouts_and_send_failures():
+    rover = FakeRover(reject=["self_destruct"])
+    dispatcher = CommandDispatcher(
+        rover, writer=CommandLogWriter(), hub=WebSocketHub(), timeout=0.05
+    )
+    await dispatcher.start()
+
+    rejected = await dispatcher.wait(await dispatcher.send("self_destruct"))
+    assert rejected.status == "failed" and rejected.detail == "rejected by rover"
+
+    rover.drop_rate = 1.0
+    lost = await dispatcher.wait(await dispatcher.send("move"))
+    assert lost.status == "failed" and lost.detail == "timeout"
+    assert dispatcher.timeouts == 1 and dispatcher.pending == 0
+    assert "move" not in dispatcher.latency
+
+    await dispatcher.use_transport(BrokenTransport())
+    broken = await dispatcher.send("move")
+    assert broken.status == "failed"
+    assert broken.detail == "send failed: link down"
+    await dispatcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_command_log_is_written_in_background():
+    mission_id = await _create_mission()
+    writer = CommandLogWriter(flush_interval=60)
+    dispatcher = CommandDispatcher(
+        FakeRover(latency=0.01), writer=writer, hub=WebSocketHub(), timeout=0.5
+    )
+    await writer.start()
+    await dispatcher.start()
+    try:
+        fast = await dispatcher.send("stop", {}, mission_id)
+        await dispatcher.wait(fast)
+        # Acknowledged before its row was written: folded into the insert
+        slow = await dispatcher.send("move", {"speed": 1}, mission_id)
+        await writer.flush()
+        assert writer.rows_written == 2 and writer.updates_written == 0
+
+        await dispatcher.wait(slow)
+        await writer.flush()
+        assert writer.updates_written == 1
+        rows = {row.command: row for row in await _command_rows(mission_id)}
+        assert rows["stop"].status == "acknowledged"
+        assert rows["move"].status == "acknowledged"
+        assert rows["move"].payload == {"speed": 1}
+    finally:
+        await dispatcher.stop()
+        await writer.stop()
+
+
+@pytest.mark.asyncio
+async def test_stop_fails_pending_commands():
+    dispatcher = CommandDispatcher(
+        FakeRover(drop_rate=1.0), writer=CommandLogWriter(), hub=WebSocketHub()
+    )
+    await dispatcher.start()
+    record = await dispatcher.send("move")
+    await dispatcher.stop()
+
+    assert record.status == "failed" and record.detail == "dispatcher stopped"
+    with pytest.raises(RuntimeError):
+        await dispatcher.send("move")
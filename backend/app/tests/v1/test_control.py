@@ -1,3 +1,10 @@
+import pytest
+from httpx import ASGITransport, AsyncClient
+from ...main import app
+from ...services.commands import command_dispatcher
+from ...services.setpoints import setpoints
+
+
 def test_basic():
     assert True
 
@@ -11,12 +18,42 @@ def test_example_green():
     assert mock_func.called
 
 
-def test_set_manipulator_power():
-    pass
-
-
-def test_set_manipulator_speed():
-    pass
+@pytest.mark.asyncio
+async def test_set_manipulator_power():
+    await command_dispatcher.start()
+    await setpoints.start()
+    try:
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            url = "/api/v1/control/manipulator/power"
+            first = await client.post(url, json={"value": 42})
+            second = await client.post(url, json={"value": 43})
+            invalid = await client.post(url, json={"value": 150})
+            stats = await client.get("/api/v1/control/setpoints/stats")
+    finally:
+        await setpoints.stop()
+        await command_dispatcher.stop()
+
+    assert first.json() == {
+        "command": "set_manipulator_power",
+        "value": 42,
+        "status": "sent",
+    }
+    assert second.json()["status"] == "queued"
+    assert invalid.status_code == 422
+    assert stats.json()["requests"] >= 2
+
+
+@pytest.mark.asyncio
+async def test_set_manipulator_speed():
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        response = await client.post(
+            "/api/v1/control/manipulator/speed", json={"value": 10}
+        )
+    assert response.status_code == 503
 
 
 def test_get_manipulator_status():
@@ -39,8 +76,25 @@ def test_get_radio_signal():
     pass
 
 
-def test_set_vesc_acceleration():
-    pass
+@pytest.mark.asyncio
+async def test_set_vesc_acceleration():
+    await command_dispatcher.start()
+    await setpoints.start()
+    try:
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            response = await client.post(
+                "/api/v1/control/vesc/acceleration", json={"value": 2.5}
+            )
+            negative = await client.post(
+                "/api/v1/control/vesc/acceleration", json={"value": -1}
+            )
+    finally:
+        await setpoints.stop()
+        await command_dispatcher.stop()
+    assert response.json()["command"] == "set_vesc_acceleration"
+    assert negative.status_code == 422
 
 
 def test_get_vesc_parameters():
@@ -51,9 +105,57 @@ def test_update_vesc_parameters():
     pass
 
 
-def test_send_command():
-    pass
-
-
-def test_get_command_history():
-    pass
+@pytest.mark.asyncio
+async def test_send_command():
+    await command_dispatcher.start()
+    try:
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            response = await client.post(
+                "/api/v1/control/commands/send",
+                json={"command": "move", "parameters": {"speed": 1}},
+            )
+            assert response.status_code == 200
+            assert response.json()["status"] == "sent"
+
+            response = await client.post(
+                "/api/v1/control/commands/send",
+                json={"command": "move", "wait": True},
+            )
+            assert response.json()["status"] == "acknowledged"
+            assert response.json()["latency_ms"] > 0
+
+            response = await client.post(
+                "/api/v1/control/commands/send", json={"command": ""}
+            )
+            assert response.status_code == 422
+
+            stats = (await client.get("/api/v1/control/commands/stats")).json()
+            assert stats["latency_ms"]["move"]["count"] >= 1
+    finally:
+        await command_dispatcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_get_command_history():
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        response = await client.post(
+            "/api/v1/control/commands/send", json={"command": "move"}
+        )
+        assert response.status_code == 503
+
+        await command_dispatcher.start()
+        try:
+            sent = await client.post(
+                "/api/v1/control/commands/send", json={"command": "history_test"}
+            )
+            response = await client.get(
+                "/api/v1/control/commands/history", params={"limit": 1}
+            )
+        finally:
+            await command_dispatcher.stop()
+    assert response.status_code == 200
+    assert [r["seq"] for r in response.json()] == [sent.json()["seq"]]
@@ -1,5 +1,7 @@
 import pytest
-from ...database import init_db, get_db
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from ... import database
+from ...database import Base, init_db, get_db, make_engine
 from ...services.database_service import DatabaseService
 import json
 
@@ -62,6 +64,9 @@ async def test_log_telemetry():
         assert log.mission_id == mission.id
         assert log.topic == "sensors/vesc"
         assert json.loads(log.data) == data
+        # Single rows update the rollups like batches do
+        [bucket] = await service.get_rollups(mission.id, "sensors/vesc", "voltage", 60)
+        assert bucket.count == 1 and bucket.last == 12.1
 
 
 @pytest.mark.asyncio
@@ -117,3 +122,55 @@ async def test_update_command_status():
         # Verify
         logs = await service.get_command_logs(mission.id)
         assert logs[0].status == "acknowledged"
+
+
+@pytest.mark.asyncio
+async def test_performance_profile_pragmas(tmp_path):
+    engine = make_engine(f"sqlite+aiosqlite:///{tmp_path / 'tuned.db'}", "performance")
+    async with engine.connect() as conn:
+        journal_mode = (await conn.exec_driver_sql("PRAGMA journal_mode")).scalar()
+        synchronous = (await conn.exec_driver_sql("PRAGMA synchronous")).scalar()
+        busy_timeout = (await conn.exec_driver_sql("PRAGMA busy_timeout")).scalar()
+    await engine.dispose()
+
+    assert journal_mode == "wal"
+    assert synchronous == 1  # NORMAL
+    assert busy_timeout == 5000
+
+
+def test_unknown_profile():
+    with pytest.raises(ValueError):
+        make_engine("sqlite+aiosqlite://", "turbo")
+
+
+@pytest.mark.asyncio
+async def test_msgpack_payloads_and_reencode(tmp_path, monkeypatch):
+    engine = make_engine(f"sqlite+aiosqlite:///{tmp_path / 'payloads.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+        service = DatabaseService(session)
+        mission = await service.create_mission("Encoding Mission")
+        data = {"rpm": 1200, "current": 3.5, "faults": ["overtemp"]}
+
+        json_log = await service.log_telemetry(mission.id, "telemetry.vescs", data)
+        monkeypatch.setattr(database, "PAYLOAD_ENCODING", "msgpack")
+        binary_log = await service.log_telemetry(mission.id, "telemetry.vescs", data)
+        command = await service.log_command(mission.id, "move", {"speed": 1.0})
+
+        assert isinstance(json_log.data, str)
+        assert isinstance(binary_log.data, bytes)
+        assert len(binary_log.data) < len(json_log.data)
+        assert json_log.payload == binary_log.payload == data
+        assert command.payload == {"speed": 1.0}
+
+        # Only the JSON row needs rewriting
+        assert await service.reencode_payloads("msgpack") == 1
+        logs = await service.get_telemetry_logs(mission.id)
+        assert all(isinstance(log.data, bytes) for log in logs)
+        assert [log.payload for log in logs] == [data, data]
+
+        assert await service.reencode_payloads("json") == 3
+        logs = await service.get_telemetry_logs(mission.id)
+        assert [json.loads(log.data) for log in logs] == [data, data]
+    await engine.dispose()
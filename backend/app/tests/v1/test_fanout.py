@@ -0,0 +1,236 @@
+import pytest
+import asyncio
+from datetime import datetime, timezone
+from ...services.alerts import AlertEngine, AlertRule
+from ...services.fanout import FanoutBus, encode_frame
+from ...services.ingest import TelemetryIngest
+from ...services.pose import PoseService
+from ...services.telemetry_cache import TelemetryCache
+from ...services.telemetry_writer import TelemetryWriter
+from ...services.websocket_hub import WebSocketHub
+
+
+class RecordingArchive:
+    def __init__(self):
+        self.scheduled = []
+
+    def schedule(self, mission_id: int) -> None:
+        self.scheduled.append(mission_id)
+
+
+def make_bus(path: str, archive=None) -> FanoutBus:
+    hub = WebSocketHub()
+    ingest = TelemetryIngest(
+        TelemetryCache(),
+        hub,
+        TelemetryWriter(),
+        pose=PoseService(),
+        alerts=AlertEngine(hub=hub),
+    )
+    return FanoutBus(
+        path,
+        ingest,
+        hub,
+        writer=ingest.writer,
+        archive=archive or RecordingArchive(),
+        retry=0.02,
+    )
+
+
+async def wait_for(condition, timeout: float = 2.0) -> None:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        if loop.time() > deadline:
+            raise AssertionError("condition not met in time")
+        await asyncio.sleep(0.005)
+
+
+@pytest.mark.asyncio
+async def test_leader_forwards_samples_and_alerts(tmp_path):
+    path = str(tmp_path / "fanout.sock")
+    leader, follower = make_bus(path), make_bus(path)
+    led = []
+
+    async def on_leader():
+        led.append(True)
+
+    await leader.start(on_leader)
+    await follower.start()
+    try:
+        assert leader.is_leader and led == [True]
+        assert follower.role == "follower"
+        await wait_for(lambda: leader.stats()["followers"] == 1)
+
+        forwarded = []
+        follower.hub.taps.append(lambda topic, data, ts: forwarded.append(topic))
+        leader.ingest.alerts.set_rules(
+            [AlertRule("rpm", "threshold", "telemetry.vescs", "rpm", value=1)]
+        )
+        stamp = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        await leader.ingest.publish("telemetry.vescs", {"rpm": 5}, stamp)
+        leader.hub.publish("health.checks", {"checks": []})
+        await wait_for(lambda: len(forwarded) == 2)
+    finally:
+        await follower.stop()
+        await leader.stop()
+
+    cached = follower.ingest.cache.get("telemetry.vescs")
+    assert cached is not None and cached.data == {"rpm": 5}
+    assert cached.timestamp == stamp
+    assert forwarded == ["telemetry.vescs", "alerts.live"]
+    # Followers do not evaluate alerts or persist, but show the leader's
+    assert follower.ingest.alerts.samples == 0
+    assert list(follower.ingest.alerts.active) == [("rpm", "telemetry.vescs")]
+    assert leader.ingest.forward is None and not leader.hub.taps
+
+
+@pytest.mark.asyncio
+async def test_follower_survives_a_frame_it_cannot_apply(tmp_path):
+    path = str(tmp_path / "fanout.sock")
+    leader, follower = make_bus(path), make_bus(path)
+    await leader.start()
+    await follower.start()
+    try:
+        await wait_for(lambda: leader.stats()["followers"] == 1)
+        stamp = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        # Fewer cells than width * height: the map store raises ValueError
+        info = {
+            "width": 4,
+            "height": 4,
+            "resolution": 0.05,
+            "origin": {"position": {"x": 0.0, "y": 0.0}},
+        }
+        bad_map = {"info": info, "data": [0]}
+        leader._broadcast(encode_frame("sample", "slam.map", bad_map, stamp))
+        await leader.ingest.publish("telemetry.vescs", {"rpm": 5}, stamp)
+        await wait_for(lambda: follower.ingest.cache.get("telemetry.vescs"))
+        assert follower.stats()["errors"] == 1
+        assert follower.role == "follower"
+    finally:
+        await follower.stop()
+        await leader.stop()
+
+
+@pytest.mark.asyncio
+async def test_followers_mirror_and_change_the_leaders_alerts(tmp_path):
+    path = str(tmp_path / "fanout.sock")
+    leader, follower = make_bus(path), make_bus(path)
+    rule = AlertRule("hot", "threshold", "telemetry.vescs", "temp", value=80)
+    leader.set_rules([rule])
+    await leader.start()
+    await leader.ingest.publish("telemetry.vescs", {"temp": 90})
+    await follower.start()
+    try:
+        # A new follower gets the rules and active alerts on connecting
+        alerts = follower.ingest.alerts
+        await wait_for(lambda: ("hot", "telemetry.vescs") in alerts.active)
+        assert list(alerts.rules) == ["hot"]
+
+        alert = follower.acknowledge_alert(alerts.active[("hot", "telemetry.vescs")].id)
+        assert alert is not None and alert.acknowledged_at is not None
+        await wait_for(
+            lambda: leader.ingest.alerts.active[
+                ("hot", "telemetry.vescs")
+            ].acknowledged_at
+        )
+        assert follower.acknowledge_alert("unknown") is None
+
+        cold = AlertRule("cold", "threshold", "telemetry.vescs", "temp", op="lt")
+        follower.set_rules([cold], replace=True)
+        assert list(alerts.rules) == ["cold"]
+        await wait_for(lambda: list(leader.ingest.alerts.rules) == ["cold"])
+        # Removing the rule cleared its alert in the leader and the mirror
+        await wait_for(lambda: not alerts.active)
+    finally:
+        await follower.stop()
+        await leader.stop()
+
+
+@pytest.mark.asyncio
+async def test_followers_relay_forwarded_topics_through_the_leader(tmp_path):
+    path = str(tmp_path / "fanout.sock")
+    leader, first, second = make_bus(path), make_bus(path), make_bus(path)
+    await leader.start()
+    await first.start()
+    await second.start()
+    received = {bus: [] for bus in (leader, first, second)}
+    for bus, topics in received.items():
+        bus.hub.taps.append(lambda topic, data, ts, topics=topics: topics.append(topic))
+    try:
+        await wait_for(lambda: leader.stats()["followers"] == 2)
+        await wait_for(lambda: first.connected and second.connected)
+        first.hub.publish("commands.status", {"seq": 1})
+        first.hub.publish("health.checks", {"checks": []})
+        await wait_for(lambda: received[second] == ["commands.status"])
+        assert received[leader] == ["commands.status"]
+        # Not echoed back to the follower that published it
+        await asyncio.sleep(0.05)
+        assert received[first] == ["commands.status", "health.checks"]
+    finally:
+        await second.stop()
+        await first.stop()
+        await leader.stop()
+
+
+@pytest.mark.asyncio
+async def test_mission_changes_reach_the_leader(tmp_path):
+    path = str(tmp_path / "fanout.sock")
+    archive = RecordingArchive()
+    leader, follower = make_bus(path, archive), make_bus(path)
+    await leader.start()
+    await follower.start()
+    try:
+        await wait_for(lambda: leader.stats()["followers"] == 1)
+        follower.set_mission(7)
+        await wait_for(lambda: leader.ingest.mission_id == 7)
+
+        follower.set_mission(None)
+        await follower.archive_mission(7)
+        await wait_for(lambda: archive.scheduled == [7])
+        assert leader.ingest.mission_id is None
+    finally:
+        await follower.stop()
+        await leader.stop()
+
+
+@pytest.mark.asyncio
+async def test_follower_takes_over_when_leader_exits(tmp_path):
+    path = str(tmp_path / "fanout.sock")
+    leader, follower = make_bus(path), make_bus(path)
+    promoted = asyncio.Event()
+
+    async def on_leader():
+        promoted.set()
+
+    await leader.start()
+    await follower.start(on_leader)
+    await wait_for(lambda: leader.stats()["followers"] == 1)
+    await leader.stop()
+    try:
+        await asyncio.wait_for(promoted.wait(), 2.0)
+        assert follower.is_leader
+        third = make_bus(path)
+        await third.start()
+        try:
+            assert third.role == "follower"
+            await wait_for(lambda: follower.stats()["followers"] == 1)
+        finally:
+            await third.stop()
+    finally:
+        await follower.stop()
+
+
+@pytest.mark.asyncio
+async def test_disabled_bus_leads_alone():
+    bus = make_bus("")
+    led = []
+
+    async def on_leader():
+        led.append(True)
+
+    await bus.start(on_leader)
+    bus.set_mission(3)
+    await bus.stop()
+    assert led == [True] and bus.ingest.mission_id == 3
+    assert bus.ingest.forward is None
@@ -0,0 +1,98 @@
+import pytest
+import multiprocessing
+import numpy as np
+from ...services.frame_ring import FrameRing, Overrun
+
+
+@pytest.fixture
+def ring():
+    ring = FrameRing.create(None, (4, 3), "uint16", slots=4)
+    yield ring
+    ring.close()
+    ring.unlink()
+
+
+def frame(value: int) -> np.ndarray:
+    return np.full((4, 3), value, np.uint16)
+
+
+def test_reader_sees_frames_zero_copy(ring):
+    reader = FrameRing.attach(ring.name)
+    try:
+        assert (reader.shape, reader.dtype) == ((4, 3), np.dtype("uint16"))
+        assert reader.latest() is None
+        with pytest.raises(RuntimeError):
+            reader.write(frame(1))
+
+        assert ring.write(frame(1), timestamp=10.0) == 0
+        ring.write(frame(2), rows=2)
+        latest = reader.latest()
+        assert latest is not None and latest.seq == 1
+        assert latest.array.shape == (2, 3) and (latest.array == 2).all()
+        assert not latest.array.flags.owndata and latest.valid()
+        first = reader.read(0)
+        assert first.timestamp == 10.0 and (first.array == 1).all()
+        with pytest.raises(LookupError):
+            reader.read(2)
+
+        # Lapping the ring invalidates the view and older frames
+        for value in range(3, 7):
+            ring.write(frame(value))
+        assert not latest.valid()
+        with pytest.raises(Overrun):
+            reader.read(1)
+        assert (reader.read(5).array == 6).all()
+        del latest, first
+    finally:
+        reader.close()
+
+
+def test_frame_reader_counts_overruns(ring):
+    out = np.empty((4, 3), np.uint16)
+    reader = ring.reader()
+    assert reader.poll() is None
+    ring.write(frame(0))
+    received = reader.poll(out)
+    assert received is not None and received.array.base is out
+    for value in range(1, 8):
+        ring.write(frame(value))
+    # Frames 1-3 were overwritten; 4-7 are still in the ring
+    values = []
+    while (received := reader.poll()) is not None:
+        values.append(int(received.array[0, 0]))
+    assert values == [4, 5, 6, 7] and reader.overruns == 3
+    assert ring.reader(from_start=True).poll() is not None
+
+
+def _read_in_child(name: str, results) -> None:
+    ring = FrameRing.attach(name)
+    reader = ring.reader(from_start=True)
+    received = [reader.wait(5.0) for _ in range(3)]
+    results.put([int(f.array.sum()) if f else None for f in received])
+    del received
+    ring.close()
+
+
+def test_frames_cross_processes(ring):
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    child = context.Process(target=_read_in_child, args=(ring.name, results))
+    child.start()
+    for value in range(3):
+        ring.write(frame(value))
+    assert results.get(timeout=10) == [0, 12, 24]
+    child.join(10)
+    assert child.exitcode == 0
+    # The ring is still there after the reader exits
+    again = FrameRing.attach(ring.name)
+    assert again.write_seq == 3
+    again.close()
+
+
+def test_create_validates():
+    with pytest.raises(ValueError):
+        FrameRing.create(None, (), "uint8")
+    with pytest.raises(ValueError):
+        FrameRing.create(None, (4,), "uint8", slots=1)
+    with pytest.raises(ValueError):
+        FrameRing.create(None, (4,), object)
@@ -0,0 +1,140 @@
+import pytest
+import asyncio
+from typing import Any, List
+from ...services.command_log_writer import CommandLogWriter
+from ...services.commands import CommandDispatcher, FakeRover
+from ...services.health import (
+    HEALTH_TOPIC,
+    HealthScheduler,
+    ProbeResult,
+    database_probe,
+    disk_probe,
+    rover_link_probe,
+    telemetry_link_probe,
+    websocket_probe,
+)
+from ...services.fanout import FanoutBus
+from ...services.rover_link import RoverLink, SimulatorSource
+from ...services.websocket_hub import WebSocketHub
+
+
+class RecordingHub(WebSocketHub):
+    def __init__(self):
+        super().__init__()
+        self.messages: List[Any] = []
+
+    def publish(self, topic, data, timestamp=None):
+        if topic == HEALTH_TOPIC:
+            self.messages.append(data)
+        return super().publish(topic, data, timestamp)
+
+
+def slow_probe(delay: float, calls: List[float]):
+    async def probe() -> ProbeResult:
+        calls.append(asyncio.get_running_loop().time())
+        await asyncio.sleep(delay)
+        return ProbeResult("ok", delay, "s")
+
+    return probe
+
+
+@pytest.mark.asyncio
+async def test_probes_run_concurrently_on_their_own_intervals():
+    hub = RecordingHub()
+    scheduler = HealthScheduler(hub=hub)
+    fast: List[float] = []
+    slow: List[float] = []
+    scheduler.register("fast", slow_probe(0.0, fast), interval=0.02)
+    scheduler.register("slow", slow_probe(0.15, slow), interval=10, timeout=1)
+
+    await scheduler.start()
+    await asyncio.sleep(0.12)
+    snapshot = scheduler.snapshot()
+    await scheduler.stop()
+
+    # The slow probe did not hold up the fast one
+    assert len(slow) == 1
+    assert len(fast) >= 4
+    checks = {check["name"]: check for check in snapshot["checks"]}
+    assert checks["fast"]["status"] == "ok"
+    assert checks["slow"]["status"] == "unknown"
+    assert hub.messages[-1]["version"] == scheduler.version
+
+
+@pytest.mark.asyncio
+async def test_timeouts_and_errors_are_critical():
+    scheduler = HealthScheduler(hub=RecordingHub())
+
+    async def broken() -> ProbeResult:
+        raise OSError("no route")
+
+    scheduler.register("hang", slow_probe(1.0, []), timeout=0.02)
+    scheduler.register("broken", broken)
+    for check in scheduler.checks.values():
+        await scheduler.run_check(check)
+
+    snapshot = scheduler.snapshot()
+    assert snapshot["status"] == "critical"
+    assert snapshot["version"] == 2
+    details = {check["name"]: check["detail"] for check in snapshot["checks"]}
+    assert details == {
+        "hang": "timed out after 0.02s",
+        "broken": "probe failed: no route",
+    }
+    assert scheduler.checks["hang"].failures == 1
+
+
+@pytest.mark.asyncio
+async def test_snapshot_reads_never_run_probes():
+    calls: List[float] = []
+    scheduler = HealthScheduler(hub=RecordingHub())
+    scheduler.register("probe", slow_probe(0.0, calls))
+    etag = scheduler.etag()
+
+    for _ in range(10):
+        scheduler.snapshot()
+    assert calls == []
+    assert scheduler.snapshot()["status"] == "unknown"
+
+    await scheduler.run_check(scheduler.checks["probe"])
+    assert len(calls) == 1
+    assert scheduler.etag() != etag
+
+
+@pytest.mark.asyncio
+async def test_default_probes(tmp_path):
+    hub = WebSocketHub()
+    dispatcher = CommandDispatcher(
+        FakeRover(latency=0.01), writer=CommandLogWriter(), hub=hub
+    )
+
+    database = await database_probe()()
+    assert database.status == "ok" and database.unit == "ms"
+
+    disk = await disk_probe(str(tmp_path))()
+    assert disk.value is not None and 0 < disk.value <= 100
+
+    clients = await websocket_probe(hub)()
+    assert clients.status == "ok" and clients.value == 0
+
+    stopped = await rover_link_probe(dispatcher)()
+    assert stopped.status == "critical"
+    await dispatcher.start()
+    link = await rover_link_probe(dispatcher)()
+    await dispatcher.stop()
+    assert link.status == "ok"
+    assert link.value is not None and link.value >= 10
+
+    rover = RoverLink()
+    assert (await telemetry_link_probe(rover)()).status == "unknown"
+    rover.add_source(SimulatorSource())
+    telemetry = await telemetry_link_probe(rover)()
+    assert telemetry.status == "critical"
+    assert telemetry.detail == "0/1 sources connected"
+
+    # A follower worker reports its connection to the fan-out leader
+    bus = FanoutBus("unused.sock")
+    bus.role = "follower"
+    following = await telemetry_link_probe(rover, bus)()
+    assert following.status == "critical"
+    assert following.detail == "not connected to the leader"
@@ -0,0 +1,95 @@
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from ...main import app
+from ...services.instrumentation import (
+    MetricsMiddleware,
+    instrument_engine,
+    instrument_methods,
+)
+from ...services.metrics import HistogramFamily, MetricsRegistry
+
+
+def test_registry_renders_histograms_in_seconds():
+    registry = MetricsRegistry()
+    family = registry.histogram("op_seconds", "Op time", ("name",), buckets=(1, 10))
+    family.labels('a"b').observe(0.5)
+    family.labels('a"b').observe(5)
+    registry.collector(lambda: [("queue_depth", "gauge", "Queued", 3)])
+
+    lines = registry.render().splitlines()
+    assert "# TYPE op_seconds histogram" in lines
+    assert 'op_seconds_bucket{name="a\\"b",le="0.001"} 1' in lines
+    assert 'op_seconds_bucket{name="a\\"b",le="0.01"} 2' in lines
+    assert 'op_seconds_bucket{name="a\\"b",le="+Inf"} 2' in lines
+    assert 'op_seconds_sum{name="a\\"b"} 0.0055' in lines
+    assert 'op_seconds_count{name="a\\"b"} 2' in lines
+    assert lines[-2:] == ["# TYPE queue_depth gauge", "queue_depth 3"]
+
+
+@pytest.mark.asyncio
+async def test_middleware_labels_by_route_template():
+    family = HistogramFamily("requests", "Requests", ("method", "route", "status"))
+    transport = ASGITransport(app=MetricsMiddleware(app, family))
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.get("/health")
+        await client.get("/health")
+        await client.post("/api/v1/alerts/acknowledge/123")
+        await client.get("/no/such/path")
+
+    assert family.children[("GET", "/health", "200")].count == 2
+    assert ("POST", "/api/v1/alerts/acknowledge/{alert_id}", "404") in family.children
+    assert family.children[("GET", "unmatched", "404")].count == 1
+
+
+@pytest.mark.asyncio
+async def test_database_hooks_time_queries_and_methods():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    queries = HistogramFamily("queries", "Queries", ("statement",))
+    instrument_engine(engine, queries)
+
+    class Service:
+        def __init__(self, session):
+            self.session = session
+
+        async def count(self) -> int:
+            return (await self.session.execute(text("SELECT 1"))).scalar_one()
+
+        def sync_helper(self) -> None:
+            pass
+
+    operations = HistogramFamily("operations", "Operations", ("operation",))
+    instrument_methods(Service, operations)
+    instrument_methods(Service, operations)
+    async with async_sessionmaker(engine)() as session:
+        with pytest.raises(OperationalError):
+            await session.execute(text("SELECT * FROM missing"))
+        assert await Service(session).count() == 1
+        # Nothing is left behind on the connection by the failed statement
+        assert not (await session.connection()).info
+    await engine.dispose()
+
+    assert queries.children[("SELECT",)].count == 1
+    assert operations.children[("count",)].count == 1
+    assert ("sync_helper",) not in operations.children
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint():
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        await client.get("/health")
+        response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert (
+        'http_request_duration_seconds_count{method="GET",route="/health",'
+        'status="200"}' in body
+    )
+    assert "# TYPE websocket_queue_depth gauge" in body
+    assert "# TYPE rover_link_messages_dropped_total counter" in body
@@ -0,0 +1,147 @@
+import pytest
+from datetime import datetime, timedelta
+from ...database import flatten_payload, init_db, get_db, unflatten_payload
+from ...services.database_service import DatabaseService
+from ...services.mission_archive import MissionArchive
+from ...services.telemetry_export import iter_telemetry
+
+
+def _payload(i: int) -> dict:
+    return {
+        "rpm": i * 10,
+        "voltage": 48.0 + i if i % 2 else 48,
+        "imu": {"ax": 0.5 * i, "ok": i % 3 == 0},
+        "cells": [i, i + 1],
+        "state": "idle" if i % 2 else i,
+        "fault": None if i % 4 else "overcurrent",
+    }
+
+
+async def _mission(samples: int) -> int:
+    await init_db()
+    async for session in get_db():
+        service = DatabaseService(session)
+        mission = await service.create_mission("Archived Mission")
+        base = datetime(2024, 1, 1)
+        await service.log_telemetry_batch(
+            [
+                {
+                    "mission_id": mission.id,
+                    "topic": "telemetry.vescs" if i % 2 else "telemetry.encoders",
+                    "data": _payload(i),
+                    "timestamp": base + timedelta(seconds=i),
+                }
+                for i in range(samples)
+            ]
+        )
+        return mission.id
+    raise AssertionError("no session")
+
+
+def test_flatten_roundtrip():
+    data = {"a": 1, "b": {"c": [1, 2], "d": {"e": "x"}}, "f": {}}
+    flat = flatten_payload(data)
+    assert flat == {"a": 1, "b.c": [1, 2], "b.d.e": "x", "f": {}}
+    assert unflatten_payload(flat) == data
+
+
+@pytest.mark.asyncio
+async def test_archive_roundtrip(tmp_path):
+    mission_id = await _mission(40)
+    archive = MissionArchive(directory=str(tmp_path))
+    manifest = await archive.archive(mission_id)
+
+    assert archive.is_archived(mission_id)
+    assert manifest["rows"] == 40
+    columns = manifest["topics"]["telemetry.vescs"]["columns"]
+    assert columns["data.rpm"] == "int"
+    assert columns["data.voltage"] == "float"
+    assert columns["data.imu.ok"] == "bool"
+    assert columns["data.cells"] == "json"
+
+    # Rows are gone from SQLite and served from the archive instead
+    async for session in get_db():
+        assert await DatabaseService(session).get_telemetry_range(mission_id) == []
+
+    rows = [
+        row for chunk in archive.iter_range(mission_id, chunk_size=7) for row in chunk
+    ]
+    assert [row.payload["rpm"] for row in rows] == [i * 10 for i in range(40)]
+    expected = _payload(5)
+    del expected["fault"]
+    assert rows[5].payload == expected
+    assert rows[4].payload["fault"] == "overcurrent"
+    assert rows[4].payload["state"] == 4
+
+
+@pytest.mark.asyncio
+async def test_archive_queries(tmp_path):
+    mission_id = await _mission(30)
+    archive = MissionArchive(directory=str(tmp_path))
+    await archive.archive(mission_id)
+
+    page = archive.get_page(mission_id, limit=10)
+    assert [row.payload["rpm"] for row in page] == [i * 10 for i in range(29, 19, -1)]
+    next_page = archive.get_page(
+        mission_id, limit=10, before=(page[-1].timestamp, page[-1].id)
+    )
+    assert next_page[0].payload["rpm"] == 190
+
+    vescs = archive.get_page(mission_id, "telemetry.vescs", limit=100)
+    assert len(vescs) == 15
+    assert archive.get_page(mission_id, "telemetry.unknown") == []
+
+    start = datetime(2024, 1, 1, 0, 0, 10)
+    end = datetime(2024, 1, 1, 0, 0, 20)
+    chunks = [
+        chunk
+        async for chunk in iter_telemetry(
+            mission_id, start=start, end=end, chunk_size=4, archive=archive
+        )
+    ]
+    assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+    assert chunks[0][0].payload["rpm"] == 100
+
+
+@pytest.mark.asyncio
+async def test_archive_pages_match_database_across_equal_timestamps(tmp_path):
+    await init_db()
+    async for session in get_db():
+        service = DatabaseService(session)
+        mission = await service.create_mission("Bursty Mission")
+        base = datetime(2024, 1, 1)
+        await service.log_telemetry_batch(
+            [
+                {
+                    "mission_id": mission.id,
+                    "topic": "telemetry.vescs" if i % 2 else "telemetry.encoders",
+                    "data": {"rpm": i},
+                    # Bursts of four samples share a timestamp
+                    "timestamp": base + timedelta(seconds=i // 4),
+                }
+                for i in range(37)
+            ]
+        )
+        mission_id = mission.id
+
+    async def pages(fetch) -> list:
+        result, before = [], None
+        while page := await fetch(before):
+            result.append([row.id for row in page])
+            before = (page[-1].timestamp, page[-1].id)
+        return result
+
+    async def from_database(before):
+        async for session in get_db():
+            return await DatabaseService(session).get_telemetry_logs(
+                mission_id, None, 5, before
+            )
+
+    async def from_archive(before):
+        return archive.get_page(mission_id, None, 5, before)
+
+    expected = await pages(from_database)
+    archive = MissionArchive(directory=str(tmp_path))
+    await archive.archive(mission_id)
+    assert await pages(from_archive) == expected
+    assert sum(len(page) for page in expected) == 37
@@ -0,0 +1,148 @@
+import pytest
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, List, Optional
+from ...database import CommandLog, encode_payload, init_db, get_db
+from ...services.database_service import DatabaseService
+from ...services.mission_archive import MissionArchive
+from ...services.playback import PlaybackEngine, PlaybackEvent, merge_chunks
+from ...services.websocket_hub import WebSocketHub
+
+BASE = datetime(2024, 1, 1)
+
+
+class RecordingHub(WebSocketHub):
+    def __init__(self):
+        super().__init__()
+        self.messages: List[Any] = []
+
+    def publish(self, topic: str, data: Any, timestamp: Optional[datetime] = None):
+        self.messages.append((topic, data, timestamp))
+        return 1
+
+
+async def _recorded_mission(samples: int = 20, commands: int = 4) -> int:
+    """Telemetry every second and a command every five seconds."""
+    await init_db()
+    async for session in get_db():
+        service = DatabaseService(session)
+        mission = await service.create_mission("Playback Mission")
+        await service.log_telemetry_batch(
+            [
+                {
+                    "mission_id": mission.id,
+                    "topic": "telemetry.vescs",
+                    "data": {"i": i},
+                    "timestamp": BASE + timedelta(seconds=i),
+                }
+                for i in range(samples)
+            ]
+        )
+        session.add_all(
+            CommandLog(
+                mission_id=mission.id,
+                timestamp=BASE + timedelta(seconds=i * 5, milliseconds=500),
+                command="move",
+                parameters=encode_payload({"i": i}),
+            )
+            for i in range(commands)
+        )
+        await session.commit()
+        return mission.id
+    raise AssertionError("no session")
+
+
+async def _wait_for(condition, timeout: float = 5.0) -> None:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def _event(seconds: int) -> PlaybackEvent:
+    return PlaybackEvent(BASE + timedelta(seconds=seconds), seconds, {})
+
+
+@pytest.mark.asyncio
+async def test_merge_chunks():
+    async def stream(*chunks: List[int]):
+        for chunk in chunks:
+            yield [_event(s) for s in chunk]
+
+    merged = [
+        event.id
+        async for chunk in merge_chunks(
+            stream([0, 2, 4], [6, 8, 10]), stream([1], [3, 5, 7, 20])
+        )
+        for event in chunk
+    ]
+    assert merged == [0, 1, 2, 3, 4, 5, 6, 7, 8, 10, 20]
+
+
+@pytest.mark.asyncio
+async def test_playback_merges_telemetry_and_commands():
+    mission_id = await _recorded_mission()
+    hub = RecordingHub()
+    engine = PlaybackEngine(hub=hub, chunk_size=7, prefetch_chunks=2)
+    await engine.start(mission_id, rate=1000)
+    await _wait_for(lambda: engine.state == "finished")
+
+    kinds = [data["kind"] for _, data, _ in hub.messages]
+    assert kinds.count("telemetry") == 20 and kinds.count("command") == 4
+    timestamps = [timestamp for _, _, timestamp in hub.messages]
+    assert timestamps == sorted(timestamps)
+    assert {topic for topic, _, _ in hub.messages} == {"playback.stream"}
+    assert hub.messages[7][1] == {
+        "mission_id": mission_id,
+        "kind": "command",
+        "command": "move",
+        "parameters": {"i": 1},
+        "status": "sent",
+    }
+    await engine.stop()
+
+
+@pytest.mark.asyncio
+async def test_playback_pause_step_seek():
+    mission_id = await _recorded_mission()
+    hub = RecordingHub()
+    engine = PlaybackEngine(hub=hub, chunk_size=5)
+    await engine.start(mission_id, paused=True)
+    assert await engine.step(3) == 3
+    assert [data["kind"] for _, data, _ in hub.messages] == [
+        "telemetry",
+        "command",
+        "telemetry",
+    ]
+
+    await engine.seek(BASE + timedelta(seconds=12))
+    await engine.step()
+    assert hub.messages[-1][2] == BASE + timedelta(seconds=12)
+    assert engine.status()["position"] == (BASE + timedelta(seconds=12)).isoformat()
+
+    # Real time: the next event is a second away
+    await engine.resume()
+    await asyncio.sleep(0.2)
+    assert engine.events_sent == 4
+    await engine.set_rate(1000)
+    await _wait_for(lambda: engine.state == "finished")
+    assert hub.messages[-1][1]["data"] == {"i": 19}
+    with pytest.raises(RuntimeError):
+        await engine.step()
+    await engine.stop()
+    assert engine.status()["state"] == "idle"
+
+
+@pytest.mark.asyncio
+async def test_playback_archived_mission(tmp_path):
+    mission_id = await _recorded_mission(commands=0)
+    archive = MissionArchive(directory=str(tmp_path))
+    await archive.archive(mission_id)
+    hub = RecordingHub()
+    engine = PlaybackEngine(hub=hub, archive=archive)
+    await engine.start(mission_id, start=BASE + timedelta(seconds=15), paused=True)
+    assert await engine.step(10) == 5
+    assert [data["data"]["i"] for _, data, _ in hub.messages] == [15, 16, 17, 18, 19]
+    assert engine.state == "finished"
+    await engine.stop()
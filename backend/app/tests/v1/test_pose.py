@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta, timezone
+import math
+import numpy as np
+from ...services.pose import PoseBuffer, PoseService, slerp
+
+T0 = datetime(2024, 1, 1, 12, 0, 0)
+
+
+def yaw_quaternion(yaw: float) -> dict:
+    return {"x": 0.0, "y": 0.0, "z": math.sin(yaw / 2), "w": math.cos(yaw / 2)}
+
+
+def yaw_of(orientation: dict) -> float:
+    return 2 * math.atan2(orientation["z"], orientation["w"])
+
+
+def filled_service(samples: int, capacity: int = 100) -> PoseService:
+    service = PoseService(capacity=capacity)
+    for i in range(samples):
+        service.update(
+            {"x": float(i), "y": 2.0 * i, "z": 0.0},
+            yaw_quaternion(0.01 * i),
+            T0 + timedelta(seconds=0.1 * i),
+        )
+    return service
+
+
+def test_ring_buffer_keeps_newest_rows_in_order():
+    buffer = PoseBuffer(capacity=4)
+    for i in range(6):
+        buffer.append(np.full(8, float(i)))
+
+    assert buffer.count == 4
+    assert [buffer.row(i)[0] for i in range(4)] == [2.0, 3.0, 4.0, 5.0]
+    assert buffer.count_until(3.5) == 2
+    assert buffer.count_until(3.0, side="left") == 1
+    assert list(buffer.slice(3.0, 5.0)[:, 0]) == [3.0, 4.0, 5.0]
+
+
+def test_slerp_interpolates_rotation_angle():
+    q0 = np.array([0.0, 0.0, 0.0, 1.0])
+    q1 = np.array([0.0, 0.0, math.sin(math.pi / 4), math.cos(math.pi / 4)])
+    half = slerp(q0, q1, 0.5)
+
+    assert math.isclose(2 * math.atan2(half[2], half[3]), math.pi / 4)
+    assert math.isclose(float(np.linalg.norm(half)), 1.0)
+    # -q1 is the same rotation and must take the same short path
+    assert np.allclose(slerp(q0, -q1, 0.5), half)
+
+
+def test_pose_at_interpolates_between_samples():
+    service = filled_service(10)
+    pose = service.pose_at(T0 + timedelta(seconds=0.25))
+
+    assert pose is not None
+    assert math.isclose(pose["position"]["x"], 2.5)
+    assert math.isclose(pose["position"]["y"], 5.0)
+    assert math.isclose(yaw_of(pose["orientation"]), 0.025)
+    exact = service.pose_at(T0 + timedelta(seconds=0.9))
+    assert exact is not None and exact["position"]["x"] == 9.0
+    assert service.pose_at(T0 - timedelta(seconds=1)) is None
+    assert service.pose_at(T0 + timedelta(seconds=5)) is None
+
+
+def test_pose_at_accepts_aware_timestamps_across_wraparound():
+    service = filled_service(150, capacity=100)
+    pose = service.pose_at((T0 + timedelta(seconds=9.95)).replace(tzinfo=timezone.utc))
+
+    assert pose is not None
+    assert math.isclose(pose["position"]["x"], 99.5)
+    assert service.pose_at(T0 + timedelta(seconds=1)) is None
+
+
+def test_out_of_order_samples_are_dropped():
+    service = filled_service(3)
+    assert not service.update({"x": 0.0}, {"w": 1.0}, T0)
+    assert service.out_of_order == 1
+    latest = service.latest()
+    assert latest is not None and latest["position"]["x"] == 2.0
+
+
+def test_apply_message_unwraps_odometry():
+    service = PoseService()
+    service.apply_message(
+        {"pose": {"pose": {"position": {"x": 1.0, "y": 2.0, "z": 3.0}}}}, T0
+    )
+    latest = service.latest()
+    assert latest is not None
+    assert latest["position"] == {"x": 1.0, "y": 2.0, "z": 3.0}
+    assert latest["orientation"]["w"] == 1.0
+
+
+def test_trajectory_thins_to_max_points_keeping_newest():
+    service = filled_service(100)
+    rows = service.trajectory(max_points=10)
+
+    assert len(rows) <= 10
+    assert rows[0, 1] == 0.0 and rows[-1, 1] == 99.0
+    window = service.trajectory(T0 + timedelta(seconds=1), T0 + timedelta(seconds=2))
+    assert list(window[:, 1]) == [float(i) for i in range(10, 21)]
@@ -0,0 +1,70 @@
+import pytest
+import asyncio
+import threading
+import time
+from ...services.profiler import LoopLagMonitor, SamplingProfiler
+
+
+def block_the_loop(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+def spin(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+@pytest.mark.asyncio
+async def test_loop_monitor_reports_stall_with_blocking_stack():
+    monitor = LoopLagMonitor(interval=0.01, threshold=0.05)
+    await monitor.start()
+    try:
+        await asyncio.sleep(0.03)
+        block_the_loop(0.2)
+        await asyncio.sleep(0.03)
+    finally:
+        await monitor.stop()
+
+    stats = monitor.stats()
+    assert not stats["running"]
+    assert stats["stalls"] == 1 and stats["lag_ms"]["count"] > 3
+    stall = stats["recent_stalls"][0]
+    assert stall["lag_ms"] >= 150
+    functions = [frame.split(" ", 1)[0] for frame in stall["stack"]]
+    assert functions[-1] == "block_the_loop"
+    assert functions[-2] == "test_loop_monitor_reports_stall_with_blocking_stack"
+
+
+@pytest.mark.asyncio
+async def test_sampling_profiler_collapses_stacks():
+    profiler = SamplingProfiler(enabled=True, max_duration=1)
+    task = asyncio.create_task(profiler.profile(0.25, interval=0.002))
+    await asyncio.sleep(0.02)
+    with pytest.raises(RuntimeError):
+        await profiler.profile(0.1)
+    spin(0.15)
+    profile = await task
+
+    assert not profiler.running and profiler.last is profile
+    assert profile.samples > 20
+    assert sum(profile.stacks.values()) == profile.samples - profile.idle_samples
+    lines = profile.collapsed().splitlines()
+    stack, count = lines[0].rsplit(" ", 1)
+    assert stack.split(";")[-1].startswith("spin ") and int(count) > 10
+    assert profile.top(1)[0]["function"].startswith("spin ")
+
+    with pytest.raises(ValueError):
+        await profiler.profile(5)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_profile_stops_its_sampler():
+    profiler = SamplingProfiler(enabled=True, max_duration=5)
+    task = asyncio.create_task(profiler.profile(5, interval=0.002))
+    await asyncio.sleep(0.02)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert not profiler.running
+    assert not any(t.name == "profiler" for t in threading.enumerate())
@@ -0,0 +1,202 @@
+import pytest
+import asyncio
+import json
+import socket
+from datetime import datetime, timezone
+from websockets.asyncio.server import serve
+from ...services.alerts import AlertEngine
+from ...services.ingest import TelemetryIngest
+from ...services.pose import PoseService
+from ...services.rover_link import (
+    RosbridgeSource,
+    RoverLink,
+    SimulatorSource,
+    TcpSource,
+    UdpSource,
+    parse_message,
+    source_from_url,
+)
+from ...services.telemetry_cache import TelemetryCache
+from ...services.telemetry_writer import TelemetryWriter
+from ...services.websocket_hub import WebSocketHub
+
+
+def make_link(queue_size: int = 1000) -> RoverLink:
+    hub = WebSocketHub()
+    ingest = TelemetryIngest(
+        TelemetryCache(),
+        hub,
+        TelemetryWriter(),
+        pose=PoseService(),
+        alerts=AlertEngine(hub=hub),
+    )
+    return RoverLink(ingest, queue_size=queue_size)
+
+
+async def wait_for(condition, timeout: float = 2.0) -> None:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        if loop.time() > deadline:
+            raise AssertionError("condition not met in time")
+        await asyncio.sleep(0.005)
+
+
+def test_parse_message_formats():
+    topic, data, timestamp = parse_message(
+        '{"topic": "telemetry.vescs", "data": {"rpm": 1}, "timestamp": 1700000000.5}'
+    )
+    assert (topic, data) == ("telemetry.vescs", {"rpm": 1})
+    assert timestamp == datetime.fromtimestamp(1700000000.5, timezone.utc)
+
+    rosbridge = {
+        "op": "publish",
+        "topic": "/odom",
+        "msg": {"header": {"stamp": {"sec": 10, "nanosec": 500000000}}, "pose": {}},
+    }
+    topic, data, timestamp = parse_message(json.dumps(rosbridge).encode())
+    assert topic == "pose.current"
+    assert timestamp == datetime.fromtimestamp(10.5, timezone.utc)
+
+    assert parse_message('{"topic": "t", "data": {}}')[2] is None
+    for bad in (
+        "not json",
+        "[]",
+        '{"data": {}}',
+        '{"topic": "t", "data": 5}',
+        '{"op": "publish", "topic": "/unknown", "msg": {}}',
+        '{"topic": "t", "data": {}, "timestamp": "yesterday"}',
+        '{"topic": "t", "data": {}, "timestamp": 1e20}',
+        '{"topic": "t", "data": {}, "timestamp": -1e20}',
+        '{"op": "publish", "topic": "/odom", "msg": {"header": '
+        '{"stamp": {"sec": 100000000000000000000, "nanosec": 0}}}}',
+    ):
+        with pytest.raises(ValueError):
+            parse_message(bad)
+
+    # Counted instead of escaping into the source's connection
+    link = RoverLink()
+    link.receive(SimulatorSource(), '{"topic": "t", "data": {}, "timestamp": 1e20}')
+    assert link.counts["parse_errors"] == 1
+
+
+def test_source_from_url():
+    assert isinstance(source_from_url("simulator"), SimulatorSource)
+    assert isinstance(source_from_url("ws://rover:9090"), RosbridgeSource)
+    udp = source_from_url("udp://0.0.0.0:9870")
+    assert isinstance(udp, UdpSource) and udp.port == 9870
+    assert isinstance(source_from_url("tcp://rover:9870"), TcpSource)
+    with pytest.raises(ValueError):
+        source_from_url("serial:///dev/ttyUSB0")
+
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_oldest():
+    link = make_link(queue_size=3)
+    for i in range(5):
+        link.submit("telemetry.vescs", {"rpm": i})
+    assert link.counts["dropped"] == 2
+
+    await link.start()
+    await link.stop()
+    cached = link.ingest.cache.get("telemetry.vescs")
+    assert cached is not None and cached.data == {"rpm": 4}
+    assert link.counts["ingested"] == 3
+
+
+@pytest.mark.asyncio
+async def test_simulator_feeds_ingest():
+    link = make_link()
+    source = SimulatorSource(
+        {"telemetry.vescs": 200, "telemetry.rgbd": 100, "pose.current": 100}, seed=1
+    )
+    link.add_source(source)
+    await link.start()
+    await asyncio.sleep(0.1)
+    await link.stop()
+
+    assert link.counts["parse_errors"] == 0
+    assert link.counts["ingested"] == link.counts["received"] >= 30
+    vescs = link.ingest.cache.get("telemetry.vescs")
+    assert vescs is not None and set(vescs.data) >= {"front_left", "rear_right"}
+    assert link.ingest.pose.latest() is not None
+    assert not source.connected
+
+
+@pytest.mark.asyncio
+async def test_tcp_source_reconnects():
+    connections = 0
+
+    async def handle(reader, writer):
+        nonlocal connections
+        connections += 1
+        line = {"topic": "telemetry.payload", "data": {"n": connections}}
+        writer.write(json.dumps(line).encode() + b"\nnot json\n")
+        await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    link = make_link()
+    source = TcpSource("127.0.0.1", port, min_backoff=0.01, max_backoff=0.02)
+    link.add_source(source)
+    await link.start()
+    try:
+        await wait_for(lambda: link.counts["ingested"] >= 2)
+    finally:
+        await link.stop()
+        server.close()
+
+    assert source.reconnects >= 1
+    assert source.last_error == "connection closed"
+    assert link.counts["parse_errors"] >= 2
+
+
+@pytest.mark.asyncio
+async def test_udp_source_receives_datagrams():
+    link = make_link()
+    source = UdpSource("127.0.0.1", 0)
+    link.add_source(source)
+    await link.start()
+    try:
+        await wait_for(lambda: source.address is not None)
+        assert source.address is not None
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            message = {"topic": "telemetry.encoders", "data": {"ticks": 7}}
+            sock.sendto(json.dumps(message).encode(), source.address)
+        await wait_for(lambda: link.counts["ingested"] == 1)
+    finally:
+        await link.stop()
+
+    cached = link.ingest.cache.get("telemetry.encoders")
+    assert cached is not None and cached.data == {"ticks": 7}
+
+
+@pytest.mark.asyncio
+async def test_rosbridge_source_subscribes_and_maps_topics():
+    subscribed = []
+
+    async def rosbridge(websocket):
+        async for raw in websocket:
+            request = json.loads(raw)
+            subscribed.append(request["topic"])
+            if request["topic"] == "/vesc/state":
+                await websocket.send(
+                    json.dumps(
+                        {"op": "publish", "topic": "/vesc/state", "msg": {"rpm": 9}}
+                    )
+                )
+
+    async with serve(rosbridge, "127.0.0.1", 0) as server:
+        port = list(server.sockets)[0].getsockname()[1]
+        link = make_link()
+        link.add_source(RosbridgeSource(f"ws://127.0.0.1:{port}"))
+        await link.start()
+        try:
+            await wait_for(lambda: link.counts["ingested"] == 1)
+        finally:
+            await link.stop()
+
+    assert "/vesc/state" in subscribed and "/odom" in subscribed
+    cached = link.ingest.cache.get("telemetry.vescs")
+    assert cached is not None and cached.data == {"rpm": 9}
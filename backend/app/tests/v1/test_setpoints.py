@@ -0,0 +1,99 @@
+import pytest
+import asyncio
+from ...services.command_log_writer import CommandLogWriter
+from ...services.commands import CommandDispatcher, FakeRover
+from ...services.setpoints import SetpointCoalescer
+from ...services.websocket_hub import WebSocketHub
+
+
+async def _coalescer(rate: float = 20, **rover) -> SetpointCoalescer:
+    dispatcher = CommandDispatcher(
+        FakeRover(**rover), writer=CommandLogWriter(), hub=WebSocketHub()
+    )
+    await dispatcher.start()
+    coalescer = SetpointCoalescer(dispatcher, rate=rate)
+    await coalescer.start()
+    return coalescer
+
+
+@pytest.mark.asyncio
+async def test_burst_sends_first_and_latest_values():
+    coalescer = await _coalescer(rate=20)
+    statuses = [
+        await coalescer.set("set_vesc_acceleration", {"value": v}) for v in range(10)
+    ]
+    assert statuses[0] == "sent"
+    assert set(statuses[1:]) == {"queued"}
+
+    await asyncio.sleep(0.08)
+    sent = [r.parameters["value"] for r in coalescer.dispatcher.recent()][::-1]
+    assert sent == [0, 9]
+    assert coalescer.counts["coalesced"] == 8
+    assert coalescer.queue_latency.count == 10
+    # Queued requests waited for the next tick, 50 ms after the first send
+    assert 40 <= coalescer.queue_latency.max <= 80
+    await coalescer.stop()
+    await coalescer.dispatcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_setpoint_queued_later_with_an_earlier_slot_is_not_delayed():
+    coalescer = await _coalescer(rate=4)
+    await coalescer.set("set_vesc_acceleration", {"value": 1})
+    await asyncio.sleep(0.15)
+    await coalescer.set("set_vesc_speed", {"value": 1})
+    # The loop waits for this one, due in 250 ms
+    assert await coalescer.set("set_vesc_speed", {"value": 2}) == "queued"
+    await asyncio.sleep(0)
+    # Due in 100 ms
+    await coalescer.set("set_vesc_acceleration", {"value": 2})
+
+    await asyncio.sleep(0.17)
+    sent = [(r.command, r.parameters["value"]) for r in coalescer.dispatcher.recent()]
+    assert ("set_vesc_acceleration", 2) in sent
+    assert ("set_vesc_speed", 2) not in sent
+    await coalescer.stop()
+    await coalescer.dispatcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_unchanged_values_are_not_sent():
+    coalescer = await _coalescer(rate=1000)
+    assert await coalescer.set("set_manipulator_power", {"value": 50}) == "sent"
+    await asyncio.sleep(0.01)
+    assert await coalescer.set("set_manipulator_power", {"value": 50}) == "unchanged"
+    assert await coalescer.set("set_manipulator_speed", {"value": 50}) == "sent"
+
+    assert coalescer.counts["sent"] == 2 and coalescer.counts["unchanged"] == 1
+    assert coalescer.dispatcher.stats()["sent"] == 2
+    await coalescer.stop()
+    await coalescer.dispatcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_burst_returning_to_sent_value_is_dropped():
+    coalescer = await _coalescer(rate=20)
+    await coalescer.set("set_vesc_acceleration", {"value": 1})
+    await coalescer.set("set_vesc_acceleration", {"value": 2})
+    await coalescer.set("set_vesc_acceleration", {"value": 1})
+    await coalescer.stop()
+
+    assert coalescer.counts["sent"] == 1 and coalescer.counts["unchanged"] == 1
+    await coalescer.dispatcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_failed_setpoint_is_resent():
+    coalescer = await _coalescer(rate=1000, reject=["set_manipulator_power"])
+    await coalescer.set("set_manipulator_power", {"value": 10})
+    await asyncio.sleep(0.02)
+    assert await coalescer.set("set_manipulator_power", {"value": 10}) == "sent"
+    await coalescer.stop()
+    await coalescer.dispatcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_set_requires_running_coalescer():
+    coalescer = SetpointCoalescer(CommandDispatcher(writer=CommandLogWriter()))
+    with pytest.raises(RuntimeError):
+        await coalescer.set("set_manipulator_power", {"value": 10})
@@ -0,0 +1,179 @@
+import pytest
+import asyncio
+import base64
+import json
+import zlib
+from typing import Any, Dict, List, Tuple
+from ...services.slam_map import TiledMapStore, UNKNOWN_CELL
+from ...services.websocket_hub import Subscriber, WebSocketHub
+
+
+class RecordingHub(WebSocketHub):
+    def __init__(self):
+        super().__init__()
+        self.messages: List[Tuple[str, Any]] = []
+
+    def publish(self, topic, data, timestamp=None):
+        self.messages.append((topic, data))
+        return super().publish(topic, data, timestamp)
+
+
+class FakeWebSocket:
+    async def send_text(self, text: str) -> None:
+        pass
+
+
+def decode_tiles(message: Dict[str, Any]) -> Dict[Tuple[int, int], bytes]:
+    return {
+        (tile["x"], tile["y"]): zlib.decompress(base64.b64decode(tile["data"]))
+        for tile in message["tiles"]
+    }
+
+
+def cell(tiles: Dict[Tuple[int, int], bytes], size: int, x: int, y: int) -> int:
+    tile = tiles[(x // size, y // size)]
+    return tile[(y % size) * size + x % size]
+
+
+def grid(width: int, height: int) -> bytes:
+    return bytes((x + y) % 100 for y in range(height) for x in range(width))
+
+
+@pytest.mark.asyncio
+async def test_update_round_trips_cells_through_tiles():
+    store = TiledMapStore(hub=RecordingHub(), tile_size=4)
+    data = grid(10, 6)
+    delta = await store.update(10, 6, 0.05, 0.0, 0.0, data)
+
+    assert delta is not None
+    assert delta["version"] == 1 and delta["reset"] is True
+    tiles = decode_tiles(delta)
+    assert set(tiles) == {(x, y) for x in range(3) for y in range(2)}
+    for y in range(6):
+        for x in range(10):
+            assert cell(tiles, 4, x, y) == data[y * 10 + x]
+    # Cells past the edge of the grid are unknown
+    assert cell(tiles, 4, 11, 7) == UNKNOWN_CELL
+
+
+@pytest.mark.asyncio
+async def test_update_publishes_only_changed_tiles():
+    hub = RecordingHub()
+    store = TiledMapStore(hub=hub, tile_size=4)
+    data = bytearray(grid(8, 8))
+    await store.update(8, 8, 0.05, 0.0, 0.0, bytes(data))
+    assert await store.update(8, 8, 0.05, 0.0, 0.0, bytes(data)) is None
+
+    data[5 * 8 + 6] = 100
+    delta = await store.update(8, 8, 0.05, 0.0, 0.0, bytes(data))
+    assert delta is not None
+    assert delta["version"] == 2 and delta["base_version"] == 1
+    assert delta["reset"] is False
+    assert [(t["x"], t["y"]) for t in delta["tiles"]] == [(1, 1)]
+    assert cell(decode_tiles(delta), 4, 6, 5) == 100
+    assert [topic for topic, _ in hub.messages] == ["slam.map", "slam.map"]
+
+
+@pytest.mark.asyncio
+async def test_update_accepts_signed_cell_lists():
+    store = TiledMapStore(hub=RecordingHub(), tile_size=2)
+    delta = await store.update(2, 2, 0.1, 0.0, 0.0, [-1, 0, 50, 100])
+
+    assert delta is not None
+    assert decode_tiles(delta)[(0, 0)] == bytes([UNKNOWN_CELL, 0, 50, 100])
+    with pytest.raises(ValueError):
+        await store.update(2, 2, 0.1, 0.0, 0.0, [0, 0, 0])
+    assert store.version == 1
+
+
+@pytest.mark.asyncio
+async def test_origin_shift_keeps_tiles_world_aligned():
+    store = TiledMapStore(hub=RecordingHub(), tile_size=4)
+    await store.update(4, 4, 1.0, 0.0, 0.0, bytes([10] * 16))
+    # The map grows by 4 cells to the left: the old tile is unchanged
+    data = bytes([20] * 4 + [10] * 4) * 4
+    delta = await store.update(8, 4, 1.0, -4.0, 0.0, data)
+
+    assert delta is not None
+    assert [(t["x"], t["y"]) for t in delta["tiles"]] == [(-1, 0)]
+    assert store.tiles[(0, 0)].version == 1
+
+
+@pytest.mark.asyncio
+async def test_snapshot_since_version():
+    store = TiledMapStore(hub=RecordingHub(), tile_size=4)
+    data = bytearray(grid(8, 4))
+    await store.update(8, 4, 0.05, 0.0, 0.0, bytes(data))
+    data[0] = 99
+    await store.update(8, 4, 0.05, 0.0, 0.0, bytes(data))
+
+    full = store.snapshot()
+    assert full["reset"] is True and len(full["tiles"]) == 2
+    since = store.snapshot(since_version=1)
+    assert since["reset"] is False and since["base_version"] == 1
+    assert [(t["x"], t["y"]) for t in since["tiles"]] == [(0, 0)]
+    assert store.snapshot(since_version=2)["tiles"] == []
+
+
+@pytest.mark.asyncio
+async def test_resolution_change_resets_map():
+    store = TiledMapStore(hub=RecordingHub(), tile_size=4)
+    await store.update(8, 4, 0.05, 0.0, 0.0, grid(8, 4))
+    delta = await store.update(4, 4, 0.1, 0.0, 0.0, grid(4, 4))
+
+    assert delta is not None and delta["reset"] is True
+    assert list(store.tiles) == [(0, 0)]
+    # Clients at version 1 hold tiles for the old resolution
+    assert store.snapshot(since_version=1)["reset"] is True
+
+
+@pytest.mark.asyncio
+async def test_apply_occupancy_grid_message():
+    store = TiledMapStore(hub=RecordingHub(), tile_size=4)
+    delta = await store.apply_message(
+        {
+            "info": {
+                "width": 2,
+                "height": 1,
+                "resolution": 0.5,
+                "origin": {"position": {"x": 1.0, "y": 2.0, "z": 0.0}},
+            },
+            "data": [0, 100],
+        }
+    )
+
+    assert delta is not None
+    tiles = decode_tiles(delta)
+    assert cell(tiles, 4, 2, 4) == 0 and cell(tiles, 4, 3, 4) == 100
+
+
+@pytest.mark.asyncio
+async def test_new_subscriber_receives_snapshot():
+    hub = WebSocketHub()
+    store = TiledMapStore(hub=hub, tile_size=4)
+    await store.update(4, 4, 0.05, 0.0, 0.0, grid(4, 4))
+    subscriber = Subscriber(FakeWebSocket())
+    hub.add(subscriber)
+    hub.handle_message(
+        subscriber, json.dumps({"action": "subscribe", "topics": ["slam.*"]})
+    )
+
+    replies = [json.loads(text) for text in subscriber._control]
+    assert replies[0]["type"] == "subscribed"
+    assert replies[1]["topic"] == "slam.map"
+    assert replies[1]["data"]["version"] == 1
+    assert len(replies[1]["data"]["tiles"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_updates_apply_in_order():
+    hub = RecordingHub()
+    store = TiledMapStore(hub=hub, tile_size=4)
+    grids = [bytes([value] * 16) for value in (1, 2, 3)]
+    deltas = await asyncio.gather(
+        *(store.update(4, 4, 0.05, 0.0, 0.0, data) for data in grids)
+    )
+
+    assert [delta["version"] for delta in deltas] == [1, 2, 3]
+    assert [delta["base_version"] for delta in deltas] == [0, 1, 2]
+    assert store.tiles[(0, 0)].cells == grids[-1]
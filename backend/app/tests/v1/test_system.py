@@ -1,3 +1,10 @@
+import pytest
+from httpx import ASGITransport, AsyncClient
+from ...main import app
+from ...services.health import health_scheduler
+from ...services.profiler import profiler
+
+
 def test_basic():
     assert True
 
@@ -11,12 +18,70 @@ def test_example_green():
     assert mock_func.called
 
 
-def test_get_system_status():
-    pass
+@pytest.mark.asyncio
+async def test_get_system_status():
+    await health_scheduler.run_check(health_scheduler.checks["disk"])
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        response = await client.get("/api/v1/system/status")
 
+    body = response.json()
+    assert body["version"] == health_scheduler.version
+    assert {check["category"] for check in body["checks"]} == {"system"}
+    disk = next(check for check in body["checks"] if check["name"] == "disk")
+    assert disk["unit"] == "% free" and disk["checked_at"] is not None
 
-def test_get_network_status():
-    pass
+
+@pytest.mark.asyncio
+async def test_get_network_status():
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        response = await client.get("/api/v1/system/network")
+
+    names = {check["name"] for check in response.json()["checks"]}
+    assert names == {"websocket", "rover_link", "telemetry_link"}
+
+
+@pytest.mark.asyncio
+async def test_get_loop_lag():
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        response = await client.get("/api/v1/system/loop")
+
+    body = response.json()
+    assert response.status_code == 200
+    assert body["threshold_ms"] > 0 and body["recent_stalls"] == []
+
+
+@pytest.mark.asyncio
+async def test_profile_event_loop(monkeypatch):
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        params = {"duration": 0.05, "include_idle": True}
+        monkeypatch.setattr(profiler, "enabled", False)
+        response = await client.post("/api/v1/system/profile", params=params)
+        assert response.status_code == 403
+
+        monkeypatch.setattr(profiler, "enabled", True)
+        response = await client.post("/api/v1/system/profile", params=params)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert ".folded" in response.headers["content-disposition"]
+        assert response.text.endswith("\n")
+
+        response = await client.post(
+            "/api/v1/system/profile", params={**params, "format": "json"}
+        )
+        assert response.json()["samples"] > 0
+
+        response = await client.post(
+            "/api/v1/system/profile", params={"duration": 3600}
+        )
+        assert response.status_code == 400
 
 
 def test_restart_system():
@@ -1,3 +1,13 @@
+import pytest
+from httpx import ASGITransport, AsyncClient
+from ...main import app
+from ...services.telemetry_cache import telemetry_cache
+
+
+def _client() -> AsyncClient:
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
 def test_basic():
     assert True
 
@@ -11,24 +21,78 @@ def test_example_green():
     assert mock_func.called
 
 
-def test_get_latest_telemetry():
-    pass
+@pytest.mark.asyncio
+async def test_get_latest_telemetry():
+    telemetry_cache.update("telemetry.payload", {"ph": 7.1})
+    async with _client() as client:
+        response = await client.get("/api/v1/telemetry/latest")
+        assert response.status_code == 200
+        body = response.json()
+        assert body["version"] == telemetry_cache.version
+        assert body["topics"]["telemetry.payload"]["data"] == {"ph": 7.1}
+
+        etag = response.headers["etag"]
+        response = await client.get(
+            "/api/v1/telemetry/latest", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 304
+
+        telemetry_cache.update("telemetry.payload", {"ph": 7.2})
+        response = await client.get(
+            "/api/v1/telemetry/latest", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 200
 
 
 def test_get_telemetry_health():
     pass
 
 
-def test_get_sensors_vescs():
-    pass
+@pytest.mark.asyncio
+async def test_get_sensors_vescs():
+    telemetry_cache.update("telemetry.vescs", {"rpm": 1500})
+    async with _client() as client:
+        response = await client.get("/api/v1/telemetry/sensors/vescs")
+        assert response.status_code == 200
+        assert response.json()["data"] == {"rpm": 1500}
+        seq = response.json()["seq"]
+
+        response = await client.get(
+            "/api/v1/telemetry/sensors/vescs",
+            headers={"If-None-Match": response.headers["etag"]},
+        )
+        assert response.status_code == 304
+
+        # Updates to other topics leave this topic's ETag alone
+        telemetry_cache.update("telemetry.encoders", {"ticks": 3})
+        response = await client.get(
+            "/api/v1/telemetry/sensors/vescs",
+            headers={"If-None-Match": response.headers["etag"]},
+        )
+        assert response.status_code == 304
+
+        telemetry_cache.update("telemetry.vescs", {"rpm": 1600})
+        response = await client.get("/api/v1/telemetry/sensors/vescs")
+        assert response.json()["seq"] == seq + 1
 
 
 def test_get_sensors_encoders():
     pass
 
 
-def test_get_sensors_rgbd():
-    pass
+@pytest.mark.asyncio
+async def test_get_sensors_rgbd():
+    telemetry_cache.clear()
+    async with _client() as client:
+        response = await client.get("/api/v1/telemetry/sensors/rgbd")
+        assert response.status_code == 404
+        # "*" matches only an existing value
+        wildcard = {"If-None-Match": "*"}
+        response = await client.get("/api/v1/telemetry/sensors/rgbd", headers=wildcard)
+        assert response.status_code == 404
+        telemetry_cache.update("telemetry.rgbd", {"ax": 0.1})
+        response = await client.get("/api/v1/telemetry/sensors/rgbd", headers=wildcard)
+        assert response.status_code == 304
 
 
 def test_get_sensors_payload():
@@ -0,0 +1,95 @@
+import pytest
+from ...services.ingest import TelemetryIngest
+from ...services.pose import PoseService
+from ...services.slam_map import TiledMapStore
+from ...services.telemetry_cache import TelemetryCache
+from ...services.telemetry_writer import TelemetryWriter
+from ...services.websocket_hub import Subscriber, WebSocketHub
+
+
+def test_per_topic_sequence_numbers():
+    cache = TelemetryCache()
+    cache.update("telemetry.vescs", {"rpm": 1})
+    cache.update("telemetry.vescs", {"rpm": 2})
+    cache.update("telemetry.encoders", {"ticks": 7})
+
+    vescs = cache.get("telemetry.vescs")
+    assert vescs is not None
+    assert vescs.seq == 2 and vescs.data == {"rpm": 2}
+    assert cache.get("telemetry.encoders").seq == 1
+    assert cache.get("telemetry.rgbd") is None
+    assert cache.version == 3
+    assert set(cache.snapshot()) == {"telemetry.vescs", "telemetry.encoders"}
+
+
+def test_etags_change_only_with_their_topic():
+    cache = TelemetryCache()
+    cache.update("telemetry.vescs", {"rpm": 1})
+    vescs_etag, all_etag = cache.etag("telemetry.vescs"), cache.etag()
+
+    cache.update("telemetry.encoders", {"ticks": 1})
+    assert cache.etag("telemetry.vescs") == vescs_etag
+    assert cache.etag() != all_etag
+    assert TelemetryCache().etag("telemetry.vescs") != TelemetryCache().etag(
+        "telemetry.vescs"
+    )
+
+
+class FakeWebSocket:
+    async def send_text(self, text: str) -> None:
+        pass
+
+
+@pytest.mark.asyncio
+async def test_ingest_updates_cache_hub_and_writer():
+    cache, hub, writer = TelemetryCache(), WebSocketHub(), TelemetryWriter()
+    subscriber = Subscriber(FakeWebSocket())
+    hub.add(subscriber)
+    hub.subscribe(subscriber, ["telemetry.all"])
+    ingest = TelemetryIngest(cache, hub, writer)
+
+    await ingest.publish("telemetry.vescs", {"rpm": 5})
+    assert cache.get("telemetry.vescs").data == {"rpm": 5}
+    assert subscriber.queue_depth == 1
+    assert writer.pending == 0  # no active mission, nothing is logged
+
+    await writer.start()
+    ingest.mission_id = 1
+    await ingest.publish("telemetry.vescs", {"rpm": 6})
+    assert writer.pending == 1
+    writer._buffer.clear()
+    await writer.stop()
+
+
+@pytest.mark.asyncio
+async def test_ingest_routes_map_grids_to_map_store():
+    cache, hub = TelemetryCache(), WebSocketHub()
+    store = TiledMapStore(hub=hub, tile_size=4)
+    ingest = TelemetryIngest(cache, hub, TelemetryWriter(), store)
+
+    await ingest.publish(
+        "slam.map",
+        {
+            "info": {
+                "width": 2,
+                "height": 2,
+                "resolution": 0.1,
+                "origin": {"position": {"x": 0.0, "y": 0.0}},
+            },
+            "data": [0, 0, 100, -1],
+        },
+    )
+    assert store.version == 1
+    # The full grid is not cached; clients read tiles instead
+    assert cache.get("slam.map") is None
+
+
+@pytest.mark.asyncio
+async def test_ingest_records_poses():
+    cache, hub, pose = TelemetryCache(), WebSocketHub(), PoseService()
+    ingest = TelemetryIngest(cache, hub, TelemetryWriter(), pose=pose)
+
+    await ingest.publish("pose.current", {"position": {"x": 1.0, "y": 2.0, "z": 0.0}})
+    latest = pose.latest()
+    assert latest is not None and latest["position"]["x"] == 1.0
+    assert cache.get("pose.current") is not None
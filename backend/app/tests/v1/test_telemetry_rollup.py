@@ -0,0 +1,93 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from ...database import init_db, get_db
+from ...services.database_service import DatabaseService
+from ...services.telemetry_rollup import (
+    bucket_start,
+    choose_resolution,
+    compute_rollups,
+    downsample,
+    numeric_fields,
+)
+
+BASE = datetime(2024, 1, 1, 12, 0, 0)
+
+
+def test_bucket_start():
+    assert bucket_start(BASE + timedelta(seconds=17.5), 10) == BASE + timedelta(
+        seconds=10
+    )
+    aware = datetime(2024, 1, 1, 14, 0, 5, tzinfo=timezone(timedelta(hours=2)))
+    assert bucket_start(aware, 60) == BASE
+
+
+def test_numeric_fields():
+    data = {"rpm": 10, "ok": True, "state": "idle", "imu": {"ax": 0.5}, "nan": 1e999}
+    assert numeric_fields(data) == {"rpm": 10.0, "imu.ax": 0.5}
+
+
+def test_compute_rollups():
+    rows = [
+        {
+            "mission_id": 1,
+            "topic": "telemetry.vescs",
+            "data": {"current": float(i)},
+            "timestamp": BASE + timedelta(seconds=i),
+        }
+        for i in range(25)
+    ]
+    rollups = compute_rollups(rows, resolutions=(10,))
+    assert [(r["count"], r["min"], r["max"], r["last"]) for r in rollups] == [
+        (10, 0.0, 9.0, 9.0),
+        (10, 10.0, 19.0, 19.0),
+        (5, 20.0, 24.0, 24.0),
+    ]
+    assert rollups[0]["sum"] == 45.0
+
+
+def test_choose_resolution():
+    hour = BASE + timedelta(hours=1)
+    assert choose_resolution(BASE, BASE + timedelta(seconds=100), 500) == (1, 1)
+    assert choose_resolution(BASE, hour, 500) == (1, 8)
+    assert choose_resolution(BASE, hour, 60) == (60, 60)
+    assert choose_resolution(BASE, hour, 100) == (10, 40)
+    resolution, width = choose_resolution(BASE + timedelta(seconds=5), hour, 100)
+    assert (hour - bucket_start(BASE + timedelta(seconds=5), width)) / timedelta(
+        seconds=width
+    ) <= 100
+
+
+@pytest.mark.asyncio
+async def test_rollups_maintained_at_ingest():
+    await init_db()
+    async for session in get_db():
+        service = DatabaseService(session)
+        mission = await service.create_mission("Rollup Mission")
+        for batch in range(3):
+            await service.log_telemetry_batch(
+                [
+                    {
+                        "mission_id": mission.id,
+                        "topic": "telemetry.vescs",
+                        "data": {"current": float(batch * 20 + i)},
+                        "timestamp": BASE + timedelta(seconds=batch * 20 + i),
+                    }
+                    for i in range(20)
+                ]
+            )
+        rows = await service.get_rollups(
+            mission.id, "telemetry.vescs", "current", resolution=60
+        )
+        assert len(rows) == 1
+        assert (rows[0].count, rows[0].min, rows[0].max) == (60, 0.0, 59.0)
+        assert rows[0].last == 59.0
+
+        rows = await service.get_rollups(
+            mission.id, "telemetry.vescs", "current", resolution=10
+        )
+        buckets = downsample(rows, 30)
+        assert [b.count for b in buckets] == [30, 30]
+        assert buckets[1].mean == sum(range(30, 60)) / 30
+        assert await service.get_rollup_span(
+            mission.id, "telemetry.vescs", "current"
+        ) == (BASE, BASE + timedelta(seconds=59))
@@ -0,0 +1,91 @@
+import pytest
+import asyncio
+from ...database import init_db, get_db
+from ...services.database_service import DatabaseService
+from ...services.telemetry_writer import TelemetryWriter
+import json
+
+
+async def _create_mission() -> int:
+    await init_db()
+    async for session in get_db():
+        mission = await DatabaseService(session).create_mission("Writer Mission")
+        return mission.id
+    raise AssertionError("no session")
+
+
+async def _count_rows(mission_id: int) -> int:
+    async for session in get_db():
+        logs = await DatabaseService(session).get_telemetry_logs(
+            mission_id, limit=100_000
+        )
+        return len(logs)
+    raise AssertionError("no session")
+
+
+@pytest.mark.asyncio
+async def test_log_telemetry_batch():
+    mission_id = await _create_mission()
+    async for session in get_db():
+        service = DatabaseService(session)
+        rows = [
+            {"mission_id": mission_id, "topic": "telemetry.vescs", "data": {"rpm": i}}
+            for i in range(10)
+        ]
+        assert await service.log_telemetry_batch(rows) == 10
+        assert await service.log_telemetry_batch([]) == 0
+
+        logs = await service.get_telemetry_logs(mission_id)
+        assert sorted(json.loads(log.data)["rpm"] for log in logs) == list(range(10))
+
+
+@pytest.mark.asyncio
+async def test_writer_flushes_on_batch_size():
+    mission_id = await _create_mission()
+    writer = TelemetryWriter(batch_size=50, flush_interval=60)
+    await writer.start()
+    try:
+        for i in range(120):
+            await writer.submit(mission_id, "telemetry.vescs", {"rpm": i})
+        for _ in range(100):
+            if writer.rows_written >= 100:
+                break
+            await asyncio.sleep(0.01)
+        assert writer.rows_written == 100
+        assert writer.pending == 20
+        assert [m.rows for m in writer.metrics] == [50, 50]
+    finally:
+        await writer.stop()
+    assert await _count_rows(mission_id) == 120
+
+
+@pytest.mark.asyncio
+async def test_writer_flushes_on_interval():
+    mission_id = await _create_mission()
+    writer = TelemetryWriter(batch_size=1000, flush_interval=0.05)
+    await writer.start()
+    try:
+        await writer.submit(mission_id, "telemetry.encoders", {"ticks": 1})
+        await asyncio.sleep(0.2)
+        assert writer.rows_written == 1
+        assert writer.metrics[-1].latency_s > 0
+    finally:
+        await writer.stop()
+
+
+@pytest.mark.asyncio
+async def test_writer_backpressure_and_shutdown_flush():
+    mission_id = await _create_mission()
+    writer = TelemetryWriter(batch_size=10, flush_interval=60, max_pending=10)
+    await writer.start()
+    for i in range(25):
+        await writer.submit(mission_id, "telemetry.payload", {"i": i})
+        assert writer.pending <= 10
+    await writer.stop()
+
+    assert writer.pending == 0
+    assert writer.rows_written == 25
+    assert writer.stats()["flush_count"] == 3
+    assert await _count_rows(mission_id) == 25
+    with pytest.raises(RuntimeError):
+        await writer.submit(mission_id, "telemetry.payload", {})
@@ -1,3 +1,12 @@
+import pytest
+from httpx import ASGITransport, AsyncClient
+from ...main import app
+from ...services.pose import pose_service
+from ...services.slam_map import map_store
+from datetime import datetime, timedelta
+import numpy as np
+
+
 def test_basic():
     assert True
 
@@ -11,9 +20,55 @@ def test_example_green():
     assert mock_func.called
 
 
-def test_get_current_slam_map():
-    pass
+@pytest.mark.asyncio
+async def test_get_current_slam_map():
+    await map_store.update(4, 4, 0.05, 0.0, 0.0, bytes(16))
+    version = map_store.version
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        full = await client.get("/api/v1/slam/map/current")
+        since = await client.get(
+            "/api/v1/slam/map/current", params={"since_version": version}
+        )
+
+    assert full.status_code == 200
+    assert full.json()["version"] == version
+    assert full.json()["reset"] is True
+    assert full.json()["tiles"]
+    assert since.json()["tiles"] == []
+
+
+@pytest.mark.asyncio
+async def test_get_current_pose():
+    start = datetime(2024, 1, 1, 12, 0, 0)
+    for i in range(5):
+        pose_service.update(
+            {"x": float(i), "y": 0.0, "z": 0.0},
+            {"w": 1.0},
+            start + timedelta(seconds=i),
+        )
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        latest = await client.get("/api/v1/pose/current")
+        interpolated = await client.get(
+            "/api/v1/pose/current", params={"at": "2024-01-01T12:00:02.5Z"}
+        )
+        outside = await client.get(
+            "/api/v1/pose/current", params={"at": "2020-01-01T00:00:00Z"}
+        )
+        trajectory = await client.get(
+            "/api/v1/pose/trajectory", params={"max_points": 3}
+        )
 
+    assert latest.status_code == 200
+    assert latest.json()["position"]["x"] == 4.0
+    assert interpolated.json()["position"]["x"] == 2.5
+    assert outside.status_code == 404
 
-def test_get_current_pose():
-    pass
+    assert trajectory.headers["x-pose-fields"] == "t,x,y,z,qx,qy,qz,qw"
+    rows = np.frombuffer(trajectory.content, dtype="<f4").reshape(-1, 8)
+    assert int(trajectory.headers["x-pose-count"]) == len(rows) == 3
+    assert list(rows[:, 0]) == [0.0, 2.0, 4.0]
+    assert list(rows[:, 1]) == [0.0, 2.0, 4.0]
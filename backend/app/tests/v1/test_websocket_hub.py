@@ -0,0 +1,297 @@
+import pytest
+import asyncio
+from fastapi import WebSocketDisconnect
+from fastapi.testclient import TestClient
+from ...main import app
+from ...services.websocket_hub import (
+    DeltaEncoder,
+    Subscriber,
+    WebSocketHub,
+    topic_patterns,
+)
+import json
+import msgpack
+
+
+class FakeWebSocket:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.sent: list = []
+
+    async def send_text(self, text: str) -> None:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.sent.append(json.loads(text))
+
+
+def test_topic_patterns():
+    assert topic_patterns("telemetry.vescs") == [
+        "telemetry.vescs",
+        "telemetry.all",
+        "telemetry.*",
+        "*",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_publish_matches_exact_and_wildcard_topics():
+    hub = WebSocketHub()
+    exact, wildcard, other = (Subscriber(FakeWebSocket()) for _ in range(3))
+    for subscriber in (exact, wildcard, other):
+        hub.add(subscriber)
+    hub.subscribe(exact, ["telemetry.vescs"])
+    hub.subscribe(wildcard, ["telemetry.all"])
+    hub.subscribe(other, ["alerts.live"])
+
+    assert hub.publish("telemetry.vescs", {"rpm": 1}) == 2
+    assert hub.publish("pose.current", {"x": 0}) == 0
+    assert exact.queue_depth == 1 and wildcard.queue_depth == 1
+    assert other.queue_depth == 0
+
+    hub.unsubscribe(exact, ["telemetry.vescs"])
+    assert hub.publish("telemetry.vescs", {"rpm": 2}) == 1
+    hub.remove(wildcard)
+    assert hub.publish("telemetry.vescs", {"rpm": 3}) == 0
+
+
+@pytest.mark.asyncio
+async def test_drop_oldest_and_conflate_policies():
+    dropping = Subscriber(FakeWebSocket(), max_queue=3)
+    for i in range(5):
+        dropping.enqueue("telemetry.vescs", json.dumps({"i": i}))
+    assert dropping.queue_depth == 3
+    assert dropping.dropped == 2
+
+    conflating = Subscriber(FakeWebSocket(), max_queue=3, policy="conflate")
+    for i in range(5):
+        conflating.enqueue("telemetry.vescs", json.dumps({"i": i}))
+        conflating.enqueue("telemetry.encoders", json.dumps({"j": i}))
+    assert conflating.queue_depth == 2
+
+    sender = asyncio.create_task(conflating.run_sender())
+    await asyncio.sleep(0.01)
+    sender.cancel()
+    assert conflating.websocket.sent == [{"i": 4}, {"j": 4}]
+
+
+@pytest.mark.asyncio
+async def test_slow_client_does_not_stall_fast_client():
+    hub = WebSocketHub(max_queue=5)
+    slow = Subscriber(FakeWebSocket(delay=1.0), max_queue=5)
+    fast = Subscriber(FakeWebSocket(), max_queue=5)
+    for subscriber in (slow, fast):
+        hub.add(subscriber)
+        hub.subscribe(subscriber, ["telemetry.all"])
+    tasks = [asyncio.create_task(s.run_sender()) for s in (slow, fast)]
+
+    for i in range(50):
+        hub.publish("telemetry.vescs", {"i": i})
+        await asyncio.sleep(0)
+    await asyncio.sleep(0.01)
+    for task in tasks:
+        task.cancel()
+
+    assert len(fast.websocket.sent) == 50
+    assert slow.queue_depth == 5
+    assert slow.dropped > 0
+    assert hub.stats()["dropped"] == slow.dropped
+    # Totals keep counting clients that have disconnected
+    before = hub.stats()
+    hub.remove(slow)
+    hub.remove(slow)
+    after = hub.stats()
+    assert after["dropped"] == before["dropped"] == slow.dropped
+    assert after["bytes_sent"] == before["bytes_sent"] > 0
+
+
+def test_websocket_protocol():
+    client = TestClient(app)
+    with client.websocket_connect("/api/v1/ws") as websocket:
+        websocket.send_text(
+            json.dumps({"action": "subscribe", "topics": ["telemetry.all"]})
+        )
+        assert websocket.receive_json() == {
+            "type": "subscribed",
+            "topics": ["telemetry.all"],
+        }
+        websocket.send_text(json.dumps({"action": "ping"}))
+        assert websocket.receive_json() == {"type": "pong"}
+        websocket.send_text("not json")
+        assert websocket.receive_json()["type"] == "error"
+        websocket.send_text(
+            json.dumps({"action": "unsubscribe", "topics": ["telemetry.all"]})
+        )
+        assert websocket.receive_json() == {"type": "unsubscribed", "topics": []}
+
+
+@pytest.mark.asyncio
+async def test_max_rate_decimates_and_sends_latest():
+    hub = WebSocketHub()
+    capped, full = Subscriber(FakeWebSocket()), Subscriber(FakeWebSocket())
+    for subscriber in (capped, full):
+        hub.add(subscriber)
+    hub.handle_message(
+        capped,
+        json.dumps({"action": "subscribe", "topics": ["pose.*"], "max_rate": 20}),
+    )
+    hub.subscribe(full, ["pose.current"])
+
+    for i in range(10):
+        hub.publish("pose.current", {"i": i})
+    assert full.queue_depth == 10
+    # The first message goes out at once, the rest wait for the interval
+    assert capped.queue_depth == 1
+    assert capped.decimated == 8
+
+    await asyncio.sleep(0.06)
+    assert capped.queue_depth == 2
+    latest = json.loads(capped._queue[-1])
+    assert latest["data"] == {"i": 9}
+    assert json.loads(capped._control[0])["max_rates"] == {"pose.*": 20.0}
+
+
+@pytest.mark.asyncio
+async def test_held_messages_are_not_sent_after_unsubscribing():
+    hub = WebSocketHub()
+    staying, leaving = Subscriber(FakeWebSocket()), Subscriber(FakeWebSocket())
+    for subscriber in (staying, leaving):
+        hub.add(subscriber)
+        hub.subscribe(subscriber, ["pose.*", "pose.current"])
+        subscriber.set_max_rate(["pose.*"], 20)
+    for i in range(3):
+        hub.publish("pose.current", {"i": i})
+    # Still subscribed through pose.current
+    hub.unsubscribe(staying, ["pose.*"])
+    hub.remove(leaving)
+    assert leaving._held == {} and leaving._release_timers == {}
+
+    await asyncio.sleep(0.06)
+    assert leaving.queue_depth == 1
+    assert staying.queue_depth == 2
+    # Held until the next interval
+    hub.publish("pose.current", {"i": 3})
+    hub.unsubscribe(staying, ["pose.current"])
+    await asyncio.sleep(0.06)
+    assert staying.queue_depth == 2
+
+
+def test_max_rate_must_be_positive():
+    hub = WebSocketHub()
+    subscriber = Subscriber(FakeWebSocket())
+    hub.handle_message(
+        subscriber,
+        json.dumps({"action": "subscribe", "topics": ["pose.current"], "max_rate": 0}),
+    )
+    assert json.loads(subscriber._control[0])["type"] == "error"
+    assert subscriber.topics == set()
+
+
+def test_delta_encoder_sends_changes_from_acknowledged_state():
+    encoder = DeltaEncoder(keyframe_interval=5)
+    stamp = "2026-01-01T00:00:00+00:00"
+    state = {"a": 1, "b": {"c": 2, "d": 3}, "e": 4, "f": 5, "g": 6}
+    first = encoder.encode("t", state, stamp)
+    # Nothing acknowledged yet: full messages
+    assert first["seq"] == 1 and first["data"] == state
+    assert "data" in encoder.encode("t", state, stamp)
+    assert encoder.ack("t", 1) and not encoder.ack("t", 1)
+    assert not encoder.ack("t", 99) and not encoder.ack("other", 1)
+
+    changed = {"a": 1, "b": {"c": 5}, "e": 4, "f": 5, "g": 6, "h": "x"}
+    third = encoder.encode("t", changed, stamp)
+    assert third == {
+        "topic": "t",
+        "seq": 3,
+        "timestamp": stamp,
+        "base": 1,
+        "set": {"b.c": 5, "h": "x"},
+        "unset": ["b.d"],
+    }
+    # Still relative to seq 1 until 3 is acknowledged, so losing a
+    # message never breaks the client
+    assert encoder.encode("t", {**state, "a": 2}, stamp)["set"] == {"a": 2}
+    assert encoder.ack("t", 3)
+    assert encoder.encode("t", {**changed, "a": 2}, stamp)["base"] == 3
+    # Mostly changed: a full message is smaller
+    assert "data" in encoder.encode("t", {"a": 9, "b": 9, "e": 9, "f": 9}, stamp)
+    # Counts as a keyframe
+    full = ["data" in encoder.encode("t", state, stamp) for _ in range(5)]
+    assert full == [False, False, False, False, True]
+    assert encoder.encode("t", [1, 2], stamp)["data"] == [1, 2]
+    assert encoder.encode("t", {}, stamp)["data"] == {}
+
+
+def test_delta_encoder_indexes_lists_and_sends_reshaped_data_in_full():
+    encoder = DeltaEncoder()
+    stamp = "2026-01-01T00:00:00+00:00"
+    checks = [{"name": n, "status": "ok", "value": 1} for n in "abcd"]
+    snapshot = {"version": 1, "status": "ok", "checks": checks, "a": 1, "b": 2}
+    encoder.encode("health", snapshot, stamp)
+    assert encoder.ack("health", 1)
+
+    checks = [dict(check) for check in checks]
+    checks[2]["value"] = 7
+    delta = encoder.encode(
+        "health", {**snapshot, "version": 2, "checks": checks}, stamp
+    )
+    assert delta["set"] == {"version": 2, "checks.2.value": 7}
+    # A list changing length, a value becoming a dict or a dict becoming a
+    # value is a new shape, sent in full
+    reshaped = [
+        {**snapshot, "checks": checks[:3]},
+        {**snapshot, "a": {"x": 1}},
+        {**snapshot, "checks": [*checks[:3], 5]},
+        {**snapshot, "checks": {str(i): check for i, check in enumerate(checks)}},
+    ]
+    for data in reshaped:
+        assert encoder.encode("health", data, stamp)["data"] == data
+    assert encoder.ack("health", 3)
+    assert encoder.encode("health", {**snapshot, "a": 2}, stamp)["data"]["a"] == 2
+
+
+@pytest.mark.asyncio
+async def test_publish_encodes_once_per_encoding():
+    hub = WebSocketHub()
+    subscribers = [
+        Subscriber(FakeWebSocket()),
+        Subscriber(FakeWebSocket(), encoding="msgpack"),
+        Subscriber(FakeWebSocket(), encoding="msgpack"),
+        Subscriber(FakeWebSocket(), delta=True),
+        Subscriber(FakeWebSocket(), encoding="msgpack", delta=True),
+    ]
+    for subscriber in subscribers:
+        hub.add(subscriber)
+        hub.subscribe(subscriber, ["telemetry.*"])
+    hub.publish("telemetry.vescs", {"rpm": 1})
+    plain, packed, packed_again, delta, packed_delta = (
+        s._queue[0] for s in subscribers
+    )
+
+    assert json.loads(plain)["data"] == {"rpm": 1}
+    assert packed is packed_again and msgpack.unpackb(packed)["data"] == {"rpm": 1}
+    assert json.loads(delta)["seq"] == 1
+    assert msgpack.unpackb(packed_delta)["seq"] == 1
+
+    with pytest.raises(ValueError):
+        Subscriber(FakeWebSocket(), encoding="xml")
+
+
+def test_websocket_encoding_options():
+    client = TestClient(app)
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect("/api/v1/ws?encoding=xml") as websocket:
+            websocket.receive_json()
+    with client.websocket_connect("/api/v1/ws") as websocket:
+        websocket.send_text(json.dumps({"action": "ack", "seqs": {"t": 1}}))
+        assert websocket.receive_json()["message"] == "ack needs a delta connection"
+    with client.websocket_connect("/api/v1/ws?encoding=msgpack") as websocket:
+        websocket.send_bytes(msgpack.packb({"action": "ping"}))
+        with pytest.raises(WebSocketDisconnect) as closed:
+            websocket.receive_bytes()
+        assert closed.value.code == 1003
+    with client.websocket_connect("/api/v1/ws?encoding=msgpack&delta=true") as ws:
+        ws.send_text(json.dumps({"action": "ack", "seqs": {"t": "one"}}))
+        assert ws.receive_json()["type"] == "error"
+        ws.send_text(json.dumps({"action": "ack", "seqs": {"t": 1}}))
+        ws.send_text(json.dumps({"action": "ping"}))
+        assert ws.receive_json() == {"type": "pong"}